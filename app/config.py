@@ -23,9 +23,50 @@ def default_config() -> dict[str, Any]:
             "candidates_per_image": 100,  # 侵害検知向上のため100（50だと候補外になる場合あり）
             "stop_on_first_match_per_image": True,
             "max_concurrent_downloads": 10,
+            "listing_workers": 1,  # 出品ステージのワーカー数
+            "resolve_workers": 2,  # 自画像の取得・ハッシュ
+            "search_workers": 2,  # 画像・キーワード検索
+            "download_workers": 2,  # 候補画像のダウンロード完了待ち・ハッシュ
+            "match_workers": 1,  # 照合・登録
+            "stage_queue_size": 8,  # ステージ間キューの上限
+            "additional_images_top_hits": 0,  # 画像検索上位N件の追加画像も比較（0=無効）
+            "search_image_max_edge": 1024,  # 画像検索に送る画像の長辺上限（px）
+            "image_search_marketplaces": ["EBAY_US"],  # 画像検索を並列実行するマーケットプレイス
+            "image_search_max_depth": 300,  # 閾値帯の候補が出続ける間だけ深いページを取得（最大件数）
+            "time_budget_minutes": 0,  # 実行時間の予算（分）。0=無制限
+            "api_call_budget": 0,  # Browse API 呼び出し回数の予算。0=無制限
+            "budget_reserve_sec": 60,  # 時間予算のうち出力・後処理に残す秒数
+            "write_batch_listings": 20,  # DB 書き込みを N 出品ごとにまとめてコミット
+            "write_batch_interval_sec": 5.0,  # または T 秒ごとにコミット
         },
         "ebay": {"search_limit": 1000, "search_sort": "newlyListed"},
+        # ホストごとの同時リクエスト数を応答時間・エラーに応じて自動調整（AIMD）。hosts で範囲を上書きできる
+        "concurrency": {"adaptive": True, "hosts": {}},
+        # ステージごとの所要時間は run ごとに常に記録する。per_listing で出品ごとの内訳も記録
+        "timing": {"per_listing": False},
         "match": {"mode": "sha256_exact", "also_accept_same_image_url": True},
+        "catalog": {"enabled": True, "full_sync_interval_days": 7},
+        "accounts": [],  # 空なら EBAY_SELLER_USERNAME / EBAY_USER_REFRESH_TOKEN の1アカウント
+        "work_queue": {"enabled": False, "lease_sec": 300, "lease_batch": 10, "join_window_hours": 24},
+        "priority": {"enabled": True, "rescan_min_days": 1, "rescan_max_days": 30, "new_listing_days": 14},
+        "daemon": {
+            "full_sweep_interval_hours": 24,
+            "new_listings_interval_minutes": 60,
+            "verify_interval_hours": 24,
+            "verify_batch": 200,
+            "jitter_ratio": 0.1,
+            "status_file": "data/daemon_status.json",
+            "heartbeat_sec": 60,
+        },
+        "retention": {
+            "enabled": True,
+            "interval_hours": 24,
+            "keep_runs_days": 180,
+            "archive_resolved_after_days": 90,
+            "prune_ended_listings_days": 365,
+            "payload_cache_days": 30,
+            "payload_cache_max_mb": 1024,
+        },
         "sheet": {
             "output_type": "csv",
             "worksheet_name": "detections",
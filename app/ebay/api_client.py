@@ -2,11 +2,29 @@
 from __future__ import annotations
 
 import os
+import threading
 
 from app.constants import DEFAULT_MARKETPLACE_ID
 
 BASE_URL = "https://api.ebay.com/buy/browse/v1"
 
+# プロセス内の Browse API 呼び出し回数（run の API 呼び出し予算・実績の記録用）
+_call_count = 0
+_call_lock = threading.Lock()
+
+
+def record_api_call() -> None:
+    """Browse API を1回呼び出したことを記録。"""
+    global _call_count
+    with _call_lock:
+        _call_count += 1
+
+
+def api_call_count() -> int:
+    """プロセス起動からの Browse API 呼び出し回数（差分で run ごとの回数を求める）。"""
+    with _call_lock:
+        return _call_count
+
 
 def get_marketplace_id() -> str:
     """マーケットプレイスIDを取得。EBAY_IT=ebay.it, EBAY_US=ebay.com。"""
@@ -3,15 +3,21 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Optional
+from typing import Iterator, Optional
 from urllib.parse import urlencode
 
 import requests
 from dotenv import load_dotenv
 
 from app.ebay import auth, models
-from app.ebay.api_client import BASE_URL, build_headers, get_delivery_country, use_delivery_country_filter
-from app.util import http
+from app.ebay.api_client import (
+    BASE_URL,
+    build_headers,
+    get_delivery_country,
+    record_api_call,
+    use_delivery_country_filter,
+)
+from app.util import concurrency, http
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -83,13 +89,15 @@ def search_my_fixed_price_listings(
     full_url = f"{url}?{urlencode(params)}"
     print(f"[DEBUG] Browse API リクエストURL: {full_url}")  # limit=200, filter=sellers:{...} を確認
     token = auth.get_access_token()
-    r = requests.get(
-        url,
-        params=params,
-        headers=build_headers(token, marketplace_id=marketplace_id),
-        timeout=http.get_timeout_sec(),
-    )
-    r.raise_for_status()
+    record_api_call()
+    with concurrency.limited(url):
+        r = requests.get(
+            url,
+            params=params,
+            headers=build_headers(token, marketplace_id=marketplace_id),
+            timeout=http.get_timeout_sec(),
+        )
+        r.raise_for_status()
     return models.SearchResponse.from_api(r.json())
 
 
@@ -209,13 +217,15 @@ def search_by_keywords(
         params["sort"] = sort
     token = auth.get_access_token()
     url = f"{BASE_URL}/item_summary/search"
-    r = requests.get(
-        url,
-        params=params,
-        headers=build_headers(token, marketplace_id=marketplace_id),
-        timeout=http.get_timeout_sec(),
-    )
-    r.raise_for_status()
+    record_api_call()
+    with concurrency.limited(url):
+        r = requests.get(
+            url,
+            params=params,
+            headers=build_headers(token, marketplace_id=marketplace_id),
+            timeout=http.get_timeout_sec(),
+        )
+        r.raise_for_status()
     return models.SearchResponse.from_api(r.json())
 
 
@@ -236,14 +246,16 @@ def search_by_image(
     logger.debug("search_by_image: image_size=%d bytes, limit=%d", image_size, limit)
     
     try:
-        r = requests.post(
-            url,
-            params=params,
-            headers=build_headers(token, marketplace_id=marketplace_id),
-            json=body,
-            timeout=http.get_timeout_sec(),
-        )
-        r.raise_for_status()
+        record_api_call()
+        with concurrency.limited(url):
+            r = requests.post(
+                url,
+                params=params,
+                headers=build_headers(token, marketplace_id=marketplace_id),
+                json=body,
+                timeout=http.get_timeout_sec(),
+            )
+            r.raise_for_status()
         return models.SearchResponse.from_api(r.json() if r.content else {"itemSummaries": [], "total": 0, "offset": 0, "limit": limit})
     except requests.exceptions.HTTPError as e:
         error_msg = f"HTTP {r.status_code}: {r.text[:500]}" if hasattr(e, 'response') and e.response else str(e)
@@ -252,3 +264,34 @@ def search_by_image(
     except Exception as e:
         logger.error("search_by_image エラー: %s", str(e), exc_info=True)
         raise
+
+
+def iter_search_by_image_pages(
+    image_base64: str,
+    page_size: int = 50,
+    max_total: int = 200,
+    marketplace_id: Optional[str] = None,
+) -> Iterator[models.SearchResponse]:
+    """
+    search_by_image を offset ベースで1ページずつ取得するジェネレータ。
+    呼び出し側が次ページが必要かを判断し、不要になった時点でループを抜ける（以降の API 呼び出しは発生しない）。
+    終了条件: 取得0件 / page_size 未満（最終ページ）/ API 総件数に到達 / max_total に到達。
+    """
+    page_size = max(1, min(int(page_size), BROWSE_API_LIMIT))
+    offset = 0
+    while offset < max_total:
+        limit = min(page_size, max_total - offset)
+        resp = search_by_image(
+            image_base64,
+            limit=limit,
+            offset=offset,
+            marketplace_id=marketplace_id,
+        )
+        if not resp.item_summaries:
+            return
+        yield resp
+        offset += len(resp.item_summaries)
+        if len(resp.item_summaries) < limit:
+            return
+        if resp.total > 0 and offset >= resp.total:
+            return
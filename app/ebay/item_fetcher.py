@@ -1,13 +1,20 @@
-"""eBay 出品の取得（検索・直接取得）。"""
+"""eBay 出品の取得（検索・直接取得・複数件一括取得）。"""
 from __future__ import annotations
 
-from typing import Optional
+import logging
+import threading
+from typing import Iterable, Optional
 
 import requests
 
 from app.ebay import browse, models
-from app.ebay.api_client import BASE_URL, build_headers
-from app.util import http
+from app.ebay.api_client import BASE_URL, build_headers, record_api_call
+from app.util import concurrency, http
+
+logger = logging.getLogger(__name__)
+
+# Browse API getItems（GET item/?item_ids=）で1回に指定できる最大件数
+MULTI_ITEM_BATCH_SIZE = 20
 
 
 def fetch_item_by_id(
@@ -41,18 +48,14 @@ def fetch_item_by_id(
     headers = build_headers(token)
     if item_id_clean.isdigit():
         url = f"{BASE_URL}/item/get_item_by_legacy_id"
-        r = requests.get(
-            url,
-            params={"legacy_item_id": item_id_clean},
-            headers=headers,
-            timeout=http.get_timeout_sec(),
-        )
+        params = {"legacy_item_id": item_id_clean}
     else:
-        r = requests.get(
-            f"{BASE_URL}/item/{item_id_clean}",
-            headers=headers,
-            timeout=http.get_timeout_sec(),
-        )
+        url = f"{BASE_URL}/item/{item_id_clean}"
+        params = None
+    record_api_call()
+    with concurrency.limited(url) as outcome:
+        r = requests.get(url, params=params, headers=headers, timeout=http.get_timeout_sec())
+        outcome.status = r.status_code
     if r.ok:
         return models.ItemSummary.from_api(r.json())
     return None
@@ -63,6 +66,14 @@ def fetch_any_item_by_id(item_id: str, token: str) -> Optional[models.ItemSummar
     任意の出品を ID で直接取得。自アカウント以外も取得可能。
     疑わしいアイテムの画像比較用。
     """
+    r = _get_single_item(item_id, token)
+    if r is not None and r.ok:
+        return models.ItemSummary.from_api(r.json())
+    return None
+
+
+def _get_single_item(item_id: str, token: str) -> Optional[requests.Response]:
+    """出品を1件直接取得した応答（ID が空なら None）。レガシーID は get_item_by_legacy_id を使う。"""
     item_id_clean = (item_id or "").strip()
     if not item_id_clean:
         return None
@@ -75,18 +86,227 @@ def fetch_any_item_by_id(item_id: str, token: str) -> Optional[models.ItemSummar
     headers = build_headers(token)
     if legacy_id.isdigit():
         url = f"{BASE_URL}/item/get_item_by_legacy_id"
-        r = requests.get(
-            url,
-            params={"legacy_item_id": legacy_id},
-            headers=headers,
-            timeout=http.get_timeout_sec(),
-        )
+        params = {"legacy_item_id": legacy_id}
     else:
-        r = requests.get(
-            f"{BASE_URL}/item/{legacy_id}",
-            headers=headers,
-            timeout=http.get_timeout_sec(),
+        url = f"{BASE_URL}/item/{legacy_id}"
+        params = None
+    record_api_call()
+    with concurrency.limited(url) as outcome:
+        r = requests.get(url, params=params, headers=headers, timeout=http.get_timeout_sec())
+        outcome.status = r.status_code
+    return r
+
+
+def to_rest_item_id(item_id: str) -> str:
+    """
+    Browse API の RESTful ID（v1|xxx|0）に変換。
+    レガシーID（数値のみ）は v1|xxx|0 とみなす。それ以外はそのまま返す。
+    """
+    item_id_clean = (item_id or "").strip()
+    if item_id_clean.isdigit():
+        return f"v1|{item_id_clean}|0"
+    return item_id_clean
+
+
+class ItemCache:
+    """
+    1回の実行（run）内で共有する出品キャッシュ。スレッドセーフ。
+    取得できなかった ID も None として記録し、同じ run 内で再取得しない。
+    """
+
+    def __init__(self) -> None:
+        self._items: dict[str, Optional[models.ItemSummary]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, item_id: str) -> tuple[bool, Optional[models.ItemSummary]]:
+        """(キャッシュ済みか, ItemSummary) を返す。"""
+        key = to_rest_item_id(item_id)
+        with self._lock:
+            if key in self._items:
+                return True, self._items[key]
+        return False, None
+
+    def put(self, item_id: str, item: Optional[models.ItemSummary]) -> None:
+        with self._lock:
+            self._items[to_rest_item_id(item_id)] = item
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+def _fetch_items_batch(rest_ids: list[str], token: str) -> dict[str, Optional[models.ItemSummary]]:
+    """
+    GET item/?item_ids= で最大20件を1リクエストで取得。
+    戻り値は RESTful ID → ItemSummary（見つからなければ None）。
+    一括取得自体が失敗した場合は1件ずつ fetch_any_item_by_id で取得する。
+    """
+    result: dict[str, Optional[models.ItemSummary]] = {rid: None for rid in rest_ids}
+    try:
+        record_api_call()
+        with concurrency.limited(BASE_URL):
+            r = requests.get(
+                f"{BASE_URL}/item/",
+                params={"item_ids": ",".join(rest_ids)},
+                headers=build_headers(token),
+                timeout=http.get_timeout_sec(),
+            )
+            r.raise_for_status()
+        data = r.json() if r.content else {}
+    except Exception as e:
+        logger.warning("一括取得失敗のため1件ずつ取得します: ids=%d件, err=%s", len(rest_ids), e)
+        for rid in rest_ids:
+            try:
+                result[rid] = fetch_any_item_by_id(rid, token)
+            except Exception as e2:
+                logger.warning("出品取得失敗: item_id=%s, err=%s", rid, e2)
+        return result
+
+    for d in data.get("items") or []:
+        item = models.ItemSummary.from_api(d)
+        if item.item_id in result:
+            result[item.item_id] = item
+            continue
+        # バリエーション出品などで ID 表記が異なる場合はレガシーIDで対応付ける
+        legacy = str(d.get("legacyItemId") or "").strip()
+        if legacy and to_rest_item_id(legacy) in result:
+            result[to_rest_item_id(legacy)] = item
+    return result
+
+
+def fetch_items_by_ids(
+    item_ids: Iterable[str],
+    token: str,
+    cache: Optional[ItemCache] = None,
+    max_workers: int = 4,
+) -> dict[str, models.ItemSummary]:
+    """
+    複数の出品を Browse API の一括取得（20件/リクエスト）でまとめて取得。
+    cache 指定時はキャッシュ済みの ID を再取得しない。バッチは並列に実行する。
+    戻り値は入力 ID → ItemSummary（取得できなかった ID は含まない）。
+    """
+    requested: list[str] = []
+    for iid in item_ids:
+        iid_clean = (iid or "").strip()
+        if iid_clean and iid_clean not in requested:
+            requested.append(iid_clean)
+
+    found: dict[str, Optional[models.ItemSummary]] = {}
+    to_fetch: list[str] = []
+    for iid in requested:
+        rid = to_rest_item_id(iid)
+        if cache is not None:
+            hit, item = cache.get(rid)
+            if hit:
+                found[rid] = item
+                continue
+        if rid not in to_fetch:
+            to_fetch.append(rid)
+
+    batches = [
+        to_fetch[i : i + MULTI_ITEM_BATCH_SIZE]
+        for i in range(0, len(to_fetch), MULTI_ITEM_BATCH_SIZE)
+    ]
+    if batches:
+        # プロセス内で使い回すプールで並列に取得する（同時リクエスト数は api.ebay.com の並列数の制御に従う）
+        executor = concurrency.shared_executor(
+            "item-fetch", concurrency.max_level(concurrency.API_HOST, max_workers)
         )
-    if r.ok:
-        return models.ItemSummary.from_api(r.json())
-    return None
+        for batch_result in executor.map(lambda b: _fetch_items_batch(b, token), batches):
+            for rid, item in batch_result.items():
+                found[rid] = item
+                if cache is not None:
+                    cache.put(rid, item)
+
+    result: dict[str, models.ItemSummary] = {}
+    for iid in requested:
+        item = found.get(to_rest_item_id(iid))
+        if item is not None:
+            result[iid] = item
+    return result
+
+
+def fetch_item_availability(item_ids: Iterable[str], token: str) -> dict[str, bool]:
+    """
+    出品がまだ掲載中か（入力 ID → bool）を一括取得（20件/リクエスト）で確認する。
+    一括取得の応答に含まれない ID は、1件ずつ直接取得して 404 のときだけ掲載終了（False）とする
+    （一括取得は一時的な不調でも出品を落とすことがあるため、応答にないことだけでは終了とみなさない）。
+    直接取得でも判定できなかった ID は戻り値に含めない。一括取得の失敗は例外として送出する。
+    """
+    requested = list(dict.fromkeys((iid or "").strip() for iid in item_ids if (iid or "").strip()))
+    live: set[str] = set()
+    rest_ids = list(dict.fromkeys(to_rest_item_id(iid) for iid in requested))
+    for i in range(0, len(rest_ids), MULTI_ITEM_BATCH_SIZE):
+        batch = rest_ids[i : i + MULTI_ITEM_BATCH_SIZE]
+        record_api_call()
+        with concurrency.limited(BASE_URL) as outcome:
+            r = requests.get(
+                f"{BASE_URL}/item/",
+                params={"item_ids": ",".join(batch)},
+                headers=build_headers(token),
+                timeout=http.get_timeout_sec(),
+            )
+            outcome.status = r.status_code
+        # 全件が見つからない場合は 404 が返る（この場合も1件ずつ確かめる）
+        if r.status_code != 404:
+            r.raise_for_status()
+        data = r.json() if r.ok and r.content else {}
+        for d in data.get("items") or []:
+            live.add(str(d.get("itemId", "")))
+            legacy = str(d.get("legacyItemId") or "").strip()
+            if legacy:
+                live.add(to_rest_item_id(legacy))
+
+    result: dict[str, bool] = {}
+    for iid in requested:
+        rid = to_rest_item_id(iid)
+        if rid in live:
+            result[iid] = True
+            continue
+        try:
+            single = _get_single_item(rid, token)
+        except requests.RequestException as e:
+            logger.warning("掲載状況を確認できませんでした: item_id=%s, err=%s", iid, e)
+            continue
+        if single is None:
+            continue
+        if single.status_code == 404:
+            result[iid] = False
+        elif single.ok:
+            result[iid] = True
+        else:
+            logger.warning("掲載状況を確認できませんでした: item_id=%s, status=%s", iid, single.status_code)
+    return result
+
+
+def enrich_additional_images(
+    summaries: list[models.ItemSummary],
+    token: str,
+    top_n: int,
+    cache: Optional[ItemCache] = None,
+) -> list[models.ItemSummary]:
+    """
+    検索結果（item_summary）の上位 top_n 件について、一括取得で additionalImages を補完する。
+    item_summary は主画像のみのことが多いため、追加画像まで比較したい場合に使う。
+    補完できなかった出品は元の ItemSummary のまま返す。
+    """
+    if top_n <= 0 or not summaries:
+        return summaries
+    targets = [s.item_id for s in summaries[:top_n] if not s.additional_images]
+    if not targets:
+        return summaries
+    fetched = fetch_items_by_ids(targets, token, cache=cache)
+    enriched: list[models.ItemSummary] = []
+    for s in summaries:
+        full = fetched.get(s.item_id)
+        if full is not None and full.additional_images:
+            s = models.ItemSummary(
+                item_id=s.item_id,
+                item_web_url=s.item_web_url or full.item_web_url,
+                image=s.image or full.image,
+                additional_images=full.additional_images,
+                seller=s.seller or full.seller,
+                title=s.title or full.title,
+            )
+        enriched.append(s)
+    return enriched
@@ -1,9 +1,14 @@
-"""Trading API: GetMyeBaySelling（自分の出品一覧取得）。User OAuth 必須。"""
+"""Trading API: GetMyeBaySelling（自分の出品一覧取得）/ GetSellerEvents（差分取得）。User OAuth 必須。"""
 from __future__ import annotations
 
 import logging
+import os
+import time
 import xml.etree.ElementTree as ET
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import IO, Iterator, Optional
 
 import requests
 from dotenv import load_dotenv
@@ -44,21 +49,36 @@ MARKETPLACE_TO_SITE_ID: dict[str, int] = {
 }
 
 
+# 名前空間付きタグ
+_NS = "{urn:ebay:apis:eBLBaseComponents}"
+
+# OutputSelector: 実際にパースするフィールドだけを返させ、レスポンスを小さくする
+OUTPUT_SELECTORS = (
+    "ActiveList.ItemArray.Item.ItemID",
+    "ActiveList.ItemArray.Item.Title",
+    "ActiveList.ItemArray.Item.ListingDetails.ViewItemURL",
+    "ActiveList.ItemArray.Item.PictureDetails.PictureURL",
+    "ActiveList.PaginationResult",
+)
+
+
 def _build_get_my_ebay_selling_xml(
     page: int = 1, entries_per_page: int = 100, include_listing_type: bool = False
 ) -> str:
     """
     GetMyeBaySelling リクエスト XML。
     paginationInput: EntriesPerPage（100=最大値）, PageNumber で全件取得。
+    OutputSelector で ItemID / Title / ViewItemURL / PictureURL / ページ情報のみに絞る。
     """
     listing_line = "    <ListingType>FixedPriceItem</ListingType>\n" if include_listing_type else ""
+    selector_lines = "".join(f"  <OutputSelector>{sel}</OutputSelector>\n" for sel in OUTPUT_SELECTORS)
     return f"""<?xml version="1.0" encoding="utf-8"?>
 <GetMyeBaySellingRequest xmlns="urn:ebay:apis:eBLBaseComponents">
   <RequesterCredentials>
     <eBayAuthToken>{{token}}</eBayAuthToken>
   </RequesterCredentials>
   <DetailLevel>ReturnAll</DetailLevel>
-  <ActiveList>
+{selector_lines}  <ActiveList>
     <Include>true</Include>
 {listing_line}    <Pagination>
       <EntriesPerPage>{entries_per_page}</EntriesPerPage>
@@ -68,23 +88,27 @@ def _build_get_my_ebay_selling_xml(
 </GetMyeBaySellingRequest>"""
 
 
+def _child_text(element: ET.Element, path: str) -> str:
+    el = element.find(path)
+    return (el.text or "").strip() if el is not None else ""
+
+
 def _parse_item(element: ET.Element, seller_username: str) -> Optional[models.ItemSummary]:
-    """Trading API Item 要素を ItemSummary に変換。"""
-    item_id_el = element.find(".//{urn:ebay:apis:eBLBaseComponents}ItemID")
-    view_url_el = element.find(".//{urn:ebay:apis:eBLBaseComponents}ViewItemURL")
-    if item_id_el is None or item_id_el.text is None:
+    """Trading API Item 要素を ItemSummary に変換。子要素のみを参照し、全体検索はしない。"""
+    item_id = _child_text(element, f"{_NS}ItemID")
+    if not item_id:
         return None
-    item_id = item_id_el.text.strip()
-    item_web_url = (view_url_el.text or "").strip() or f"https://www.ebay.com/itm/{item_id}"
-
-    title_el = element.find(".//{urn:ebay:apis:eBLBaseComponents}Title")
-    title = (title_el.text or "").strip() or None
+    view_url = _child_text(element, f"{_NS}ListingDetails/{_NS}ViewItemURL") or _child_text(
+        element, f"{_NS}ViewItemURL"
+    )
+    item_web_url = view_url or f"https://www.ebay.com/itm/{item_id}"
+    title = _child_text(element, f"{_NS}Title") or None
 
     # 画像URL
     pic_urls = []
-    pic_details = element.find(".//{urn:ebay:apis:eBLBaseComponents}PictureDetails")
+    pic_details = element.find(f"{_NS}PictureDetails")
     if pic_details is not None:
-        for pic in pic_details.findall(".//{urn:ebay:apis:eBLBaseComponents}PictureURL"):
+        for pic in pic_details.findall(f"{_NS}PictureURL"):
             if pic.text and pic.text.strip():
                 pic_urls.append(pic.text.strip())
 
@@ -104,6 +128,229 @@ def _parse_item(element: ET.Element, seller_username: str) -> Optional[models.It
     )
 
 
+@dataclass
+class _ResponseMeta:
+    """iter_my_ebay_selling_items がパース中に埋めるレスポンス情報。"""
+
+    ack: Optional[str] = None
+    short_message: Optional[str] = None
+    has_active_list: bool = False
+    item_count: int = 0  # Item 要素の件数（画像なし等で変換できなかったものも含む）
+    total_entries: Optional[int] = None
+
+
+def _iter_item_elements(
+    source: IO[bytes],
+    meta: _ResponseMeta,
+    container_tag: str,
+    call_name: str,
+) -> Iterator[ET.Element]:
+    """
+    Trading API レスポンスを iterparse で逐次パースし、container_tag 配下の Item 要素を返す。
+    呼び出し側が要素を処理して次を要求した時点で要素を破棄するため、メモリ使用量は一定。
+    Ack / TotalNumberOfEntries などは meta に格納する（meta.has_active_list は container_tag の有無）。
+    Ack が Failure の場合は最後に RuntimeError。
+    """
+    container_depth = 0
+    parents: list[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if elem.tag == f"{_NS}{container_tag}":
+                container_depth += 1
+                meta.has_active_list = True
+            parents.append(elem)
+            continue
+        parents.pop()
+        tag = elem.tag
+        if tag == f"{_NS}{container_tag}":
+            container_depth -= 1
+        elif tag == f"{_NS}Ack" and meta.ack is None:
+            meta.ack = (elem.text or "").strip()
+        elif tag == f"{_NS}ShortMessage" and meta.short_message is None:
+            meta.short_message = (elem.text or "").strip()
+        elif container_depth and tag == f"{_NS}TotalNumberOfEntries" and elem.text:
+            meta.total_entries = int(elem.text)
+        elif container_depth and tag == f"{_NS}Item":
+            meta.item_count += 1
+            yield elem
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+    if meta.ack in ("Failure", "PartialFailure"):
+        raise RuntimeError(f"{call_name} error: {meta.short_message or 'Unknown error'}")
+
+
+def iter_my_ebay_selling_items(
+    source: IO[bytes],
+    seller_username: str,
+    meta: Optional[_ResponseMeta] = None,
+) -> Iterator[models.ItemSummary]:
+    """
+    GetMyeBaySelling レスポンスを iterparse で逐次パースし、ActiveList の Item を ItemSummary として返す。
+    処理済みの Item 要素は都度破棄するため、ページサイズに依らずメモリ使用量は一定。
+    Ack / TotalNumberOfEntries などは meta に格納する。Ack が Failure の場合は最後に RuntimeError。
+    """
+    meta = meta if meta is not None else _ResponseMeta()
+    for elem in _iter_item_elements(source, meta, "ActiveList", "GetMyeBaySelling"):
+        parsed = _parse_item(elem, seller_username)
+        if parsed:
+            yield parsed
+
+
+@dataclass
+class _PageResult:
+    """GetMyeBaySelling 1ページ分の結果。"""
+
+    items: list[models.ItemSummary]
+    item_count: int  # Item 要素の件数（画像なし等で変換できなかったものも含む）
+    total_entries: Optional[int]  # TotalNumberOfEntries（不明なら None）
+    has_active_list: bool
+
+
+def get_max_concurrency() -> int:
+    """GetMyeBaySelling の同時リクエスト数の上限。環境変数 EBAY_TRADING_MAX_CONCURRENCY で上書き可能。"""
+    return max(1, int(os.getenv("EBAY_TRADING_MAX_CONCURRENCY", "4")))
+
+
+def _fetch_my_ebay_selling_page(
+    user_token: str,
+    seller_username: str,
+    site_id: int,
+    page_number: int,
+    entries_per_page: int = PAGINATION_ENTRIES_PER_PAGE,
+) -> _PageResult:
+    """GetMyeBaySelling を1ページ分実行。レスポンスはストリームのまま逐次パースする。API エラー時は RuntimeError。"""
+    body = _build_get_my_ebay_selling_xml(page_number, entries_per_page, include_listing_type=False).replace("{token}", user_token)
+    logger.info(
+        "Trading API GetMyeBaySelling: SiteID %d ページ%d (EntriesPerPage=%d) 取得中...",
+        site_id, page_number, entries_per_page,
+    )
+    meta = _ResponseMeta()
+    with requests.post(
+        TRADING_ENDPOINT,
+        headers={
+            "X-EBAY-API-COMPATIBILITY-LEVEL": API_VERSION,
+            "X-EBAY-API-CALL-NAME": "GetMyeBaySelling",
+            "X-EBAY-API-SITEID": str(site_id),
+            "Content-Type": "text/xml",
+        },
+        data=body.encode("utf-8"),
+        timeout=http.get_timeout_sec(),
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True  # gzip 等を透過的に展開
+        items = list(iter_my_ebay_selling_items(r.raw, seller_username, meta))
+
+    if not meta.has_active_list:
+        # ActiveListが存在しない = そのサイトに出品がない
+        logger.info(
+            "Trading API: ActiveList が見つかりません (SiteID=%d, Ack=%s) - このサイトには出品がない可能性があります",
+            site_id, meta.ack or "N/A",
+        )
+        return _PageResult(items=[], item_count=0, total_entries=None, has_active_list=False)
+
+    logger.info(
+        "Trading API GetMyeBaySelling: SiteID %d ページ%d 取得完了 取得=%d件 (総ヒット数=%s)",
+        site_id, page_number, meta.item_count,
+        str(meta.total_entries) if meta.total_entries is not None else "N/A",
+    )
+    return _PageResult(
+        items=items,
+        item_count=meta.item_count,
+        total_entries=meta.total_entries,
+        has_active_list=True,
+    )
+
+
+def check_my_ebay_selling_access(user_token: str, seller_username: str, site_id: int = 0) -> Optional[int]:
+    """
+    GetMyeBaySelling を1件だけ（1ページ目・EntriesPerPage=1）取得し、トークンで認証できるかを確かめる。
+    そのサイトの出品総数（TotalNumberOfEntries。不明・出品なしは None）を返す。認証・API エラー時は例外を送出。
+    """
+    return _fetch_my_ebay_selling_page(user_token, seller_username, site_id, 1, entries_per_page=1).total_entries
+
+
+def _fetch_page_with_retry(
+    user_token: str,
+    seller_username: str,
+    site_id: int,
+    page_number: int,
+    entries_per_page: int,
+) -> _PageResult:
+    """並列取得で失敗したページを取り直す（HTTP_RETRY_MAX 回まで指数バックオフ）。最後まで失敗したら例外を送出。"""
+    retry_max = http.get_retry_max()
+    backoff = http.get_retry_backoff_sec()
+    for attempt in range(retry_max):
+        time.sleep(backoff * (2 ** attempt))
+        try:
+            return _fetch_my_ebay_selling_page(user_token, seller_username, site_id, page_number, entries_per_page)
+        except Exception as e:
+            if attempt == retry_max - 1:
+                raise
+            logger.warning(
+                "Trading API GetMyeBaySelling: SiteID %s ページ%d 再試行 %d/%d 失敗: %s",
+                site_id, page_number, attempt + 1, retry_max, e,
+            )
+    raise RuntimeError(f"GetMyeBaySelling SiteID {site_id} page {page_number} failed")
+
+
+def _remaining_page_numbers(first: _PageResult, max_total: int, entries_per_page: int) -> list[int]:
+    """
+    1ページ目の結果から、並列取得する残りページ番号（2..N）を返す。
+    TotalNumberOfEntries が不明な場合は並列化できないため空（呼び出し側で逐次取得）。
+    """
+    if not first.has_active_list or first.total_entries is None:
+        return []
+    wanted = min(max_total, first.total_entries)
+    last_page = -(-wanted // entries_per_page)  # ceil
+    return list(range(2, last_page + 1))
+
+
+def _fetch_pages_serially(
+    user_token: str,
+    seller_username: str,
+    site_id: int,
+    start_page: int,
+    collected: int,
+    total_entries: Optional[int],
+    max_total: int,
+    entries_per_page: int,
+) -> list[_PageResult]:
+    """
+    ページ番号 start_page から逐次取得（TotalNumberOfEntries 不明時や、API が EntriesPerPage 未満しか
+    返さず並列取得分で総件数に届かなかった場合の補完）。
+    """
+    results: list[_PageResult] = []
+    page_number = start_page
+    while collected < max_total:
+        page = _fetch_my_ebay_selling_page(user_token, seller_username, site_id, page_number, entries_per_page)
+        if not page.has_active_list or page.item_count == 0:
+            break
+        results.append(page)
+        collected += page.item_count
+        if total_entries is None:
+            total_entries = page.total_entries
+        if total_entries is not None and collected >= min(max_total, total_entries):
+            break
+        # 返却件数が EntriesPerPage 未満なら通常は最終ページ。総件数が分かっていて未達なら次ページを試す
+        if page.item_count < entries_per_page and total_entries is None:
+            break
+        page_number += 1
+    return results
+
+
+def _site_needs_serial_tail(
+    pages: list[_PageResult], max_total: int, entries_per_page: int
+) -> bool:
+    """並列取得した後、まだ総件数に届いていない（逐次の補完取得が必要）か。"""
+    first = pages[0]
+    collected = sum(p.item_count for p in pages)
+    if first.total_entries is None:
+        return first.item_count >= entries_per_page and collected < max_total
+    return 0 < pages[-1].item_count and collected < min(max_total, first.total_entries)
+
+
 def _fetch_my_ebay_selling_one_site(
     user_token: str,
     seller_username: str,
@@ -112,108 +359,114 @@ def _fetch_my_ebay_selling_one_site(
 ) -> list[models.ItemSummary]:
     """
     1サイト分の GetMyeBaySelling を実行。
-    paginationInput: EntriesPerPage=200（最大値）, PageNumber をインクリメントして全件取得。
+    1ページ目で TotalNumberOfEntries が分かれば、残りページは並列に取得する。
+    """
+    results = _fetch_sites(user_token, seller_username, [site_id], max_total)
+    return _merge_site_pages(results.get(site_id, []), max_total)
+
+
+def _merge_site_pages(pages: list[_PageResult], max_total: int) -> list[models.ItemSummary]:
+    items: list[models.ItemSummary] = []
+    for page in pages:
+        items.extend(page.items)
+    return items[:max_total]
+
+
+def _fetch_sites(
+    user_token: str,
+    seller_username: str,
+    site_ids: list[int],
+    max_total: int,
+    max_workers: Optional[int] = None,
+    incomplete_site_ids: Optional[list[int]] = None,
+) -> dict[int, list[_PageResult]]:
+    """
+    複数サイトの GetMyeBaySelling を並列実行し、SiteID → ページ結果（ページ番号順）を返す。
+    1) 全サイトの1ページ目を並列取得 → 2) TotalNumberOfEntries から残りページを全サイト分まとめて並列取得。
+    同時リクエスト数は max_workers（デフォルト get_max_concurrency()）で制限する。
+    1ページ目が失敗したサイトは結果に含めない。2ページ目以降は失敗したページを取り直し、
+    それでも取れなかったサイトは取得できた分だけを返して incomplete_site_ids に追加する（一部の出品が欠けている）。
     """
-    all_items: list[models.ItemSummary] = []
-    page_number = 1
     entries_per_page = PAGINATION_ENTRIES_PER_PAGE
-    total_from_api: Optional[int] = None
+    workers = max_workers or get_max_concurrency()
+    site_pages: dict[int, dict[int, _PageResult]] = {}
+    failed_pages: list[tuple[int, int]] = []
+    incomplete: set[int] = set()
 
-    while len(all_items) < max_total:
-        body = _build_get_my_ebay_selling_xml(page_number, entries_per_page, include_listing_type=False).replace("{token}", user_token)
-        print(
-            f"[DEBUG] Trading API リクエスト: {TRADING_ENDPOINT} "
-            f"(EntriesPerPage={entries_per_page}, PageNumber={page_number})"
-        )
-        if page_number == 1:
-            # リクエストXMLをログに出力（トークンはマスク）
-            body_masked = body.replace(user_token, "***TOKEN_MASKED***")
-            print(f"[DEBUG] Trading API リクエストXML:")
-            print(body_masked)
-        logger.info(
-            "Trading API GetMyeBaySelling: ページ%d (EntriesPerPage=%d) 取得中...",
-            page_number, entries_per_page,
-        )
-        r = requests.post(
-            TRADING_ENDPOINT,
-            headers={
-                "X-EBAY-API-COMPATIBILITY-LEVEL": API_VERSION,
-                "X-EBAY-API-CALL-NAME": "GetMyeBaySelling",
-                "X-EBAY-API-SITEID": str(site_id),
-                "Content-Type": "text/xml",
-            },
-            data=body.encode("utf-8"),
-            timeout=http.get_timeout_sec(),
-        )
-        r.raise_for_status()
-        root = ET.fromstring(r.content)
-
-        # エラーチェック
-        ack = root.find(".//{urn:ebay:apis:eBLBaseComponents}Ack")
-        if ack is not None and ack.text and ack.text in ("Failure", "PartialFailure"):
-            err = root.find(".//{urn:ebay:apis:eBLBaseComponents}ShortMessage")
-            msg = err.text if err is not None else "Unknown error"
-            raise RuntimeError(f"GetMyeBaySelling error: {msg}")
-
-        active_list = root.find(".//{urn:ebay:apis:eBLBaseComponents}ActiveList")
-        if active_list is None:
-            # ActiveListが存在しない = そのサイトに出品がない
-            logger.info("Trading API: ActiveList が見つかりません (SiteID=%d) - このサイトには出品がない可能性があります", site_id)
-            print(f"[DEBUG] Trading API: ActiveList が見つかりません (SiteID={site_id}) - このサイトには出品がない可能性があります")
-            # XMLレスポンス全体をログに出力（デバッグ用）
-            xml_str = ET.tostring(root, encoding='unicode')
-            print(f"[DEBUG] Trading API XMLレスポンス全体:")
-            print(xml_str)
-            # このサイトには出品がないので、次のサイトに進む
-            break
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        first_futures = {
+            executor.submit(
+                _fetch_my_ebay_selling_page, user_token, seller_username, sid, 1, entries_per_page
+            ): sid
+            for sid in site_ids
+        }
+        for future in as_completed(first_futures):
+            sid = first_futures[future]
+            site_name = SITE_ID_TO_NAME.get(sid, str(sid))
+            try:
+                site_pages[sid] = {1: future.result()}
+            except Exception as e:
+                logger.warning(
+                    "Trading API GetMyeBaySelling: SiteID %s (%s) 失敗: %s",
+                    sid, site_name, e,
+                )
 
-        # PaginationResult から総ヒット数を取得
-        pagination_result = active_list.find(".//{urn:ebay:apis:eBLBaseComponents}PaginationResult")
-        if pagination_result is not None:
-            total_el = pagination_result.find(".//{urn:ebay:apis:eBLBaseComponents}TotalNumberOfEntries")
-            if total_el is not None and total_el.text:
-                total_from_api = int(total_el.text)
-                if page_number == 1:
-                    logger.info("Trading API GetMyeBaySelling: TotalNumberOfEntries（総ヒット数）=%d", total_from_api)
-                    print(f"[DEBUG] Trading API: SiteID {site_id} 総ヒット数={total_from_api}件")
-            else:
-                if page_number == 1:
-                    print(f"[DEBUG] Trading API: SiteID {site_id} TotalNumberOfEntries が見つかりません")
-
-        items = active_list.findall(".//{urn:ebay:apis:eBLBaseComponents}Item")
-        if page_number == 1 and len(items) == 0:
-            # アイテムが0件の場合、レスポンスの構造を確認
-            print(f"[DEBUG] Trading API: SiteID {site_id} でItem要素が0件です。ActiveListの構造を確認:")
-            active_list_str = ET.tostring(active_list, encoding='unicode')[:1000]
-            print(f"[DEBUG] Trading API ActiveList XML（最初の1000文字）: {active_list_str}")
-        for item_el in items:
-            parsed = _parse_item(item_el, seller_username)
-            if parsed:
-                all_items.append(parsed)
+        page_futures = {}
+        for sid, pages in site_pages.items():
+            first = pages[1]
+            for page_number in _remaining_page_numbers(first, max_total, entries_per_page):
+                future = executor.submit(
+                    _fetch_my_ebay_selling_page,
+                    user_token, seller_username, sid, page_number, entries_per_page,
+                )
+                page_futures[future] = (sid, page_number)
+        for future in as_completed(page_futures):
+            sid, page_number = page_futures[future]
+            try:
+                site_pages[sid][page_number] = future.result()
+            except Exception as e:
+                logger.warning(
+                    "Trading API GetMyeBaySelling: SiteID %s ページ%d 失敗（再試行します）: %s",
+                    sid, page_number, e,
+                )
+                failed_pages.append((sid, page_number))
 
-        logger.info(
-            "Trading API GetMyeBaySelling: ページ%d 取得完了 取得=%d件, 累計=%d件",
-            page_number, len(items), len(all_items),
-        )
-        print(f"[DEBUG] Trading API: ページ{page_number} 取得完了 取得={len(items)}件, 累計={len(all_items)}件 (総ヒット数={total_from_api if total_from_api is not None else 'N/A'})")
-        # 総件数まで取得済みなら終了
-        if total_from_api is not None and len(all_items) >= min(max_total, total_from_api):
-            print(f"[DEBUG] Trading API: 総件数に達したため終了 (累計={len(all_items)}, 総ヒット数={total_from_api})")
-            break
-        # 返却件数が EntriesPerPage 未満なら通常は最終ページ。
-        # ただし TotalNumberOfEntries がそれより大きい場合は次ページを試す（APIが40件ずつ返す等の対策）。
-        if len(items) < entries_per_page:
-            if total_from_api is None or len(all_items) >= min(max_total, total_from_api):
-                print(f"[DEBUG] Trading API: 最終ページのため終了 (取得={len(items)}件 < EntriesPerPage={entries_per_page})")
-                break
-        print(f"[DEBUG] Trading API: 次ページへ進みます (ページ{page_number} → {page_number + 1})")
-        page_number += 1
+    # 取り直さないと、後続ページからの逐次取得でそのページが抜けたまま「全件取得」扱いになる
+    for sid, page_number in sorted(failed_pages):
+        try:
+            site_pages[sid][page_number] = _fetch_page_with_retry(
+                user_token, seller_username, sid, page_number, entries_per_page
+            )
+        except Exception as e:
+            logger.warning(
+                "Trading API GetMyeBaySelling: SiteID %s ページ%d の取得に失敗しました。このサイトの一覧は不完全です: %s",
+                sid, page_number, e,
+            )
+            incomplete.add(sid)
 
-    result = all_items[:max_total]
-    logger.info(
-        "Trading API GetMyeBaySelling (SiteID=%d): 総ヒット数（TotalNumberOfEntries）=%s, 実際にリストに格納した数=%d",
-        site_id, str(total_from_api) if total_from_api is not None else "N/A", len(result),
-    )
+    result: dict[int, list[_PageResult]] = {}
+    for sid in site_ids:
+        if sid not in site_pages:
+            continue
+        pages = [site_pages[sid][n] for n in sorted(site_pages[sid])]
+        if sid not in incomplete and _site_needs_serial_tail(pages, max_total, entries_per_page):
+            try:
+                pages.extend(_fetch_pages_serially(
+                    user_token,
+                    seller_username,
+                    sid,
+                    start_page=max(site_pages[sid]) + 1,
+                    collected=sum(p.item_count for p in pages),
+                    total_entries=pages[0].total_entries,
+                    max_total=max_total,
+                    entries_per_page=entries_per_page,
+                ))
+            except Exception as e:
+                logger.warning("Trading API GetMyeBaySelling: SiteID %s 追加ページ取得失敗: %s", sid, e)
+                incomplete.add(sid)
+        result[sid] = pages
+    if incomplete_site_ids is not None:
+        incomplete_site_ids.extend(sid for sid in site_ids if sid in incomplete)
     return result
 
 
@@ -221,41 +474,40 @@ def get_my_ebay_selling_active(
     user_token: str,
     seller_username: str,
     max_total: int = 1000,
+    max_workers: Optional[int] = None,
+    failed_site_ids: Optional[list[int]] = None,
 ) -> list[models.ItemSummary]:
     """
     GetMyeBaySelling で出品中一覧を取得。
-    複数サイト（US/UK/AU/DE/IT/FR）を順に取得してマージ。400件超に対応。
+    failed_site_ids を渡すと、取得に失敗した SiteID（一部のページだけ取れなかったサイトを含む）を追加する
+    （完全同期の可否判定用。不完全なサイトも取得できた出品は返す）。
+    複数サイト（US/UK/AU/DE/IT/FR）とそのページを並列に取得してマージ。400件超に対応。
+    マージは完了順に依らず決定的（サイト順 → ページ順で、item_id の重複は先勝ち）。
     User OAuth トークンが必要。
     """
     seen_ids: set[str] = set()
     all_items: list[models.ItemSummary] = []
     site_ids = [0, 3, 15, 77, 101, 71]  # US, UK, AU, DE, IT, FR
 
+    incomplete_site_ids: list[int] = []
+    results = _fetch_sites(user_token, seller_username, site_ids, max_total, max_workers, incomplete_site_ids)
     for site_id in site_ids:
-        if len(all_items) >= max_total:
-            break
-        site_name = SITE_ID_TO_NAME.get(site_id, str(site_id))
-        try:
-            items = _fetch_my_ebay_selling_one_site(
-                user_token, seller_username, site_id, max_total=max_total
-            )
-            new_count = sum(1 for s in items if s.item_id not in seen_ids)
-            for s in items:
-                if s.item_id not in seen_ids:
-                    seen_ids.add(s.item_id)
-                    all_items.append(s)
-            logger.info(
-                "Trading API GetMyeBaySelling: SiteID %s (%s) 取得件数=%d (新規=%d)",
-                site_id, site_name, len(items), new_count,
-            )
-            print(f"[DEBUG] Trading API: SiteID {site_id} ({site_name}) 取得={len(items)}件, 累計={len(all_items)}件")
-        except Exception as e:
-            logger.warning(
-                "Trading API GetMyeBaySelling: SiteID %s (%s) 失敗: %s",
-                site_id, site_name, e,
-            )
-            print(f"[DEBUG] Trading API: SiteID {site_id} ({site_name}) 失敗: {e}")
+        if failed_site_ids is not None and (site_id not in results or site_id in incomplete_site_ids):
+            failed_site_ids.append(site_id)
+        if site_id not in results:
             continue
+        site_name = SITE_ID_TO_NAME.get(site_id, str(site_id))
+        items = _merge_site_pages(results[site_id], max_total)
+        new_count = 0
+        for s in items:
+            if s.item_id not in seen_ids:
+                seen_ids.add(s.item_id)
+                all_items.append(s)
+                new_count += 1
+        logger.info(
+            "Trading API GetMyeBaySelling: SiteID %s (%s) 取得件数=%d (新規=%d)",
+            site_id, site_name, len(items), new_count,
+        )
 
     result = all_items[:max_total]
     logger.info(
@@ -264,3 +516,109 @@ def get_my_ebay_selling_active(
     )
     print(f"[DEBUG] Trading API 完了: 実際にリストに格納した数={len(result)}件 (max_total={max_total})")
     return result
+
+
+# GetSellerEvents: 1リクエストあたりの ModTime の時間幅（eBay 推奨は48時間以内）
+SELLER_EVENTS_MAX_WINDOW = timedelta(hours=48)
+
+SELLER_EVENTS_OUTPUT_SELECTORS = (
+    "ItemArray.Item.ItemID",
+    "ItemArray.Item.Title",
+    "ItemArray.Item.ListingDetails.ViewItemURL",
+    "ItemArray.Item.PictureDetails.PictureURL",
+    "ItemArray.Item.SellingStatus.ListingStatus",
+)
+
+
+@dataclass
+class SellerEvent:
+    """GetSellerEvents で返った1出品分の変更（出品開始・改訂・終了）。"""
+
+    item_id: str
+    listing_status: str  # Active / Ended / Completed など
+    item: Optional[models.ItemSummary]  # 画像がない等で変換できなかった場合は None
+
+    @property
+    def is_active(self) -> bool:
+        return self.listing_status in ("", "Active")
+
+
+def _format_ebay_time(dt: datetime) -> str:
+    """Trading API の日時形式（UTC, ミリ秒, Z 付き）。"""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _build_get_seller_events_xml(mod_time_from: datetime, mod_time_to: datetime) -> str:
+    """GetSellerEvents リクエスト XML。ModTimeFrom〜ModTimeTo の間に開始・改訂・終了した出品を返す。"""
+    selector_lines = "".join(
+        f"  <OutputSelector>{sel}</OutputSelector>\n" for sel in SELLER_EVENTS_OUTPUT_SELECTORS
+    )
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<GetSellerEventsRequest xmlns="urn:ebay:apis:eBLBaseComponents">
+  <RequesterCredentials>
+    <eBayAuthToken>{{token}}</eBayAuthToken>
+  </RequesterCredentials>
+  <DetailLevel>ReturnAll</DetailLevel>
+{selector_lines}  <ModTimeFrom>{_format_ebay_time(mod_time_from)}</ModTimeFrom>
+  <ModTimeTo>{_format_ebay_time(mod_time_to)}</ModTimeTo>
+</GetSellerEventsRequest>"""
+
+
+def iter_seller_event_items(
+    source: IO[bytes],
+    seller_username: str,
+    meta: Optional[_ResponseMeta] = None,
+) -> Iterator[SellerEvent]:
+    """GetSellerEvents レスポンスを逐次パースし、ItemArray の Item を SellerEvent として返す。"""
+    meta = meta if meta is not None else _ResponseMeta()
+    for elem in _iter_item_elements(source, meta, "ItemArray", "GetSellerEvents"):
+        item_id = _child_text(elem, f"{_NS}ItemID")
+        if not item_id:
+            continue
+        status = _child_text(elem, f"{_NS}SellingStatus/{_NS}ListingStatus")
+        yield SellerEvent(
+            item_id=item_id,
+            listing_status=status,
+            item=_parse_item(elem, seller_username),
+        )
+
+
+def get_seller_events(
+    user_token: str,
+    seller_username: str,
+    mod_time_from: datetime,
+    mod_time_to: datetime,
+) -> list[SellerEvent]:
+    """
+    GetSellerEvents で ModTimeFrom〜ModTimeTo に開始・改訂・終了した出品を取得。
+    期間は SELLER_EVENTS_MAX_WINDOW ごとに分割して順に取得し、同じ出品は後の変更で上書きする。
+    """
+    events: dict[str, SellerEvent] = {}
+    window_start = mod_time_from
+    while window_start < mod_time_to:
+        window_end = min(window_start + SELLER_EVENTS_MAX_WINDOW, mod_time_to)
+        body = _build_get_seller_events_xml(window_start, window_end).replace("{token}", user_token)
+        logger.info(
+            "Trading API GetSellerEvents: %s 〜 %s 取得中...",
+            _format_ebay_time(window_start), _format_ebay_time(window_end),
+        )
+        meta = _ResponseMeta()
+        with requests.post(
+            TRADING_ENDPOINT,
+            headers={
+                "X-EBAY-API-COMPATIBILITY-LEVEL": API_VERSION,
+                "X-EBAY-API-CALL-NAME": "GetSellerEvents",
+                "X-EBAY-API-SITEID": "0",
+                "Content-Type": "text/xml",
+            },
+            data=body.encode("utf-8"),
+            timeout=http.get_timeout_sec(),
+            stream=True,
+        ) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            for ev in iter_seller_event_items(r.raw, seller_username, meta):
+                events[ev.item_id] = ev
+        logger.info("Trading API GetSellerEvents: 変更=%d件 (累計=%d件)", meta.item_count, len(events))
+        window_start = window_end
+    return list(events.values())
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import base64
 import os
+import threading
 import time
 from typing import Optional
 
@@ -18,8 +19,12 @@ TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
 # sell.inventory.readonly と sell.inventory の両方を要求
 SCOPE = "https://api.ebay.com/oauth/api_scope https://api.ebay.com/oauth/api_scope/sell.inventory.readonly https://api.ebay.com/oauth/api_scope/sell.inventory"
 
-_cached_user_token: Optional[str] = None
-_cached_expires_at: float = 0
+# 既定のアカウントの Refresh Token を持つ環境変数（複数アカウントは config.yaml の accounts で変数名を指定）
+DEFAULT_REFRESH_TOKEN_ENV = "EBAY_USER_REFRESH_TOKEN"
+
+# 環境変数名 → (Access Token, 有効期限)。アカウントごとの選定スレッドから並行に参照される
+_cached_tokens: dict[str, tuple[str, float]] = {}
+_cache_lock = threading.Lock()
 _BUFFER_SEC = 60
 
 
@@ -31,24 +36,28 @@ def _get_client_credentials() -> tuple[str, str]:
     return cid, secret
 
 
-def has_user_refresh_token() -> bool:
-    """EBAY_USER_REFRESH_TOKEN が設定されているか。"""
-    token = (os.getenv("EBAY_USER_REFRESH_TOKEN") or "").strip()
+def has_user_refresh_token(env_var: str = DEFAULT_REFRESH_TOKEN_ENV) -> bool:
+    """Refresh Token（既定は EBAY_USER_REFRESH_TOKEN）が設定されているか。"""
+    token = (os.getenv(env_var) or "").strip()
     return bool(token)
 
 
-def get_user_access_token(use_cache: bool = True) -> Optional[str]:
+def get_user_access_token(
+    use_cache: bool = True, env_var: str = DEFAULT_REFRESH_TOKEN_ENV
+) -> Optional[str]:
     """
-    Refresh Token から User Access Token を取得。
-    EBAY_USER_REFRESH_TOKEN が未設定なら None。
+    環境変数 env_var の Refresh Token から User Access Token を取得（アカウントごとにキャッシュ）。
+    Refresh Token が未設定なら None。
     """
-    global _cached_user_token, _cached_expires_at
-    refresh_token = (os.getenv("EBAY_USER_REFRESH_TOKEN") or "").strip()
+    refresh_token = (os.getenv(env_var) or "").strip()
     if not refresh_token:
         return None
 
-    if use_cache and _cached_user_token and time.time() < _cached_expires_at - _BUFFER_SEC:
-        return _cached_user_token
+    if use_cache:
+        with _cache_lock:
+            cached = _cached_tokens.get(env_var)
+        if cached and time.time() < cached[1] - _BUFFER_SEC:
+            return cached[0]
 
     cid, secret = _get_client_credentials()
     auth = base64.b64encode(f"{cid}:{secret}".encode()).decode()
@@ -77,6 +86,6 @@ def get_user_access_token(use_cache: bool = True) -> Optional[str]:
     if not token:
         raise ValueError("No access_token in response")
     expires_in = int(data.get("expires_in", 7200))
-    _cached_user_token = token
-    _cached_expires_at = time.time() + expires_in
+    with _cache_lock:
+        _cached_tokens[env_var] = (token, time.time() + expires_in)
     return token
@@ -0,0 +1,45 @@
+"""
+監視対象の eBay アカウント（自分のストア）。
+
+config.yaml の accounts に複数のストアを並べると、1回の run で全ストアの出品を選定・スキャンする。
+未設定なら EBAY_SELLER_USERNAME と EBAY_USER_REFRESH_TOKEN の1アカウント（従来どおり）。
+全アカウントの出品を「自分の出品」として扱い、候補から除外する。
+"""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from app.constants import DEFAULT_SELLER_USERNAME
+from app.ebay.user_token import DEFAULT_REFRESH_TOKEN_ENV
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Account:
+    seller_username: str
+    refresh_token_env: str = DEFAULT_REFRESH_TOKEN_ENV  # Trading API 用の Refresh Token を持つ環境変数名
+
+
+def load_accounts(config: dict[str, Any]) -> list[Account]:
+    """config の accounts からアカウント一覧を作る（同じセラー名は1つにまとめる）。"""
+    accounts: list[Account] = []
+    seen: set[str] = set()
+    for entry in config.get("accounts") or []:
+        if isinstance(entry, str):
+            entry = {"seller_username": entry}
+        username = str((entry or {}).get("seller_username") or "").strip()
+        if not username:
+            logger.warning("accounts に seller_username のない項目があるため無視します: %s", entry)
+            continue
+        if username.lower() in seen:
+            continue
+        seen.add(username.lower())
+        env_var = str(entry.get("refresh_token_env") or DEFAULT_REFRESH_TOKEN_ENV).strip()
+        accounts.append(Account(username, env_var))
+    if not accounts:
+        accounts.append(Account(os.getenv("EBAY_SELLER_USERNAME", DEFAULT_SELLER_USERNAME)))
+    return accounts
@@ -0,0 +1,153 @@
+"""
+run の実行予算（時間・Browse API 呼び出し回数）。
+
+cron の実行枠を超えないよう、過去の run から1出品あたりのコストを見積もって処理件数を絞り、
+実行中は実測のペースで「次の出品を始めると予算を超えるか」を判定する。
+予算に達したら新しい出品は始めず、処理中の出品を終えて通常どおり終了する（スキャン状態は完了分だけ更新）。
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.ebay import api_client
+from app.job.params import RunParams
+from app.store import repo
+
+logger = logging.getLogger(__name__)
+
+# 見積もりに使う直近の run 数
+_HISTORY_RUNS = 10
+# 実測ペースに切り替えるまでに完了させる出品数
+_MIN_OBSERVED_LISTINGS = 3
+
+BUDGET_TIME = "time"
+BUDGET_API_CALLS = "api_calls"
+
+
+@dataclass(frozen=True)
+class ListingCostEstimate:
+    """1出品あたりのコスト（経過時間は並行処理込みの実時間）。履歴がなければ None。"""
+
+    sec_per_listing: Optional[float] = None
+    api_calls_per_listing: Optional[float] = None
+
+
+def estimate_listing_cost(conn: sqlite3.Connection, history_runs: int = _HISTORY_RUNS) -> ListingCostEstimate:
+    """直近の完了した run から1出品あたりの時間・API 呼び出し回数を見積もる（外れ値に強い中央値）。"""
+    costs = repo.get_recent_run_costs(conn, history_runs)
+    secs = [duration / scanned for duration, scanned, _calls in costs if duration > 0]
+    calls = [n / scanned for _duration, scanned, n in costs if n > 0]
+    return ListingCostEstimate(
+        sec_per_listing=statistics.median(secs) if secs else None,
+        api_calls_per_listing=statistics.median(calls) if calls else None,
+    )
+
+
+class RunBudget:
+    """
+    run の予算の管理。listing_started / listing_finished を出品ごとに呼び、
+    新しい出品を始める前に exhausted() で予算に達したかを確認する。
+    """
+
+    def __init__(
+        self,
+        time_budget_sec: float,
+        api_call_budget: int,
+        reserve_sec: float,
+        estimate: ListingCostEstimate,
+        api_calls_before: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        api_call_count: Callable[[], int] = api_client.api_call_count,
+    ) -> None:
+        self._clock = clock
+        self._api_call_count = api_call_count
+        self._time_budget_sec = time_budget_sec
+        self._api_call_budget = api_call_budget
+        self._reserve_sec = reserve_sec
+        self._estimate = estimate
+        self._started = clock()
+        self._calls_base = api_call_count() - api_calls_before
+        self._work_started: Optional[float] = None
+        self._in_flight = 0
+        self._finished = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(
+        cls, conn: sqlite3.Connection, params: RunParams, api_calls_before: int = 0
+    ) -> RunBudget:
+        """設定と履歴から作る。api_calls_before は再開する run で既に使った呼び出し回数。"""
+        return cls(
+            time_budget_sec=params.time_budget_minutes * 60.0,
+            api_call_budget=params.api_call_budget,
+            reserve_sec=params.budget_reserve_sec,
+            estimate=estimate_listing_cost(conn),
+            api_calls_before=api_calls_before,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._time_budget_sec > 0 or self._api_call_budget > 0
+
+    def api_calls_used(self) -> int:
+        """この run（再開前を含む）の Browse API 呼び出し回数。"""
+        return self._api_call_count() - self._calls_base
+
+    def listings_that_fit(self, count: int) -> tuple[int, Optional[str]]:
+        """
+        履歴の見積もりで予算内に収まる出品数（最大 count）と、絞り込んだ場合はその理由。
+        見積もれない予算は制限しない。
+        """
+        fit, reason = count, None
+        sec = self._estimate.sec_per_listing
+        if self._time_budget_sec > 0 and sec:
+            remaining = self._time_budget_sec - self._reserve_sec - (self._clock() - self._started)
+            by_time = max(0, int(remaining // sec))
+            if by_time < fit:
+                fit, reason = by_time, BUDGET_TIME
+        calls = self._estimate.api_calls_per_listing
+        if self._api_call_budget > 0 and calls:
+            by_calls = max(0, int((self._api_call_budget - self.api_calls_used()) // calls))
+            if by_calls < fit:
+                fit, reason = by_calls, BUDGET_API_CALLS
+        return fit, reason
+
+    def listing_started(self) -> None:
+        with self._lock:
+            if self._work_started is None:
+                self._work_started = self._clock()
+            self._in_flight += 1
+
+    def listing_finished(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._finished += 1
+
+    def exhausted(self) -> Optional[str]:
+        """
+        次の出品を始めると予算を超える見込みなら理由（BUDGET_TIME / BUDGET_API_CALLS）を返す。
+        処理中の出品が終わるまでの分も含めて見積もる。
+        """
+        with self._lock:
+            now = self._clock()
+            ahead = self._in_flight + 1
+            observed = self._finished >= _MIN_OBSERVED_LISTINGS and self._work_started is not None
+            sec = (now - self._work_started) / self._finished if observed else self._estimate.sec_per_listing
+            calls = (
+                (self._api_call_count() - self._calls_base) / self._finished
+                if observed else self._estimate.api_calls_per_listing
+            )
+        if self._time_budget_sec > 0:
+            deadline = self._started + self._time_budget_sec - self._reserve_sec
+            if now + (sec or 0.0) * ahead > deadline:
+                return BUDGET_TIME
+        if self._api_call_budget > 0:
+            if self.api_calls_used() + (calls or 0.0) * ahead > self._api_call_budget:
+                return BUDGET_API_CALLS
+        return None
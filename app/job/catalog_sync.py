@@ -0,0 +1,171 @@
+"""
+自分の出品カタログ（my_listings）の同期。
+初回と一定間隔ごとに GetMyeBaySelling で完全同期し、それ以外は GetSellerEvents で
+前回同期以降に開始・改訂・終了した出品だけを反映する（差分同期）。
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.ebay import models
+from app.ebay.trading import get_my_ebay_selling_active, get_seller_events
+from app.store import repo
+from app.store.models import MyListingRow
+
+logger = logging.getLogger(__name__)
+
+# 差分同期の開始時刻を前回ウォーターマークから少し戻す（API 側の反映遅延対策）
+DELTA_SYNC_OVERLAP = timedelta(minutes=10)
+
+# 完全同期で取得する出品数の上限（実質無制限）。run で処理する件数（max_listings_per_run）は選定時に絞る
+FULL_SYNC_MAX_LISTINGS = 1_000_000
+
+
+@dataclass
+class CatalogSyncResult:
+    mode: str  # full / delta
+    upserted: int
+    ended: int
+
+
+def _to_iso(dt: datetime) -> str:
+    # 文字列比較で大小関係が崩れないよう、マイクロ秒まで固定桁で出力する
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def listing_row_from_summary(item: models.ItemSummary, seller_username: str) -> MyListingRow:
+    """ItemSummary をカタログ行に変換。画像 URL は全件保持する。"""
+    return MyListingRow(
+        item_id=item.item_id,
+        seller_username=seller_username,
+        title=item.title,
+        item_web_url=item.item_web_url,
+        image_urls=item.image_urls(max_count=len(item.additional_images) + 1),
+    )
+
+
+def summary_from_listing_row(row: MyListingRow) -> models.ItemSummary:
+    """カタログ行を ItemSummary に戻す（セラーは同期時のセラー名）。"""
+    urls = [u for u in row.image_urls if u]
+    return models.ItemSummary(
+        item_id=row.item_id,
+        item_web_url=row.item_web_url,
+        image=models.ImageInfo(image_url=urls[0]) if urls else None,
+        additional_images=[models.ImageInfo(image_url=u) for u in urls[1:]],
+        seller=models.Seller(username=row.seller_username, user_id=row.seller_username),
+        title=row.title,
+    )
+
+
+def load_catalog_summaries(
+    conn: sqlite3.Connection, seller_username: str, limit: Optional[int] = None
+) -> list[models.ItemSummary]:
+    """ローカルカタログから出品中の出品を新しい順に読み込む（API 呼び出しなし）。"""
+    return [
+        summary_from_listing_row(r)
+        for r in repo.get_active_catalog_listings(conn, seller_username, limit=limit)
+    ]
+
+
+def apply_full_listing(
+    conn: sqlite3.Connection,
+    seller_username: str,
+    items: list[models.ItemSummary],
+    complete: bool,
+    synced_at: datetime,
+) -> CatalogSyncResult:
+    """
+    完全取得した出品一覧をカタログに反映。
+    complete=True（全サイト・全ページ成功）のときだけ、今回見つからなかった出品を終了済みにし、
+    差分同期のウォーターマークを synced_at に進める。
+    """
+    seen_at = _to_iso(synced_at)
+    repo.upsert_catalog_listings(
+        conn, [listing_row_from_summary(s, seller_username) for s in items], seen_at=seen_at
+    )
+    ended = 0
+    if complete:
+        ended = repo.mark_catalog_listings_ended_not_seen_since(conn, seller_username, seen_at)
+        repo.update_catalog_sync_state(
+            conn, seller_username, last_delta_sync_at=seen_at, last_full_sync_at=seen_at
+        )
+    return CatalogSyncResult(mode="full", upserted=len(items), ended=ended)
+
+
+def needs_full_sync(
+    conn: sqlite3.Connection,
+    seller_username: str,
+    full_sync_interval_days: int,
+    now: datetime,
+) -> bool:
+    """未同期、または前回の完全同期から full_sync_interval_days 以上経過していれば True。"""
+    state = repo.get_catalog_sync_state(conn, seller_username)
+    if state is None:
+        return True
+    last_full = _parse_iso(state.last_full_sync_at)
+    last_delta = _parse_iso(state.last_delta_sync_at)
+    if last_full is None or last_delta is None:
+        return True
+    return now - last_full >= timedelta(days=max(0, full_sync_interval_days))
+
+
+def sync_catalog(
+    conn: sqlite3.Connection,
+    seller_username: str,
+    user_token: str,
+    full_sync_interval_days: int = 7,
+    force_full: bool = False,
+    now: Optional[datetime] = None,
+) -> CatalogSyncResult:
+    """
+    カタログを同期する。完全同期が必要なら GetMyeBaySelling、それ以外は GetSellerEvents で差分のみ取得。
+    完全同期は run の処理件数に関係なく全出品を取得する（件数で打ち切ると完全同期にならず差分同期に移れない）。
+    API エラーは呼び出し側に送出する（カタログは前回の状態のまま）。
+    """
+    now = now or datetime.now(timezone.utc)
+    if force_full or needs_full_sync(conn, seller_username, full_sync_interval_days, now):
+        failed_site_ids: list[int] = []
+        items = get_my_ebay_selling_active(
+            user_token, seller_username, max_total=FULL_SYNC_MAX_LISTINGS, failed_site_ids=failed_site_ids
+        )
+        complete = bool(items) and not failed_site_ids and len(items) < FULL_SYNC_MAX_LISTINGS
+        result = apply_full_listing(conn, seller_username, items, complete, now)
+        logger.info(
+            "カタログ完全同期: seller=%s, 取得=%d件, 終了扱い=%d件, 完全=%s",
+            seller_username, result.upserted, result.ended, complete,
+        )
+        return result
+
+    state = repo.get_catalog_sync_state(conn, seller_username)
+    watermark = _parse_iso(state.last_delta_sync_at if state else None) or now
+    events = get_seller_events(
+        user_token, seller_username, watermark - DELTA_SYNC_OVERLAP, now
+    )
+    active_rows = [
+        listing_row_from_summary(ev.item, seller_username)
+        for ev in events
+        if ev.is_active and ev.item is not None
+    ]
+    ended_ids = [ev.item_id for ev in events if not ev.is_active]
+    seen_at = _to_iso(now)
+    repo.upsert_catalog_listings(conn, active_rows, seen_at=seen_at)
+    ended = repo.mark_catalog_listings_ended(conn, ended_ids, ended_at=seen_at)
+    repo.update_catalog_sync_state(conn, seller_username, last_delta_sync_at=seen_at)
+    logger.info(
+        "カタログ差分同期: seller=%s, 変更=%d件 (出品中=%d, 終了=%d)",
+        seller_username, len(events), len(active_rows), ended,
+    )
+    return CatalogSyncResult(mode="delta", upserted=len(active_rows), ended=ended)
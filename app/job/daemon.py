@@ -0,0 +1,296 @@
+"""
+常駐モード（python -m app.main --daemon）。
+
+cron で毎回起動する代わりに1プロセスで常駐し、トークン・HTTP 接続・モジュールの読み込みを使い回しながら、
+次のタスクを設定した間隔で実行する（間隔には ±jitter_ratio の揺らぎを入れ、複数台で時刻が揃わないようにする）。
+- full_sweep: 通常の run（優先度による選定）
+- new_listings: 一度もスキャンしていない出品だけの短い run
+- verify: 検知の再確認（侵害出品の掲載終了を REMOVED にする）
+各タスクの前回実行時刻は maintenance_state に記録し、再起動しても間隔を守る。
+状態（各タスクの前回・次回の実行、実行中のタスクと run の進捗、最終更新時刻）は status_file に JSON で書き出す。
+タスクの実行中も heartbeat_sec ごとに書き直すので、updated_at が古ければ常駐が止まっている（ハングしている）と判断できる。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.config import ROOT, load_config
+from app.ebay import auth
+from app.job import reverify
+from app.job.runner import run_once
+from app.store import db, repo
+from app.util.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+TASK_FULL_SWEEP = "full_sweep"
+TASK_NEW_LISTINGS = "new_listings"
+TASK_VERIFY = "verify"
+
+# maintenance_state に記録するタスク名の接頭辞（retention などの保守タスクと区別する）
+_STATE_PREFIX = "daemon:"
+
+
+@dataclass(frozen=True)
+class DaemonParams:
+    """常駐モードの設定（config.yaml の daemon セクション）。間隔が 0 のタスクは実行しない。"""
+
+    full_sweep_interval_hours: float
+    new_listings_interval_minutes: float
+    verify_interval_hours: float
+    verify_batch: int  # 1回の再確認で確認する検知の最大数
+    jitter_ratio: float  # 間隔に加える揺らぎ（±割合）
+    status_file: str
+    heartbeat_sec: float  # status_file を更新する間隔（待機中・タスク実行中とも）
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> DaemonParams:
+        cfg = config.get("daemon", {})
+        status_file = str(cfg.get("status_file") or "data/daemon_status.json")
+        if not os.path.isabs(status_file):
+            status_file = str(ROOT / status_file)
+        return cls(
+            full_sweep_interval_hours=max(0.0, float(cfg.get("full_sweep_interval_hours", 24))),
+            new_listings_interval_minutes=max(0.0, float(cfg.get("new_listings_interval_minutes", 60))),
+            verify_interval_hours=max(0.0, float(cfg.get("verify_interval_hours", 24))),
+            verify_batch=max(1, int(cfg.get("verify_batch", 200))),
+            jitter_ratio=min(0.5, max(0.0, float(cfg.get("jitter_ratio", 0.1)))),
+            status_file=status_file,
+            heartbeat_sec=max(1.0, float(cfg.get("heartbeat_sec", 60))),
+        )
+
+
+@dataclass
+class DaemonTask:
+    name: str
+    interval_sec: float
+    fn: Callable[[], None]
+    next_run_at: float = 0.0  # UNIX 秒
+    last_run_at: Optional[float] = None
+    last_status: Optional[str] = None  # ok / error
+    last_error: Optional[str] = None
+    last_duration_sec: Optional[float] = None
+    runs: int = 0
+
+    def to_status(self) -> dict[str, Any]:
+        return {
+            "interval_sec": self.interval_sec,
+            "next_run_at": _iso(self.next_run_at),
+            "last_run_at": _iso(self.last_run_at),
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_duration_sec": self.last_duration_sec,
+            "runs": self.runs,
+        }
+
+
+@dataclass
+class Daemon:
+    """タスクの予定を管理し、期限の来たものから順に実行する。"""
+
+    tasks: list[DaemonTask]
+    conn: sqlite3.Connection
+    status_file: str
+    jitter_ratio: float = 0.1
+    heartbeat_sec: float = 60.0
+    clock: Callable[[], float] = time.time
+    rng: random.Random = field(default_factory=random.Random)
+    started_at: float = 0.0
+    current_task: Optional[str] = None
+    # 実行中の run の進捗（build_tasks の progress に渡したものと同じ dict。run のスレッドから更新される）
+    progress: dict[str, Any] = field(default_factory=dict)
+    _status_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        self.started_at = self.clock()
+        now = self.started_at
+        for task in self.tasks:
+            last = _parse_iso(repo.get_maintenance_last_run(self.conn, _STATE_PREFIX + task.name))
+            task.last_run_at = last
+            # 前回実行から間隔が経っていなければ、その分だけ待つ（再起動で全タスクが一斉に走らないように）
+            task.next_run_at = now if last is None else max(now, last + self._jittered(task.interval_sec))
+
+    def run(self, stop_event: threading.Event) -> None:
+        """stop_event が立つまでタスクを実行する。実行中のタスクは最後まで実行してから止まる。"""
+        logger.info(
+            "常駐モード開始: %s",
+            ", ".join(f"{t.name}={t.interval_sec / 3600:.2f}h" for t in self.tasks) or "(タスクなし)",
+        )
+        while not stop_event.is_set() and self.tasks:
+            task = min(self.tasks, key=lambda t: t.next_run_at)
+            wait = task.next_run_at - self.clock()
+            if wait > 0:
+                self.write_status("idle")
+                stop_event.wait(min(wait, self.heartbeat_sec))
+                continue
+            self.run_task(task)
+        self.write_status("stopped")
+        logger.info("常駐モード終了")
+
+    def run_task(self, task: DaemonTask) -> None:
+        """タスクを1回実行し、結果と次回の予定を記録する。失敗しても常駐は続ける。"""
+        self.current_task = task.name
+        self.progress.clear()
+        self.write_status("running")
+        started = self.clock()
+        logger.info("タスク開始: %s", task.name)
+        # 実行中も状態ファイルを更新し続ける（長い full_sweep の間もハングと区別できるように）
+        task_done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(task_done,), name="daemon-heartbeat", daemon=True
+        )
+        heartbeat.start()
+        try:
+            task.fn()
+            task.last_status, task.last_error = "ok", None
+        except (Exception, SystemExit) as e:
+            # run_once は OAuth の失敗で SystemExit を送出する
+            logger.exception("タスク失敗: %s: %s", task.name, e)
+            task.last_status, task.last_error = "error", str(e) or type(e).__name__
+        finally:
+            task_done.set()
+            heartbeat.join()
+        finished = self.clock()
+        task.runs += 1
+        task.last_run_at = started
+        task.last_duration_sec = round(finished - started, 1)
+        task.next_run_at = started + self._jittered(task.interval_sec)
+        repo.set_maintenance_last_run(self.conn, _STATE_PREFIX + task.name, _iso(started))
+        self.current_task = None
+        self.progress.clear()
+        logger.info(
+            "タスク終了: %s (%s, %.1fs) 次回=%s",
+            task.name, task.last_status, task.last_duration_sec, _iso(task.next_run_at),
+        )
+        self.write_status("idle")
+
+    def _heartbeat(self, task_done: threading.Event) -> None:
+        while not task_done.wait(self.heartbeat_sec):
+            self.write_status("running")
+
+    def write_status(self, state: str) -> None:
+        """状態を status_file に書き出す（一時ファイルから置き換えるので読み手が途中の内容を見ない）。"""
+        payload = {
+            "pid": os.getpid(),
+            "state": state,
+            "current_task": self.current_task,
+            "progress": dict(self.progress) if self.current_task else None,
+            "started_at": _iso(self.started_at),
+            "updated_at": _iso(self.clock()),
+            "tasks": {t.name: t.to_status() for t in self.tasks},
+        }
+        path = Path(self.status_file)
+        try:
+            with self._status_lock:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(path.name + ".tmp")
+                tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("状態ファイルの書き込みに失敗: %s", e)
+
+    def _jittered(self, interval_sec: float) -> float:
+        return interval_sec * (1.0 + self.rng.uniform(-self.jitter_ratio, self.jitter_ratio))
+
+
+def build_tasks(
+    params: DaemonParams,
+    conn: sqlite3.Connection,
+    stop_event: threading.Event,
+    progress: Optional[dict[str, Any]] = None,
+) -> list[DaemonTask]:
+    """
+    設定からタスクを作る。run は stop_event が立つと処理中の出品を終えて止まる。
+    progress: run の進捗（処理済み・対象の出品数、スキャンした画像数、確認した候補数）を書き込む dict。
+    """
+
+    def _on_progress(scanned: int, total: int, images: int, candidates: int) -> None:
+        if progress is not None:
+            progress.update(
+                listings_scanned=scanned, listings_total=total, images_scanned=images, candidates_checked=candidates
+            )
+
+    def _full_sweep() -> None:
+        run_once(progress_callback=_on_progress, cancellation_check=stop_event.is_set)
+
+    def _new_listings() -> None:
+        run_once(
+            run_overrides={"new_listings_only": True},
+            progress_callback=_on_progress,
+            cancellation_check=stop_event.is_set,
+        )
+
+    def _verify() -> None:
+        reverify.reverify_detections(
+            conn,
+            auth.get_access_token(),
+            limit=params.verify_batch,
+            min_interval_hours=params.verify_interval_hours,
+        )
+
+    tasks = [
+        DaemonTask(TASK_FULL_SWEEP, params.full_sweep_interval_hours * 3600, _full_sweep),
+        DaemonTask(TASK_NEW_LISTINGS, params.new_listings_interval_minutes * 60, _new_listings),
+        DaemonTask(TASK_VERIFY, params.verify_interval_hours * 3600, _verify),
+    ]
+    return [t for t in tasks if t.interval_sec > 0]
+
+
+def run_daemon() -> None:
+    """常駐モードのエントリーポイント。SIGTERM / SIGINT で実行中のタスクを終えてから終了する。"""
+    setup_logging()
+    params = DaemonParams.from_config(load_config())
+    stop_event = threading.Event()
+    # run_once は実行中だけ自身のハンドラを設定し、受け取ったシグナルをこのハンドラにも伝える
+    previous = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    def _handler(signum: int, frame: object) -> None:
+        logger.warning("%s を受信: 実行中のタスクを終えて常駐を終了します", signal.Signals(signum).name)
+        stop_event.set()
+
+    for sig in previous:
+        signal.signal(sig, _handler)
+    # run_once はスレッドの接続を閉じるため、常駐側は専用の接続を持つ
+    conn = db.get_connection()
+    try:
+        db.init_schema(conn)
+        progress: dict[str, Any] = {}
+        daemon = Daemon(
+            tasks=build_tasks(params, conn, stop_event, progress),
+            conn=conn,
+            progress=progress,
+            status_file=params.status_file,
+            jitter_ratio=params.jitter_ratio,
+            heartbeat_sec=params.heartbeat_sec,
+        )
+        daemon.run(stop_event)
+    finally:
+        conn.close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _parse_iso(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
@@ -0,0 +1,158 @@
+"""
+出品のリスクによる優先度付きの選定。
+
+リスク（0〜1）は次の要素の noisy-OR:
+- その出品の過去の検知数
+- タイトルの語（ブランド名など）がよく盗用されるか（その語を含む他の出品の検知率）
+- 新着の出品か（カタログに載ってから new_listing_days 以内）
+リスクから再スキャン間隔を決め（リスク1で rescan_min_days、0で rescan_max_days。間は対数補間）、
+間隔が来た出品だけを、未スキャン → 経過日数/間隔 の大きい順に選ぶ。
+限られた画像・検索の枠を盗用の出やすい出品に回し、盗用の出ない出品は月1回程度にする。
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.job.params import RunParams
+from app.store import repo
+from app.store.models import ListingRiskRow
+
+logger = logging.getLogger(__name__)
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+# 盗用の傾向を表さない語
+_STOP_TERMS = frozenset({
+    "and", "for", "the", "with", "new", "used", "from", "set", "lot", "free", "shipping",
+    "japan", "japanese", "vintage", "rare",
+})
+# 出現の少ない語の検知率を 0 側に寄せる擬似件数
+_TERM_PRIOR = 5
+# 新着の出品のリスク
+_NEW_LISTING_RISK = 0.5
+
+
+@dataclass(frozen=True)
+class ListingPriority:
+    listing_item_id: str
+    last_scanned_at: Optional[str]
+    risk: float  # 0〜1
+    interval_days: float  # 再スキャン間隔（日）
+    due_ratio: float  # 前回スキャンからの経過日数 / 間隔。1以上で再スキャン時期（未スキャンは inf）
+
+
+def title_terms(title: Optional[str]) -> set[str]:
+    """タイトルの語（英数字3文字以上・小文字）。"""
+    return {
+        t for t in _TERM_RE.findall((title or "").lower())
+        if len(t) >= 3 and not t.isdigit() and t not in _STOP_TERMS
+    }
+
+
+def term_risks(
+    titles: dict[str, Optional[str]], detected_ids: set[str]
+) -> dict[str, float]:
+    """
+    出品ごとの「タイトルの語の盗用されやすさ」。語ごとに、その語を含む他の出品のうち
+    検知のあった割合（擬似件数で平滑化）を求め、タイトル内の最大値を返す。
+    自身の検知は数えない（検知数の要素と二重にならないように）。
+    """
+    terms = {lid: title_terms(t) for lid, t in titles.items()}
+    listings: dict[str, int] = {}
+    detected: dict[str, int] = {}
+    for lid, ts in terms.items():
+        hit = lid in detected_ids
+        for t in ts:
+            listings[t] = listings.get(t, 0) + 1
+            if hit:
+                detected[t] = detected.get(t, 0) + 1
+    result: dict[str, float] = {}
+    for lid, ts in terms.items():
+        own = 1 if lid in detected_ids else 0
+        result[lid] = max(
+            (
+                (detected.get(t, 0) - own) / (listings[t] - 1 + _TERM_PRIOR)
+                for t in ts if detected.get(t, 0) > own
+            ),
+            default=0.0,
+        )
+    return result
+
+
+def listing_risk(detections_count: int, term_risk: float, is_new: bool) -> float:
+    """出品のリスク（0〜1）。検知1件で 0.5、2件で 0.75 …。"""
+    detection_risk = 1.0 - 0.5 ** max(0, detections_count)
+    new_risk = _NEW_LISTING_RISK if is_new else 0.0
+    return 1.0 - (1.0 - detection_risk) * (1.0 - term_risk) * (1.0 - new_risk)
+
+
+def rescan_interval_days(risk: float, min_days: float, max_days: float) -> float:
+    """リスクに応じた再スキャン間隔。min_days〜max_days を対数補間する。"""
+    min_days = max(min_days, 1e-3)
+    max_days = max(max_days, min_days)
+    return max_days * (min_days / max_days) ** min(max(risk, 0.0), 1.0)
+
+
+def prioritize(
+    rows: list[ListingRiskRow],
+    titles: dict[str, Optional[str]],
+    params: RunParams,
+    now: Optional[datetime] = None,
+) -> list[ListingPriority]:
+    """出品ごとの優先度を rows の順で返す。"""
+    now = now or datetime.now(timezone.utc)
+    detected_ids = {r.listing_item_id for r in rows if r.detections_count > 0}
+    terms = term_risks({r.listing_item_id: titles.get(r.listing_item_id) for r in rows}, detected_ids)
+    result = []
+    for r in rows:
+        first_seen = _parse_iso(r.first_seen_at)
+        is_new = first_seen is not None and (now - first_seen).days < params.priority_new_listing_days
+        risk = listing_risk(r.detections_count, terms.get(r.listing_item_id, 0.0), is_new)
+        interval = rescan_interval_days(
+            risk, params.priority_rescan_min_days, params.priority_rescan_max_days
+        )
+        last = _parse_iso(r.last_scanned_at)
+        due_ratio = (
+            math.inf if last is None
+            else (now - last).total_seconds() / 86400.0 / interval
+        )
+        result.append(ListingPriority(r.listing_item_id, r.last_scanned_at, risk, interval, due_ratio))
+    return result
+
+
+def select_by_priority(
+    conn: sqlite3.Connection,
+    params: RunParams,
+    listing_ids: list[str],
+    titles: dict[str, Optional[str]],
+    now: Optional[datetime] = None,
+) -> list[tuple[str, Optional[str]]]:
+    """
+    再スキャン時期の来た出品を優先度順に max_listings 件選ぶ（select_listings と同じ (出品 ID, 最終スキャン日時)）。
+    未スキャンの出品はリスクの高い順、それ以外は due_ratio の大きい順（同じならリスクの高い順）。
+    """
+    priorities = prioritize(repo.get_listing_risk_rows(conn, listing_ids), titles, params, now)
+    due = [p for p in priorities if p.due_ratio >= 1.0]
+    # sort は安定なので、同順位は API 順（新着順）のまま
+    due.sort(key=lambda p: (p.due_ratio, p.risk), reverse=True)
+    selected = due[: params.max_listings]
+    logger.info(
+        "優先度による選定: 出品=%d件, 再スキャン時期=%d件（未スキャン=%d件, 高リスク=%d件）, 対象=%d件",
+        len(priorities), len(due), sum(1 for p in due if math.isinf(p.due_ratio)),
+        sum(1 for p in priorities if p.risk >= 0.5), len(selected),
+    )
+    return [(p.listing_item_id, p.last_scanned_at) for p in selected]
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
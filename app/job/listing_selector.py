@@ -1,18 +1,25 @@
 """
 対象出品の選定ロジック。
-Trading API を優先（EBAY_USER_REFRESH_TOKEN 設定時）。失敗時のみ Browse API をフォールバックとして使用。
+Trading API を優先（アカウントの Refresh Token 設定時）。失敗時のみ Browse API をフォールバックとして使用。
+Trading API 使用時はローカルカタログ（my_listings）を差分同期して読み込む。
+複数アカウントはアカウントごとに並行して選定し、選定順を交互に並べて1つの run で処理する。
 """
 from __future__ import annotations
 
 import logging
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
 from typing import Optional, Tuple
 
 from app.ebay import api_client, browse, models
 from app.ebay.user_token import get_user_access_token, has_user_refresh_token
 from app.ebay.trading import get_my_ebay_selling_active
+from app.job import catalog_sync, listing_priority
+from app.job.accounts import Account
 from app.job.params import RunParams
-from app.store import repo
+from app.store import db, repo
+from app.util import timing
 
 # サブマーケットプレイスも常に試す（US で取れても IT/GB 等に追加出品がある場合をカバー）
 USE_FALLBACK_MARKETPLACES_ALWAYS = True
@@ -23,22 +30,89 @@ logger = logging.getLogger(__name__)
 def select_listings(
     conn: sqlite3.Connection,
     params: RunParams,
-    seller_username: str,
+    accounts: list[Account],
     only_item: Optional[str],
     from_beginning: bool = False,
+    new_only: bool = False,
+    timings: Optional[timing.StageTimings] = None,
 ) -> Tuple[list[Tuple[str, Optional[str]]], dict[str, models.ItemSummary], list[str]]:
     """
-    対象出品一覧と ItemSummary マップを取得。
-    Trading API 優先: EBAY_USER_REFRESH_TOKEN が設定されていれば Trading API のみ使用。
-    Browse API は Trading API が失敗した場合のみフォールバックとして使用。
-    from_beginning=True: API順（新着順）の先頭から。24時間以上経過時など。
-    from_beginning=False: 未スキャン・最も古くスキャンした順（続きから）。
+    対象出品一覧・ItemSummary マップ・自分のセラー名（全アカウント）を取得。
+    アカウントごとに max_listings 件まで選定する（選定方法は _select_account_listings）。
+    複数アカウントは各アカウントのスレッド（専用の接続）で並行に出品を取得・選定し、
+    選定順を交互に並べる（予算で途中までしか処理できなくても各アカウントが進む）。
+    timings: Trading API による出品の列挙の所要時間（アカウントごと）を記録する。
     """
+    seller_names = [a.seller_username for a in accounts]
     if only_item:
         selected = [(only_item, None)]
         summary_map = {}
-        return selected, summary_map, [seller_username]
+        return selected, summary_map, seller_names
+
+    if len(accounts) == 1:
+        results = [_select_account_listings(conn, params, accounts[0], from_beginning, new_only, timings)]
+    else:
+        with ThreadPoolExecutor(max_workers=len(accounts), thread_name_prefix="account") as executor:
+            results = list(executor.map(
+                lambda a: _select_account_listings_in_thread(params, a, from_beginning, new_only, timings),
+                accounts,
+            ))
+    summary_map: dict[str, models.ItemSummary] = {}
+    for _selected, account_map in results:
+        for item_id, s in account_map.items():
+            summary_map.setdefault(item_id, s)
+    selected: list[Tuple[str, Optional[str]]] = []
+    seen_ids: set[str] = set()
+    for row in zip_longest(*(r[0] for r in results)):
+        for entry in row:
+            if entry is not None and entry[0] not in seen_ids:
+                seen_ids.add(entry[0])
+                selected.append(entry)
+    if len(accounts) > 1:
+        logger.info(
+            "複数アカウントの選定完了: %s, 合計=%d件",
+            ", ".join(f"{a.seller_username}={len(r[0])}件" for a, r in zip(accounts, results)),
+            len(selected),
+        )
+    return selected, summary_map, seller_names
 
+
+def _select_account_listings_in_thread(
+    params: RunParams,
+    account: Account,
+    from_beginning: bool,
+    new_only: bool,
+    timings: Optional[timing.StageTimings],
+) -> Tuple[list[Tuple[str, Optional[str]]], dict[str, models.ItemSummary]]:
+    """アカウントのスレッドで選定する（接続はスレッドごと）。失敗したアカウントは対象なしとして他を続ける。"""
+    conn = db.get_connection()
+    try:
+        return _select_account_listings(conn, params, account, from_beginning, new_only, timings)
+    except Exception as e:
+        logger.exception("出品の選定に失敗: seller=%s, %s", account.seller_username, e)
+        return [], {}
+    finally:
+        conn.close()
+
+
+def _select_account_listings(
+    conn: sqlite3.Connection,
+    params: RunParams,
+    account: Account,
+    from_beginning: bool,
+    new_only: bool,
+    timings: Optional[timing.StageTimings] = None,
+) -> Tuple[list[Tuple[str, Optional[str]]], dict[str, models.ItemSummary]]:
+    """
+    1アカウントの対象出品一覧と ItemSummary マップを取得。
+    Trading API 優先: アカウントの Refresh Token が設定されていれば Trading API のみ使用。
+    Browse API は Trading API が失敗した場合のみフォールバックとして使用。
+    priority_enabled: リスクの優先度順（再スキャン時期の来た出品のみ。listing_priority を参照）。
+    それ以外で from_beginning=True: API順（新着順）の先頭から。24時間以上経過時など。
+    from_beginning=False: 未スキャン・最も古くスキャンした順（続きから）。
+    new_only=True: 一度もスキャンしていない出品だけ（新着出品の短い巡回）。
+    """
+    seller_username = account.seller_username
     seller_names = [seller_username]
     # max_total: APIから取得する最大件数。search_limitとmax_listingsの大きい方を使用
     # ただし、処理する件数（max_listings）を超えて取得する必要はないので、max_listingsを優先
@@ -49,13 +123,13 @@ def select_listings(
     best_listings: list[models.ItemSummary] = []
     primary_marketplace = api_client.get_marketplace_id()
 
-    # Trading API を優先（EBAY_USER_REFRESH_TOKEN が設定されていれば Trading API のみ使用）
+    # Trading API を優先（Refresh Token が設定されていれば Trading API のみ使用）
     trading_api_success = False
-    if has_user_refresh_token():
+    if has_user_refresh_token(account.refresh_token_env):
         try:
-            user_token = get_user_access_token()
-            if user_token:
-                items = get_my_ebay_selling_active(user_token, seller_username, max_total=max_total)
+            with timing.measure(timing.STAGE_TRADING, timings):
+                items = _fetch_trading_listings(conn, params, account, max_total)
+            if items is not None:
                 added = 0
                 for s in items:
                     if s.item_id not in seen_ids and s.is_from_any_seller(seller_names):
@@ -145,13 +219,56 @@ def select_listings(
     )
     summary_map = {s.item_id: s for s in best_listings}
 
-    if from_beginning:
+    if new_only:
+        selected = [
+            (lid, last_scanned)
+            for lid, last_scanned in repo.get_listings_scan_state_for_selection(
+                conn, params.max_listings, all_listing_ids
+            )
+            if last_scanned is None
+        ]
+    elif params.priority_enabled:
+        selected = listing_priority.select_by_priority(
+            conn, params, all_listing_ids, {s.item_id: s.title for s in best_listings}
+        )
+    elif from_beginning:
         selected = [(lid, None) for lid in all_listing_ids[: params.max_listings]]
     else:
         selected = repo.get_listings_scan_state_for_selection(
             conn, params.max_listings, all_listing_ids
         )
-    return selected, summary_map, seller_names
+    return selected, summary_map
+
+
+def _fetch_trading_listings(
+    conn: sqlite3.Connection,
+    params: RunParams,
+    account: Account,
+    max_total: int,
+) -> Optional[list[models.ItemSummary]]:
+    """
+    Trading API 経由で自分の出品一覧を取得。User トークンが取れなければ None。
+    catalog_enabled 時はローカルカタログを差分同期してから読み込む（同期失敗時は前回のカタログを使用）。
+    カタログは max_total で打ち切らず全件を返す（処理件数は選定時に max_listings で絞る）。
+    """
+    seller_username = account.seller_username
+    user_token = get_user_access_token(env_var=account.refresh_token_env)
+    if not user_token:
+        return None
+    if not params.catalog_enabled:
+        return get_my_ebay_selling_active(user_token, seller_username, max_total=max_total)
+    try:
+        catalog_sync.sync_catalog(
+            conn,
+            seller_username,
+            user_token,
+            full_sync_interval_days=params.catalog_full_sync_interval_days,
+        )
+    except Exception as e:
+        logger.warning("カタログ同期失敗: %s。前回同期時のカタログを使用します", e)
+    items = catalog_sync.load_catalog_summaries(conn, seller_username)
+    logger.info("ローカルカタログから出品を読み込み: seller=%s, %d件", seller_username, len(items))
+    return items
 
 
 def compute_listing_status(
@@ -5,6 +5,9 @@ import logging
 from dataclasses import dataclass
 from typing import Any
 
+from app.constants import DEFAULT_MARKETPLACE_ID
+from app.util.concurrency import HostLimitConfig, host_limits_from_config
+
 logger = logging.getLogger(__name__)
 
 # 40品以下だと全件取得できない不具合があったため、40以下は200に補正
@@ -21,9 +24,46 @@ class RunParams:
     keyword_search_candidates: int
     stop_on_first_match_per_image: bool
     max_concurrent_downloads: int
+    concurrency_adaptive: bool  # ホストごとの並列数を応答時間・エラーに応じて自動調整する（AIMD）
+    concurrency_hosts: tuple[HostLimitConfig, ...]  # ホストごとの並列数の初期値・範囲
+    timing_per_listing: bool  # ステージごとの所要時間を出品ごとにも記録する（run ごとの集計は常に記録）
+    listing_workers: int  # パイプラインの出品ステージ（出品の解決・画像への展開）のワーカー数
+    resolve_workers: int  # 自画像の取得・ハッシュのワーカー数
+    search_workers: int  # 画像・キーワード検索のワーカー数（レート制限に合わせて調整）
+    download_workers: int  # 候補画像のダウンロード完了待ち・ハッシュのワーカー数
+    match_workers: int  # 照合・登録のワーカー数
+    stage_queue_size: int  # ステージ間キューの上限（満杯なら上流が待つ）
+    additional_images_top_hits: int  # 画像検索上位N件の追加画像を一括取得して比較（0=無効）
+    search_image_max_edge: int  # search_by_image に送る画像の長辺上限（px）
+    image_search_marketplaces: tuple[str, ...]  # 画像検索を並列実行するマーケットプレイス
+    image_search_max_depth: int  # 画像検索の適応的ページングで取得する最大件数（1画像・1マーケットあたり）
+    image_search_near_band_margin: int  # 閾値帯とみなす pHash 距離のマージン（閾値＋マージン以内）
+    image_search_min_near_per_page: int  # 次ページへ進むのに必要な閾値帯の候補数
     search_limit: int
     search_sort: str
     also_accept_same_image_url: bool
+    time_budget_minutes: int  # run の実行時間の予算（分）。超える見込みなら新しい出品を始めない（0=無制限）
+    api_call_budget: int  # run の Browse API 呼び出し回数の予算（0=無制限）
+    budget_reserve_sec: int  # 時間予算のうち出力・後処理のために残す秒数
+    write_batch_listings: int  # 書き込みを N 出品ごとに1トランザクションでコミット
+    write_batch_interval_sec: float  # 出品数に達しなくても T 秒ごとにコミット
+    work_queue_enabled: bool  # 複数プロセスで1つの run を作業キューで分担する
+    work_queue_lease_sec: int  # 出品のリース期限（秒）。ハートビートで延長し、落ちたワーカーの出品は期限後に取り直す
+    work_queue_lease_batch: int  # 1回にリースする出品数
+    work_queue_join_window_hours: int  # この時間以内に始まった未終了の run に合流する
+    catalog_enabled: bool  # 出品一覧をローカルカタログ（my_listings）から読み、差分同期する
+    catalog_full_sync_interval_days: int  # 完全同期（reconciliation）の間隔（日）
+    priority_enabled: bool  # 出品をリスクの優先度で選定し、リスクに応じた間隔で再スキャンする
+    priority_rescan_min_days: float  # 最もリスクの高い出品の再スキャン間隔（日）
+    priority_rescan_max_days: float  # リスクのない出品の再スキャン間隔（日）
+    priority_new_listing_days: int  # カタログに載ってからこの日数以内の出品を新着として扱う
+    retention_enabled: bool  # run 終了時に保持期間を過ぎたデータを整理する
+    retention_interval_hours: int  # 整理の実行間隔（時間）
+    retention_keep_runs_days: int  # これより古い run は日次集計にまとめて削除（0=無効）
+    retention_archive_resolved_after_days: int  # これより古い対応済み検知をアーカイブ（0=無効）
+    retention_prune_ended_listings_days: int  # これより前に終了した出品をカタログから削除（0=無効）
+    retention_payload_cache_days: float  # これより長く使われていない検索ペイロードのキャッシュを削除（0=無効）
+    retention_payload_cache_max_mb: float  # 検索ペイロードのキャッシュの容量上限（MB、0=無効）
     output_type: str  # "csv" | "sheets"
     worksheet_name: str
     image_preview_formula: bool
@@ -37,6 +77,12 @@ class RunParams:
         match_cfg = config.get("match", {})
         sheet_cfg = config.get("sheet", {})
         msg_cfg = config.get("message", {})
+        catalog_cfg = config.get("catalog", {})
+        retention_cfg = config.get("retention", {})
+        priority_cfg = config.get("priority", {})
+        work_queue_cfg = config.get("work_queue", {})
+        concurrency_cfg = config.get("concurrency", {})
+        timing_cfg = config.get("timing", {})
 
         max_listings = int(run_cfg.get("max_listings_per_run", 1000))
         search_limit = int(ebay_cfg.get("search_limit", 1000))
@@ -53,6 +99,13 @@ class RunParams:
             )
             search_limit = 200
 
+        marketplaces = run_cfg.get("image_search_marketplaces") or [DEFAULT_MARKETPLACE_ID]
+        if isinstance(marketplaces, str):
+            marketplaces = [m for m in marketplaces.split(",")]
+        image_search_marketplaces = tuple(
+            dict.fromkeys(str(m).strip().upper() for m in marketplaces if str(m).strip())
+        ) or (DEFAULT_MARKETPLACE_ID,)
+
         return cls(
             max_listings=max_listings,
             max_images_per_listing=int(run_cfg.get("max_images_per_listing", 3)),
@@ -62,11 +115,54 @@ class RunParams:
                 run_cfg.get("stop_on_first_match_per_image", True)
             ),
             max_concurrent_downloads=int(run_cfg.get("max_concurrent_downloads", 10)),
+            concurrency_adaptive=bool(concurrency_cfg.get("adaptive", True)),
+            concurrency_hosts=host_limits_from_config(
+                concurrency_cfg.get("hosts"), int(run_cfg.get("max_concurrent_downloads", 10))
+            ),
+            timing_per_listing=bool(timing_cfg.get("per_listing", False)),
+            listing_workers=max(1, int(run_cfg.get("listing_workers", 1))),
+            resolve_workers=max(1, int(run_cfg.get("resolve_workers", 2))),
+            search_workers=max(1, int(run_cfg.get("search_workers", 2))),
+            download_workers=max(1, int(run_cfg.get("download_workers", 2))),
+            match_workers=max(1, int(run_cfg.get("match_workers", 1))),
+            stage_queue_size=max(1, int(run_cfg.get("stage_queue_size", 8))),
+            additional_images_top_hits=int(run_cfg.get("additional_images_top_hits", 0)),
+            search_image_max_edge=int(run_cfg.get("search_image_max_edge", 1024)),
+            image_search_marketplaces=image_search_marketplaces,
+            image_search_max_depth=int(run_cfg.get("image_search_max_depth", 300)),
+            image_search_near_band_margin=int(run_cfg.get("image_search_near_band_margin", 8)),
+            image_search_min_near_per_page=int(run_cfg.get("image_search_min_near_per_page", 1)),
             search_limit=search_limit,
             search_sort=ebay_cfg.get("search_sort") or "newlyListed",
             also_accept_same_image_url=bool(
                 match_cfg.get("also_accept_same_image_url", True)
             ),
+            time_budget_minutes=max(0, int(run_cfg.get("time_budget_minutes", 0))),
+            api_call_budget=max(0, int(run_cfg.get("api_call_budget", 0))),
+            budget_reserve_sec=max(0, int(run_cfg.get("budget_reserve_sec", 60))),
+            write_batch_listings=int(run_cfg.get("write_batch_listings", 20)),
+            write_batch_interval_sec=float(run_cfg.get("write_batch_interval_sec", 5.0)),
+            work_queue_enabled=bool(work_queue_cfg.get("enabled", False)),
+            work_queue_lease_sec=max(10, int(work_queue_cfg.get("lease_sec", 300))),
+            work_queue_lease_batch=max(1, int(work_queue_cfg.get("lease_batch", 10))),
+            work_queue_join_window_hours=max(1, int(work_queue_cfg.get("join_window_hours", 24))),
+            catalog_enabled=bool(catalog_cfg.get("enabled", True)),
+            catalog_full_sync_interval_days=int(catalog_cfg.get("full_sync_interval_days", 7)),
+            priority_enabled=bool(priority_cfg.get("enabled", True)),
+            priority_rescan_min_days=max(0.0, float(priority_cfg.get("rescan_min_days", 1))),
+            priority_rescan_max_days=max(0.0, float(priority_cfg.get("rescan_max_days", 30))),
+            priority_new_listing_days=max(0, int(priority_cfg.get("new_listing_days", 14))),
+            retention_enabled=bool(retention_cfg.get("enabled", True)),
+            retention_interval_hours=int(retention_cfg.get("interval_hours", 24)),
+            retention_keep_runs_days=int(retention_cfg.get("keep_runs_days", 180)),
+            retention_archive_resolved_after_days=int(
+                retention_cfg.get("archive_resolved_after_days", 90)
+            ),
+            retention_prune_ended_listings_days=int(
+                retention_cfg.get("prune_ended_listings_days", 365)
+            ),
+            retention_payload_cache_days=max(0.0, float(retention_cfg.get("payload_cache_days", 30))),
+            retention_payload_cache_max_mb=max(0.0, float(retention_cfg.get("payload_cache_max_mb", 1024))),
             output_type=sheet_cfg.get("output_type", "csv"),
             worksheet_name=sheet_cfg.get("worksheet_name", "detections"),
             image_preview_formula=bool(sheet_cfg.get("image_preview_formula", True)),
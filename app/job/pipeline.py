@@ -0,0 +1,256 @@
+"""
+出品処理のステージ型パイプライン。
+
+出品 → 自画像の取得・ハッシュ → 画像・キーワード検索 → 候補ダウンロード・ハッシュ → 照合・登録
+の各ステージを有界キューでつなぎ、ステージごとのワーカー数で並行に実行する。
+下流のキューが満杯なら上流は待つ（バックプレッシャー）。レート制限で遅い検索ステージが
+他のステージを止めず、スループットをステージ単位で調整できる。登録は BatchWriter の書き込みスレッドが担う。
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Iterable, Optional
+
+from app.ebay.models import ItemSummary
+from app.job import processor
+from app.util import concurrency
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class StageMetrics:
+    """ステージごとの処理件数・入力キューの深さ・処理時間。"""
+
+    name: str
+    workers: int
+    queue_size: int
+    processed: int = 0
+    max_depth: int = 0
+    depth_total: int = 0
+    depth_samples: int = 0
+    busy_sec: float = 0.0
+
+    @property
+    def avg_depth(self) -> float:
+        return self.depth_total / self.depth_samples if self.depth_samples else 0.0
+
+
+class _Stage:
+    """入力キュー1本とワーカースレッド群。fn が返した要素を下流ステージへ渡す。"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Optional[Iterable[Any]]],
+        workers: int,
+        queue_size: int,
+        downstream: Optional[_Stage],
+        on_error: Callable[[BaseException], None],
+        aborted: threading.Event,
+    ) -> None:
+        self._fn = fn
+        self._downstream = downstream
+        self._on_error = on_error
+        self._aborted = aborted
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self.metrics = StageMetrics(name, max(1, workers), max(1, queue_size))
+        self._threads = [
+            threading.Thread(target=self._run, name=f"stage-{name}-{i}", daemon=True)
+            for i in range(self.metrics.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def put(self, item: Any) -> None:
+        """要素を投入する。キューが満杯なら空くまで待つ。"""
+        depth = self._queue.qsize()
+        with self._lock:
+            self.metrics.max_depth = max(self.metrics.max_depth, depth)
+            self.metrics.depth_total += depth
+            self.metrics.depth_samples += 1
+        self._queue.put(item)
+
+    def close(self) -> None:
+        """投入済みの要素を処理し終えるまで待ち、ワーカーを止める。"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            # 中断後は残りの要素を処理せずに読み捨てる（上流が満杯のキューで止まらないように）
+            if self._aborted.is_set():
+                continue
+            started = time.monotonic()
+            try:
+                for out in self._fn(item) or ():
+                    self._downstream.put(out)
+            except Exception as e:
+                self._on_error(e)
+            with self._lock:
+                self.metrics.processed += 1
+                self.metrics.busy_sec += time.monotonic() - started
+
+
+class ListingPipeline:
+    """
+    run 全体で1つ作り、submit() で出品を投入、close() で完了を待つ。
+    出品の全画像が終わると on_listing_done(ListingTask) をワーカースレッドから呼ぶ。
+    on_image_done(ImageTask) は出品の途中の画像が終わるたびに呼ぶ（最後の画像では呼ばない）。
+    resolve_listing は出品 ID から ItemSummary を返す（None ならその出品はスキップ）。
+    done_images: 再開時に完了済みの画像（出品 ID → 画像番号 → 結果）。これらの画像は処理しない。
+    出品の処理を始める時点の内容を参照するので、呼び出し側が実行中に追加してもよい。
+    """
+
+    def __init__(
+        self,
+        ctx: processor.ProcessContext,
+        resolve_listing: Callable[[str], Optional[ItemSummary]],
+        on_listing_done: Callable[[processor.ListingTask], None],
+        skip_seller_check: bool = False,
+        suspect_item_ids: Optional[list[str]] = None,
+        on_image_done: Optional[Callable[[processor.ImageTask], None]] = None,
+        done_images: Optional[dict[str, dict[int, processor.ImageResult]]] = None,
+    ) -> None:
+        params = ctx.params
+        self._resolve_listing = resolve_listing
+        self._on_listing_done = on_listing_done
+        self._on_image_done = on_image_done
+        self._done_images = done_images if done_images is not None else {}
+        self._skip_seller_check = skip_seller_check
+        self._suspect_item_ids = suspect_item_ids
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self._aborted = threading.Event()
+        # 候補画像のダウンロードは run 全体で共有するプールで行う。並列数の自動調整が有効なら
+        # 実際の同時ダウンロード数は画像ホストの制御（app.util.concurrency）が決めるので、プールは上限まで用意する
+        self._download_executor = ThreadPoolExecutor(
+            max_workers=concurrency.max_level(concurrency.IMAGE_HOST, max(1, params.max_concurrent_downloads)),
+            thread_name_prefix="download",
+        )
+        self._ctx = replace(ctx, download_executor=self._download_executor)
+        qsize = params.stage_queue_size
+        # 下流から作る（各ステージは下流ステージへ出力する）
+        specs = [
+            ("listing", self._listing_stage, params.listing_workers),
+            ("resolve", self._image_stage(processor.resolve_image), params.resolve_workers),
+            ("search", self._image_stage(processor.search_image), params.search_workers),
+            ("download", self._image_stage(processor.download_candidates), params.download_workers),
+            ("match", self._match_stage, params.match_workers),
+        ]
+        stages: list[_Stage] = []
+        downstream: Optional[_Stage] = None
+        for name, fn, workers in reversed(specs):
+            downstream = _Stage(name, fn, workers, qsize, downstream, self._fail, self._aborted)
+            stages.append(downstream)
+        self._stages = list(reversed(stages))
+        self._closed = False
+
+    def __enter__(self) -> ListingPipeline:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if exc[0] is not None:
+            self._aborted.set()
+        self.close()
+
+    @property
+    def failed(self) -> bool:
+        return self._aborted.is_set()
+
+    def submit(self, listing_item_id: str) -> None:
+        """出品を投入する。先頭ステージのキューが満杯なら待つ。"""
+        self._stages[0].put(listing_item_id)
+
+    def metrics(self) -> list[StageMetrics]:
+        return [s.metrics for s in self._stages]
+
+    def close(self) -> None:
+        """上流から順にステージを閉じて全件の完了を待つ。ステージで例外があれば最初の1件を送出する。"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            for stage in self._stages:
+                stage.close()
+        finally:
+            self._download_executor.shutdown(wait=False, cancel_futures=True)
+        for m in self.metrics():
+            logger.info(
+                "ステージ %s: workers=%d, 処理=%d, キュー深さ max=%d/%d avg=%.1f, 処理時間=%.1fs",
+                m.name, m.workers, m.processed, m.max_depth, m.queue_size, m.avg_depth, m.busy_sec,
+            )
+        if self._error is not None:
+            raise self._error
+
+    # --- ステージ ---
+
+    def _fail(self, e: BaseException) -> None:
+        with self._error_lock:
+            if self._error is None:
+                self._error = e
+                logger.error("パイプライン中断: %s", e)
+        self._aborted.set()
+
+    def _listing_stage(self, listing_item_id: str) -> Iterable[processor.ImageTask]:
+        item_summary = self._resolve_listing(listing_item_id)
+        if item_summary is None:
+            return []
+        listing = processor.start_listing(
+            self._ctx,
+            listing_item_id,
+            item_summary,
+            skip_seller_check=self._skip_seller_check,
+            suspect_item_ids=self._suspect_item_ids,
+            done_images=self._done_images.get(listing_item_id),
+        )
+        tasks = listing.image_tasks()
+        if not tasks:
+            self._on_listing_done(listing)
+        return tasks
+
+    def _image_stage(
+        self, fn: Callable[[processor.ImageTask, processor.ProcessContext], bool]
+    ) -> Callable[[processor.ImageTask], Iterable[processor.ImageTask]]:
+        def _run(task: processor.ImageTask) -> Iterable[processor.ImageTask]:
+            try:
+                ok = fn(task, self._ctx)
+            except Exception:
+                # 例外はパイプラインを中断する。出品は完了扱いにしない
+                task.close()
+                raise
+            if not ok:
+                self._finish(task)
+                return []
+            return [task]
+        return _run
+
+    def _match_stage(self, task: processor.ImageTask) -> None:
+        try:
+            processor.match_candidates(task, self._ctx)
+        except Exception:
+            task.close()
+            raise
+        self._finish(task)
+
+    def _finish(self, task: processor.ImageTask) -> None:
+        task.close()
+        if self._aborted.is_set():
+            return
+        if task.listing.image_done():
+            self._on_listing_done(task.listing)
+        elif self._on_image_done:
+            self._on_image_done(task)
@@ -5,20 +5,25 @@
 from __future__ import annotations
 
 import logging
-import sqlite3
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
 from typing import Optional, Tuple
 
 from app.ebay import browse, item_fetcher, models
 from app.job.params import RunParams
 from app.match import hashing, matcher
 from app.msg import generator
-from app.store import repo
-from app.util import http
-from app.util.image import to_base64_for_search
+from app.store.writer import BatchWriter
+from app.util import concurrency, http, timing
+from app.util.image import build_search_payload
 
 logger = logging.getLogger(__name__)
 
+# run 全体で共有する候補画像のハッシュのキャッシュ件数（1件あたり数百バイト）
+_FINGERPRINT_CACHE_SIZE = 50_000
+
 
 def _download_candidate_image(url: str) -> Optional[bytes]:
     """候補画像を1件ダウンロード。失敗時は None。"""
@@ -33,15 +38,22 @@ def _collect_candidates_to_check(
     listing_item_id: str,
     seller_names: list[str],
     include_additional_images: bool = False,
+    additional_image_item_ids: Optional[set[str]] = None,
 ) -> list[Tuple[models.ItemSummary, str]]:
-    """スキップ対象を除いた候補リストを収集。自アカウント（seller_names）の出品は除外。"""
+    """
+    スキップ対象を除いた候補リストを収集。自アカウント（seller_names）の出品は除外。
+    additional_image_item_ids に含まれる出品は追加画像も候補にする。
+    """
     result: list[Tuple[models.ItemSummary, str]] = []
     for candidate in search_resp.item_summaries:
         if candidate.is_from_any_seller(seller_names):
             continue
         if candidate.item_id == listing_item_id:
             continue
-        urls = candidate.image_urls(12) if include_additional_images else (
+        with_additional = include_additional_images or (
+            additional_image_item_ids is not None and candidate.item_id in additional_image_item_ids
+        )
+        urls = candidate.image_urls(12) if with_additional else (
             [candidate.image.image_url] if candidate.image and candidate.image.image_url else []
         )
         for url in urls:
@@ -114,30 +126,45 @@ def _collect_keyword_candidates(
     return all_cands
 
 
-def _collect_suspect_candidates(
+def _fetch_suspect_items(
     suspect_item_ids: list[str],
     token: str,
+    item_cache: Optional[item_fetcher.ItemCache] = None,
+) -> list[models.ItemSummary]:
+    """
+    疑わしいアイテムを一括取得（20件/リクエスト）。画像ループの外で1回だけ呼ぶ。
+    item_cache 指定時は run 内で取得済みのアイテムを再取得しない。
+    """
+    ids = [(sid or "").strip() for sid in suspect_item_ids if (sid or "").strip()]
+    if not ids:
+        return []
+    try:
+        fetched = item_fetcher.fetch_items_by_ids(ids, token, cache=item_cache)
+    except Exception as e:
+        logger.warning("疑わしいアイテム取得失敗: item_ids=%s, err=%s", ids, e)
+        return []
+    result: list[models.ItemSummary] = []
+    for sid in ids:
+        suspect = fetched.get(sid)
+        if not suspect:
+            logger.warning("疑わしいアイテムが見つかりません: item_id=%s", sid)
+            continue
+        result.append(suspect)
+    return result
+
+
+def _collect_suspect_candidates(
+    suspects: list[models.ItemSummary],
     listing_item_id: str,
     seller_names: list[str],
     max_images: int,
 ) -> list[Tuple[models.ItemSummary, str]]:
     """
-    疑わしいアイテムを直接取得し、その全画像を候補として返す。
+    取得済みの疑わしいアイテムから、その全画像を候補として返す。
     eBay画像検索に引っかからないリサイズ流用も検知するため。
     """
     result: list[Tuple[models.ItemSummary, str]] = []
-    for sid in suspect_item_ids:
-        sid_clean = (sid or "").strip()
-        if not sid_clean:
-            continue
-        try:
-            suspect = item_fetcher.fetch_any_item_by_id(sid_clean, token)
-        except Exception as e:
-            logger.warning("疑わしいアイテム取得失敗: item_id=%s, err=%s", sid_clean, e)
-            continue
-        if not suspect:
-            logger.warning("疑わしいアイテムが見つかりません: item_id=%s", sid_clean)
-            continue
+    for suspect in suspects:
         if suspect.item_id == listing_item_id:
             continue
         if suspect.is_from_any_seller(seller_names):
@@ -149,195 +176,659 @@ def _collect_suspect_candidates(
     return result
 
 
-def _download_candidates_parallel(
-    candidates: list[Tuple[models.ItemSummary, str]],
-    max_workers: int,
-) -> dict[str, bytes]:
-    """候補画像を並列ダウンロード。"""
-    if not candidates:
-        return {}
-    workers = max(1, min(max_workers, len(candidates)))
-    cand_raw_map: dict[str, bytes] = {}
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_url = {
-            executor.submit(_download_candidate_image, url): url
-            for _, url in candidates
-        }
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                raw = future.result()
-                if raw is not None:
-                    cand_raw_map[url] = raw
-            except Exception:
-                pass
-    return cand_raw_map
-
-
-def process_one_listing(
-    conn: sqlite3.Connection,
-    run_id: str,
+class FingerprintCache:
+    """
+    run 全体で共有する候補画像 URL → ハッシュ一式のキャッシュ（LRU）。スレッドセーフ。
+    複数の自画像・複数アカウントの出品の検索に同じ盗用出品の画像が出ても、ダウンロードとハッシュは1回だけ。
+    デコード済みの画像は保持しない。ダウンロードに失敗した URL は記録しない（次に出たときに再取得する）。
+    """
+
+    def __init__(self, max_entries: int = _FINGERPRINT_CACHE_SIZE) -> None:
+        self._max_entries = max(1, max_entries)
+        self._items: OrderedDict[str, hashing.ImageFingerprint] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, url: str) -> Optional[hashing.ImageFingerprint]:
+        with self._lock:
+            fp = self._items.get(url)
+            if fp is not None:
+                self._items.move_to_end(url)
+                self.hits += 1
+            return fp
+
+    def put(self, url: str, fp: hashing.ImageFingerprint) -> None:
+        with self._lock:
+            self._items[url] = replace(fp, image=None) if fp.image is not None else fp
+            self._items.move_to_end(url)
+            while len(self._items) > self._max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class _CandidateDownloader:
+    """
+    候補画像のダウンロードを逐次投入できる並列ダウンローダ。
+    同じ URL は1回だけダウンロードする。画像検索の応答が届いた順に投入し、待ち時間を重ねる。
+    ハッシュ（fingerprint）も URL ごとに1回だけ計算して共有する。
+    cache 指定時は run 全体のキャッシュにあるハッシュを使い、ダウンロードしない。
+    executor 指定時は run 全体で共有するプールでダウンロードする（close で共有プールは止めない）。
+    timings: ダウンロード・ハッシュ計算の所要時間を記録する先（run 全体・出品ごと）。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        executor: Optional[ThreadPoolExecutor] = None,
+        cache: Optional[FingerprintCache] = None,
+        timings: Tuple[Optional[timing.StageTimings], ...] = (),
+    ) -> None:
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._cache = cache
+        self._timings = timings
+        self._futures: dict[str, Future] = {}
+        self._fingerprints: dict[str, Optional[hashing.ImageFingerprint]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, candidates: list[Tuple[models.ItemSummary, str]]) -> None:
+        with self._lock:
+            for _, url in candidates:
+                if not url or url in self._futures or url in self._fingerprints:
+                    continue
+                cached = self._cache.get(url) if self._cache is not None else None
+                if cached is not None:
+                    self._fingerprints[url] = cached
+                    continue
+                self._futures[url] = self._executor.submit(self._download, url)
+
+    def _download(self, url: str) -> Optional[bytes]:
+        with timing.measure(timing.STAGE_CANDIDATE_DOWNLOAD, *self._timings):
+            return _download_candidate_image(url)
+
+    def fingerprint(self, url: str) -> Optional[hashing.ImageFingerprint]:
+        """投入済み URL のダウンロード完了を待ち、ハッシュ一式を返す。失敗・未投入は None。"""
+        with self._lock:
+            if url in self._fingerprints:
+                return self._fingerprints[url]
+            future = self._futures.get(url)
+        if future is None:
+            return None
+        try:
+            raw = future.result()
+        except Exception:
+            raw = None
+        fp = None
+        if raw is not None:
+            with timing.measure(timing.STAGE_CANDIDATE_HASH, *self._timings):
+                fp = hashing.fingerprint_image(raw)
+        if fp is not None and self._cache is not None:
+            self._cache.put(url, fp)
+        with self._lock:
+            self._fingerprints.setdefault(url, fp)
+            return self._fingerprints[url]
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            return
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+
+    def __enter__(self) -> "_CandidateDownloader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+@dataclass
+class ImageSearchDepth:
+    """1画像・1マーケットプレイスの画像検索で到達した深さ。"""
+
+    marketplace_id: str
+    depth: int  # 取得した候補（item_summary）の累計件数
+    pages: int
+    stop_reason: str  # exhausted / max_depth / relevance_drop / error
+
+
+def _near_band_count(
+    downloader: _CandidateDownloader,
+    cands: list[Tuple[models.ItemSummary, str]],
+    our_fp: hashing.ImageFingerprint,
+    params: RunParams,
+) -> int:
+    """
+    ページ内の候補のうち、pHash 距離が判定閾値＋マージン以内（閾値帯に近い）の件数。
+    次ページを取得するかの判断に使う。ハッシュはダウンローダ経由で共有され、照合時に再計算しない。
+    """
+    if our_fp.phash is None:
+        return 0
+    band = hashing.PHASH_THRESHOLD + params.image_search_near_band_margin
+    count = 0
+    for _, url in cands:
+        fp = downloader.fingerprint(url)
+        if fp is None:
+            continue
+        if fp.sha256 == our_fp.sha256 or hashing.phash_similar(our_fp.phash, fp.phash, threshold=band):
+            count += 1
+    return count
+
+
+def _search_image_one_marketplace(
+    image_b64: str,
+    our_fp: hashing.ImageFingerprint,
+    params: RunParams,
+    marketplace_id: str,
     listing_item_id: str,
-    item_summary: models.ItemSummary,
+    seller_names: list[str],
+    token: str,
+    item_cache: Optional[item_fetcher.ItemCache],
+    downloader: _CandidateDownloader,
+) -> Tuple[list[Tuple[models.ItemSummary, str]], ImageSearchDepth]:
+    """
+    1マーケットプレイスで画像検索し、候補を返す（適応的ページング）。
+    1ページ目（candidates_per_image 件。Browse API の上限 200 件まで）は常に取得。以降は直前のページに閾値帯に近い候補が
+    image_search_min_near_per_page 件以上あるときだけ、image_search_max_depth まで深く取得する。
+    各ページの候補はすぐにダウンローダへ投入する。1ページ目の取得失敗は例外を送出する。
+    """
+    # API の上限を超えるページサイズでは「件数不足＝最終ページ」の判定が常に成り立ち、1ページで止まってしまう
+    page_size = min(max(1, params.candidates_per_image), browse.BROWSE_API_LIMIT)
+    max_depth = max(page_size, params.image_search_max_depth)
+    cands_all: list[Tuple[models.ItemSummary, str]] = []
+    depth = 0
+    pages = 0
+    stop_reason = "exhausted"
+    pager = browse.iter_search_by_image_pages(
+        image_b64,
+        page_size=page_size,
+        max_total=max_depth,
+        marketplace_id=marketplace_id,
+    )
+    while True:
+        try:
+            search_resp = next(pager, None)
+        except Exception:
+            if pages == 0:
+                raise
+            stop_reason = "error"
+            break
+        if search_resp is None:
+            if depth >= max_depth:
+                stop_reason = "max_depth"
+            break
+        pages += 1
+        depth += len(search_resp.item_summaries)
+
+        # 上位ヒットの追加画像を一括取得で補完（additional_images_top_hits > 0 のとき）
+        top_hit_ids: Optional[set[str]] = None
+        if params.additional_images_top_hits > 0 and pages == 1:
+            search_resp.item_summaries = item_fetcher.enrich_additional_images(
+                search_resp.item_summaries,
+                token,
+                params.additional_images_top_hits,
+                cache=item_cache,
+            )
+            top_hit_ids = {
+                s.item_id for s in search_resp.item_summaries[: params.additional_images_top_hits]
+            }
+        cands = _collect_candidates_to_check(
+            search_resp, listing_item_id, seller_names,
+            additional_image_item_ids=top_hit_ids,
+        )
+        cands_all.extend(cands)
+        downloader.submit(cands)
+
+        if depth >= max_depth:
+            stop_reason = "max_depth"
+            break
+        # 最終ページ（件数不足・API総件数に到達）なら閾値帯の判定を待たずに終了
+        if len(search_resp.item_summaries) < page_size or (
+            search_resp.total > 0 and depth >= search_resp.total
+        ):
+            break
+        # 次ページは閾値帯に近い候補が出続けている場合のみ取得（関連度が落ちたら打ち切り）
+        if _near_band_count(downloader, cands, our_fp, params) < params.image_search_min_near_per_page:
+            stop_reason = "relevance_drop"
+            break
+    pager.close()
+    return cands_all, ImageSearchDepth(
+        marketplace_id=marketplace_id, depth=depth, pages=pages, stop_reason=stop_reason,
+    )
+
+
+def _search_image_candidates(
+    image_b64: str,
+    our_fp: hashing.ImageFingerprint,
     params: RunParams,
+    listing_item_id: str,
+    img_index: int,
     seller_names: list[str],
     token: str,
+    item_cache: Optional[item_fetcher.ItemCache],
+    downloader: _CandidateDownloader,
+) -> Tuple[Optional[list[Tuple[models.ItemSummary, str]]], list[ImageSearchDepth]]:
+    """
+    設定された全マーケットプレイス（image_search_marketplaces）で並列に画像検索し、候補を返す。
+    応答が届いたマーケットから順に候補画像のダウンロードを開始する。
+    候補は item_id で重複除去し、設定順（先頭のマーケット優先）でマージする。
+    戻り値は (候補, マーケットごとの到達深さ)。全マーケットで失敗した場合、候補は None。
+    """
+    marketplaces = list(params.image_search_marketplaces) or ["EBAY_US"]
+    per_marketplace: dict[str, list[Tuple[models.ItemSummary, str]]] = {}
+    depths: list[ImageSearchDepth] = []
+    # マーケットごとの検索はプロセス内で使い回すプールで並列に実行する（画像ごとにプールを作らない）
+    executor = concurrency.shared_executor("image-search", params.search_workers * len(marketplaces))
+    future_to_mp = {
+        executor.submit(
+            _search_image_one_marketplace,
+            image_b64,
+            our_fp,
+            params,
+            mpid,
+            listing_item_id,
+            seller_names,
+            token,
+            item_cache,
+            downloader,
+        ): mpid
+        for mpid in marketplaces
+    }
+    for future in as_completed(future_to_mp):
+        mpid = future_to_mp[future]
+        try:
+            cands, depth = future.result()
+        except Exception as e:
+            error_detail = str(e)
+            # HTTPエラーの場合は詳細を取得
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_detail = f"{e.response.status_code}: {e.response.text[:200]}"
+                except:
+                    pass
+            logger.warning("画像検索失敗: item_id=%s, image_index=%d, marketplace=%s, error=%s",
+                          listing_item_id, img_index, mpid, error_detail)
+            depths.append(ImageSearchDepth(marketplace_id=mpid, depth=0, pages=0, stop_reason="error"))
+            continue
+        per_marketplace[mpid] = cands
+        depths.append(depth)
+
+    depths.sort(key=lambda d: marketplaces.index(d.marketplace_id))
+    if not per_marketplace:
+        return None, depths
+
+    merged: list[Tuple[models.ItemSummary, str]] = []
+    seen_item_ids: set[str] = set()
+    for mpid in marketplaces:
+        cands = per_marketplace.get(mpid)
+        if not cands:
+            continue
+        mp_item_ids: set[str] = set()
+        for c, u in cands:
+            if c.item_id in seen_item_ids:
+                continue
+            mp_item_ids.add(c.item_id)
+            merged.append((c, u))
+        seen_item_ids |= mp_item_ids
+    return merged, depths
+
+
+# --- 出品処理のステージ ---
+# 自画像の取得 → ハッシュ → 画像・キーワード検索（候補収集）→ 候補ダウンロード・ハッシュ → 照合・登録。
+# app.job.pipeline がステージごとのワーカーと有界キューでつなぎ、run 全体で並行に実行する。
+
+
+@dataclass
+class ProcessContext:
+    """ステージ間で共有する run 単位の設定と依存。"""
+
+    run_id: str
+    params: RunParams
+    seller_names: list[str]
+    token: str
+    writer: BatchWriter  # 検知・到達深さの書き込み先（ワーカースレッドから DB 接続は使わない）
+    item_cache: Optional[item_fetcher.ItemCache] = None
+    download_executor: Optional[ThreadPoolExecutor] = None  # 候補ダウンロードの共有プール
+    fingerprint_cache: Optional[FingerprintCache] = None  # 候補画像のハッシュの run 全体のキャッシュ
+    timings: Optional[timing.StageTimings] = None  # ステージごとの所要時間の run 全体の集計
+
+
+@dataclass(frozen=True)
+class ImageResult:
+    """画像1枚の処理結果。"""
+
+    scanned_images: int = 0
+    candidates_checked: int = 0
+    detections_new: int = 0
+    errors: int = 0
+
+
+@dataclass
+class ListingTask:
+    """1出品の処理状態。画像ごとの結果をスレッドセーフに集計する。"""
+
+    listing_item_id: str
+    item_summary: models.ItemSummary
+    image_urls: list[str]
+    suspects: list[models.ItemSummary] = field(default_factory=list)
+    scanned_images: int = 0
+    candidates_checked: int = 0
+    detections_new: int = 0
+    errors: int = 0
+    matched: bool = False
+    done_images: dict[int, ImageResult] = field(default_factory=dict)  # 再開時に完了済みの画像
+    timings: Optional[timing.StageTimings] = None  # この出品のステージごとの所要時間（timing.per_listing 有効時）
+    _pending: int = field(default=0, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        self._pending = len(self.image_urls) - len(self.done_images)
+        for r in self.done_images.values():
+            self.add(r.scanned_images, r.candidates_checked, r.detections_new, r.errors)
+            if r.detections_new:
+                self.matched = True
+
+    def add(self, images: int = 0, candidates: int = 0, detections: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            self.scanned_images += images
+            self.candidates_checked += candidates
+            self.detections_new += detections
+            self.errors += errors
+
+    def image_done(self) -> bool:
+        """画像1枚の処理完了を記録。全画像が完了したら True。"""
+        with self._lock:
+            self._pending -= 1
+            return self._pending == 0
+
+    def image_tasks(self) -> list[ImageTask]:
+        """未完了の画像のタスク。"""
+        return [
+            ImageTask(self, i, url) for i, url in enumerate(self.image_urls) if i not in self.done_images
+        ]
+
+    def result(self) -> Tuple[int, int, int, int]:
+        """(scanned_images, candidates_checked, detections_new, listing_errors)"""
+        with self._lock:
+            return self.scanned_images, self.candidates_checked, self.detections_new, self.errors
+
+
+@dataclass
+class ImageTask:
+    """自出品の画像1枚の処理状態。ステージを進むごとに項目が埋まる。"""
+
+    listing: ListingTask
+    img_index: int
+    img_url: str
+    fp: Optional[hashing.ImageFingerprint] = None
+    image_b64: Optional[str] = None
+    downloader: Optional[_CandidateDownloader] = None
+    candidates: list[Tuple[models.ItemSummary, str]] = field(default_factory=list)
+    fingerprints: dict[str, Optional[hashing.ImageFingerprint]] = field(default_factory=dict)
+    result: ImageResult = ImageResult()
+
+    def add(self, images: int = 0, candidates: int = 0, detections: int = 0, errors: int = 0) -> None:
+        """この画像の結果を加算し、出品の集計にも反映する。"""
+        r = self.result
+        self.result = ImageResult(
+            r.scanned_images + images,
+            r.candidates_checked + candidates,
+            r.detections_new + detections,
+            r.errors + errors,
+        )
+        self.listing.add(images, candidates, detections, errors)
+
+    def close(self) -> None:
+        """ダウンローダと画像データを解放する。"""
+        if self.downloader is not None:
+            self.downloader.close()
+            self.downloader = None
+        self.fp = None
+        self.candidates = []
+        self.fingerprints = {}
+
+
+def _timers(ctx: ProcessContext, listing: ListingTask) -> Tuple[Optional[timing.StageTimings], ...]:
+    """所要時間の記録先（run 全体・出品ごと）。"""
+    return ctx.timings, listing.timings
+
+
+def _listing_stopped(task: ImageTask, ctx: ProcessContext) -> bool:
+    """stop_on_first_match_per_image で、この出品の検知が既に見つかっているか。"""
+    return ctx.params.stop_on_first_match_per_image and task.listing.matched
+
+
+def start_listing(
+    ctx: ProcessContext,
+    listing_item_id: str,
+    item_summary: models.ItemSummary,
     skip_seller_check: bool = False,
     suspect_item_ids: Optional[list[str]] = None,
-) -> Tuple[int, int, int, int]:
+    done_images: Optional[dict[int, ImageResult]] = None,
+) -> ListingTask:
     """
-    1出品を処理し、画像スキャン・候補チェック・検知を実行する。
-
-    Returns:
-        (scanned_images, candidates_checked, detections_new, listing_errors)
+    出品の処理対象画像を決め、疑わしいアイテムを取得する。
+    セラー不一致・画像なしの場合は画像0枚・エラー1件の ListingTask を返す。
+    done_images: 中断した run の再開時に完了済みの画像（結果を集計に含め、処理はしない）。
     """
     # 設定したセラー（EBAY_SELLER_USERNAME）の出品か検証。不一致なら処理しない（誤検知防止）
     # skip_seller_check: only_item で明示指定時はセラーチェックをスキップ
-    if not skip_seller_check and not item_summary.is_from_any_seller(seller_names):
-        return 0, 0, 0, 1
-
-    scanned_images = 0
-    candidates_checked = 0
-    detections_new = 0
-    listing_errors = 0
+    if not skip_seller_check and not item_summary.is_from_any_seller(ctx.seller_names):
+        return ListingTask(listing_item_id, item_summary, [], errors=1)
 
     # 疑わしいアイテム指定時は画像枚数を多めに（リサイズ流用は枚数が違う場合がある）
+    params = ctx.params
     max_imgs = max(params.max_images_per_listing, 12) if suspect_item_ids else params.max_images_per_listing
     image_urls = item_summary.image_urls(max_imgs)
-    
+
     # 画像URLが空の場合のログ
     if not image_urls:
-        logger.warning("画像URLが空: item_id=%s, title=%s, image=%s, additional_images=%d", 
-                      listing_item_id, 
+        logger.warning("画像URLが空: item_id=%s, title=%s, image=%s, additional_images=%d",
+                      listing_item_id,
                       item_summary.title[:50] if item_summary.title else "None",
                       "有" if item_summary.image else "無",
                       len(item_summary.additional_images))
-        return 0, 0, 0, 1  # 画像がない場合はエラーとしてカウント
-    
-    matched_this_image = False
-
-    for img_index, img_url in enumerate(image_urls):
-        # 画像ダウンロード
-        try:
+        return ListingTask(listing_item_id, item_summary, [], errors=1)  # 画像がない場合はエラーとしてカウント
+
+    listing_timings = timing.StageTimings(percentiles=False) if params.timing_per_listing else None
+    # 疑わしいアイテムは画像ループの外で1回だけ一括取得（画像ごとに再取得しない）
+    suspects: list[models.ItemSummary] = []
+    if suspect_item_ids:
+        with timing.measure(timing.STAGE_SUSPECT_FETCH, ctx.timings, listing_timings):
+            suspects = _fetch_suspect_items(suspect_item_ids, ctx.token, ctx.item_cache)
+    done = {i: r for i, r in (done_images or {}).items() if i < len(image_urls)}
+    return ListingTask(
+        listing_item_id, item_summary, image_urls, suspects=suspects, done_images=done, timings=listing_timings
+    )
+
+
+def resolve_image(task: ImageTask, ctx: ProcessContext) -> bool:
+    """自出品の画像をダウンロードしてハッシュと検索用ペイロードを作る。失敗時は False（エラー1件）。"""
+    if _listing_stopped(task, ctx):
+        return False
+    listing_item_id, img_index, img_url = task.listing.listing_item_id, task.img_index, task.img_url
+    timers = _timers(ctx, task.listing)
+    try:
+        with timing.measure(timing.STAGE_OWN_DOWNLOAD, *timers):
             raw = http.download_bytes(img_url)
-        except Exception as e:
-            logger.warning("画像ダウンロード失敗: item_id=%s, image_index=%d, url=%s, error=%s", 
-                          listing_item_id, img_index, img_url[:100] if img_url else "None", str(e))
-            listing_errors += 1
-            continue
-
-        if not raw or len(raw) == 0:
-            logger.warning("画像データが空: item_id=%s, image_index=%d, url=%s", 
-                          listing_item_id, img_index, img_url[:100] if img_url else "None")
-            listing_errors += 1
-            continue
-
+    except Exception as e:
+        logger.warning("画像ダウンロード失敗: item_id=%s, image_index=%d, url=%s, error=%s",
+                      listing_item_id, img_index, img_url[:100] if img_url else "None", str(e))
+        task.add(errors=1)
+        return False
+
+    if not raw or len(raw) == 0:
+        logger.warning("画像データが空: item_id=%s, image_index=%d, url=%s",
+                      listing_item_id, img_index, img_url[:100] if img_url else "None")
+        task.add(errors=1)
+        return False
+
+    with timing.measure(timing.STAGE_OWN_HASH, *timers):
         try:
-            our_sha = hashing.sha256_hex(raw)
-            our_phash = hashing.phash_image(raw)
-            our_ahash = hashing.ahash_image(raw)
-            our_dhash = hashing.dhash_image(raw)
+            our_fp = hashing.fingerprint_image(raw, keep_image=True)
         except Exception as e:
-            logger.warning("画像ハッシュ計算失敗: item_id=%s, image_index=%d, error=%s", 
+            logger.warning("画像ハッシュ計算失敗: item_id=%s, image_index=%d, error=%s",
                           listing_item_id, img_index, str(e))
-            listing_errors += 1
-            continue
-
-        image_b64 = to_base64_for_search(raw)
-        if not image_b64:
-            logger.warning("画像Base64変換失敗: item_id=%s, image_index=%d, url=%s", 
-                          listing_item_id, img_index, img_url[:100] if img_url else "None")
-            listing_errors += 1
-            continue
-
-        # 画像検索
-        try:
-            # marketplace_idを指定して検索（デフォルトはEBAY_US）
-            search_resp = browse.search_by_image(
-                image_b64,
-                limit=params.candidates_per_image,
-                offset=0,
-                marketplace_id="EBAY_US",  # 画像検索はUSマーケットプレイスで実行
-            )
-        except Exception as e:
-            error_detail = str(e)
-            # HTTPエラーの場合は詳細を取得
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_detail = f"{e.response.status_code}: {e.response.text[:200]}"
-                except:
-                    pass
-            logger.warning("画像検索失敗: item_id=%s, image_index=%d, error=%s", 
-                          listing_item_id, img_index, error_detail)
-            listing_errors += 1
-            continue
+            task.add(errors=1)
+            return False
+
+        # ハッシュ計算でデコード済みの画像を再利用し、縮小・キャッシュ済みのペイロードを使う
+        image_b64 = build_search_payload(
+            raw,
+            sha256=our_fp.sha256,
+            image=our_fp.image,
+            max_edge=ctx.params.search_image_max_edge,
+        )
+    if not image_b64:
+        logger.warning("画像Base64変換失敗: item_id=%s, image_index=%d, url=%s",
+                      listing_item_id, img_index, img_url[:100] if img_url else "None")
+        task.add(errors=1)
+        return False
+    task.fp = our_fp
+    task.image_b64 = image_b64
+    return True
 
-        scanned_images += 1
-        matched_this_image = False
 
-        candidates_to_check = _collect_candidates_to_check(
-            search_resp, listing_item_id, seller_names
+def search_image(task: ImageTask, ctx: ProcessContext) -> bool:
+    """
+    画像検索（全マーケットプレイス）とキーワード検索・疑わしいアイテムで候補を集める。
+    画像検索の候補は応答順にダウンロードを開始する。全マーケットで失敗した場合は False（エラー1件）。
+    """
+    if _listing_stopped(task, ctx) or task.fp is None or task.image_b64 is None:
+        return False
+    listing = task.listing
+    params = ctx.params
+    timers = _timers(ctx, listing)
+    task.downloader = _CandidateDownloader(
+        params.max_concurrent_downloads,
+        executor=ctx.download_executor,
+        cache=ctx.fingerprint_cache,
+        timings=timers,
+    )
+    # 画像検索（全マーケットプレイスへ並列に投げ、応答順に候補ダウンロードを開始）
+    with timing.measure(timing.STAGE_IMAGE_SEARCH, *timers):
+        candidates_to_check, depths = _search_image_candidates(
+            task.image_b64,
+            task.fp,
+            params,
+            listing.listing_item_id,
+            task.img_index,
+            ctx.seller_names,
+            ctx.token,
+            ctx.item_cache,
+            task.downloader,
         )
-        # キーワード検索で追加候補（画像検索に出ないリサイズ流用を一括で検知）
-        if item_summary.title:
+    for d in depths:
+        depth_args = (
+            ctx.run_id, listing.listing_item_id, task.img_index,
+            d.marketplace_id, d.depth, d.pages, d.stop_reason,
+        )
+        ctx.writer.record_image_search_depth(*depth_args)
+    logger.debug(
+        "画像検索の到達深さ: item_id=%s, image_index=%d, %s",
+        listing.listing_item_id, task.img_index,
+        ", ".join(f"{d.marketplace_id}={d.depth}({d.stop_reason})" for d in depths),
+    )
+    if candidates_to_check is None:
+        task.add(errors=1)
+        return False
+
+    task.add(images=1)
+
+    # キーワード検索で追加候補（画像検索に出ないリサイズ流用を一括で検知）
+    if listing.item_summary.title:
+        with timing.measure(timing.STAGE_KEYWORD_SEARCH, *timers):
             kw_cands = _collect_keyword_candidates(
-                item_summary.title,
-                listing_item_id,
-                seller_names,
+                listing.item_summary.title,
+                listing.listing_item_id,
+                ctx.seller_names,
                 params.keyword_search_candidates,
             )
-            seen_keys = {(c.item_id, u) for c, u in candidates_to_check}
-            for kc, kurl in kw_cands:
-                if (kc.item_id, kurl) not in seen_keys:
-                    candidates_to_check.append((kc, kurl))
-                    seen_keys.add((kc.item_id, kurl))
-        # 疑わしいアイテムを直接追加（特定アイテムモード時のみ）
-        if suspect_item_ids:
-            # 疑わしいアイテムは画像枚数を多めに（12枚）取得して比較
-            suspect_max_images = max(params.max_images_per_listing, 12)
-            suspect_cands = _collect_suspect_candidates(
-                suspect_item_ids,
-                token,
-                listing_item_id,
-                seller_names,
-                suspect_max_images,
-            )
-            # 重複を避ける（item_id + url が既にあればスキップ）
-            seen_keys = {(c.item_id, u) for c, u in candidates_to_check}
-            for sc, surl in suspect_cands:
-                if (sc.item_id, surl) not in seen_keys:
-                    candidates_to_check.append((sc, surl))
-                    seen_keys.add((sc.item_id, surl))
-        cand_raw_map = _download_candidates_parallel(
-            candidates_to_check, params.max_concurrent_downloads
+        seen_keys = {(c.item_id, u) for c, u in candidates_to_check}
+        for kc, kurl in kw_cands:
+            if (kc.item_id, kurl) not in seen_keys:
+                candidates_to_check.append((kc, kurl))
+                seen_keys.add((kc.item_id, kurl))
+    # 疑わしいアイテムを直接追加（特定アイテムモード時のみ）
+    if listing.suspects:
+        # 疑わしいアイテムは画像枚数を多めに（12枚）取得して比較
+        suspect_max_images = max(params.max_images_per_listing, 12)
+        suspect_cands = _collect_suspect_candidates(
+            listing.suspects,
+            listing.listing_item_id,
+            ctx.seller_names,
+            suspect_max_images,
         )
-
-        for candidate, cand_image_url in candidates_to_check:
-            cand_raw = cand_raw_map.get(cand_image_url)
-            if cand_raw is None:
+        # 重複を避ける（item_id + url が既にあればスキップ）
+        seen_keys = {(c.item_id, u) for c, u in candidates_to_check}
+        for sc, surl in suspect_cands:
+            if (sc.item_id, surl) not in seen_keys:
+                candidates_to_check.append((sc, surl))
+                seen_keys.add((sc.item_id, surl))
+    task.candidates = candidates_to_check
+    return True
+
+
+def download_candidates(task: ImageTask, ctx: ProcessContext) -> bool:
+    """候補画像のダウンロード完了を待ち、取得できた画像のハッシュを計算する（キャッシュ済みの画像はそのまま使う）。"""
+    if _listing_stopped(task, ctx) or task.downloader is None:
+        return False
+    # 画像検索分は投入済み。追加分（キーワード・疑わしいアイテム）も投入して完了を待つ
+    task.downloader.submit(task.candidates)
+    fingerprints = {
+        url: task.downloader.fingerprint(url) for url in dict.fromkeys(u for _, u in task.candidates)
+    }
+    task.fingerprints = {url: fp for url, fp in fingerprints.items() if fp is not None}
+    return True
+
+
+def match_candidates(task: ImageTask, ctx: ProcessContext) -> None:
+    """候補と照合し、新規の検知を登録する。"""
+    if _listing_stopped(task, ctx) or task.fp is None:
+        return
+    with timing.measure(timing.STAGE_MATCH, *_timers(ctx, task.listing)):
+        _match_candidates(task, ctx)
+
+
+def _match_candidates(task: ImageTask, ctx: ProcessContext) -> None:
+    listing = task.listing
+    params = ctx.params
+    listing_item_id = listing.listing_item_id
+    item_summary = listing.item_summary
+    our_fp = task.fp
+    candidates_checked = 0
+    detections_new = 0
+    matched_this_image = False
+    try:
+        for candidate, cand_image_url in task.candidates:
+            if cand_image_url not in task.fingerprints:
                 continue
 
             candidates_checked += 1
-            their_sha = hashing.sha256_hex(cand_raw)
-            their_phash = hashing.phash_image(cand_raw)
-            their_ahash = hashing.ahash_image(cand_raw)
-            their_dhash = hashing.dhash_image(cand_raw)
+            their_fp = task.fingerprints[cand_image_url]
+            if their_fp is None:
+                continue
             result = matcher.check_match(
-                our_sha,
-                their_sha,
-                our_image_url=img_url,
+                our_fp.sha256,
+                their_fp.sha256,
+                our_image_url=task.img_url,
                 their_image_url=cand_image_url,
                 also_accept_same_image_url=params.also_accept_same_image_url,
-                our_phash=our_phash,
-                their_phash=their_phash,
-                our_ahash=our_ahash,
-                their_ahash=their_ahash,
-                our_dhash=our_dhash,
-                their_dhash=their_dhash,
+                our_phash=our_fp.phash,
+                their_phash=their_fp.phash,
+                our_ahash=our_fp.ahash,
+                their_ahash=their_fp.ahash,
+                our_dhash=our_fp.dhash,
+                their_dhash=their_fp.dhash,
             )
             if not result.match:
                 continue
-            if repo.detection_exists(conn, listing_item_id, candidate.item_id):
+            # 重複チェックは run 開始時に読み込んだ検知キー集合で行い、SQLite に問い合わせない
+            if ctx.writer.has_detection(listing_item_id, candidate.item_id):
                 continue
 
             subj, body = generator.generate_message(
@@ -349,31 +840,29 @@ def process_one_listing(
             seller_display = (
                 candidate.seller.display_name() if candidate.seller else ""
             )
-            inserted = repo.insert_detection(
-                conn,
-                run_id,
-                your_item_id=listing_item_id,
+            detection = dict(
                 your_item_url=item_summary.item_web_url,
-                your_image_index=img_index,
-                your_image_url=img_url,
-                your_image_sha256=our_sha,
-                infringing_item_id=candidate.item_id,
+                your_image_index=task.img_index,
+                your_image_url=task.img_url,
+                your_image_sha256=our_fp.sha256,
                 infringing_item_url=candidate.item_web_url,
                 infringing_seller_display=seller_display,
                 infringing_image_url=cand_image_url,
-                infringing_image_sha256=their_sha,
+                infringing_image_sha256=their_fp.sha256,
                 match_evidence=result.evidence,
                 message_subject=subj,
                 message_body=body,
             )
+            inserted = ctx.writer.insert_detection(
+                listing_item_id, candidate.item_id, run_id=ctx.run_id, **detection
+            )
             if inserted:
                 detections_new += 1
                 matched_this_image = True
 
             if params.stop_on_first_match_per_image and matched_this_image:
                 break
-
-        if params.stop_on_first_match_per_image and matched_this_image:
-            break
-
-    return scanned_images, candidates_checked, detections_new, listing_errors
+    finally:
+        task.add(candidates=candidates_checked, detections=detections_new)
+        if matched_this_image:
+            listing.matched = True
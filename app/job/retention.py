@@ -0,0 +1,155 @@
+"""
+DB の保持期間の整理（run 終了時に retention.interval_hours ごとに1回実行）。
+
+- keep_runs_days より古い run を日次集計（run_daily_rollups）にまとめて削除
+- archive_resolved_after_days より古い対応済み検知を detections_archive に圧縮して移動
+- prune_ended_listings_days より前に終了した出品をカタログとスキャン状態から削除
+- 画像検索のペイロードのディスクキャッシュ（data/search_payload_cache）を日数・容量で整理
+- 空きページを incremental_vacuum で解放（auto_vacuum=INCREMENTAL の DB のみ）
+
+auto_vacuum が INCREMENTAL でない既存 DB の切り替え（DB 全体の VACUUM）は run の中では行わず、
+保守コマンド python -m app.main --vacuum で明示的に1回だけ実行する（vacuum_database）。
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.job.params import RunParams
+from app.store import db, repo
+from app.util.image import prune_payload_cache
+from app.util.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+RETENTION_TASK = "retention"
+
+# auto_vacuum の値（PRAGMA auto_vacuum）
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass
+class RetentionResult:
+    runs_rolled_up: int
+    detections_archived: int
+    listings_pruned: int
+    pages_freed: int
+    payloads_pruned: int = 0
+
+
+def _to_iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def is_incremental_auto_vacuum(conn: sqlite3.Connection) -> bool:
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL
+
+
+def ensure_incremental_auto_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    auto_vacuum=INCREMENTAL でない既存 DB を VACUUM して切り替える。切り替えた場合 True。
+    VACUUM は DB 全体を書き直し、その間は他の接続が書き込めないため、run や常駐を止めてから実行する。
+    """
+    if is_incremental_auto_vacuum(conn):
+        return False
+    logger.info("auto_vacuum を INCREMENTAL に切り替えます（初回のみ VACUUM を実行）")
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def run_retention(
+    conn: sqlite3.Connection,
+    keep_runs_days: int,
+    archive_resolved_after_days: int,
+    prune_ended_listings_days: int,
+    now: Optional[datetime] = None,
+    payload_cache_days: float = 0,
+    payload_cache_max_mb: float = 0,
+) -> RetentionResult:
+    """保持期間を過ぎたデータを整理する。0 以下の日数・容量はその項目を無効にする。"""
+    now = now or datetime.now(timezone.utc)
+    rolled_up = archived = pruned = 0
+    # 検知を先にアーカイブし、検知が紐づかなくなった run を集計対象にする
+    if archive_resolved_after_days > 0:
+        archived = repo.archive_resolved_detections(
+            conn, _to_iso(now - timedelta(days=archive_resolved_after_days)), archived_at=_to_iso(now)
+        )
+    if keep_runs_days > 0:
+        rolled_up = repo.rollup_runs_before(conn, _to_iso(now - timedelta(days=keep_runs_days)))
+    if prune_ended_listings_days > 0:
+        pruned = repo.prune_ended_listings(
+            conn, _to_iso(now - timedelta(days=prune_ended_listings_days))
+        )
+    freed = 0
+    if is_incremental_auto_vacuum(conn):
+        freed = repo.incremental_vacuum(conn)
+    else:
+        logger.info(
+            "auto_vacuum が INCREMENTAL でないため空きページを解放しません"
+            "（python -m app.main --vacuum で1回だけ切り替えてください）"
+        )
+    payloads = prune_payload_cache(payload_cache_days, payload_cache_max_mb, now=now.timestamp())
+    return RetentionResult(rolled_up, archived, pruned, freed, payloads)
+
+
+def maybe_run_retention(
+    conn: sqlite3.Connection, params: RunParams, now: Optional[datetime] = None
+) -> Optional[RetentionResult]:
+    """前回の整理から retention_interval_hours 以上経過していれば整理する。実行しなければ None。"""
+    if not params.retention_enabled:
+        return None
+    now = now or datetime.now(timezone.utc)
+    last = _parse_iso(repo.get_maintenance_last_run(conn, RETENTION_TASK))
+    if last and now - last < timedelta(hours=params.retention_interval_hours):
+        return None
+    result = run_retention(
+        conn,
+        keep_runs_days=params.retention_keep_runs_days,
+        archive_resolved_after_days=params.retention_archive_resolved_after_days,
+        prune_ended_listings_days=params.retention_prune_ended_listings_days,
+        now=now,
+        payload_cache_days=params.retention_payload_cache_days,
+        payload_cache_max_mb=params.retention_payload_cache_max_mb,
+    )
+    repo.set_maintenance_last_run(conn, RETENTION_TASK, _to_iso(now))
+    logger.info(
+        "保持期間の整理: run集計=%d, 検知アーカイブ=%d, 終了出品削除=%d, 解放ページ=%d, ペイロードキャッシュ削除=%d",
+        result.runs_rolled_up, result.detections_archived, result.listings_pruned, result.pages_freed,
+        result.payloads_pruned,
+    )
+    return result
+
+
+def vacuum_database(db_path: Optional[str] = None) -> bool:
+    """
+    保守コマンド（python -m app.main --vacuum）。DB を auto_vacuum=INCREMENTAL に切り替え、空きページを解放する。
+    他のプロセスが DB を使用中（SQLITE_BUSY）などで失敗した場合は False。
+    """
+    setup_logging()
+    conn = db.get_connection(db_path)
+    try:
+        if not ensure_incremental_auto_vacuum(conn):
+            freed = repo.incremental_vacuum(conn)
+            logger.info("auto_vacuum は INCREMENTAL です。空きページを解放しました: %d ページ", freed)
+        else:
+            logger.info("auto_vacuum を INCREMENTAL に切り替えました")
+        return True
+    except sqlite3.OperationalError as e:
+        logger.error("VACUUM に失敗しました（run や常駐モードを止めてから再実行してください）: %s", e)
+        return False
+    finally:
+        conn.close()
@@ -0,0 +1,49 @@
+"""
+検知の再確認。未対応・送信済みの検知について侵害出品がまだ掲載中かを一括取得で確認し、
+掲載終了が確かめられた（直接取得で 404）ときだけ REMOVED にする（対応不要になった検知を一覧から外し、
+保持期間の整理でアーカイブする）。REMOVED にする前のステータスは previous_status に残す。
+判定できなかった検知は確認日時を更新せず、次回また確認する。
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+from app.ebay.item_fetcher import fetch_item_availability
+from app.store import repo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReverifyResult:
+    checked: int
+    removed: int
+
+
+def reverify_detections(
+    conn: sqlite3.Connection,
+    token: str,
+    limit: int,
+    min_interval_hours: float,
+    now: Optional[datetime] = None,
+    check_availability: Callable[[Iterable[str], str], dict[str, bool]] = fetch_item_availability,
+) -> ReverifyResult:
+    """前回の確認から min_interval_hours 以上経った検知を、確認の古い順に最大 limit 件再確認する。"""
+    now = now or datetime.now(timezone.utc)
+    verified_before = (now - timedelta(hours=min_interval_hours)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    targets = repo.get_detections_to_verify(conn, verified_before, limit)
+    if not targets:
+        return ReverifyResult(0, 0)
+    available = check_availability([item_id for _, item_id in targets], token)
+    verified = [d for d, item_id in targets if item_id in available]
+    removed = [d for d, item_id in targets if available.get(item_id) is False]
+    repo.mark_detections_verified(conn, verified, now.strftime("%Y-%m-%dT%H:%M:%S.%fZ"), removed)
+    logger.info(
+        "検知の再確認: 確認=%d件, 掲載終了=%d件, 判定不能=%d件",
+        len(verified), len(removed), len(targets) - len(verified),
+    )
+    return ReverifyResult(len(verified), len(removed))
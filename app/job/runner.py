@@ -2,20 +2,30 @@
 from __future__ import annotations
 
 import logging
-import os
+import signal
+import sqlite3
 import sys
+import threading
+from dataclasses import dataclass, field
 from typing import Callable, Optional
 
 from app.config import load_config
-from app.constants import DEFAULT_SELLER_USERNAME
 from app.ebay import auth
 from app.ebay.models import ItemSummary
-from app.ebay.item_fetcher import fetch_item_by_id
+from app.ebay.item_fetcher import ItemCache, fetch_item_by_id
+from app.job import retention
+from app.job.accounts import load_accounts
+from app.job.budget import BUDGET_TIME, RunBudget
 from app.job.listing_selector import select_listings, compute_listing_status
 from app.job.output_writer import write_detections
 from app.job.params import RunParams
-from app.job.processor import process_one_listing
+from app.job.pipeline import ListingPipeline
+from app.job.processor import FingerprintCache, ImageResult, ImageTask, ListingTask, ProcessContext
+from app.job.work_queue import SharedRunWorker, join_window_start
 from app.store import db, repo
+from app.store.detection_keys import DetectionKeySet
+from app.store.writer import BatchWriter
+from app.util import concurrency, timing
 from app.util.datetime_utils import run_id as make_run_id, utc_now_iso
 from app.util.log import get_logger, log_run_summary, setup_logging
 
@@ -29,10 +39,14 @@ def run_once(
         Callable[[int, int, int, int], None]
     ] = None,
     cancellation_check: Optional[Callable[[], bool]] = None,
+    resume_run_id: Optional[str] = None,
 ) -> None:
     """
     1回のジョブ実行。出品検索 → 画像スキャン → 侵害検知 → 出力。
     run_overrides: 実行時オーバーライド（max_listings_per_run, candidates_per_image など）
+    resume_run_id: 中断・中止した run をチェックポイントの続きから再開する（選定済みの未完了出品だけを処理）。
+    work_queue.enabled の場合は作業キューで他のプロセスと run を分担する（実行中の run があれば合流する）。
+    accounts に複数のストアを設定した場合は全ストアの出品を1つの run で並行に処理する。
     """
     setup_logging()
     logger = get_logger("main")
@@ -42,68 +56,158 @@ def run_once(
         ebay_cfg = config.setdefault("ebay", {})
         for k, v in run_overrides.items():
             if k in ("max_listings_per_run", "max_images_per_listing", "candidates_per_image",
-                     "stop_on_first_match_per_image", "max_concurrent_downloads"):
+                     "stop_on_first_match_per_image", "max_concurrent_downloads",
+                     "additional_images_top_hits", "image_search_marketplaces",
+                     "image_search_max_depth", "listing_workers", "resolve_workers",
+                     "search_workers", "download_workers", "match_workers", "stage_queue_size",
+                     "time_budget_minutes", "api_call_budget"):
                 run_cfg[k] = v
             elif k == "search_limit":
                 ebay_cfg[k] = v
     params = RunParams.from_config(config)
-    seller_username = os.getenv("EBAY_SELLER_USERNAME", DEFAULT_SELLER_USERNAME)
+    accounts = load_accounts(config)
 
-    run_id = make_run_id()
+    run_id = resume_run_id or make_run_id()
     if dry_run:
         _handle_dry_run(logger, run_id, params, only_item)
         return
 
-    conn = db.get_connection()
+    conn = db.get_thread_connection()
     db.init_schema(conn)
-    repo.create_run(conn, run_id)
+    # ホストごとの並列数の自動調整（プロセス内で共有し、常駐モードでは前回の run の並列数から始める）
+    concurrency.configure(params.concurrency_hosts, params.concurrency_adaptive)
+    # 作業キューで分担する run か（only_item は1件だけなので分担しない）。joined は既存の run に合流した場合
+    shared = params.work_queue_enabled and not only_item
+    joined = False
+    pending: list[str] = []
+    api_calls_before = 0
+    if resume_run_id:
+        resumed_run = repo.get_run(conn, run_id)
+        if resumed_run is None:
+            raise ValueError(f"Run {run_id} not found")
+        pending = repo.get_pending_checkpoint_listings(conn, run_id)
+        if not pending:
+            logger.info("run %s に再開する出品はありません", run_id)
+            return
+        joined = shared and repo.count_remaining_work(conn, run_id) > 0
+        if not joined:
+            api_calls_before = resumed_run.api_calls_count
+    elif shared and (active_run_id := repo.find_active_shared_run(conn, join_window_start(params))):
+        run_id = active_run_id
+        joined = True
+        logger.info("実行中の run %s に合流します", run_id)
+    else:
+        run_id = _create_run(conn, run_id)
 
     try:
         token = auth.get_access_token()
     except Exception as e:
         logger.exception("OAuth failed: %s", e)
-        repo.update_run(conn, run_id, finished_at=utc_now_iso(), errors_count=1, notes="OAuth failed")
+        if not resume_run_id and not joined:
+            repo.update_run(conn, run_id, finished_at=utc_now_iso(), errors_count=1, notes="OAuth failed")
         log_run_summary(logger, run_id, 0, 0, 0, 0, 1, notes="OAuth failed")
         sys.exit(1)
 
-    scanned = 0
-    images_scanned = 0
-    candidates_checked = 0
-    detections_new = 0
-    errors_count = 0
+    counters = _RunCounters()
+    # 実行時間・API 呼び出し回数の予算（time_budget_minutes / api_call_budget。0 は無制限）
+    budget = RunBudget.from_params(conn, params, api_calls_before=api_calls_before)
+    # 選定した出品と画像ごとの完了状況を記録し、中断しても --resume で続きから処理できるようにする
+    # （only_item は1件だけなので記録しない）
+    checkpointing = not only_item
+    done_images: dict[str, dict[int, ImageResult]] = {}
+    if resume_run_id or joined:
+        totals = _restore_progress(conn, run_id, counters, done_images)
+        if not joined:
+            repo.reopen_run(conn, run_id, notes="Resumed")
+            logger.info(
+                "run %s を再開: 完了済み=%d件, 未完了=%d件", run_id, totals["total"] - len(pending), len(pending)
+            )
 
     from_beginning = bool((run_overrides or {}).get("from_beginning", True))
+    # run 内で共有する出品キャッシュ（疑わしいアイテム・上位ヒットの一括取得結果）
+    item_cache = ItemCache()
+    # run 内で共有する候補画像のハッシュ。同じ盗用出品が複数の出品・アカウントの検索に出ても1回だけ取得する
+    fingerprint_cache = FingerprintCache()
+    # ステージごとの所要時間（run の終了時に件数・合計・p50・p95・最大を run_stage_timings に記録）
+    timings = timing.StageTimings()
+    # 検知・スキャン状態・カウンタの書き込みは専用スレッドで N 出品 / T 秒ごとにまとめてコミット
+    # 登録済み検知キーは run 開始時に1回だけ読み込み、以降の重複チェックはメモリ上で行う
+    writer = BatchWriter(
+        flush_every_listings=params.write_batch_listings,
+        flush_interval_sec=params.write_batch_interval_sec,
+        detection_keys=DetectionKeySet.from_pairs(repo.iter_detection_keys(conn)),
+    )
+    # 中止要求（ユーザー操作・SIGTERM / SIGINT）で立てる。未着手の出品はスキップする（処理中の出品は最後まで処理）
+    stop_event = threading.Event()
+    stop_signal: list[str] = []
+    restore_signals = _install_signal_handlers(stop_event, stop_signal, logger)
+    shared_worker: Optional[SharedRunWorker] = None
+    # 分担する run で他のワーカーが処理中なら終了しない（最後のワーカーが終了処理をする）
+    finish_run = True
     try:
-        selected, summary_map, seller_names = select_listings(
-            conn,
-            params,
-            seller_username,
-            only_item,
-            from_beginning=from_beginning,
+        if resume_run_id or joined:
+            # 再開・合流時は出品情報（ItemSummary）の取得だけに使い、処理対象はチェックポイント・作業キューの未完了分
+            with timing.measure(timing.STAGE_SELECT, timings):
+                _selected, summary_map, seller_names = select_listings(
+                    conn, params, accounts, None, from_beginning=True, timings=timings
+                )
+            selected = [(lid, None) for lid in pending]
+        else:
+            with timing.measure(timing.STAGE_SELECT, timings):
+                selected, summary_map, seller_names = select_listings(
+                    conn,
+                    params,
+                    accounts,
+                    only_item,
+                    from_beginning=from_beginning,
+                    new_only=bool((run_overrides or {}).get("new_listings_only")),
+                    timings=timings,
+                )
+        # 予算に収まる件数だけを優先順（選定順）に処理する。残りは次回の run で選定される
+        fit, budget_reason = budget.listings_that_fit(len(selected))
+        if budget_reason:
+            logger.info(
+                "実行予算（%s）に合わせて対象を絞り込み: %d件 → %d件", budget_reason, len(selected), fit
+            )
+            selected = selected[:fit]
+        if not resume_run_id and not joined:
+            counters.total = len(selected)
+            if shared:
+                queued_run_id = repo.enqueue_shared_run(
+                    conn, run_id, [lid for lid, _ in selected], join_window_start(params)
+                )
+                if queued_run_id != run_id:
+                    # 同時に起動した別のプロセスが先に登録した run に合流する
+                    logger.info("同時に開始された run %s に合流します", queued_run_id)
+                    repo.delete_run(conn, run_id)
+                    run_id = queued_run_id
+                    joined = True
+                    _restore_progress(conn, run_id, counters, done_images)
+            elif checkpointing:
+                repo.save_run_selection(conn, run_id, [lid for lid, _ in selected])
+        if shared:
+            shared_worker = SharedRunWorker(run_id, params)
+
+        logger.info(
+            "処理開始: 対象=%d件, ワーカー数 出品=%d 自画像=%d 検索=%d ダウンロード=%d 照合=%d, 並列数 %s",
+            counters.total, params.listing_workers, params.resolve_workers,
+            params.search_workers, params.download_workers, params.match_workers,
+            ", ".join(f"{l['host']}={l['level']}" for l in concurrency.summary())
+            or f"ダウンロード={params.max_concurrent_downloads}（固定）",
         )
+        counters.add(progress_callback=progress_callback)
 
-        total = len(selected)
-        logger.info("処理開始: 対象=%d件", total)
-        if progress_callback:
-            progress_callback(0, total, 0, 0)
-        for idx, (listing_item_id, _last_scanned) in enumerate(selected):
-            # キャンセルチェック
-            if cancellation_check and cancellation_check():
-                logger.info("実行が中止されました。処理済み: %d / %d 件", scanned, total)
-                repo.update_run(
-                    conn, run_id,
-                    scanned_listings_count=scanned,
-                    scanned_images_count=images_scanned,
-                    candidates_checked_count=candidates_checked,
-                    detections_new_count=detections_new,
-                    errors_count=errors_count,
-                    notes=f"User cancelled. Processed {scanned}/{total} items",
-                )
-                return
-            
-            if progress_callback:
-                progress_callback(scanned, total, images_scanned, candidates_checked)
+        suspect_ids = suspect_item_ids or (run_overrides or {}).get("suspect_item_ids")
 
+        def _should_stop() -> bool:
+            if not stop_event.is_set() and cancellation_check and cancellation_check():
+                stop_event.set()
+            return stop_event.is_set()
+
+        def _resolve_listing(listing_item_id: str) -> Optional[ItemSummary]:
+            if _should_stop():
+                budget.listing_finished()
+                return None
             item_summary = _resolve_item_summary(
                 listing_item_id,
                 summary_map,
@@ -114,81 +218,208 @@ def run_once(
                 logger,
             )
             if item_summary is None:
-                if only_item:
-                    repo.upsert_listing_scan_state(conn, listing_item_id, run_id, "fail")
-                    errors_count += 1
-                    repo.update_run(
-                        conn, run_id,
-                        notes=f"Item {listing_item_id} not found (API fetch failed or invalid ID)",
-                    )
-                continue
+                budget.listing_finished()
+            if item_summary is None and only_item:
+                writer.upsert_listing_scan_state(listing_item_id, run_id, "fail")
+                counters.add(errors=1)
+                writer.update_run(
+                    run_id,
+                    notes=f"Item {listing_item_id} not found (API fetch failed or invalid ID)",
+                )
+            elif item_summary is None and checkpointing:
+                writer.mark_listing_checkpoint(run_id, listing_item_id, "skipped")
+            return item_summary
 
-            suspect_ids = suspect_item_ids or (run_overrides or {}).get("suspect_item_ids")
-            img_count, cand_count, det_count, listing_errors = process_one_listing(
-                conn,
-                run_id,
-                listing_item_id,
-                item_summary,
-                params,
-                seller_names,
-                token,
-                skip_seller_check=bool(only_item),
-                suspect_item_ids=suspect_ids,
+        def _image_done(task: ImageTask) -> None:
+            r = task.result
+            writer.record_image_checkpoint(
+                run_id, task.listing.listing_item_id, task.img_index,
+                r.scanned_images, r.candidates_checked, r.detections_new, r.errors,
             )
-            scanned += 1
-            images_scanned += img_count
-            candidates_checked += cand_count
-            detections_new += det_count
-            errors_count += listing_errors
 
+        def _listing_done(listing: ListingTask) -> None:
+            img_count, cand_count, det_count, listing_errors = listing.result()
             status = compute_listing_status(
-                listing_errors, item_summary.image_urls(params.max_images_per_listing)
+                listing_errors, listing.item_summary.image_urls(params.max_images_per_listing)
             )
-            repo.upsert_listing_scan_state(conn, listing_item_id, run_id, status)
-            if scanned % 50 == 0 or scanned == total:
-                logger.info("処理中: %d / %d 件目 (スキャン済=%d, 画像=%d)", scanned, total, scanned, images_scanned)
-            if progress_callback:
-                progress_callback(scanned, total, images_scanned, candidates_checked)
-
-        repo.update_run(
-            conn,
-            run_id,
-            scanned_listings_count=scanned,
-            scanned_images_count=images_scanned,
-            candidates_checked_count=candidates_checked,
-            detections_new_count=detections_new,
-            errors_count=errors_count,
+            writer.upsert_listing_scan_state(listing.listing_item_id, run_id, status)
+            if listing.timings:
+                writer.record_listing_timings(run_id, listing.listing_item_id, listing.timings.summary())
+
+            def _persist(fields: dict[str, int]) -> None:
+                # チェックポイントと run のカウンタを同じトランザクションに積む（再開時に一致させる）
+                if checkpointing:
+                    writer.mark_listing_checkpoint(
+                        run_id, listing.listing_item_id, status,
+                        1, img_count, cand_count, det_count, listing_errors,
+                    )
+                if shared:
+                    # 他のワーカーの分も含めて、完了した出品の合計を run に反映する
+                    writer.sync_run_counters(run_id)
+                else:
+                    writer.update_run(run_id, **fields, api_calls_count=budget.api_calls_used())
+
+            budget.listing_finished()
+            scanned = counters.add(
+                scanned=1,
+                images=img_count,
+                candidates=cand_count,
+                detections=det_count,
+                errors=listing_errors,
+                progress_callback=progress_callback,
+                persist=_persist,
+            )
+            writer.listing_done()
+            if scanned % 50 == 0 or scanned == counters.total:
+                logger.info(
+                    "処理中: %d / %d 件目 (スキャン済=%d, 画像=%d)",
+                    scanned, counters.total, scanned, counters.images_scanned,
+                )
+
+        # 出品 → 自画像 → 検索 → 候補ダウンロード → 照合 をステージごとのワーカーで並行に処理
+        # DB への書き込みはすべて writer 経由（接続はワーカースレッドでは使えないため）
+        ctx = ProcessContext(
+            run_id=run_id,
+            params=params,
+            seller_names=seller_names,
+            token=token,
+            item_cache=item_cache,
+            writer=writer,
+            fingerprint_cache=fingerprint_cache,
+            timings=timings,
+        )
+        with ListingPipeline(
+            ctx,
+            _resolve_listing,
+            _listing_done,
+            skip_seller_check=bool(only_item),
+            suspect_item_ids=suspect_ids,
+            on_image_done=_image_done if checkpointing else None,
+            done_images=done_images,
+        ) as pipeline:
+            if shared_worker:
+                listing_ids = shared_worker.iter_listings(
+                    conn,
+                    lambda: _should_stop() or pipeline.failed,
+                    on_reclaimed=lambda _ids: _restore_progress(conn, run_id, None, done_images),
+                )
+            else:
+                listing_ids = (lid for lid, _last_scanned in selected)
+            for listing_item_id in listing_ids:
+                if _should_stop() or pipeline.failed:
+                    break
+                # 処理中の出品を含めて予算を超える見込みなら、新しい出品は始めない
+                reason = budget.exhausted()
+                if reason:
+                    budget_reason = reason
+                    logger.info(
+                        "実行予算（%s）に達するため新しい出品の処理を停止: 処理済み=%d件",
+                        budget_reason, counters.scanned,
+                    )
+                    break
+                budget.listing_started()
+                pipeline.submit(listing_item_id)
+        logger.info(
+            "候補画像のハッシュキャッシュ: 保持=%d件, ヒット=%d回", len(fingerprint_cache), fingerprint_cache.hits
         )
 
+        if stop_event.is_set() and shared_worker:
+            # 分担する run は終了せず、残りは他のワーカー・次に起動したプロセスが続きを処理する
+            logger.info("実行が中止されました。残りの出品は他のワーカーが処理します: 処理済み=%d件", counters.scanned)
+            finish_run = False
+            return
+        if stop_event.is_set():
+            logger.info("実行が中止されました。処理済み: %d / %d 件", counters.scanned, counters.total)
+            reason = f"Interrupted by {stop_signal[0]}" if stop_signal else "User cancelled"
+            resume_hint = f" (resume with --resume {run_id})" if checkpointing else ""
+            writer.update_run(
+                run_id,
+                **counters.run_fields(),
+                api_calls_count=budget.api_calls_used(),
+                notes=f"{reason}. Processed {counters.scanned}/{counters.total} items{resume_hint}",
+            )
+            return
+
+        if shared_worker:
+            writer.flush()
+            shared_worker.close(conn)
+            if repo.count_remaining_work(conn, run_id) or not repo.claim_run_finish(
+                conn, run_id, utc_now_iso()
+            ):
+                logger.info("run %s の残りは他のワーカーが処理中です。終了処理は最後のワーカーが行います", run_id)
+                finish_run = False
+                return
+            # 全ワーカーの集計で終了する
+            counters.restore(repo.get_checkpoint_totals(conn, run_id))
+        budget_notes = None
+        if budget_reason:
+            label = "Time budget" if budget_reason == BUDGET_TIME else "API call budget"
+            budget_notes = f"{label} reached. Processed {counters.scanned}/{counters.total} items"
+        writer.update_run(run_id, **counters.run_fields(), notes=budget_notes)
+        if not shared:
+            writer.update_run(run_id, api_calls_count=budget.api_calls_used())
+        # 出力前にバッファ済みの検知をコミットして読めるようにする
+        writer.flush()
+        # 全件完了した run のチェックポイントは不要
+        repo.clear_run_checkpoints(conn, run_id)
+
         new_detections = repo.get_detections_by_run(conn, run_id)
         if new_detections:
             try:
-                dest = write_detections(
-                    new_detections,
-                    output_type=params.output_type,
-                    worksheet_name=params.worksheet_name,
-                    image_preview_formula=params.image_preview_formula,
-                )
+                with timing.measure(timing.STAGE_OUTPUT, timings):
+                    dest = write_detections(
+                        new_detections,
+                        output_type=params.output_type,
+                        worksheet_name=params.worksheet_name,
+                        image_preview_formula=params.image_preview_formula,
+                    )
                 logger.info("Detections appended to %s", dest)
             except Exception as e:
                 logger.exception("Output failed: %s", e)
-                repo.update_run(conn, run_id, notes=f"Output failed: {e}")
-                errors_count += 1
+                counters.add(errors=1)
+                writer.update_run(run_id, errors_count=counters.errors, notes=f"Output failed: {e}")
     except Exception as e:
         logger.exception("Run error: %s", e)
-        errors_count += 1
-        repo.update_run(
-            conn, run_id,
-            scanned_listings_count=scanned,
-            scanned_images_count=images_scanned,
-            candidates_checked_count=candidates_checked,
-            detections_new_count=detections_new,
-            errors_count=errors_count,
-            notes=str(e),
-        )
+        counters.add(errors=1)
+        if writer.failed:
+            # 書き込みに失敗した後は writer を使えない。コミット済みの分だけが残り、残りは --resume でやり直す
+            repo.update_run(conn, run_id, notes=f"DB write failed: {e}")
+            finish_run = False
+        elif shared_worker:
+            # 他のワーカーの分を上書きしない。run は他のワーカー・次に起動したプロセスが続ける
+            writer.sync_run_counters(run_id)
+            writer.update_run(run_id, notes=str(e))
+            finish_run = False
+        else:
+            writer.update_run(run_id, **counters.run_fields(), notes=str(e))
     finally:
-        # finished_at を更新（カウントは既に更新済み）
-        repo.update_run(conn, run_id, finished_at=utc_now_iso())
+        try:
+            writer.close()
+        except Exception as e:
+            logger.exception("DB write failed: %s", e)
+        if shared_worker:
+            # 完了分をコミットしてからリースを手放す。API 呼び出し回数は各ワーカーの分を加算する
+            shared_worker.close(conn)
+            repo.add_run_api_calls(conn, run_id, budget.api_calls_used())
+        if finish_run:
+            # finished_at を更新（カウントは既に更新済み）
+            repo.update_run(conn, run_id, finished_at=utc_now_iso())
+        stage_timings = timings.summary()
+        if stage_timings:
+            logger.info("ステージ別の所要時間: %s", timing.format_summary(stage_timings))
+            try:
+                repo.save_run_stage_timings(conn, run_id, stage_timings)
+            except Exception as e:
+                logger.warning("所要時間の記録に失敗: %s", e)
+        levels = concurrency.summary()
+        if levels:
+            logger.info(
+                "並列数（自動調整）: %s",
+                ", ".join(
+                    f"{l['host']}={l['level']} (範囲 {l['low']}-{l['high']}, 減少 {l['decreases']}回)"
+                    for l in levels
+                ),
+            )
         run = repo.get_run(conn, run_id)
         if run:
             log_run_summary(
@@ -201,6 +432,142 @@ def run_once(
                 run.errors_count,
                 run.notes or "",
             )
+        try:
+            retention.maybe_run_retention(conn, params)
+        except Exception as e:
+            logger.warning("保持期間の整理に失敗: %s", e)
+        db.close_thread_connections()
+        restore_signals()
+
+
+def _create_run(conn: sqlite3.Connection, run_id: str) -> str:
+    """run を登録する。同じ秒に起動した別のプロセスと run_id が重なったら連番を付ける。"""
+    candidate = run_id
+    for n in range(2, 100):
+        try:
+            repo.create_run(conn, candidate)
+            return candidate
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            candidate = f"{run_id}-{n}"
+    raise RuntimeError(f"Could not allocate a run id for {run_id}")
+
+
+def _restore_progress(
+    conn: sqlite3.Connection,
+    run_id: str,
+    counters: Optional[_RunCounters],
+    done_images: dict[str, dict[int, ImageResult]],
+) -> dict[str, int]:
+    """
+    再開・合流する run のチェックポイントからカウンタと出品内の完了画像を読み込む。
+    done_images はパイプラインと共有する dict をその場で更新する。チェックポイントの集計を返す。
+    """
+    totals = repo.get_checkpoint_totals(conn, run_id)
+    if counters is not None:
+        counters.restore(totals)
+    done_images.update(
+        (lid, {i: ImageResult(*r) for i, r in images.items()})
+        for lid, images in repo.get_image_checkpoints(conn, run_id).items()
+    )
+    return totals
+
+
+@dataclass
+class _RunCounters:
+    """run 全体のカウンタ。パイプラインのワーカーから並行に加算されるためロックで保護する。"""
+
+    total: int = 0
+    scanned: int = 0
+    images_scanned: int = 0
+    candidates_checked: int = 0
+    detections_new: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(
+        self,
+        scanned: int = 0,
+        images: int = 0,
+        candidates: int = 0,
+        detections: int = 0,
+        errors: int = 0,
+        progress_callback: Optional[Callable[[int, int, int, int], None]] = None,
+        persist: Optional[Callable[[dict[str, int]], None]] = None,
+    ) -> int:
+        """
+        カウンタを加算し、加算後の処理済み出品数を返す。
+        progress_callback と persist（加算後の run_fields を受け取る）はロック内で呼ぶ（値が前後しない）。
+        """
+        with self._lock:
+            self.scanned += scanned
+            self.images_scanned += images
+            self.candidates_checked += candidates
+            self.detections_new += detections
+            self.errors += errors
+            if progress_callback:
+                progress_callback(self.scanned, self.total, self.images_scanned, self.candidates_checked)
+            if persist:
+                persist(self._fields())
+            return self.scanned
+
+    def restore(self, totals: dict[str, int]) -> None:
+        """再開する run のチェックポイントの集計から復元する。"""
+        with self._lock:
+            self.total = totals["total"]
+            self.scanned = totals["scanned_listings_count"]
+            self.images_scanned = totals["scanned_images_count"]
+            self.candidates_checked = totals["candidates_checked_count"]
+            self.detections_new = totals["detections_new_count"]
+            self.errors = totals["errors_count"]
+
+    def run_fields(self) -> dict[str, int]:
+        """update_run に渡すカウンタ。"""
+        with self._lock:
+            return self._fields()
+
+    def _fields(self) -> dict[str, int]:
+        return {
+            "scanned_listings_count": self.scanned,
+            "scanned_images_count": self.images_scanned,
+            "candidates_checked_count": self.candidates_checked,
+            "detections_new_count": self.detections_new,
+            "errors_count": self.errors,
+        }
+
+
+def _install_signal_handlers(
+    stop_event: threading.Event, stop_signal: list[str], logger: logging.Logger
+) -> Callable[[], None]:
+    """
+    SIGTERM / SIGINT で stop_event を立てる（処理中の出品を終え、書き込みをコミットしてから終了する）。
+    2回目の SIGINT は通常どおり KeyboardInterrupt になる。シグナルはメインスレッドでしか扱えないため、
+    Web UI のスレッドから呼ばれた場合は何もしない。戻り値は元のハンドラに戻す関数。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous = {sig: signal.getsignal(sig) or signal.SIG_DFL for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    def _handler(signum: int, frame: object) -> None:
+        name = signal.Signals(signum).name
+        logger.warning("%s を受信: 処理中の出品を終えて状態を保存し、終了します", name)
+        if not stop_signal:
+            stop_signal.append(name)
+        stop_event.set()
+        signal.signal(signal.SIGINT, previous[signal.SIGINT])
+        # 呼び出し元（--daemon など）が設定したハンドラにも伝える（KeyboardInterrupt にする既定の SIGINT は除く）
+        prev = previous[signum]
+        if callable(prev) and prev is not signal.default_int_handler:
+            prev(signum, frame)
+
+    for sig in previous:
+        signal.signal(sig, _handler)
+
+    def _restore() -> None:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    return _restore
 
 
 def _resolve_item_summary(
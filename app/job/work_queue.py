@@ -0,0 +1,116 @@
+"""
+複数プロセスで1つの run を分担する（work_queue.enabled）。
+
+最初に起動したプロセスが出品を選定して作業キュー（work_queue テーブル）に登録し、
+join_window_hours 以内に起動した他のプロセス（別ホストの cron・Web UI の実行ボタンなど）はその run に合流する。
+各ワーカーは出品を lease_batch 件ずつ期限付きでリースし、ハートビートで期限を延長しながら処理する。
+ワーカーが落ちると期限切れになった出品を他のワーカーが取り直す。キューが空になったら最後のワーカーが run を終了する。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, Optional
+
+from app.job.params import RunParams
+from app.store import db, repo
+
+logger = logging.getLogger(__name__)
+
+# キューが空でない（他のワーカーが処理中）間に、期限切れの出品を確認する間隔の上限（秒）
+_MAX_POLL_SEC = 5.0
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def join_window_start(params: RunParams, now: Optional[datetime] = None) -> str:
+    """合流する run の開始日時の下限（runs.started_at と同じ形式）。"""
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(hours=params.work_queue_join_window_hours)
+    return since.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SharedRunWorker:
+    """
+    作業キューから出品をリースするワーカー。作成するとハートビートのスレッドを開始し、close() で
+    止めてリース中の未完了の出品を手放す。完了した出品は mark_listing_checkpoint がキューから削除する。
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        params: RunParams,
+        worker_id: Optional[str] = None,
+        poll_sec: Optional[float] = None,
+    ) -> None:
+        self.run_id = run_id
+        self.worker_id = worker_id or make_worker_id()
+        self._lease_sec = float(params.work_queue_lease_sec)
+        self._batch = params.work_queue_lease_batch
+        self._poll_sec = poll_sec if poll_sec is not None else min(_MAX_POLL_SEC, self._lease_sec / 3)
+        self._stop = threading.Event()
+        self._closed = False
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="work-queue-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+        logger.info("作業キューのワーカーを開始: run=%s, worker=%s", run_id, self.worker_id)
+
+    def iter_listings(
+        self,
+        conn: sqlite3.Connection,
+        should_stop: Callable[[], bool],
+        on_reclaimed: Optional[Callable[[list[str]], None]] = None,
+    ) -> Iterator[str]:
+        """
+        リースした出品 ID を順に返す。リースできる出品がなく、他のワーカーが処理中なら
+        期限切れになるのを待って取り直す。キューが空になるか should_stop() が True で終わる。
+        on_reclaimed は他のワーカーが途中で止まった出品（2回目以降のリース）を処理する前に呼ぶ。
+        """
+        while not should_stop():
+            leased = repo.lease_work(conn, self.run_id, self.worker_id, self._batch, self._lease_sec)
+            if not leased:
+                remaining = repo.count_remaining_work(conn, self.run_id)
+                if remaining == 0:
+                    return
+                logger.debug("作業キュー: 他のワーカーが処理中 残り=%d件", remaining)
+                self._stop.wait(self._poll_sec)
+                continue
+            reclaimed = [lid for lid, attempts in leased if attempts > 0]
+            if reclaimed:
+                logger.info("期限切れのリースを取り直し: %d件", len(reclaimed))
+                if on_reclaimed:
+                    on_reclaimed(reclaimed)
+            for listing_item_id, _attempts in leased:
+                if should_stop():
+                    return
+                yield listing_item_id
+
+    def close(self, conn: sqlite3.Connection) -> None:
+        """ハートビートを止め、リース中の未完了の出品を手放す（完了分の書き込みをコミットしてから呼ぶ）。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._heartbeat.join()
+        released = repo.release_leases(conn, self.run_id, self.worker_id)
+        if released:
+            logger.info("未完了の出品 %d件のリースを解放しました", released)
+
+    def _heartbeat_loop(self) -> None:
+        conn = db.get_connection()
+        try:
+            while not self._stop.wait(self._lease_sec / 3):
+                try:
+                    repo.renew_leases(conn, self.run_id, self.worker_id, self._lease_sec)
+                except sqlite3.Error as e:
+                    logger.warning("リースの延長に失敗: %s", e)
+        finally:
+            conn.close()
@@ -1,5 +1,5 @@
 """
-CLI エントリーポイント。--once, --dry-run, --only-item を処理。
+CLI エントリーポイント。--once, --dry-run, --only-item, --resume, --daemon, --vacuum を処理。
 """
 from __future__ import annotations
 
@@ -28,22 +28,57 @@ def main() -> None:
         metavar="IDS",
         help="Comma-separated suspect item IDs to compare (use with --only-item)",
     )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="RUN_ID",
+        help="Resume an interrupted run from its checkpoint (implies --once)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay resident and run sweeps, new-listing scans and detection re-checks on a schedule",
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="One-time maintenance: convert the DB to incremental auto_vacuum (rewrites the whole DB; stop other jobs first)",
+    )
     args = parser.parse_args()
 
-    if not args.once:
+    if args.vacuum:
+        if args.once or args.resume or args.only_item or args.dry_run or args.daemon:
+            parser.error("--vacuum cannot be combined with other options")
+        from app.job.retention import vacuum_database
+
+        sys.exit(0 if vacuum_database() else 1)
+    if not args.once and not args.resume and not args.daemon:
         parser.print_help()
         sys.exit(0)
+    if args.resume and args.only_item:
+        parser.error("--resume cannot be combined with --only-item")
+    if args.daemon:
+        if args.once or args.resume or args.only_item or args.dry_run:
+            parser.error("--daemon cannot be combined with --once, --resume, --only-item or --dry-run")
+        from app.job.daemon import run_daemon
+
+        run_daemon()
+        return
 
     from app.job import run_once
 
     suspect_ids = None
     if args.suspect_items:
         suspect_ids = [x.strip() for x in args.suspect_items.split(",") if x.strip()]
-    run_once(
-        dry_run=args.dry_run,
-        only_item=args.only_item,
-        suspect_item_ids=suspect_ids,
-    )
+    try:
+        run_once(
+            dry_run=args.dry_run,
+            only_item=args.only_item,
+            suspect_item_ids=suspect_ids,
+            resume_run_id=args.resume,
+        )
+    except ValueError as e:
+        parser.error(str(e))
 
 
 if __name__ == "__main__":
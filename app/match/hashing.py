@@ -1,6 +1,7 @@
 """画像ハッシュ: SHA-256 と perceptual hash（複数アルゴリズム）。"""
 import hashlib
 import io
+from dataclasses import dataclass
 from typing import Optional, Tuple
 
 import PIL.Image
@@ -8,6 +9,9 @@ import PIL.Image
 # ハッシュ計算前に正規化するサイズ。異なる解像度でも同一と判定しやすくする。
 _NORMALIZE_SIZE = (256, 256)
 
+# pHash の一致判定の閾値（ハミング距離）。matcher.check_match と適応的ページングの閾値帯で共有する
+PHASH_THRESHOLD = 20
+
 
 def sha256_hex(data: bytes) -> str:
     """バイト列の SHA-256 を16進文字列で返す。"""
@@ -30,6 +34,51 @@ def _load_normalized(data: bytes) -> Optional[PIL.Image.Image]:
         return None
 
 
+@dataclass
+class ImageFingerprint:
+    """1画像分のハッシュ一式。デコードは1回だけ行い、各ハッシュで共有する。"""
+
+    sha256: str
+    phash: Optional[object]
+    ahash: Optional[object]
+    dhash: Optional[object]
+    image: Optional[PIL.Image.Image]  # デコード済みの原画像（keep_image=True のときだけ。検索用ペイロード生成で再利用）
+
+
+def fingerprint_image(data: bytes, keep_image: bool = False) -> ImageFingerprint:
+    """
+    SHA-256 と pHash / aHash / dHash をまとめて計算する。
+    phash_image 等を個別に呼ぶと毎回デコード・正規化するため、処理ループではこちらを使う。
+    keep_image=True ならデコード済みの原画像を image に残す（自分の画像だけ。候補画像は照合まで大量に
+    保持されるため残さない）。デコードに失敗した場合は perceptual hash と image を None にする。
+    """
+    sha = sha256_hex(data)
+    try:
+        img = PIL.Image.open(io.BytesIO(data))
+        img.load()
+        normalized = _normalize_image(img)
+    except Exception:
+        return ImageFingerprint(sha256=sha, phash=None, ahash=None, dhash=None, image=None)
+    try:
+        import imagehash
+    except Exception:
+        return ImageFingerprint(sha256=sha, phash=None, ahash=None, dhash=None, image=img if keep_image else None)
+
+    def _safe(fn):
+        try:
+            return fn(normalized)
+        except Exception:
+            return None
+
+    return ImageFingerprint(
+        sha256=sha,
+        phash=_safe(imagehash.phash),
+        ahash=_safe(imagehash.average_hash),
+        dhash=_safe(imagehash.dhash),
+        image=img if keep_image else None,
+    )
+
+
 def phash_image(data: bytes) -> Optional[object]:
     """
     画像の perceptual hash を返す。
@@ -78,7 +127,7 @@ def dhash_image(data: bytes) -> Optional[object]:
         return None
 
 
-def phash_similar(h1: object, h2: object, threshold: int = 20) -> bool:
+def phash_similar(h1: object, h2: object, threshold: int = PHASH_THRESHOLD) -> bool:
     """
     pHash の類似度。同一画像・リサイズ流用を検知。
     閾値は20に設定（誤検知を減らすため厳しく設定）。
@@ -130,7 +179,7 @@ def perceptual_match(
     their_ahash: object,
     our_dhash: object = None,
     their_dhash: object = None,
-    phash_threshold: int = 20,
+    phash_threshold: int = PHASH_THRESHOLD,
     ahash_threshold: int = 15,
     dhash_threshold: int = 22,
 ) -> Tuple[bool, str]:
@@ -25,7 +25,7 @@ def check_match(
     their_ahash: Any = None,
     our_dhash: Any = None,
     their_dhash: Any = None,
-    phash_threshold: int = 20,
+    phash_threshold: int = hashing.PHASH_THRESHOLD,
     ahash_threshold: int = 15,
     dhash_threshold: int = 22,
 ) -> MatchResult:
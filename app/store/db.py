@@ -1,8 +1,18 @@
 """SQLite テーブル作成と接続。"""
 import os
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+# 接続ごとに適用する PRAGMA。WAL で読み取り（Web UI）と書き込み（ジョブ）が互いにブロックしないようにする
+_MMAP_SIZE = 256 * 1024 * 1024
+_BUSY_TIMEOUT_MS = 10000
+
+_thread_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_initialized: set[str] = set()
+
 
 # デフォルトはプロジェクトルートの data/state.db
 def _default_db_path() -> str:
@@ -11,59 +21,470 @@ def _default_db_path() -> str:
     data_dir.mkdir(parents=True, exist_ok=True)
     return str(data_dir / "state.db")
 
-def get_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
-    path = db_path or os.getenv("STATE_DB_PATH") or _default_db_path()
+def resolve_db_path(db_path: Optional[str] = None) -> str:
+    """DB ファイルのパス。引数 → STATE_DB_PATH → data/state.db の順。"""
+    return db_path or os.getenv("STATE_DB_PATH") or _default_db_path()
+
+def _apply_pragmas(conn: sqlite3.Connection, read_only: bool = False) -> None:
+    conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+    if not read_only:
+        # auto_vacuum は DB 作成時（WAL 切り替えでヘッダが書かれる前）にしか効かない。
+        # 既存 DB は保守コマンド（python -m app.main --vacuum）で1回だけ VACUUM して INCREMENTAL に切り替える
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # journal_mode=WAL は DB ファイルに永続化される（読み取り専用接続からは変更できない）
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+
+def get_connection(db_path: Optional[str] = None, read_only: bool = False) -> sqlite3.Connection:
+    """
+    新しい接続を開く（WAL・synchronous=NORMAL・mmap・busy_timeout を適用）。
+    read_only=True の場合は読み取り専用（mode=ro）で開く。呼び出し側で close すること。
+    """
+    path = resolve_db_path(db_path)
     Path(path).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path)
+    if read_only:
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn, read_only=read_only)
     return conn
 
-def init_schema(conn: sqlite3.Connection) -> None:
-    conn.executescript("""
-        CREATE TABLE IF NOT EXISTS runs (
-            run_id TEXT PRIMARY KEY,
-            started_at TEXT NOT NULL,
-            finished_at TEXT,
-            scanned_listings_count INTEGER DEFAULT 0,
-            scanned_images_count INTEGER DEFAULT 0,
-            candidates_checked_count INTEGER DEFAULT 0,
-            detections_new_count INTEGER DEFAULT 0,
-            errors_count INTEGER DEFAULT 0,
-            notes TEXT
+def _ensure_schema(path: str) -> None:
+    """読み取り専用接続を開く前に、書き込み可能な接続でスキーマを最新にしておく（プロセス内で1回）。"""
+    if os.path.realpath(path) in _schema_initialized:
+        return
+    conn = get_connection(path)
+    try:
+        init_schema(conn)
+    finally:
+        conn.close()
+
+def get_thread_connection(db_path: Optional[str] = None, read_only: bool = False) -> sqlite3.Connection:
+    """
+    スレッドごとに1本の接続を再利用して返す（呼び出し側で close しない）。
+    sqlite3 の接続はスレッド間で共有できないため、スレッド・DB ファイル・読み書き種別ごとに保持する。
+    """
+    path = resolve_db_path(db_path)
+    conns: dict[tuple[str, bool], sqlite3.Connection] = getattr(_thread_local, "connections", None) or {}
+    _thread_local.connections = conns
+    key = (path, read_only)
+    conn = conns.get(key)
+    if conn is None:
+        if read_only:
+            _ensure_schema(path)
+        conn = get_connection(path, read_only=read_only)
+        conns[key] = conn
+    return conn
+
+def get_read_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """Web UI 用の読み取り専用接続（スレッドごとに再利用）。実行中のジョブの書き込みをブロックしない。"""
+    return get_thread_connection(db_path, read_only=True)
+
+def close_thread_connections() -> None:
+    """現在のスレッドが保持する接続をすべて閉じる。"""
+    conns: dict = getattr(_thread_local, "connections", None) or {}
+    for conn in conns.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    conns.clear()
+
+# --- スキーマ管理 ---
+# PRAGMA user_version をスキーマのバージョンとし、未適用のマイグレーションだけを順に1回ずつ適用する。
+# 適用済みかどうかはプロセス内で DB ファイルごとに記録し、2回目以降の init_schema は何もしない。
+# 新しいテーブル・インデックスは _MIGRATIONS の末尾に追加する（既存のマイグレーションは変更しない）。
+
+_SCHEMA_V1 = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        scanned_listings_count INTEGER DEFAULT 0,
+        scanned_images_count INTEGER DEFAULT 0,
+        candidates_checked_count INTEGER DEFAULT 0,
+        detections_new_count INTEGER DEFAULT 0,
+        errors_count INTEGER DEFAULT 0,
+        notes TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS listings_scan_state (
+        listing_item_id TEXT PRIMARY KEY,
+        last_scanned_at TEXT,
+        last_scanned_run_id TEXT,
+        last_scan_status TEXT,
+        FOREIGN KEY (last_scanned_run_id) REFERENCES runs(run_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS detections (
+        detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id TEXT NOT NULL,
+        detected_at TEXT NOT NULL,
+        your_item_id TEXT NOT NULL,
+        your_item_url TEXT NOT NULL,
+        your_image_index INTEGER NOT NULL,
+        your_image_url TEXT NOT NULL,
+        your_image_sha256 TEXT NOT NULL,
+        infringing_item_id TEXT NOT NULL,
+        infringing_item_url TEXT NOT NULL,
+        infringing_seller_display TEXT NOT NULL,
+        infringing_image_url TEXT NOT NULL,
+        infringing_image_sha256 TEXT NOT NULL,
+        match_evidence TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'NEW',
+        message_subject TEXT,
+        message_body TEXT,
+        UNIQUE(your_item_id, infringing_item_id),
+        FOREIGN KEY (run_id) REFERENCES runs(run_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS image_search_depth (
+        run_id TEXT NOT NULL,
+        listing_item_id TEXT NOT NULL,
+        image_index INTEGER NOT NULL,
+        marketplace_id TEXT NOT NULL,
+        depth INTEGER NOT NULL,
+        pages INTEGER NOT NULL,
+        stop_reason TEXT NOT NULL,
+        PRIMARY KEY (run_id, listing_item_id, image_index, marketplace_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS my_listings (
+        item_id TEXT PRIMARY KEY,
+        seller_username TEXT NOT NULL,
+        title TEXT,
+        item_web_url TEXT NOT NULL,
+        image_urls TEXT NOT NULL DEFAULT '[]',
+        status TEXT NOT NULL DEFAULT 'active',
+        first_seen_at TEXT NOT NULL,
+        last_seen_at TEXT NOT NULL,
+        ended_at TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS catalog_sync_state (
+        seller_username TEXT PRIMARY KEY,
+        last_delta_sync_at TEXT,
+        last_full_sync_at TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS run_daily_rollups (
+        day TEXT PRIMARY KEY,
+        runs_count INTEGER NOT NULL DEFAULT 0,
+        scanned_listings_count INTEGER NOT NULL DEFAULT 0,
+        scanned_images_count INTEGER NOT NULL DEFAULT 0,
+        candidates_checked_count INTEGER NOT NULL DEFAULT 0,
+        detections_new_count INTEGER NOT NULL DEFAULT 0,
+        errors_count INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS detections_archive (
+        detection_id INTEGER PRIMARY KEY,
+        your_item_id TEXT NOT NULL,
+        infringing_item_id TEXT NOT NULL,
+        detected_at TEXT NOT NULL,
+        status TEXT NOT NULL,
+        archived_at TEXT NOT NULL,
+        payload BLOB NOT NULL,
+        UNIQUE(your_item_id, infringing_item_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS maintenance_state (
+        task TEXT PRIMARY KEY,
+        last_run_at TEXT NOT NULL
+    );
+
+    -- ダッシュボード用の集計（1行のみ）。トリガーで runs / detections の増減に追従する。
+    -- 総数には保持期間の整理で日次集計・アーカイブ済みの分も含む
+    CREATE TABLE IF NOT EXISTS dashboard_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_runs INTEGER NOT NULL DEFAULT 0,
+        total_detections INTEGER NOT NULL DEFAULT 0,
+        new_detections INTEGER NOT NULL DEFAULT 0,
+        sent_detections INTEGER NOT NULL DEFAULT 0,
+        last_run_id TEXT,
+        last_run_started_at TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_my_listings_seller_status ON my_listings(seller_username, status);
+    CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+    CREATE INDEX IF NOT EXISTS idx_runs_finished_at ON runs(finished_at);
+    CREATE INDEX IF NOT EXISTS idx_detections_detected_at ON detections(detected_at);
+    CREATE INDEX IF NOT EXISTS idx_detections_seller ON detections(infringing_seller_display, detected_at);
+    CREATE INDEX IF NOT EXISTS idx_listings_scan_state_run_id ON listings_scan_state(last_scanned_run_id);
+    CREATE INDEX IF NOT EXISTS idx_my_listings_status_ended ON my_listings(status, ended_at);
+    CREATE INDEX IF NOT EXISTS idx_detections_run_id ON detections(run_id);
+    CREATE INDEX IF NOT EXISTS idx_detections_status ON detections(status);
+    CREATE INDEX IF NOT EXISTS idx_listings_scan_state_last_scanned ON listings_scan_state(last_scanned_at);
+"""
+
+
+# dashboard_stats の1行を実データから集計する INSERT（初期化と repo_stats.rebuild_dashboard_stats で共用）
+DASHBOARD_STATS_INSERT_SQL = """
+    INSERT INTO dashboard_stats (
+        id, total_runs, total_detections, new_detections, sent_detections,
+        last_run_id, last_run_started_at
+    )
+    SELECT 1,
+        (SELECT COUNT(*) FROM runs) + (SELECT COALESCE(SUM(runs_count), 0) FROM run_daily_rollups),
+        (SELECT COUNT(*) FROM detections) + (SELECT COUNT(*) FROM detections_archive),
+        (SELECT COUNT(*) FROM detections WHERE status = 'NEW')
+            + (SELECT COUNT(*) FROM detections_archive WHERE status = 'NEW'),
+        (SELECT COUNT(*) FROM detections WHERE status = 'SENT')
+            + (SELECT COUNT(*) FROM detections_archive WHERE status = 'SENT'),
+        (SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1),
+        (SELECT started_at FROM runs ORDER BY started_at DESC LIMIT 1)
+"""
+
+
+_DASHBOARD_STATS_TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_runs_insert AFTER INSERT ON runs BEGIN
+        UPDATE dashboard_stats SET
+            total_runs = total_runs + 1,
+            last_run_id = CASE WHEN last_run_started_at IS NULL OR NEW.started_at >= last_run_started_at
+                               THEN NEW.run_id ELSE last_run_id END,
+            last_run_started_at = CASE WHEN last_run_started_at IS NULL OR NEW.started_at >= last_run_started_at
+                                       THEN NEW.started_at ELSE last_run_started_at END
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_runs_delete AFTER DELETE ON runs BEGIN
+        UPDATE dashboard_stats SET total_runs = total_runs - 1 WHERE id = 1;
+        UPDATE dashboard_stats SET
+            last_run_id = (SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1),
+            last_run_started_at = (SELECT started_at FROM runs ORDER BY started_at DESC LIMIT 1)
+        WHERE id = 1 AND last_run_id = OLD.run_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rollups_insert AFTER INSERT ON run_daily_rollups BEGIN
+        UPDATE dashboard_stats SET total_runs = total_runs + NEW.runs_count WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_rollups_update AFTER UPDATE OF runs_count ON run_daily_rollups BEGIN
+        UPDATE dashboard_stats SET total_runs = total_runs + NEW.runs_count - OLD.runs_count WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_detections_insert AFTER INSERT ON detections BEGIN
+        UPDATE dashboard_stats SET
+            total_detections = total_detections + 1,
+            new_detections = new_detections + (NEW.status = 'NEW'),
+            sent_detections = sent_detections + (NEW.status = 'SENT')
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_detections_delete AFTER DELETE ON detections BEGIN
+        UPDATE dashboard_stats SET
+            total_detections = total_detections - 1,
+            new_detections = new_detections - (OLD.status = 'NEW'),
+            sent_detections = sent_detections - (OLD.status = 'SENT')
+        WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_stats_detections_status AFTER UPDATE OF status ON detections BEGIN
+        UPDATE dashboard_stats SET
+            new_detections = new_detections - (OLD.status = 'NEW') + (NEW.status = 'NEW'),
+            sent_detections = sent_detections - (OLD.status = 'SENT') + (NEW.status = 'SENT')
+        WHERE id = 1;
+    END;
+
+    -- アーカイブへの移動は detections の削除と相殺する（総数・状態別の数は変わらない）
+    CREATE TRIGGER IF NOT EXISTS trg_stats_archive_insert AFTER INSERT ON detections_archive BEGIN
+        UPDATE dashboard_stats SET
+            total_detections = total_detections + 1,
+            new_detections = new_detections + (NEW.status = 'NEW'),
+            sent_detections = sent_detections + (NEW.status = 'SENT')
+        WHERE id = 1;
+    END;
+"""
+
+
+def _migration_v1(conn: sqlite3.Connection) -> None:
+    """基本スキーマ（user_version 導入前の DB にもそのまま適用できるよう IF NOT EXISTS で作成）。"""
+    _execute_script(conn, _SCHEMA_V1)
+    if conn.execute("SELECT 1 FROM dashboard_stats WHERE id = 1").fetchone() is None:
+        conn.execute(DASHBOARD_STATS_INSERT_SQL)
+    _execute_script(conn, _DASHBOARD_STATS_TRIGGERS)
+
+
+def _migration_v2(conn: sqlite3.Connection) -> None:
+    """run の進捗チェックポイント（選定した出品の完了状況・出品内の完了画像）。--resume で続きから再開する。"""
+    _execute_script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS run_checkpoints (
+            run_id TEXT NOT NULL,
+            listing_item_id TEXT NOT NULL,
+            ord INTEGER NOT NULL,
+            status TEXT,
+            scanned INTEGER NOT NULL DEFAULT 0,
+            images_scanned INTEGER NOT NULL DEFAULT 0,
+            candidates_checked INTEGER NOT NULL DEFAULT 0,
+            detections_new INTEGER NOT NULL DEFAULT 0,
+            errors_count INTEGER NOT NULL DEFAULT 0,
+            done_at TEXT,
+            PRIMARY KEY (run_id, listing_item_id)
         );
 
-        CREATE TABLE IF NOT EXISTS listings_scan_state (
-            listing_item_id TEXT PRIMARY KEY,
-            last_scanned_at TEXT,
-            last_scanned_run_id TEXT,
-            last_scan_status TEXT,
-            FOREIGN KEY (last_scanned_run_id) REFERENCES runs(run_id)
+        CREATE TABLE IF NOT EXISTS run_image_checkpoints (
+            run_id TEXT NOT NULL,
+            listing_item_id TEXT NOT NULL,
+            image_index INTEGER NOT NULL,
+            images_scanned INTEGER NOT NULL DEFAULT 0,
+            candidates_checked INTEGER NOT NULL DEFAULT 0,
+            detections_new INTEGER NOT NULL DEFAULT 0,
+            errors_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, listing_item_id, image_index)
         );
+        """,
+    )
 
-        CREATE TABLE IF NOT EXISTS detections (
-            detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+def _migration_v3(conn: sqlite3.Connection) -> None:
+    """run ごとの Browse API 呼び出し回数（run 予算の見積もりに使う）。"""
+    conn.execute("ALTER TABLE runs ADD COLUMN api_calls_count INTEGER DEFAULT 0")
+
+
+def _migration_v4(conn: sqlite3.Connection) -> None:
+    """
+    複数プロセスで1つの run を分担する作業キュー。未完了の出品だけを持ち、完了（チェックポイント）で削除する。
+    worker_id / lease_expires_at（UNIX 秒）はリース中のワーカーと期限。期限切れの出品は他のワーカーが取り直す。
+    """
+    _execute_script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS work_queue (
             run_id TEXT NOT NULL,
-            detected_at TEXT NOT NULL,
-            your_item_id TEXT NOT NULL,
-            your_item_url TEXT NOT NULL,
-            your_image_index INTEGER NOT NULL,
-            your_image_url TEXT NOT NULL,
-            your_image_sha256 TEXT NOT NULL,
-            infringing_item_id TEXT NOT NULL,
-            infringing_item_url TEXT NOT NULL,
-            infringing_seller_display TEXT NOT NULL,
-            infringing_image_url TEXT NOT NULL,
-            infringing_image_sha256 TEXT NOT NULL,
-            match_evidence TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'NEW',
-            message_subject TEXT,
-            message_body TEXT,
-            UNIQUE(your_item_id, infringing_item_id),
-            FOREIGN KEY (run_id) REFERENCES runs(run_id)
+            listing_item_id TEXT NOT NULL,
+            ord INTEGER NOT NULL,
+            worker_id TEXT,
+            lease_expires_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, listing_item_id)
         );
 
-        CREATE INDEX IF NOT EXISTS idx_detections_run_id ON detections(run_id);
-        CREATE INDEX IF NOT EXISTS idx_detections_status ON detections(status);
-        CREATE INDEX IF NOT EXISTS idx_listings_scan_state_last_scanned ON listings_scan_state(last_scanned_at);
-    """)
+        CREATE INDEX IF NOT EXISTS idx_work_queue_ord ON work_queue(run_id, ord);
+        CREATE INDEX IF NOT EXISTS idx_work_queue_worker ON work_queue(run_id, worker_id);
+        """,
+    )
+
+
+def _migration_v5(conn: sqlite3.Connection) -> None:
+    """検知の再確認（侵害出品がまだ掲載中か）の最終確認日時。確認の古い順に読むための索引。"""
+    conn.execute("ALTER TABLE detections ADD COLUMN verified_at TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_detections_verify ON detections(status, verified_at)")
+
+
+def _migration_v6(conn: sqlite3.Connection) -> None:
+    """
+    run ごとのステージ別の所要時間（件数・合計・p50・p95・最大。秒）と、出品ごとの内訳（timing.per_listing 有効時）。
+    """
+    _execute_script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS run_stage_timings (
+            run_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_sec REAL NOT NULL DEFAULT 0,
+            p50_sec REAL NOT NULL DEFAULT 0,
+            p95_sec REAL NOT NULL DEFAULT 0,
+            max_sec REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, stage)
+        );
+
+        CREATE TABLE IF NOT EXISTS run_listing_timings (
+            run_id TEXT NOT NULL,
+            listing_item_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_sec REAL NOT NULL DEFAULT 0,
+            max_sec REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_id, listing_item_id, stage)
+        );
+        """,
+    )
+
+
+def _migration_v7(conn: sqlite3.Connection) -> None:
+    """再確認で REMOVED にした検知の元のステータス（SENT などの対応履歴を失わないため）。"""
+    conn.execute("ALTER TABLE detections ADD COLUMN previous_status TEXT")
+
+
+_MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _migration_v1,
+    _migration_v2,
+    _migration_v3,
+    _migration_v4,
+    _migration_v5,
+    _migration_v6,
+    _migration_v7,
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    """
+    複数の SQL 文を現在のトランザクション内で実行する。
+    executescript は実行前に COMMIT してしまうため、文ごとに分割して execute する。
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    未適用のマイグレーションを順に適用し、適用後のバージョンを返す。
+    各マイグレーションは user_version の更新と同じトランザクションで実行する（途中で失敗しても半端に残らない）。
+    複数プロセスが同時に起動しても、BEGIN IMMEDIATE の中でバージョンを読み直すので二重に適用しない。
+    """
     conn.commit()
+    version = get_schema_version(conn)
+    while version < SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.rollback()
+                break
+            _MIGRATIONS[version](conn)
+            version += 1
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+
+def _database_file(conn: sqlite3.Connection) -> str:
+    """接続の main DB のファイルパス（メモリ DB は空文字）。"""
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main":
+            return os.path.realpath(row[2]) if row[2] else ""
+    return ""
+
+
+def init_schema(conn: sqlite3.Connection) -> None:
+    """スキーマを最新にする。プロセス内で DB ファイルごとに1回だけ migrate し、以降は何もしない。"""
+    path = _database_file(conn)
+    if path and path in _schema_initialized:
+        return
+    with _schema_lock:
+        if path and path in _schema_initialized:
+            return
+        migrate(conn)
+        if path:
+            _schema_initialized.add(path)
@@ -0,0 +1,72 @@
+"""
+登録済み検知キー（your_item_id, infringing_item_id）のメモリ上の集合。
+
+run 開始時に DB から1回だけ読み込み、以降の重複チェックは SQLite に問い合わせない。
+件数が多い場合は文字列キーの代わりに 64bit 指紋（blake2b）で保持してメモリを抑える
+（誤判定率はおよそ 件数 / 2^64 で、実用上は無視できる）。
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Iterable, Union
+
+# この件数を超えたら 64bit 指紋の集合に切り替える
+DEFAULT_COMPACT_THRESHOLD = 100_000
+
+_SEP = "\x1f"
+
+
+def _fingerprint(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DetectionKeySet:
+    """スレッドセーフな検知キー集合。"""
+
+    def __init__(self, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD) -> None:
+        self._compact_threshold = compact_threshold
+        self._keys: set[Union[str, int]] = set()
+        self._compact = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pairs(
+        cls,
+        pairs: Iterable[tuple[str, str]],
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+    ) -> DetectionKeySet:
+        keys = cls(compact_threshold)
+        for your_item_id, infringing_item_id in pairs:
+            keys._add(your_item_id, infringing_item_id)
+        return keys
+
+    @property
+    def compact(self) -> bool:
+        """64bit 指紋で保持しているか。"""
+        return self._compact
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, pair: tuple[str, str]) -> bool:
+        return self._key(*pair) in self._keys
+
+    def add(self, your_item_id: str, infringing_item_id: str) -> bool:
+        """キーを追加。既に存在すれば False。"""
+        with self._lock:
+            return self._add(your_item_id, infringing_item_id)
+
+    def _key(self, your_item_id: str, infringing_item_id: str) -> Union[str, int]:
+        key = f"{your_item_id}{_SEP}{infringing_item_id}"
+        return _fingerprint(key) if self._compact else key
+
+    def _add(self, your_item_id: str, infringing_item_id: str) -> bool:
+        key = self._key(your_item_id, infringing_item_id)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        if not self._compact and len(self._keys) > self._compact_threshold:
+            self._keys = {_fingerprint(k) for k in self._keys}
+            self._compact = True
+        return True
@@ -1,7 +1,7 @@
 """ストア用データモデル。"""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 
@@ -16,6 +16,7 @@ class RunRow:
     detections_new_count: int
     errors_count: int
     notes: Optional[str]
+    api_calls_count: int = 0
 
 
 @dataclass
@@ -26,6 +27,16 @@ class ListingScanStateRow:
     last_scan_status: Optional[str]  # success / partial / fail
 
 
+@dataclass
+class ListingRiskRow:
+    """出品の優先度の算出に使う DB 上の情報。"""
+
+    listing_item_id: str
+    last_scanned_at: Optional[str]
+    detections_count: int  # この出品の過去の検知数（アーカイブ済みを含む）
+    first_seen_at: Optional[str]  # カタログに初めて載った日時（カタログ未使用なら None）
+
+
 @dataclass
 class DetectionRow:
     detection_id: int
@@ -45,3 +56,66 @@ class DetectionRow:
     status: str
     message_subject: Optional[str]
     message_body: Optional[str]
+    previous_status: Optional[str] = None  # 再確認で REMOVED にする前のステータス
+
+
+@dataclass
+class MyListingRow:
+    item_id: str
+    seller_username: str
+    title: Optional[str]
+    item_web_url: str
+    image_urls: list[str] = field(default_factory=list)
+    status: str = "active"  # active / ended
+    first_seen_at: Optional[str] = None
+    last_seen_at: Optional[str] = None
+    ended_at: Optional[str] = None
+
+
+@dataclass
+class CatalogSyncStateRow:
+    seller_username: str
+    last_delta_sync_at: Optional[str]  # 差分同期のウォーターマーク（この時刻までの変更は反映済み）
+    last_full_sync_at: Optional[str]
+
+
+@dataclass
+class DashboardStatsRow:
+    total_runs: int  # 日次集計済みの run を含む
+    total_detections: int  # アーカイブ済みの検知を含む
+    new_detections: int
+    sent_detections: int
+    last_run_id: Optional[str]
+    last_run_started_at: Optional[str]
+
+
+@dataclass
+class StageTimingRow:
+    """run（または出品）のステージ1つ分の所要時間（秒）。出品ごとの内訳では p50 / p95 は 0。"""
+
+    stage: str
+    count: int
+    total_sec: float
+    p50_sec: float
+    p95_sec: float
+    max_sec: float
+
+
+@dataclass(frozen=True)
+class DetectionFilter:
+    """検知一覧の絞り込み条件（未指定の項目は絞り込まない）。"""
+
+    status: Optional[str] = None
+    seller: Optional[str] = None  # infringing_seller_display の完全一致
+    your_item_id: Optional[str] = None
+    detected_from: Optional[str] = None  # ISO8601。この時刻以降
+    detected_to: Optional[str] = None  # ISO8601。この時刻より前
+
+
+@dataclass
+class DetectionPage:
+    """キーセットページングの1ページ。rows は columns の順のタプル。"""
+
+    columns: list[str]
+    rows: list[tuple]
+    next_cursor: Optional[tuple[str, int]]  # 次ページの開始位置（detected_at, detection_id）。最終ページは None
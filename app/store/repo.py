@@ -1,21 +1,83 @@
 """
 ストアリポジトリの集約エントリポイント。
-runs / listings_scan_state / detections の CRUD を一元提供。
+runs / run_checkpoints / work_queue / run_stage_timings / listings_scan_state / detections / image_search_depth / my_listings の CRUD・ダッシュボード集計・保持期間の整理を一元提供。
 """
 from __future__ import annotations
 
-from app.store.repo_runs import create_run, delete_run, get_run, get_last_run_finished_at, update_run
+from app.store.repo_runs import (
+    add_run_api_calls,
+    claim_run_finish,
+    create_run,
+    delete_run,
+    get_last_run_finished_at,
+    get_recent_run_costs,
+    get_run,
+    list_resumable_runs,
+    reopen_run,
+    update_run,
+)
+from app.store.repo_checkpoints import (
+    clear_run_checkpoints,
+    get_checkpoint_totals,
+    get_image_checkpoints,
+    get_pending_checkpoint_listings,
+    mark_listing_checkpoint,
+    record_image_checkpoint,
+    save_run_selection,
+    sync_run_counters,
+)
+from app.store.repo_work_queue import (
+    count_remaining_work,
+    enqueue_shared_run,
+    find_active_shared_run,
+    lease_work,
+    release_leases,
+    renew_leases,
+)
+from app.store.repo_timings import (
+    get_run_stage_timings,
+    get_slowest_listings,
+    list_timed_run_ids,
+    record_listing_timings,
+    save_run_stage_timings,
+)
 from app.store.repo_listings import (
+    get_listing_risk_rows,
     get_listings_scan_state_for_selection,
     upsert_listing_scan_state,
 )
+from app.store.repo_image_search import record_image_search_depth
+from app.store.repo_stats import get_dashboard_stats, rebuild_dashboard_stats
+from app.store.repo_retention import (
+    archive_resolved_detections,
+    get_archived_detection,
+    get_maintenance_last_run,
+    incremental_vacuum,
+    prune_ended_listings,
+    rollup_runs_before,
+    set_maintenance_last_run,
+)
+from app.store.repo_catalog import (
+    get_active_catalog_listings,
+    get_catalog_sync_state,
+    mark_catalog_listings_ended,
+    mark_catalog_listings_ended_not_seen_since,
+    update_catalog_sync_state,
+    upsert_catalog_listings,
+)
 from app.store.repo_detections import (
+    count_detections_by_seller,
     delete_detection,
     detection_exists,
     get_detection,
+    get_detection_messages,
     get_detections_by_run,
     get_detections_not_synced_to_sheet,
+    get_detections_to_verify,
     insert_detection,
+    iter_detection_keys,
+    mark_detections_verified,
+    query_detections_page,
     update_detection_status,
 )
 
@@ -26,12 +88,59 @@ __all__ = [
     "update_run",
     "get_run",
     "get_last_run_finished_at",
+    "get_recent_run_costs",
+    "list_resumable_runs",
+    "reopen_run",
+    "claim_run_finish",
+    "add_run_api_calls",
+    "clear_run_checkpoints",
+    "get_checkpoint_totals",
+    "get_image_checkpoints",
+    "get_pending_checkpoint_listings",
+    "mark_listing_checkpoint",
+    "record_image_checkpoint",
+    "save_run_selection",
+    "sync_run_counters",
+    "count_remaining_work",
+    "enqueue_shared_run",
+    "find_active_shared_run",
+    "lease_work",
+    "release_leases",
+    "renew_leases",
+    "get_run_stage_timings",
+    "get_slowest_listings",
+    "list_timed_run_ids",
+    "record_listing_timings",
+    "save_run_stage_timings",
+    "get_listing_risk_rows",
     "get_listings_scan_state_for_selection",
+    "record_image_search_depth",
+    "get_dashboard_stats",
+    "rebuild_dashboard_stats",
+    "archive_resolved_detections",
+    "get_archived_detection",
+    "get_maintenance_last_run",
+    "incremental_vacuum",
+    "prune_ended_listings",
+    "rollup_runs_before",
+    "set_maintenance_last_run",
+    "get_active_catalog_listings",
+    "get_catalog_sync_state",
+    "mark_catalog_listings_ended",
+    "mark_catalog_listings_ended_not_seen_since",
+    "update_catalog_sync_state",
+    "upsert_catalog_listings",
     "upsert_listing_scan_state",
+    "count_detections_by_seller",
     "detection_exists",
     "get_detection",
+    "get_detection_messages",
     "insert_detection",
+    "iter_detection_keys",
+    "query_detections_page",
     "get_detections_by_run",
     "get_detections_not_synced_to_sheet",
+    "get_detections_to_verify",
+    "mark_detections_verified",
     "update_detection_status",
 ]
@@ -0,0 +1,146 @@
+"""my_listings（自分の出品カタログ）/ catalog_sync_state テーブルの CRUD。"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import Optional
+
+from app.store.models import CatalogSyncStateRow, MyListingRow
+
+
+def _row_to_listing(row: sqlite3.Row) -> MyListingRow:
+    try:
+        image_urls = json.loads(row["image_urls"] or "[]")
+    except ValueError:
+        image_urls = []
+    return MyListingRow(
+        item_id=row["item_id"],
+        seller_username=row["seller_username"],
+        title=row["title"],
+        item_web_url=row["item_web_url"],
+        image_urls=image_urls,
+        status=row["status"],
+        first_seen_at=row["first_seen_at"],
+        last_seen_at=row["last_seen_at"],
+        ended_at=row["ended_at"],
+    )
+
+
+def upsert_catalog_listings(
+    conn: sqlite3.Connection,
+    listings: list[MyListingRow],
+    seen_at: Optional[str] = None,
+) -> None:
+    """出品をカタログに登録または更新（status=active, last_seen_at=seen_at）。1トランザクションで反映。"""
+    if not listings:
+        return
+    now = seen_at or datetime.utcnow().isoformat() + "Z"
+    conn.executemany(
+        """
+        INSERT INTO my_listings (
+            item_id, seller_username, title, item_web_url, image_urls, status,
+            first_seen_at, last_seen_at, ended_at
+        ) VALUES (?, ?, ?, ?, ?, 'active', ?, ?, NULL)
+        ON CONFLICT(item_id) DO UPDATE SET
+            seller_username = excluded.seller_username,
+            title = excluded.title,
+            item_web_url = excluded.item_web_url,
+            image_urls = excluded.image_urls,
+            status = 'active',
+            last_seen_at = excluded.last_seen_at,
+            ended_at = NULL
+        """,
+        [
+            (
+                l.item_id, l.seller_username, l.title, l.item_web_url,
+                json.dumps(l.image_urls), now, now,
+            )
+            for l in listings
+        ],
+    )
+    conn.commit()
+
+
+def mark_catalog_listings_ended(
+    conn: sqlite3.Connection, item_ids: list[str], ended_at: Optional[str] = None
+) -> int:
+    """指定出品を終了済みにする。更新件数を返す。"""
+    if not item_ids:
+        return 0
+    now = ended_at or datetime.utcnow().isoformat() + "Z"
+    cursor = conn.executemany(
+        "UPDATE my_listings SET status = 'ended', ended_at = ? "
+        "WHERE item_id = ? AND status = 'active'",
+        [(now, iid) for iid in item_ids],
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def mark_catalog_listings_ended_not_seen_since(
+    conn: sqlite3.Connection, seller_username: str, seen_at: str
+) -> int:
+    """
+    完全同期（reconciliation）用。seen_at 以降に確認されなかった出品中の出品を終了済みにする。
+    更新件数を返す。
+    """
+    cursor = conn.execute(
+        "UPDATE my_listings SET status = 'ended', ended_at = ? "
+        "WHERE seller_username = ? AND status = 'active' AND last_seen_at < ?",
+        (seen_at, seller_username, seen_at),
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def get_active_catalog_listings(
+    conn: sqlite3.Connection, seller_username: str, limit: Optional[int] = None
+) -> list[MyListingRow]:
+    """出品中のカタログを新しい順（初回確認日時 → item_id の降順）で取得。"""
+    sql = (
+        "SELECT * FROM my_listings WHERE seller_username = ? AND status = 'active' "
+        "ORDER BY first_seen_at DESC, item_id DESC"
+    )
+    args: list = [seller_username]
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(limit)
+    return [_row_to_listing(r) for r in conn.execute(sql, args).fetchall()]
+
+
+def get_catalog_sync_state(
+    conn: sqlite3.Connection, seller_username: str
+) -> Optional[CatalogSyncStateRow]:
+    """セラーのカタログ同期状態を取得。未同期なら None。"""
+    row = conn.execute(
+        "SELECT * FROM catalog_sync_state WHERE seller_username = ?", (seller_username,)
+    ).fetchone()
+    if not row:
+        return None
+    return CatalogSyncStateRow(
+        seller_username=row["seller_username"],
+        last_delta_sync_at=row["last_delta_sync_at"],
+        last_full_sync_at=row["last_full_sync_at"],
+    )
+
+
+def update_catalog_sync_state(
+    conn: sqlite3.Connection,
+    seller_username: str,
+    *,
+    last_delta_sync_at: Optional[str] = None,
+    last_full_sync_at: Optional[str] = None,
+) -> None:
+    """カタログ同期状態を登録または更新（None の項目は変更しない）。"""
+    conn.execute(
+        """
+        INSERT INTO catalog_sync_state (seller_username, last_delta_sync_at, last_full_sync_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(seller_username) DO UPDATE SET
+            last_delta_sync_at = COALESCE(excluded.last_delta_sync_at, last_delta_sync_at),
+            last_full_sync_at = COALESCE(excluded.last_full_sync_at, last_full_sync_at)
+        """,
+        (seller_username, last_delta_sync_at, last_full_sync_at),
+    )
+    conn.commit()
@@ -0,0 +1,173 @@
+"""
+run_checkpoints / run_image_checkpoints テーブルの CRUD（run の進捗チェックポイント）。
+run_checkpoints.status が NULL の出品が未完了。完了時は scan status（success / partial / fail）または skipped。
+複数プロセスで分担する run では、完了した出品を作業キュー（work_queue）からも同じトランザクションで削除する。
+"""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from typing import Iterable
+
+
+def save_run_selection(conn: sqlite3.Connection, run_id: str, listing_item_ids: Iterable[str]) -> None:
+    """run で処理する出品を選定順に登録する（すべて未完了）。"""
+    conn.executemany(
+        "INSERT OR IGNORE INTO run_checkpoints (run_id, listing_item_id, ord) VALUES (?, ?, ?)",
+        [(run_id, lid, i) for i, lid in enumerate(listing_item_ids)],
+    )
+    conn.commit()
+
+
+def mark_listing_checkpoint(
+    conn: sqlite3.Connection,
+    run_id: str,
+    listing_item_id: str,
+    status: str,
+    scanned: int = 0,
+    images_scanned: int = 0,
+    candidates_checked: int = 0,
+    detections_new: int = 0,
+    errors_count: int = 0,
+    *,
+    commit: bool = True,
+) -> None:
+    """出品の完了と結果を記録し、出品内の画像チェックポイントと作業キューの行を削除する。"""
+    conn.execute(
+        """
+        UPDATE run_checkpoints SET
+            status = ?, scanned = ?, images_scanned = ?, candidates_checked = ?,
+            detections_new = ?, errors_count = ?, done_at = ?
+        WHERE run_id = ? AND listing_item_id = ?
+        """,
+        (
+            status, scanned, images_scanned, candidates_checked, detections_new, errors_count,
+            datetime.utcnow().isoformat() + "Z", run_id, listing_item_id,
+        ),
+    )
+    for table in ("run_image_checkpoints", "work_queue"):
+        conn.execute(
+            f"DELETE FROM {table} WHERE run_id = ? AND listing_item_id = ?", (run_id, listing_item_id)
+        )
+    if commit:
+        conn.commit()
+
+
+def record_image_checkpoint(
+    conn: sqlite3.Connection,
+    run_id: str,
+    listing_item_id: str,
+    image_index: int,
+    images_scanned: int,
+    candidates_checked: int,
+    detections_new: int,
+    errors_count: int,
+    *,
+    commit: bool = True,
+) -> None:
+    """出品内の画像1枚の完了と結果を記録。"""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO run_image_checkpoints (
+            run_id, listing_item_id, image_index,
+            images_scanned, candidates_checked, detections_new, errors_count
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (run_id, listing_item_id, image_index, images_scanned, candidates_checked, detections_new, errors_count),
+    )
+    if commit:
+        conn.commit()
+
+
+def get_pending_checkpoint_listings(conn: sqlite3.Connection, run_id: str) -> list[str]:
+    """未完了の出品 ID を選定順に返す。"""
+    rows = conn.execute(
+        "SELECT listing_item_id FROM run_checkpoints WHERE run_id = ? AND status IS NULL ORDER BY ord",
+        (run_id,),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_image_checkpoints(
+    conn: sqlite3.Connection, run_id: str
+) -> dict[str, dict[int, tuple[int, int, int, int]]]:
+    """
+    未完了の出品で完了済みの画像。出品 ID → 画像番号 →
+    (images_scanned, candidates_checked, detections_new, errors_count)。
+    """
+    result: dict[str, dict[int, tuple[int, int, int, int]]] = {}
+    for row in conn.execute(
+        """
+        SELECT i.* FROM run_image_checkpoints AS i
+        JOIN run_checkpoints AS c USING (run_id, listing_item_id)
+        WHERE i.run_id = ? AND c.status IS NULL
+        """,
+        (run_id,),
+    ).fetchall():
+        result.setdefault(row["listing_item_id"], {})[row["image_index"]] = (
+            row["images_scanned"], row["candidates_checked"], row["detections_new"], row["errors_count"],
+        )
+    return result
+
+
+def get_checkpoint_totals(conn: sqlite3.Connection, run_id: str) -> dict[str, int]:
+    """
+    完了済み出品の集計（update_run に渡すカウンタ）と選定件数 total。
+    run のカウンタは出品の完了と同じトランザクションで更新するため、この集計と一致する。
+    """
+    row = conn.execute(
+        """
+        SELECT COUNT(*) AS total,
+               COALESCE(SUM(scanned), 0) AS scanned,
+               COALESCE(SUM(images_scanned), 0) AS images_scanned,
+               COALESCE(SUM(candidates_checked), 0) AS candidates_checked,
+               COALESCE(SUM(detections_new), 0) AS detections_new,
+               COALESCE(SUM(errors_count), 0) AS errors_count
+        FROM run_checkpoints WHERE run_id = ?
+        """,
+        (run_id,),
+    ).fetchone()
+    return {
+        "total": row["total"],
+        "scanned_listings_count": row["scanned"],
+        "scanned_images_count": row["images_scanned"],
+        "candidates_checked_count": row["candidates_checked"],
+        "detections_new_count": row["detections_new"],
+        "errors_count": row["errors_count"],
+    }
+
+
+def sync_run_counters(conn: sqlite3.Connection, run_id: str, *, commit: bool = True) -> None:
+    """
+    run のカウンタをチェックポイントの集計で更新する。複数プロセスで分担する run では
+    各ワーカーは自分の分しか知らないため、完了した出品の合計を run に反映する。
+    """
+    conn.execute(
+        """
+        UPDATE runs SET
+            scanned_listings_count = t.scanned,
+            scanned_images_count = t.images_scanned,
+            candidates_checked_count = t.candidates_checked,
+            detections_new_count = t.detections_new,
+            errors_count = t.errors_count
+        FROM (
+            SELECT COALESCE(SUM(scanned), 0) AS scanned,
+                   COALESCE(SUM(images_scanned), 0) AS images_scanned,
+                   COALESCE(SUM(candidates_checked), 0) AS candidates_checked,
+                   COALESCE(SUM(detections_new), 0) AS detections_new,
+                   COALESCE(SUM(errors_count), 0) AS errors_count
+            FROM run_checkpoints WHERE run_id = ?
+        ) AS t
+        WHERE runs.run_id = ?
+        """,
+        (run_id, run_id),
+    )
+    if commit:
+        conn.commit()
+
+
+def clear_run_checkpoints(conn: sqlite3.Connection, run_id: str) -> None:
+    """run のチェックポイントと作業キューを削除する（全件完了した run・削除する run）。"""
+    for table in ("run_checkpoints", "run_image_checkpoints", "work_queue"):
+        conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+    conn.commit()
@@ -3,9 +3,23 @@ from __future__ import annotations
 
 import sqlite3
 from datetime import datetime
-from typing import Optional
+from typing import Any, Iterator, Optional, Sequence
 
-from app.store.models import DetectionRow
+from app.store.models import DetectionFilter, DetectionPage, DetectionRow
+
+# 一覧表示用の列（メッセージ本文は含めず、選択した行だけ get_detection_messages で読み込む）
+DETECTION_LIST_COLUMNS = (
+    "detection_id",
+    "detected_at",
+    "your_item_id",
+    "your_item_url",
+    "infringing_seller_display",
+    "infringing_item_id",
+    "infringing_item_url",
+    "match_evidence",
+    "status",
+)
+_MESSAGE_COLUMNS = ("message_subject", "message_body")
 
 
 def _row_to_detection(row: sqlite3.Row) -> DetectionRow:
@@ -27,20 +41,37 @@ def _row_to_detection(row: sqlite3.Row) -> DetectionRow:
         status=row["status"],
         message_subject=row["message_subject"],
         message_body=row["message_body"],
+        previous_status=row["previous_status"],
     )
 
 
 def detection_exists(
     conn: sqlite3.Connection, your_item_id: str, infringing_item_id: str
 ) -> bool:
-    """検知が既に登録されているか。"""
+    """検知が既に登録されているか（アーカイブ済みの検知も含む）。"""
     row = conn.execute(
-        "SELECT 1 FROM detections WHERE your_item_id = ? AND infringing_item_id = ?",
-        (your_item_id, infringing_item_id),
+        "SELECT 1 FROM detections WHERE your_item_id = ? AND infringing_item_id = ? "
+        "UNION ALL "
+        "SELECT 1 FROM detections_archive WHERE your_item_id = ? AND infringing_item_id = ? "
+        "LIMIT 1",
+        (your_item_id, infringing_item_id, your_item_id, infringing_item_id),
     ).fetchone()
     return row is not None
 
 
+def iter_detection_keys(conn: sqlite3.Connection) -> Iterator[tuple[str, str]]:
+    """
+    登録済み検知の (your_item_id, infringing_item_id) を順に返す（run 開始時の重複チェック用集合の構築に使う）。
+    アーカイブ済みの検知も含める（対応済みの侵害を再検知しない）。
+    """
+    cursor = conn.execute(
+        "SELECT your_item_id, infringing_item_id FROM detections "
+        "UNION ALL SELECT your_item_id, infringing_item_id FROM detections_archive"
+    )
+    for row in cursor:
+        yield row[0], row[1]
+
+
 def insert_detection(
     conn: sqlite3.Connection,
     run_id: str,
@@ -57,34 +88,35 @@ def insert_detection(
     match_evidence: str,
     message_subject: str,
     message_body: str,
+    *,
+    commit: bool = True,
 ) -> Optional[DetectionRow]:
-    """検知を登録。重複時は None。"""
+    """
+    検知を登録。重複時は None。
+    RETURNING で登録行をそのまま受け取る（再 SELECT しない）。commit=False は BatchWriter のトランザクション内で使う。
+    """
     now = datetime.utcnow().isoformat() + "Z"
-    try:
-        cursor = conn.execute(
-            """
-            INSERT INTO detections (
-                run_id, detected_at, your_item_id, your_item_url, your_image_index,
-                your_image_url, your_image_sha256, infringing_item_id, infringing_item_url,
-                infringing_seller_display, infringing_image_url, infringing_image_sha256,
-                match_evidence, status, message_subject, message_body
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'NEW', ?, ?)
-            """,
-            (
-                run_id, now, your_item_id, your_item_url, your_image_index,
-                your_image_url, your_image_sha256, infringing_item_id, infringing_item_url,
-                infringing_seller_display, infringing_image_url, infringing_image_sha256,
-                match_evidence, message_subject, message_body,
-            ),
-        )
+    row = conn.execute(
+        """
+        INSERT INTO detections (
+            run_id, detected_at, your_item_id, your_item_url, your_image_index,
+            your_image_url, your_image_sha256, infringing_item_id, infringing_item_url,
+            infringing_seller_display, infringing_image_url, infringing_image_sha256,
+            match_evidence, status, message_subject, message_body
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'NEW', ?, ?)
+        ON CONFLICT(your_item_id, infringing_item_id) DO NOTHING
+        RETURNING *
+        """,
+        (
+            run_id, now, your_item_id, your_item_url, your_image_index,
+            your_image_url, your_image_sha256, infringing_item_id, infringing_item_url,
+            infringing_seller_display, infringing_image_url, infringing_image_sha256,
+            match_evidence, message_subject, message_body,
+        ),
+    ).fetchone()
+    if commit:
         conn.commit()
-        row = conn.execute(
-            "SELECT * FROM detections WHERE detection_id = ?", (cursor.lastrowid,)
-        ).fetchone()
-        return _row_to_detection(row) if row else None
-    except sqlite3.IntegrityError:
-        conn.rollback()
-        return None
+    return _row_to_detection(row) if row else None
 
 
 def get_detections_by_run(conn: sqlite3.Connection, run_id: str) -> list[DetectionRow]:
@@ -130,3 +162,123 @@ def update_detection_status(
     )
     conn.commit()
     return cursor.rowcount > 0
+
+
+def get_detections_to_verify(
+    conn: sqlite3.Connection, verified_before: str, limit: int
+) -> list[tuple[int, str]]:
+    """
+    再確認する検知（未対応・送信済みで、未確認または verified_before より前に確認したもの）を
+    確認の古い順に最大 limit 件。(detection_id, infringing_item_id) を返す。
+    """
+    rows = conn.execute(
+        """
+        SELECT detection_id, infringing_item_id FROM detections
+        WHERE status IN ('NEW', 'SENT') AND (verified_at IS NULL OR verified_at < ?)
+        ORDER BY verified_at IS NOT NULL, verified_at, detection_id
+        LIMIT ?
+        """,
+        (verified_before, limit),
+    ).fetchall()
+    return [(r[0], r[1]) for r in rows]
+
+
+def mark_detections_verified(
+    conn: sqlite3.Connection,
+    detection_ids: Sequence[int],
+    verified_at: str,
+    removed_ids: Sequence[int] = (),
+) -> None:
+    """確認日時を記録し、侵害出品が掲載終了していた検知を REMOVED にする（元のステータスは previous_status に残す）。"""
+    conn.executemany(
+        "UPDATE detections SET verified_at = ? WHERE detection_id = ?",
+        [(verified_at, d) for d in detection_ids],
+    )
+    conn.executemany(
+        "UPDATE detections SET previous_status = status, status = 'REMOVED' "
+        "WHERE detection_id = ? AND status != 'REMOVED'",
+        [(d,) for d in removed_ids],
+    )
+    conn.commit()
+
+
+def _filter_clause(flt: Optional[DetectionFilter]) -> tuple[list[str], list[Any]]:
+    where: list[str] = []
+    args: list[Any] = []
+    if flt is None:
+        return where, args
+    if flt.status:
+        where.append("status = ?")
+        args.append(flt.status)
+    if flt.seller:
+        where.append("infringing_seller_display = ?")
+        args.append(flt.seller)
+    if flt.your_item_id:
+        where.append("your_item_id = ?")
+        args.append(flt.your_item_id)
+    if flt.detected_from:
+        where.append("detected_at >= ?")
+        args.append(flt.detected_from)
+    if flt.detected_to:
+        where.append("detected_at < ?")
+        args.append(flt.detected_to)
+    return where, args
+
+
+def query_detections_page(
+    conn: sqlite3.Connection,
+    flt: Optional[DetectionFilter] = None,
+    after: Optional[tuple[str, int]] = None,
+    limit: int = 100,
+    include_messages: bool = False,
+) -> DetectionPage:
+    """
+    検知一覧を新しい順（detected_at, detection_id の降順）にキーセットページングで取得。
+    after: 前ページの next_cursor。OFFSET を使わないため、深いページでも先頭と同じコストで読める。
+    """
+    columns = list(DETECTION_LIST_COLUMNS) + (list(_MESSAGE_COLUMNS) if include_messages else [])
+    where, args = _filter_clause(flt)
+    if after is not None:
+        where.append("(detected_at < ? OR (detected_at = ? AND detection_id < ?))")
+        args.extend([after[0], after[0], after[1]])
+    sql = f"SELECT {', '.join(columns)} FROM detections"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY detected_at DESC, detection_id DESC LIMIT ?"
+    # 次ページの有無を判定するため1件多く読む
+    cursor = conn.execute(sql, args + [limit + 1])
+    rows = [tuple(r) for r in cursor.fetchall()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last[1], last[0])
+    return DetectionPage(columns=columns, rows=rows, next_cursor=next_cursor)
+
+
+def count_detections_by_seller(
+    conn: sqlite3.Connection, flt: Optional[DetectionFilter] = None
+) -> list[tuple[str, int]]:
+    """絞り込み条件に一致する検知の侵害セラー別件数（セラー名順）。"""
+    where, args = _filter_clause(flt)
+    sql = "SELECT infringing_seller_display, COUNT(*) FROM detections"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY infringing_seller_display ORDER BY infringing_seller_display"
+    return [(r[0], r[1]) for r in conn.execute(sql, args).fetchall()]
+
+
+def get_detection_messages(
+    conn: sqlite3.Connection, detection_ids: Sequence[int]
+) -> dict[int, tuple[str, str]]:
+    """選択した検知のメッセージ（件名, 本文）だけを読み込む。"""
+    if not detection_ids:
+        return {}
+    ids = list(dict.fromkeys(int(i) for i in detection_ids))
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT detection_id, message_subject, message_body FROM detections "
+        f"WHERE detection_id IN ({placeholders})",
+        ids,
+    ).fetchall()
+    return {r[0]: (r[1] or "", r[2] or "") for r in rows}
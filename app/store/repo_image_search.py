@@ -0,0 +1,33 @@
+"""image_search_depth テーブルの CRUD（画像検索の適応的ページングで到達した深さ）。"""
+from __future__ import annotations
+
+import sqlite3
+
+
+def record_image_search_depth(
+    conn: sqlite3.Connection,
+    run_id: str,
+    listing_item_id: str,
+    image_index: int,
+    marketplace_id: str,
+    depth: int,
+    pages: int,
+    stop_reason: str,
+    *,
+    commit: bool = True,
+) -> None:
+    """1画像・1マーケットプレイス分の到達深さを記録。同じキーは上書き。"""
+    conn.execute(
+        """
+        INSERT INTO image_search_depth (
+            run_id, listing_item_id, image_index, marketplace_id, depth, pages, stop_reason
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(run_id, listing_item_id, image_index, marketplace_id) DO UPDATE SET
+            depth = excluded.depth,
+            pages = excluded.pages,
+            stop_reason = excluded.stop_reason
+        """,
+        (run_id, listing_item_id, image_index, marketplace_id, depth, pages, stop_reason),
+    )
+    if commit:
+        conn.commit()
@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
+from app.store.models import ListingRiskRow
 
 
 def get_listings_scan_state_for_selection(
@@ -12,41 +14,79 @@ def get_listings_scan_state_for_selection(
 ) -> list[tuple[str, Optional[str]]]:
     """
     対象出品を選ぶ: 最も古くスキャンされたものから limit 件。
-    未登録（DB にないもの）を優先し、その後 last_scanned_at が古い順。
+    未登録（DB にないもの）を優先し（known_listing_ids の順）、その後 last_scanned_at が古い順。
+    """
+    if not known_listing_ids or limit <= 0:
+        return []
+    with _selection_candidates(conn, known_listing_ids):
+        rows = conn.execute(
+            """
+            SELECT c.listing_item_id, s.last_scanned_at
+            FROM temp.selection_candidates AS c
+            LEFT JOIN listings_scan_state AS s ON s.listing_item_id = c.listing_item_id
+            ORDER BY
+                s.listing_item_id IS NULL DESC,
+                s.last_scanned_at IS NULL DESC,
+                s.last_scanned_at ASC,
+                c.ord ASC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def get_listing_risk_rows(conn: sqlite3.Connection, known_listing_ids: list[str]) -> list[ListingRiskRow]:
+    """
+    出品ごとの最終スキャン日時・過去の検知数・カタログ初出日時を known_listing_ids の順で返す。
+    検知数は detections と detections_archive の your_item_id 索引（UNIQUE の先頭列）で数える。
     """
     if not known_listing_ids:
         return []
-    placeholders = ",".join("?" * len(known_listing_ids))
-    existing = set(
-        row[0]
-        for row in conn.execute(
-            f"SELECT listing_item_id FROM listings_scan_state "
-            f"WHERE listing_item_id IN ({placeholders})",
-            known_listing_ids,
+    with _selection_candidates(conn, known_listing_ids):
+        rows = conn.execute(
+            """
+            SELECT c.listing_item_id, s.last_scanned_at, m.first_seen_at,
+                   (SELECT COUNT(*) FROM detections AS d WHERE d.your_item_id = c.listing_item_id)
+                   + (SELECT COUNT(*) FROM detections_archive AS a WHERE a.your_item_id = c.listing_item_id)
+                   AS detections_count
+            FROM temp.selection_candidates AS c
+            LEFT JOIN listings_scan_state AS s ON s.listing_item_id = c.listing_item_id
+            LEFT JOIN my_listings AS m ON m.item_id = c.listing_item_id
+            ORDER BY c.ord
+            """
         ).fetchall()
+    return [
+        ListingRiskRow(
+            listing_item_id=row["listing_item_id"],
+            last_scanned_at=row["last_scanned_at"],
+            detections_count=row["detections_count"],
+            first_seen_at=row["first_seen_at"],
+        )
+        for row in rows
+    ]
+
+
+@contextmanager
+def _selection_candidates(conn: sqlite3.Connection, known_listing_ids: list[str]) -> Iterator[None]:
+    """
+    出品 ID を一時テーブル selection_candidates（listing_item_id, ord）に入れる。
+    IN 句のプレースホルダ数の上限を受けず、10万件超でも1クエリで結合できる。抜けると空に戻す。
+    """
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS selection_candidates ("
+        "listing_item_id TEXT PRIMARY KEY, ord INTEGER NOT NULL)"
     )
-    never_scanned = [lid for lid in known_listing_ids if lid not in existing]
-    cursor = conn.execute(
-        f"""
-        SELECT listing_item_id, last_scanned_at
-        FROM listings_scan_state
-        WHERE listing_item_id IN ({placeholders})
-        ORDER BY last_scanned_at IS NULL DESC, last_scanned_at ASC
-        LIMIT ?
-        """,
-        known_listing_ids + [limit],
-    )
-    ordered_existing = [(row[0], row[1]) for row in cursor.fetchall()]
-    result: list[tuple[str, Optional[str]]] = []
-    for lid in never_scanned:
-        if len(result) >= limit:
-            break
-        result.append((lid, None))
-    for lid, last_at in ordered_existing:
-        if len(result) >= limit:
-            break
-        result.append((lid, last_at))
-    return result
+    try:
+        conn.execute("DELETE FROM temp.selection_candidates")
+        conn.executemany(
+            "INSERT OR IGNORE INTO temp.selection_candidates (listing_item_id, ord) VALUES (?, ?)",
+            ((lid, i) for i, lid in enumerate(known_listing_ids)),
+        )
+        yield
+    finally:
+        conn.execute("DELETE FROM temp.selection_candidates")
+        conn.commit()
 
 
 def upsert_listing_scan_state(
@@ -54,8 +94,10 @@ def upsert_listing_scan_state(
     listing_item_id: str,
     last_scanned_run_id: str,
     last_scan_status: str,
+    *,
+    commit: bool = True,
 ) -> None:
-    """出品のスキャン状態を登録または更新。"""
+    """出品のスキャン状態を登録または更新。commit=False は BatchWriter のトランザクション内で使う。"""
     now = datetime.utcnow().isoformat() + "Z"
     conn.execute(
         """
@@ -69,4 +111,5 @@ def upsert_listing_scan_state(
         """,
         (listing_item_id, now, last_scanned_run_id, last_scan_status),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
@@ -0,0 +1,167 @@
+"""保持期間の整理（run の日次集計・解決済み検知のアーカイブ・incremental_vacuum）と maintenance_state の CRUD。"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from app.store.models import DetectionRow
+
+# 1トランザクションでアーカイブする検知の件数
+_ARCHIVE_BATCH_SIZE = 500
+
+
+def rollup_runs_before(conn: sqlite3.Connection, cutoff: str) -> int:
+    """
+    cutoff より前に開始し終了済みの run を日次集計（run_daily_rollups）へ加算して削除する。
+    まだ検知（detections）が紐づく run は残す。紐づく画像検索の到達深さ・チェックポイント・所要時間も削除する。削除した run 数を返す。
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.rollup_runs")
+    conn.execute(
+        """
+        CREATE TEMP TABLE rollup_runs AS
+        SELECT * FROM runs AS r
+        WHERE r.started_at < ? AND r.finished_at IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM detections AS d WHERE d.run_id = r.run_id)
+        """,
+        (cutoff,),
+    )
+    try:
+        count = conn.execute("SELECT COUNT(*) FROM temp.rollup_runs").fetchone()[0]
+        if count:
+            conn.execute(
+                """
+                INSERT INTO run_daily_rollups (
+                    day, runs_count, scanned_listings_count, scanned_images_count,
+                    candidates_checked_count, detections_new_count, errors_count
+                )
+                SELECT substr(started_at, 1, 10), COUNT(*),
+                       SUM(COALESCE(scanned_listings_count, 0)),
+                       SUM(COALESCE(scanned_images_count, 0)),
+                       SUM(COALESCE(candidates_checked_count, 0)),
+                       SUM(COALESCE(detections_new_count, 0)),
+                       SUM(COALESCE(errors_count, 0))
+                FROM temp.rollup_runs
+                GROUP BY substr(started_at, 1, 10)
+                ON CONFLICT(day) DO UPDATE SET
+                    runs_count = runs_count + excluded.runs_count,
+                    scanned_listings_count = scanned_listings_count + excluded.scanned_listings_count,
+                    scanned_images_count = scanned_images_count + excluded.scanned_images_count,
+                    candidates_checked_count = candidates_checked_count + excluded.candidates_checked_count,
+                    detections_new_count = detections_new_count + excluded.detections_new_count,
+                    errors_count = errors_count + excluded.errors_count
+                """
+            )
+            for table in (
+                "image_search_depth", "run_checkpoints", "run_image_checkpoints", "work_queue",
+                "run_stage_timings", "run_listing_timings",
+            ):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE run_id IN (SELECT run_id FROM temp.rollup_runs)"
+                )
+            conn.execute(
+                "UPDATE listings_scan_state SET last_scanned_run_id = NULL "
+                "WHERE last_scanned_run_id IN (SELECT run_id FROM temp.rollup_runs)"
+            )
+            conn.execute("DELETE FROM runs WHERE run_id IN (SELECT run_id FROM temp.rollup_runs)")
+        conn.commit()
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.rollup_runs")
+    return count
+
+
+def archive_resolved_detections(
+    conn: sqlite3.Connection, cutoff: str, archived_at: Optional[str] = None
+) -> int:
+    """
+    cutoff より前に検知され、対応済み（status が NEW 以外）の検知を detections_archive へ移す。
+    行全体は zlib 圧縮した JSON で保持し、重複防止用のキー（your_item_id, infringing_item_id）は列として残す。
+    """
+    now = archived_at or datetime.utcnow().isoformat() + "Z"
+    archived = 0
+    while True:
+        rows = conn.execute(
+            "SELECT * FROM detections WHERE status != 'NEW' AND detected_at < ? "
+            "ORDER BY detection_id LIMIT ?",
+            (cutoff, _ARCHIVE_BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO detections_archive (
+                detection_id, your_item_id, infringing_item_id, detected_at, status, archived_at, payload
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    r["detection_id"], r["your_item_id"], r["infringing_item_id"],
+                    r["detected_at"], r["status"], now,
+                    zlib.compress(json.dumps(dict(r), ensure_ascii=False).encode("utf-8")),
+                )
+                for r in rows
+            ],
+        )
+        conn.executemany(
+            "DELETE FROM detections WHERE detection_id = ?", [(r["detection_id"],) for r in rows]
+        )
+        conn.commit()
+        archived += len(rows)
+    return archived
+
+
+def get_archived_detection(conn: sqlite3.Connection, detection_id: int) -> Optional[DetectionRow]:
+    """アーカイブ済みの検知を展開して取得。"""
+    row = conn.execute(
+        "SELECT payload FROM detections_archive WHERE detection_id = ?", (detection_id,)
+    ).fetchone()
+    if not row:
+        return None
+    data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+    return DetectionRow(**{k: data.get(k) for k in DetectionRow.__dataclass_fields__})
+
+
+def prune_ended_listings(conn: sqlite3.Connection, cutoff: str) -> int:
+    """cutoff より前に終了した出品をカタログとスキャン状態から削除する。削除した出品数を返す。"""
+    conn.execute(
+        """
+        DELETE FROM listings_scan_state WHERE listing_item_id IN (
+            SELECT item_id FROM my_listings WHERE status = 'ended' AND ended_at < ?
+        )
+        """,
+        (cutoff,),
+    )
+    cursor = conn.execute(
+        "DELETE FROM my_listings WHERE status = 'ended' AND ended_at < ?", (cutoff,)
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """空きページを解放する（auto_vacuum=INCREMENTAL の DB のみ有効）。解放前の空きページ数を返す。"""
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute("PRAGMA incremental_vacuum").fetchall()
+    return freelist
+
+
+def get_maintenance_last_run(conn: sqlite3.Connection, task: str) -> Optional[str]:
+    """保守タスクの前回実行時刻。"""
+    row = conn.execute(
+        "SELECT last_run_at FROM maintenance_state WHERE task = ?", (task,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_maintenance_last_run(conn: sqlite3.Connection, task: str, last_run_at: str) -> None:
+    """保守タスクの実行時刻を記録。"""
+    conn.execute(
+        """
+        INSERT INTO maintenance_state (task, last_run_at) VALUES (?, ?)
+        ON CONFLICT(task) DO UPDATE SET last_run_at = excluded.last_run_at
+        """,
+        (task, last_run_at),
+    )
+    conn.commit()
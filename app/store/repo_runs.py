@@ -19,6 +19,7 @@ def _row_to_run(row: sqlite3.Row) -> RunRow:
         detections_new_count=row["detections_new_count"] or 0,
         errors_count=row["errors_count"] or 0,
         notes=row["notes"],
+        api_calls_count=row["api_calls_count"] or 0,
     )
 
 
@@ -44,9 +45,11 @@ def update_run(
     candidates_checked_count: Optional[int] = None,
     detections_new_count: Optional[int] = None,
     errors_count: Optional[int] = None,
+    api_calls_count: Optional[int] = None,
     notes: Optional[str] = None,
+    commit: bool = True,
 ) -> None:
-    """run を更新。"""
+    """run を更新。commit=False は BatchWriter のトランザクション内で使う。"""
     updates: list[str] = []
     args: list[Any] = []
     if finished_at is not None:
@@ -67,6 +70,9 @@ def update_run(
     if errors_count is not None:
         updates.append("errors_count = ?")
         args.append(errors_count)
+    if api_calls_count is not None:
+        updates.append("api_calls_count = ?")
+        args.append(api_calls_count)
     if notes is not None:
         updates.append("notes = ?")
         args.append(notes)
@@ -74,7 +80,8 @@ def update_run(
         return
     args.append(run_id)
     conn.execute(f"UPDATE runs SET {', '.join(updates)} WHERE run_id = ?", args)
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
 def get_run(conn: sqlite3.Connection, run_id: str) -> Optional[RunRow]:
@@ -92,9 +99,75 @@ def get_last_run_finished_at(conn: sqlite3.Connection) -> Optional[str]:
     return str(row[0]) if row and row[0] else None
 
 
+def get_recent_run_costs(conn: sqlite3.Connection, limit: int = 10) -> list[tuple[float, int, int]]:
+    """
+    直近の完了した run の (所要秒数, 処理出品数, API 呼び出し回数)。出品を1件も処理していない run は除く。
+    run 予算の見積もり（1出品あたりの時間・API 呼び出し回数）に使う。
+    """
+    rows = conn.execute(
+        """
+        SELECT (julianday(finished_at) - julianday(started_at)) * 86400.0,
+               scanned_listings_count, COALESCE(api_calls_count, 0)
+        FROM runs
+        WHERE finished_at IS NOT NULL AND scanned_listings_count > 0
+        ORDER BY started_at DESC LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+    return [(float(r[0] or 0.0), int(r[1]), int(r[2])) for r in rows]
+
+
+def reopen_run(conn: sqlite3.Connection, run_id: str, notes: Optional[str] = None) -> None:
+    """中断した run を再開する（finished_at を未完了に戻す）。"""
+    conn.execute("UPDATE runs SET finished_at = NULL, notes = ? WHERE run_id = ?", (notes, run_id))
+    conn.commit()
+
+
+def claim_run_finish(conn: sqlite3.Connection, run_id: str, finished_at: str) -> bool:
+    """
+    未終了の run を終了済みにする。既に終了済みなら False。
+    複数プロセスで分担する run で、終了処理（出力など）を1つのワーカーだけが行うために使う。
+    """
+    cursor = conn.execute(
+        "UPDATE runs SET finished_at = ? WHERE run_id = ? AND finished_at IS NULL", (finished_at, run_id)
+    )
+    conn.commit()
+    return cursor.rowcount > 0
+
+
+def add_run_api_calls(conn: sqlite3.Connection, run_id: str, calls: int) -> None:
+    """run の Browse API 呼び出し回数に加算する（複数プロセスで分担する run の各ワーカーの分）。"""
+    conn.execute(
+        "UPDATE runs SET api_calls_count = COALESCE(api_calls_count, 0) + ? WHERE run_id = ?",
+        (calls, run_id),
+    )
+    conn.commit()
+
+
+def list_resumable_runs(conn: sqlite3.Connection, limit: int = 20) -> list[RunRow]:
+    """チェックポイントに未完了の出品が残っている run（新しい順）。"""
+    rows = conn.execute(
+        """
+        SELECT * FROM runs AS r
+        WHERE EXISTS (
+            SELECT 1 FROM run_checkpoints AS c WHERE c.run_id = r.run_id AND c.status IS NULL
+        )
+        ORDER BY r.started_at DESC LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+    return [_row_to_run(r) for r in rows]
+
+
 def delete_run(conn: sqlite3.Connection, run_id: str) -> bool:
-    """実行履歴を削除。紐づく検知・リストング状態も整理する。"""
+    """実行履歴を削除。紐づく検知・リストング状態・チェックポイントも整理する。"""
     conn.execute("DELETE FROM detections WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM image_search_depth WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM run_checkpoints WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM run_image_checkpoints WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM work_queue WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM run_stage_timings WHERE run_id = ?", (run_id,))
+    conn.execute("DELETE FROM run_listing_timings WHERE run_id = ?", (run_id,))
     conn.execute(
         "UPDATE listings_scan_state SET last_scanned_run_id = NULL WHERE last_scanned_run_id = ?",
         (run_id,),
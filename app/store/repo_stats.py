@@ -0,0 +1,30 @@
+"""dashboard_stats（ダッシュボード用の集計。トリガーで維持）の読み取りと再計算。"""
+from __future__ import annotations
+
+import sqlite3
+
+from app.store import db
+from app.store.models import DashboardStatsRow
+
+
+def get_dashboard_stats(conn: sqlite3.Connection) -> DashboardStatsRow:
+    """ダッシュボードの集計を主キー1件の参照で取得。"""
+    row = conn.execute("SELECT * FROM dashboard_stats WHERE id = 1").fetchone()
+    if not row:
+        return DashboardStatsRow(0, 0, 0, 0, None, None)
+    return DashboardStatsRow(
+        total_runs=row["total_runs"],
+        total_detections=row["total_detections"],
+        new_detections=row["new_detections"],
+        sent_detections=row["sent_detections"],
+        last_run_id=row["last_run_id"],
+        last_run_started_at=row["last_run_started_at"],
+    )
+
+
+def rebuild_dashboard_stats(conn: sqlite3.Connection) -> DashboardStatsRow:
+    """集計を実データから作り直す（トリガー導入前のデータや手動編集で値がずれた場合の修復用）。"""
+    conn.execute("DELETE FROM dashboard_stats")
+    conn.execute(db.DASHBOARD_STATS_INSERT_SQL)
+    conn.commit()
+    return get_dashboard_stats(conn)
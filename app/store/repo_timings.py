@@ -0,0 +1,113 @@
+"""run_stage_timings / run_listing_timings テーブルの CRUD（ステージごとの所要時間）。"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Iterable, Optional
+
+from app.store.models import StageTimingRow
+
+
+def save_run_stage_timings(
+    conn: sqlite3.Connection,
+    run_id: str,
+    rows: Iterable[dict[str, Any]],
+    *,
+    commit: bool = True,
+) -> None:
+    """
+    run のステージ別の所要時間（StageTimings.summary() の行）を記録する。
+    同じ run に既にあれば加算する（再開・複数プロセスで分担する run の各ワーカーの分）。
+    件数・合計・最大は正確に合算し、p50 / p95 は件数で重み付けした近似値にする。
+    """
+    conn.executemany(
+        """
+        INSERT INTO run_stage_timings (run_id, stage, count, total_sec, p50_sec, p95_sec, max_sec)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(run_id, stage) DO UPDATE SET
+            p50_sec = (p50_sec * count + excluded.p50_sec * excluded.count) / (count + excluded.count),
+            p95_sec = (p95_sec * count + excluded.p95_sec * excluded.count) / (count + excluded.count),
+            count = count + excluded.count,
+            total_sec = total_sec + excluded.total_sec,
+            max_sec = MAX(max_sec, excluded.max_sec)
+        """,
+        [
+            (run_id, r["stage"], r["count"], r["total_sec"], r["p50_sec"], r["p95_sec"], r["max_sec"])
+            for r in rows
+            if r["count"] > 0
+        ],
+    )
+    if commit:
+        conn.commit()
+
+
+def record_listing_timings(
+    conn: sqlite3.Connection,
+    run_id: str,
+    listing_item_id: str,
+    rows: Iterable[dict[str, Any]],
+    *,
+    commit: bool = True,
+) -> None:
+    """1出品のステージ別の所要時間（件数・合計・最大）を記録する。同じキーは上書き。"""
+    conn.executemany(
+        """
+        INSERT INTO run_listing_timings (run_id, listing_item_id, stage, count, total_sec, max_sec)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(run_id, listing_item_id, stage) DO UPDATE SET
+            count = excluded.count,
+            total_sec = excluded.total_sec,
+            max_sec = excluded.max_sec
+        """,
+        [
+            (run_id, listing_item_id, r["stage"], r["count"], r["total_sec"], r["max_sec"])
+            for r in rows
+        ],
+    )
+    if commit:
+        conn.commit()
+
+
+def get_run_stage_timings(conn: sqlite3.Connection, run_id: str) -> list[StageTimingRow]:
+    """run のステージ別の所要時間（合計の大きい順）。"""
+    rows = conn.execute(
+        "SELECT stage, count, total_sec, p50_sec, p95_sec, max_sec FROM run_stage_timings "
+        "WHERE run_id = ? ORDER BY total_sec DESC",
+        (run_id,),
+    ).fetchall()
+    return [StageTimingRow(*tuple(r)) for r in rows]
+
+
+def list_timed_run_ids(conn: sqlite3.Connection, limit: int = 20) -> list[str]:
+    """所要時間を記録した run（新しい順）。"""
+    rows = conn.execute(
+        """
+        SELECT r.run_id FROM runs AS r
+        WHERE EXISTS (SELECT 1 FROM run_stage_timings AS t WHERE t.run_id = r.run_id)
+        ORDER BY r.started_at DESC LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_slowest_listings(
+    conn: sqlite3.Connection, run_id: str, limit: int = 20
+) -> list[tuple[str, float, Optional[str]]]:
+    """
+    run で計測した合計時間の長い出品の (出品 ID, 合計秒数, 最も時間のかかったステージ)。
+    出品ごとの内訳を記録していない run は空。
+    """
+    rows = conn.execute(
+        """
+        SELECT listing_item_id, SUM(total_sec) AS total,
+               (SELECT t2.stage FROM run_listing_timings AS t2
+                WHERE t2.run_id = t.run_id AND t2.listing_item_id = t.listing_item_id
+                ORDER BY t2.total_sec DESC LIMIT 1) AS top_stage
+        FROM run_listing_timings AS t
+        WHERE run_id = ?
+        GROUP BY listing_item_id
+        ORDER BY total DESC LIMIT ?
+        """,
+        (run_id, limit),
+    ).fetchall()
+    return [(r[0], float(r[1] or 0.0), r[2]) for r in rows]
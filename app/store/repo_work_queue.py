@@ -0,0 +1,121 @@
+"""
+work_queue テーブルの CRUD（複数プロセスで1つの run を分担する作業キュー）。
+行は未完了の出品。ワーカーは期限付きでリースし、ハートビートで期限を延長する。
+出品の完了は mark_listing_checkpoint が同じトランザクションで行を削除する。
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from typing import Iterable, Optional
+
+
+def find_active_shared_run(
+    conn: sqlite3.Connection, started_since: str, exclude_run_id: Optional[str] = None
+) -> Optional[str]:
+    """started_since 以降に始まり、作業キューに未完了の出品が残っている未終了の run（最新）。"""
+    row = conn.execute(
+        """
+        SELECT r.run_id FROM runs AS r
+        WHERE r.finished_at IS NULL AND r.started_at >= ? AND r.run_id != ?
+          AND EXISTS (SELECT 1 FROM work_queue AS w WHERE w.run_id = r.run_id)
+        ORDER BY r.started_at DESC LIMIT 1
+        """,
+        (started_since, exclude_run_id or ""),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def enqueue_shared_run(
+    conn: sqlite3.Connection, run_id: str, listing_item_ids: Iterable[str], started_since: str
+) -> str:
+    """
+    選定した出品を作業キューとチェックポイントに登録し、使う run_id を返す。
+    同時に起動した別のプロセスが先に登録していた場合は何もせず、その run_id を返す（呼び出し側で合流する）。
+    """
+    ids = list(listing_item_ids)
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        other = find_active_shared_run(conn, started_since, exclude_run_id=run_id)
+        if other:
+            conn.rollback()
+            return other
+        rows = [(run_id, lid, i) for i, lid in enumerate(ids)]
+        conn.executemany(
+            "INSERT OR IGNORE INTO work_queue (run_id, listing_item_id, ord) VALUES (?, ?, ?)", rows
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO run_checkpoints (run_id, listing_item_id, ord) VALUES (?, ?, ?)", rows
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return run_id
+
+
+def lease_work(
+    conn: sqlite3.Connection,
+    run_id: str,
+    worker_id: str,
+    limit: int,
+    lease_sec: float,
+    now: Optional[float] = None,
+) -> list[tuple[str, int]]:
+    """
+    リースされていない・期限切れの出品を選定順に最大 limit 件リースする。
+    (出品 ID, これまでのリース回数) を返す。2回目以降は他のワーカーが途中で止まった出品。
+    """
+    now = time.time() if now is None else now
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            """
+            SELECT listing_item_id, attempts FROM work_queue
+            WHERE run_id = ? AND (worker_id IS NULL OR lease_expires_at < ?)
+            ORDER BY ord LIMIT ?
+            """,
+            (run_id, now, limit),
+        ).fetchall()
+        conn.executemany(
+            """
+            UPDATE work_queue SET worker_id = ?, lease_expires_at = ?, attempts = attempts + 1
+            WHERE run_id = ? AND listing_item_id = ?
+            """,
+            [(worker_id, now + lease_sec, run_id, r[0]) for r in rows],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [(r[0], r[1]) for r in rows]
+
+
+def renew_leases(
+    conn: sqlite3.Connection, run_id: str, worker_id: str, lease_sec: float, now: Optional[float] = None
+) -> int:
+    """ワーカーがリース中の出品の期限を延長する（ハートビート）。延長した件数を返す。"""
+    now = time.time() if now is None else now
+    cursor = conn.execute(
+        "UPDATE work_queue SET lease_expires_at = ? WHERE run_id = ? AND worker_id = ?",
+        (now + lease_sec, run_id, worker_id),
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def release_leases(conn: sqlite3.Connection, run_id: str, worker_id: str) -> int:
+    """ワーカーがリース中の未完了の出品を手放す（他のワーカーがすぐに取れるように）。"""
+    cursor = conn.execute(
+        "UPDATE work_queue SET worker_id = NULL, lease_expires_at = NULL WHERE run_id = ? AND worker_id = ?",
+        (run_id, worker_id),
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def count_remaining_work(conn: sqlite3.Connection, run_id: str) -> int:
+    """作業キューに残っている（未完了の）出品数。"""
+    return conn.execute("SELECT COUNT(*) FROM work_queue WHERE run_id = ?", (run_id,)).fetchone()[0]
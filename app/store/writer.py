@@ -0,0 +1,258 @@
+"""
+ジョブ実行中の書き込みをまとめる Unit of Work（専用の書き込みスレッド）。
+
+検知・スキャン状態・run カウンタ・画像検索の到達深さ・チェックポイントの書き込みをキューに積み、
+N 出品ごと、または T 秒ごとに1トランザクションでまとめてコミットする（行ごとの fsync を避ける）。
+sqlite3 の接続はスレッド間で共有できないため、書き込み用の接続は書き込みスレッドだけが持つ。
+
+バッチのコミットに失敗したら1件ずつ適用し直す（一時的なロック待ちなどはこれで通る）。それでも失敗した
+書き込みがあれば、その手前までをコミットして以降の書き込みを受け付けない（呼び出し元は次の書き込みで例外になり
+run が止まる）。チェックポイントは出品の検知より後に積むので、コミットされなかった出品は --resume でやり直される。
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from app.store import db, repo
+from app.store.detection_keys import DetectionKeySet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_EVERY_LISTINGS = 20
+DEFAULT_FLUSH_INTERVAL_SEC = 5.0
+
+_OP = "op"
+_LISTING_DONE = "listing_done"
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+class WriterFailedError(RuntimeError):
+    """BatchWriter の書き込みに失敗した後の書き込み・flush で送出する。"""
+
+
+class BatchWriter:
+    """
+    書き込みをバッファし、専用スレッドでまとめてコミットする。
+    メソッドはどのスレッドから呼んでもよい（キューに積むだけで即座に戻る）。
+    close() または flush() を呼ぶまで、他の接続からは未コミットの書き込みは見えない。
+    書き込みに失敗した後は、書き込みメソッド・flush() がその例外を原因とする WriterFailedError を送出する。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        flush_every_listings: int = DEFAULT_FLUSH_EVERY_LISTINGS,
+        flush_interval_sec: float = DEFAULT_FLUSH_INTERVAL_SEC,
+        detection_keys: Optional[DetectionKeySet] = None,
+    ) -> None:
+        self._db_path = db_path
+        self._flush_every_listings = max(1, flush_every_listings)
+        self._flush_interval_sec = max(0.1, flush_interval_sec)
+        self._queue: "queue.Queue[tuple[str, Any]]" = queue.Queue()
+        # 登録済み・登録予定の検知キー（未コミット分を含めて重複登録を防ぐ）
+        self.detection_keys = detection_keys if detection_keys is not None else DetectionKeySet()
+        self._closed = False
+        self._failure: Optional[BaseException] = None
+        self.flush_count = 0
+        self._ready: Future = Future()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        # 接続の確立失敗は呼び出し元へ伝える
+        self._ready.result()
+
+    def __enter__(self) -> BatchWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # --- 書き込み操作（repo の同名関数を commit=False でトランザクション内に積む） ---
+
+    @property
+    def failed(self) -> bool:
+        """書き込みに失敗して以降の書き込みを受け付けない状態か。"""
+        return self._failure is not None
+
+    def has_detection(self, your_item_id: str, infringing_item_id: str) -> bool:
+        """検知が登録済みまたは登録予定か（DB には問い合わせない）。"""
+        return (your_item_id, infringing_item_id) in self.detection_keys
+
+    def insert_detection(self, your_item_id: str, infringing_item_id: str, **kwargs: Any) -> bool:
+        """
+        検知の登録を予約。登録済み・予約済みのキーなら False（登録しない）。
+        True は登録予約を受け付けたことを示す（DB 側の重複は ON CONFLICT DO NOTHING で無視される）。
+        """
+        if not self.detection_keys.add(your_item_id, infringing_item_id):
+            return False
+        self._submit(
+            repo.insert_detection,
+            your_item_id=your_item_id,
+            infringing_item_id=infringing_item_id,
+            **kwargs,
+        )
+        return True
+
+    def upsert_listing_scan_state(
+        self, listing_item_id: str, last_scanned_run_id: str, last_scan_status: str
+    ) -> None:
+        self._submit(repo.upsert_listing_scan_state, listing_item_id, last_scanned_run_id, last_scan_status)
+
+    def update_run(self, run_id: str, **kwargs: Any) -> None:
+        self._submit(repo.update_run, run_id, **kwargs)
+
+    def record_image_search_depth(self, *args: Any) -> None:
+        self._submit(repo.record_image_search_depth, *args)
+
+    def mark_listing_checkpoint(self, *args: Any, **kwargs: Any) -> None:
+        self._submit(repo.mark_listing_checkpoint, *args, **kwargs)
+
+    def record_image_checkpoint(self, *args: Any) -> None:
+        self._submit(repo.record_image_checkpoint, *args)
+
+    def record_listing_timings(self, *args: Any) -> None:
+        self._submit(repo.record_listing_timings, *args)
+
+    def sync_run_counters(self, run_id: str) -> None:
+        self._submit(repo.sync_run_counters, run_id)
+
+    def listing_done(self) -> None:
+        """1出品の処理完了を通知。flush_every_listings 件ごとにコミットする。"""
+        self._put(_LISTING_DONE, None)
+
+    def flush(self) -> None:
+        """バッファ済みの書き込みをコミットし、完了まで待つ。書き込みに失敗していれば WriterFailedError。"""
+        fut: Future = Future()
+        self._put(_FLUSH, fut)
+        fut.result()
+
+    def close(self) -> None:
+        """残りをコミットして書き込みスレッドを終了する。"""
+        if self._closed:
+            return
+        fut: Future = Future()
+        self._put(_STOP, fut)
+        self._closed = True
+        try:
+            fut.result()
+        finally:
+            self._thread.join()
+
+    # --- 内部 ---
+
+    def _submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._put(_OP, (fn, args, kwargs))
+
+    def _put(self, kind: str, payload: Any) -> None:
+        if self._closed:
+            raise RuntimeError("BatchWriter is closed")
+        if kind == _OP and self._failure is not None:
+            raise WriterFailedError(
+                f"DB の書き込みに失敗したため書き込みを受け付けません: {self._failure}"
+            ) from self._failure
+        self._queue.put((kind, payload))
+
+    def _run(self) -> None:
+        try:
+            conn = db.get_connection(self._db_path)
+        except Exception as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+        pending: list[tuple[Callable[..., Any], tuple, dict]] = []
+        listings_since_flush = 0
+        last_flush = time.monotonic()
+        discarded = 0
+        try:
+            while True:
+                timeout = max(0.0, self._flush_interval_sec - (time.monotonic() - last_flush))
+                try:
+                    kind, payload = self._queue.get(timeout=timeout if pending else None)
+                except queue.Empty:
+                    kind, payload = None, None
+
+                if kind == _OP and self._failure is not None:
+                    # 失敗より後に積まれた書き込みはコミットしない（失敗した書き込みを飛ばして先へ進めない）
+                    discarded += 1
+                elif kind == _OP:
+                    pending.append(payload)
+                elif kind == _LISTING_DONE:
+                    listings_since_flush += 1
+
+                due = (
+                    kind in (_FLUSH, _STOP)
+                    or listings_since_flush >= self._flush_every_listings
+                    or time.monotonic() - last_flush >= self._flush_interval_sec
+                )
+                if due and pending:
+                    self._commit(conn, pending)
+                    pending = []
+                if due:
+                    listings_since_flush = 0
+                    last_flush = time.monotonic()
+
+                if kind in (_FLUSH, _STOP):
+                    fut: Future = payload
+                    if self._failure is not None:
+                        if discarded:
+                            logger.error("書き込み失敗の後に積まれた %d 件はコミットしていません", discarded)
+                            discarded = 0
+                        fut.set_exception(
+                            WriterFailedError(f"DB の書き込みに失敗しました: {self._failure}")
+                        )
+                    else:
+                        fut.set_result(None)
+                    if kind == _STOP:
+                        return
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, pending: list[tuple[Callable[..., Any], tuple, dict]]) -> None:
+        """まとめてコミットする。失敗したら1件ずつ適用し直し、失敗した書き込みの手前までをコミットする。"""
+        try:
+            self._apply(conn, pending)
+            return
+        except Exception as e:
+            logger.warning("バッチ書き込み失敗。1件ずつ適用し直します（%d 件）: %s", len(pending), e)
+        applied = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for fn, args, kwargs in pending:
+                conn.execute("SAVEPOINT batch_op")
+                try:
+                    fn(conn, *args, commit=False, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO batch_op")
+                    logger.exception(
+                        "書き込み失敗: %s（コミット済み=%d 件, 未コミット=%d 件）",
+                        getattr(fn, "__name__", fn), applied, len(pending) - applied,
+                    )
+                    self._failure = e
+                    break
+                conn.execute("RELEASE batch_op")
+                applied += 1
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.exception("書き込みのやり直しに失敗（%d 件）: %s", len(pending), e)
+            self._failure = self._failure or e
+            return
+        self.flush_count += 1
+
+    def _apply(self, conn: sqlite3.Connection, pending: list[tuple[Callable[..., Any], tuple, dict]]) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for fn, args, kwargs in pending:
+                fn(conn, *args, commit=False, **kwargs)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        self.flush_count += 1
+        logger.debug("バッチ書き込み: %d 件を1トランザクションでコミット", len(pending))
@@ -0,0 +1,234 @@
+"""
+ホストごとの適応的な並列数制御（AIMD）と、プロセス内で使い回すスレッドプール。
+
+api.ebay.com（Browse API）と i.ebayimg.com（画像）へのリクエストは、ホストごとの上限（limit）まで同時に実行する。
+応答が latency_target_sec 以内で成功している間は limit を少しずつ増やし（limit 回の成功で +1）、
+タイムアウト・接続エラー・429・5xx で半分に減らす（同時に失敗した複数のリクエストでは1回だけ減らす）。
+adaptive が無効、または設定にないホストは制限しない。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 混雑時に limit に掛ける係数（multiplicative decrease）
+_DECREASE_FACTOR = 0.5
+
+API_HOST = "api.ebay.com"
+IMAGE_HOST = "i.ebayimg.com"
+
+# config.yaml の concurrency.hosts で省略した項目の既定値（initial 省略時は run.max_concurrent_downloads）
+DEFAULT_HOST_LIMITS: dict[str, dict[str, Any]] = {
+    API_HOST: {"initial": 4, "min": 1, "max": 16, "latency_target_sec": 5.0},
+    IMAGE_HOST: {"min": 2, "max": 32, "latency_target_sec": 2.0},
+}
+
+
+@dataclass(frozen=True)
+class HostLimitConfig:
+    """1ホスト分の並列数の設定。"""
+
+    host: str
+    initial: int
+    min_limit: int
+    max_limit: int
+    latency_target_sec: float  # これより遅い成功では並列数を増やさない
+
+
+@dataclass
+class RequestOutcome:
+    """slot 内のリクエストの結果。例外にしない応答（r.ok で判定する呼び出しなど）は status を設定する。"""
+
+    status: Optional[int] = None
+
+    @property
+    def congested(self) -> bool:
+        return self.status is not None and (self.status == 429 or self.status >= 500)
+
+
+def host_limits_from_config(
+    hosts_cfg: Optional[dict[str, Any]], default_initial: int
+) -> tuple[HostLimitConfig, ...]:
+    """concurrency.hosts の設定（ホスト名 → initial / min / max / latency_target_sec）を読む。"""
+    merged = {h: dict(v) for h, v in DEFAULT_HOST_LIMITS.items()}
+    for host, cfg in (hosts_cfg or {}).items():
+        merged.setdefault(str(host).strip().lower(), {}).update(cfg or {})
+    configs = []
+    for host, cfg in merged.items():
+        min_limit = max(1, int(cfg.get("min", 1)))
+        max_limit = max(min_limit, int(cfg.get("max", 16)))
+        configs.append(HostLimitConfig(
+            host=host,
+            initial=min(max(int(cfg.get("initial", default_initial)), min_limit), max_limit),
+            min_limit=min_limit,
+            max_limit=max_limit,
+            latency_target_sec=max(0.1, float(cfg.get("latency_target_sec", 5.0))),
+        ))
+    return tuple(configs)
+
+
+class AimdLimiter:
+    """1ホストの同時リクエスト数を AIMD で調整するセマフォ。スレッドセーフ。"""
+
+    def __init__(self, config: HostLimitConfig, clock: Callable[[], float] = time.monotonic) -> None:
+        self.config = config
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._limit = float(min(max(config.initial, config.min_limit), config.max_limit))
+        self._in_flight = 0
+        self._last_decrease_at = float("-inf")
+        self.low = self.high = self.level
+        self.decreases = 0
+
+    def reset_stats(self) -> None:
+        """run ごとの最小・最大の並列数と減少回数を数え直す（並列数はそのまま）。"""
+        with self._cond:
+            self.low = self.high = self.level
+            self.decreases = 0
+
+    @property
+    def level(self) -> int:
+        """現在の同時リクエスト数の上限。"""
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self) -> Iterator[RequestOutcome]:
+        """
+        空きができるまで待ってリクエストを1件実行する。ブロック内の例外（requests の Timeout / ConnectionError、
+        HTTPError の 429・5xx）か、RequestOutcome.status に設定した 429・5xx を混雑と判定する。
+        """
+        with self._cond:
+            while self._in_flight >= self.level:
+                self._cond.wait()
+            self._in_flight += 1
+        outcome = RequestOutcome()
+        started = self._clock()
+        try:
+            yield outcome
+        except Exception as e:
+            self._release(started, congested=is_congestion_error(e), healthy=False)
+            raise
+        except BaseException:
+            self._release(started, congested=False, healthy=False)
+            raise
+        healthy = outcome.status is None or outcome.status < 400
+        self._release(started, congested=outcome.congested, healthy=healthy)
+
+    def _release(self, started: float, congested: bool, healthy: bool) -> None:
+        now = self._clock()
+        with self._cond:
+            self._in_flight -= 1
+            before = self.level
+            if congested:
+                # 前回の減少より後に始まったリクエストの失敗だけで減らす（同じ混雑で何度も半減しない）
+                if started > self._last_decrease_at:
+                    self._limit = max(float(self.config.min_limit), self._limit * _DECREASE_FACTOR)
+                    self._last_decrease_at = now
+                    self.decreases += 1
+            elif healthy and now - started <= self.config.latency_target_sec:
+                self._limit = min(float(self.config.max_limit), self._limit + 1.0 / self._limit)
+            after = self.level
+            self.low, self.high = min(self.low, after), max(self.high, after)
+            self._cond.notify_all()
+        if after < before:
+            logger.info("並列数を減らしました: host=%s %d → %d", self.config.host, before, after)
+        elif after > before:
+            logger.info("並列数を増やしました: host=%s %d → %d", self.config.host, before, after)
+
+
+def is_congestion_error(e: BaseException) -> bool:
+    """タイムアウト・接続エラー・429・5xx なら True（並列数を減らす）。"""
+    if isinstance(e, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+_limiters: dict[str, AimdLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure(configs: tuple[HostLimitConfig, ...], enabled: bool) -> None:
+    """
+    ホストごとの制御を設定する（run の開始時に呼ぶ）。設定が変わらないホストは調整済みの並列数を引き継ぐ
+    （常駐モードでは run をまたいで学習した並列数を使う）。
+    """
+    with _limiters_lock:
+        if not enabled:
+            _limiters.clear()
+            return
+        for cfg in configs:
+            current = _limiters.get(cfg.host)
+            if current is None or current.config != cfg:
+                _limiters[cfg.host] = AimdLimiter(cfg)
+            else:
+                current.reset_stats()
+        for host in set(_limiters) - {c.host for c in configs}:
+            del _limiters[host]
+
+
+def limiter_for(url: str) -> Optional[AimdLimiter]:
+    """URL のホストの制御。制御しないホストは None。"""
+    host = (urlsplit(url).hostname or "").lower()
+    with _limiters_lock:
+        return _limiters.get(host)
+
+
+@contextmanager
+def limited(url: str) -> Iterator[RequestOutcome]:
+    """URL のホストの並列数の枠内でリクエストを実行する（制御しないホストはそのまま実行）。"""
+    limiter = limiter_for(url)
+    if limiter is None:
+        yield RequestOutcome()
+        return
+    with limiter.slot() as outcome:
+        yield outcome
+
+
+def summary() -> list[dict[str, Any]]:
+    """ホストごとの現在・最小・最大の並列数と減少回数（run の終了時のログ用）。"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [
+        {"host": l.config.host, "level": l.level, "low": l.low, "high": l.high, "decreases": l.decreases}
+        for l in limiters
+    ]
+
+
+def max_level(host: str, default: int) -> int:
+    """ホストの並列数の上限（プールの大きさを決める用）。制御しないホストは default。"""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+    return max(default, limiter.config.max_limit) if limiter else default
+
+
+_executors: dict[str, tuple[ThreadPoolExecutor, int]] = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """
+    プロセス内で使い回すスレッドプール（画像ごと・呼び出しごとに作らない）。
+    同じ name で大きい max_workers が要求されたら新しいプールに差し替える。古いプールは shutdown しない
+    （他のスレッドが取得済みのプールにまだ投入することがあるため）。参照がなくなればワーカーは GC で終了する。
+    プールのタスクから同じ name のプールに投入して結果を待たないこと（プールが埋まると止まる）。
+    """
+    max_workers = max(1, max_workers)
+    with _executors_lock:
+        current = _executors.get(name)
+        if current is not None and current[1] >= max_workers:
+            return current[0]
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        _executors[name] = (executor, max_workers)
+        return executor
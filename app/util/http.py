@@ -5,6 +5,8 @@ from typing import Any, Optional
 
 import requests
 
+from app.util import concurrency
+
 def get_timeout_sec() -> int:
     return int(os.getenv("HTTP_TIMEOUT_SEC", "30"))
 
@@ -21,7 +23,7 @@ def download_bytes(
     retry_backoff_sec: Optional[float] = None,
     session: Optional[requests.Session] = None,
 ) -> bytes:
-    """URL からバイト列を取得。リトライ付き。"""
+    """URL からバイト列を取得。リトライ付き。各試行はホストの並列数の枠内で実行する（app.util.concurrency）。"""
     timeout_sec = timeout_sec or get_timeout_sec()
     retry_max = retry_max or get_retry_max()
     retry_backoff_sec = retry_backoff_sec or get_retry_backoff_sec()
@@ -29,11 +31,12 @@ def download_bytes(
     last_exc: Optional[Exception] = None
     for attempt in range(retry_max + 1):
         try:
-            if hasattr(use_session, "get"):
-                r = use_session.get(url, timeout=timeout_sec)
-            else:
-                r = use_session.request("GET", url, timeout=timeout_sec)
-            r.raise_for_status()
+            with concurrency.limited(url):
+                if hasattr(use_session, "get"):
+                    r = use_session.get(url, timeout=timeout_sec)
+                else:
+                    r = use_session.request("GET", url, timeout=timeout_sec)
+                r.raise_for_status()
             return r.content
         except (requests.RequestException, OSError) as e:
             last_exc = e
@@ -2,8 +2,35 @@
 from __future__ import annotations
 
 import base64
+import hashlib
 import io
-from typing import Optional
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# search_by_image に送る画像の長辺の上限（px）。これより大きい画像は縮小してから送る
+DEFAULT_SEARCH_MAX_EDGE = 1024
+_SEARCH_JPEG_QUALITY = 90
+# メモリ上に保持するペイロード数の上限
+_MEMORY_CACHE_MAX = 256
+
+_payload_cache: "OrderedDict[str, str]" = OrderedDict()
+_payload_cache_lock = threading.Lock()
+
+
+def _default_payload_cache_dir() -> str:
+    base = Path(__file__).resolve().parent.parent.parent
+    return str(base / "data" / "search_payload_cache")
+
+
+def _payload_cache_dir() -> str:
+    return os.getenv("SEARCH_PAYLOAD_CACHE_DIR") or _default_payload_cache_dir()
 
 
 def to_base64_for_search(raw: bytes) -> Optional[str]:
@@ -25,3 +52,126 @@ def to_base64_for_search(raw: bytes) -> Optional[str]:
             return base64.b64encode(raw).decode("ascii")
         except Exception:
             return None
+
+
+def _encode_search_jpeg(img: Any, max_edge: int) -> bytes:
+    """長辺を max_edge 以下に縮小し JPEG にエンコード。"""
+    from PIL import Image
+
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    if max_edge > 0 and max(img.size) > max_edge:
+        img = img.copy()
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=_SEARCH_JPEG_QUALITY)
+    return buf.getvalue()
+
+
+def build_search_payload(
+    raw: bytes,
+    sha256: Optional[str] = None,
+    image: Any = None,
+    max_edge: int = DEFAULT_SEARCH_MAX_EDGE,
+    use_disk_cache: bool = True,
+) -> Optional[str]:
+    """
+    search_by_image 用の Base64 ペイロードを返す。
+    長辺を max_edge 以下に縮小してから JPEG 化し、送信サイズとエンコード時間を抑える。
+    元画像の SHA-256（+ max_edge）をキーにメモリとディスクにキャッシュする。
+    image: ハッシュ計算でデコード済みの PIL 画像（あれば再デコードしない）。
+    変換失敗時は to_base64_for_search と同様にそのまま Base64 を試行する。
+    """
+    sha = sha256 or hashlib.sha256(raw).hexdigest()
+    key = f"{sha}_{max_edge}"
+    with _payload_cache_lock:
+        cached = _payload_cache.get(key)
+        if cached is not None:
+            _payload_cache.move_to_end(key)
+            return cached
+
+    cache_path = Path(_payload_cache_dir()) / f"{key}.b64" if use_disk_cache else None
+    payload: Optional[str] = None
+    if cache_path is not None and cache_path.is_file():
+        try:
+            payload = cache_path.read_text(encoding="ascii")
+            # 最終利用日時（prune_payload_cache の基準）を更新する
+            os.utime(cache_path)
+        except OSError:
+            payload = None
+
+    if not payload:
+        try:
+            if image is None:
+                from PIL import Image
+
+                image = Image.open(io.BytesIO(raw))
+            payload = base64.b64encode(_encode_search_jpeg(image, max_edge)).decode("ascii")
+        except Exception as e:
+            logger.debug("検索用ペイロード生成失敗、元画像をそのまま使用: %s", e)
+            try:
+                return base64.b64encode(raw).decode("ascii")
+            except Exception:
+                return None
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(
+                    f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+                )
+                tmp_path.write_text(payload, encoding="ascii")
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.debug("検索用ペイロードのディスクキャッシュ保存失敗: %s", e)
+
+    with _payload_cache_lock:
+        _payload_cache[key] = payload
+        _payload_cache.move_to_end(key)
+        while len(_payload_cache) > _MEMORY_CACHE_MAX:
+            _payload_cache.popitem(last=False)
+    return payload
+
+
+def prune_payload_cache(max_age_days: float, max_mb: float, now: Optional[float] = None) -> int:
+    """
+    ディスクの検索ペイロードキャッシュを整理し、削除したファイル数を返す。
+    max_age_days より長く使われていないファイルを削除し、残りが max_mb を超えていれば最終利用の古い順に削除する。
+    0 以下の値はその条件を無効にする。
+    """
+    cache_dir = Path(_payload_cache_dir())
+    if not cache_dir.is_dir():
+        return 0
+    now = now if now is not None else time.time()
+    files: list[tuple[float, int, Path]] = []
+    for path in cache_dir.iterdir():
+        if not path.is_file():
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort(key=lambda f: f[0])
+
+    doomed: list[Path] = []
+    if max_age_days > 0:
+        cutoff = now - max_age_days * 86400
+        doomed = [p for mtime, _, p in files if mtime < cutoff]
+        files = [f for f in files if f[0] >= cutoff]
+    if max_mb > 0:
+        total = sum(size for _, size, _ in files)
+        limit = int(max_mb * 1024 * 1024)
+        for _, size, path in files:
+            if total <= limit:
+                break
+            doomed.append(path)
+            total -= size
+
+    removed = 0
+    for path in doomed:
+        try:
+            path.unlink()
+            removed += 1
+        except OSError as e:
+            logger.debug("検索用ペイロードのキャッシュ削除失敗: %s: %s", path, e)
+    return removed
@@ -0,0 +1,133 @@
+"""
+ステージごとの所要時間の計測（出品の選定・画像検索・ダウンロード・ハッシュなど）。
+
+StageTimings に measure() で計測した秒数を積み、run の終了時に件数・合計・p50・p95・最大を集計する。
+計測は perf_counter の差分とロック1回だけなので、画像・候補ごとに計測しても負荷は小さい。
+p50 / p95 は対数間隔のヒストグラムから求める（サンプルを保持しないので、件数が増えてもメモリは一定）。
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# ステージ名（DB・ダッシュボードに保存する値）
+STAGE_SELECT = "select"  # 対象出品の選定（Trading API の列挙・カタログ同期を含む）
+STAGE_TRADING = "trading_enumeration"  # Trading API による出品の列挙（アカウントごと）
+STAGE_SUSPECT_FETCH = "suspect_fetch"  # 疑わしいアイテムの取得（出品ごと）
+STAGE_OWN_DOWNLOAD = "own_image_download"  # 自出品の画像のダウンロード（画像ごと）
+STAGE_OWN_HASH = "own_image_hash"  # 自出品の画像のハッシュ・検索用ペイロードの作成（画像ごと）
+STAGE_IMAGE_SEARCH = "image_search"  # 画像検索（全マーケットプレイス。画像ごと）
+STAGE_KEYWORD_SEARCH = "keyword_search"  # キーワード検索（画像ごと）
+STAGE_CANDIDATE_DOWNLOAD = "candidate_download"  # 候補画像のダウンロード（候補画像ごと）
+STAGE_CANDIDATE_HASH = "candidate_hash"  # 候補画像のハッシュ計算（候補画像ごと）
+STAGE_MATCH = "match"  # 照合・検知の登録（画像ごと）
+STAGE_OUTPUT = "output"  # 検知の出力（CSV / スプレッドシート）
+
+# 百分位用ヒストグラム: _HIST_MIN_SEC 以下を0番、以降は2倍ごとに _HIST_BUCKETS_PER_DOUBLING 分割
+# （百分位の誤差は約 ±2%）。0.1ms〜約3.7時間をカバーし、それ以上は最後の区間に入れる
+_HIST_MIN_SEC = 1e-4
+_HIST_BUCKETS_PER_DOUBLING = 16
+_HIST_MAX_BUCKET = 27 * _HIST_BUCKETS_PER_DOUBLING
+
+
+class StageTimings:
+    """
+    ステージごとの所要時間を積むスレッドセーフな集計。
+    percentiles=False は件数・合計・最大だけを持つ（出品ごとの内訳用。p50 / p95 は 0）。
+    """
+
+    def __init__(self, percentiles: bool = True) -> None:
+        self._percentiles = percentiles
+        self._lock = threading.Lock()
+        self._histograms: dict[str, dict[int, int]] = {}  # stage → {区間番号: 件数}
+        self._stats: dict[str, list[float]] = {}  # stage → [件数, 合計, 最大]
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            stat = self._stats.get(stage)
+            if stat is None:
+                self._stats[stage] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2] = max(stat[2], seconds)
+            if self._percentiles:
+                hist = self._histograms.setdefault(stage, {})
+                bucket = _bucket(seconds)
+                hist[bucket] = hist.get(bucket, 0) + 1
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            return bool(self._stats)
+
+    def summary(self) -> list[dict[str, Any]]:
+        """ステージごとの件数・合計・p50・p95・最大（秒）。合計の大きい順。"""
+        with self._lock:
+            stats = {stage: list(s) for stage, s in self._stats.items()}
+            histograms = {stage: sorted(h.items()) for stage, h in self._histograms.items()}
+        rows = []
+        for stage, (count, total, max_sec) in stats.items():
+            buckets = histograms.get(stage, [])
+            rows.append({
+                "stage": stage,
+                "count": int(count),
+                "total_sec": total,
+                "p50_sec": min(max_sec, _percentile(buckets, 50)),
+                "p95_sec": min(max_sec, _percentile(buckets, 95)),
+                "max_sec": max_sec,
+            })
+        rows.sort(key=lambda r: r["total_sec"], reverse=True)
+        return rows
+
+
+def _bucket(seconds: float) -> int:
+    if seconds <= _HIST_MIN_SEC:
+        return 0
+    index = math.ceil(math.log2(seconds / _HIST_MIN_SEC) * _HIST_BUCKETS_PER_DOUBLING)
+    return min(_HIST_MAX_BUCKET, max(1, index))
+
+
+def _bucket_value(bucket: int) -> float:
+    """区間の代表値（区間の両端の幾何平均）。"""
+    if bucket == 0:
+        return _HIST_MIN_SEC
+    return _HIST_MIN_SEC * 2 ** ((bucket - 0.5) / _HIST_BUCKETS_PER_DOUBLING)
+
+
+def _percentile(buckets: list[tuple[int, int]], pct: float) -> float:
+    """昇順の (区間番号, 件数) から百分位（nearest-rank）を推定する。値がなければ 0。"""
+    total = sum(n for _, n in buckets)
+    if not total:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * total))
+    seen = 0
+    for bucket, n in buckets:
+        seen += n
+        if seen >= rank:
+            return _bucket_value(bucket)
+    return _bucket_value(buckets[-1][0])
+
+
+@contextmanager
+def measure(stage: str, *timings: Optional[StageTimings]) -> Iterator[None]:
+    """ブロックの所要時間を各 StageTimings に記録する（None は無視）。例外で抜けた場合も記録する。"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        for t in timings:
+            if t is not None:
+                t.record(stage, elapsed)
+
+
+def format_summary(rows: list[dict[str, Any]]) -> str:
+    """summary() をログ用の1行にする。"""
+    return ", ".join(
+        f"{r['stage']}={r['total_sec']:.1f}s ({r['count']}回, p50={r['p50_sec']:.2f}s "
+        f"p95={r['p95_sec']:.2f}s max={r['max_sec']:.2f}s)"
+        for r in rows
+    )
@@ -25,7 +25,8 @@ def verify_account() -> VerifyResult:
     """
     対象アカウント（EBAY_SELLER_USERNAME）が正しく検知できるか検証。
     filter=sellers:{seller_username} でセラーID指定。ストアURLは使用しない。
-    EBAY_USER_REFRESH_TOKEN があれば Trading API で高速取得。なければ Browse API で検索。
+    EBAY_USER_REFRESH_TOKEN があれば Trading API で認証を確かめ、ローカルカタログまたは Trading API で取得。
+    なければ（または Trading API が失敗したら）Browse API で検索。取得件数は run.max_listings_per_run まで。
     """
     seller_username = os.getenv("EBAY_SELLER_USERNAME", "").strip()
     if not seller_username:
@@ -36,19 +37,57 @@ def verify_account() -> VerifyResult:
 
     best_listings: list = []
     seller_names = [seller_username]
-
-    # EBAY_USER_REFRESH_TOKEN があれば Trading API を優先（全サイトから一括取得）
+    source = ""
+
+    from app.config import load_config
+    from app.job import catalog_sync
+    from app.job.params import RunParams
+    from app.store import db
+    # 取得件数は run の処理件数（run.max_listings_per_run）に合わせる
+    limit = RunParams.from_config(load_config()).max_listings
+
+    # EBAY_USER_REFRESH_TOKEN があれば Trading API を優先（全サイトから一括取得）。
+    # ローカルカタログ（前回の実行・検証で同期済みの出品一覧）があっても、1件だけの Trading API 呼び出しで
+    # トークンとアカウントが有効なことを確かめてから使う（カタログだけで成功とはしない）
     from app.ebay.user_token import get_user_access_token, has_user_refresh_token
-    if has_user_refresh_token():
-        try:
-            from app.ebay.trading import get_my_ebay_selling_active
-            user_token = get_user_access_token()
-            if user_token:
-                best_listings = get_my_ebay_selling_active(
-                    user_token, seller_username, max_total=1000
-                )
-        except Exception as e:
-            logger.warning("アカウント検証: Trading API 失敗、Browse API でフォールバック: %s", e)
+    conn = db.get_connection()
+    try:
+        db.init_schema(conn)
+        if has_user_refresh_token():
+            try:
+                from datetime import datetime, timezone
+                from app.ebay.trading import check_my_ebay_selling_access, get_my_ebay_selling_active
+                user_token = get_user_access_token()
+                if user_token:
+                    check_my_ebay_selling_access(user_token, seller_username)
+                    try:
+                        best_listings = catalog_sync.load_catalog_summaries(conn, seller_username, limit=limit)
+                        if best_listings:
+                            source = "ローカルカタログ"
+                    except Exception as e:
+                        logger.warning("アカウント検証: ローカルカタログ読み込み失敗: %s", e)
+                    if not best_listings:
+                        synced_at = datetime.now(timezone.utc)
+                        failed_site_ids: list[int] = []
+                        best_listings = get_my_ebay_selling_active(
+                            user_token, seller_username, max_total=limit, failed_site_ids=failed_site_ids
+                        )
+                        if best_listings:
+                            source = "Trading API"
+                            # 取得結果をカタログに保存し、次回以降の検証・実行を即時にする
+                            catalog_sync.apply_full_listing(
+                                conn,
+                                seller_username,
+                                best_listings,
+                                complete=not failed_site_ids and len(best_listings) < limit,
+                                synced_at=synced_at,
+                            )
+            except Exception as e:
+                logger.warning("アカウント検証: Trading API 失敗、Browse API でフォールバック: %s", e)
+                best_listings = []
+                source = ""
+    finally:
+        conn.close()
 
     # Trading API で取れなかった場合のみ Browse API で検索
     # 日本からのアクセスでは1マーケットだと少数しか返らないため、複数マーケットを試してマージ
@@ -74,7 +113,7 @@ def verify_account() -> VerifyResult:
             try:
                 items = browse.search_all_my_fixed_price_listings(
                     seller_username,
-                    max_total=1000,
+                    max_total=limit,
                     sort="newlyListed",
                     marketplace_id=mpid,
                 )
@@ -84,7 +123,7 @@ def verify_account() -> VerifyResult:
                         best_listings.append(s)
             except Exception:
                 pass
-            if len(best_listings) >= 1000:
+            if len(best_listings) >= limit:
                 break
 
     if not best_listings:
@@ -142,7 +181,8 @@ def verify_account() -> VerifyResult:
 
     return VerifyResult(
         success=True,
-        message=f"✅ 対象アカウント '{seller_username}' を正しく検知できました。{total} 件の出品を取得しました。",
+        message=f"✅ 対象アカウント '{seller_username}' を正しく検知できました。{total} 件の出品を取得しました。"
+        + (f"（{source}）" if source else ""),
         listings_count=total,
         sample_item_ids=sample_ids,
         sample_item_urls=sample_urls,
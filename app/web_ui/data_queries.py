@@ -1,23 +1,20 @@
-"""Web UI 用データ取得（実行履歴・検知結果）。"""
+"""Web UI 用データ取得（実行履歴・検知結果）。読み取り専用接続（スレッドごとに再利用）を使う。"""
 from __future__ import annotations
 
 from typing import Optional
 
 import pandas as pd
 
-from app.store import db
+from app.store import db, repo
+from app.store.models import DetectionFilter, DetectionPage
 
 
 def get_runs_dataframe() -> pd.DataFrame:
     """実行履歴を DataFrame で取得。常にDBから最新を読み込む。"""
-    conn = db.get_connection()
-    db.init_schema(conn)
-    try:
-        rows = conn.execute(
-            "SELECT * FROM runs ORDER BY started_at DESC LIMIT 50"
-        ).fetchall()
-    finally:
-        conn.close()
+    conn = db.get_read_connection()
+    rows = conn.execute(
+        "SELECT * FROM runs ORDER BY started_at DESC LIMIT 50"
+    ).fetchall()
     if not rows:
         return pd.DataFrame()
     data = [
@@ -37,61 +34,149 @@ def get_runs_dataframe() -> pd.DataFrame:
     return pd.DataFrame(data)
 
 
-def get_detections_dataframe(limit: int = 100, include_messages: bool = False) -> pd.DataFrame:
-    """
-    検知結果を DataFrame で取得。常にDBから最新を読み込む。
-    include_messages=True の場合、メッセージ文面（件名・本文）も含める（CSV出力用）。
-    """
-    conn = db.get_connection()
-    db.init_schema(conn)
-    try:
-        rows = conn.execute(
-            "SELECT * FROM detections ORDER BY detected_at DESC LIMIT ?",
-            (limit,),
-        ).fetchall()
-    finally:
-        conn.close()
+def get_resumable_runs() -> list[tuple[str, str]]:
+    """再開できる（未完了の出品が残っている）run の (run_id, 表示ラベル) 一覧。"""
+    runs = repo.list_resumable_runs(db.get_read_connection())
+    return [
+        (
+            r.run_id,
+            f"{r.run_id}（開始 {r.started_at[:19]}・処理済み {r.scanned_listings_count} 件・{r.notes or '中断'}）",
+        )
+        for r in runs
+    ]
+
+
+def get_timed_run_ids(limit: int = 20) -> list[str]:
+    """ステージ別の所要時間を記録した run（新しい順）。"""
+    return repo.list_timed_run_ids(db.get_read_connection(), limit)
+
+
+def get_stage_timings_dataframe(run_id: str) -> pd.DataFrame:
+    """run のステージ別の所要時間（合計の大きい順）。割合は全ステージの合計に対する比率。"""
+    rows = repo.get_run_stage_timings(db.get_read_connection(), run_id)
     if not rows:
         return pd.DataFrame()
-    data = [
+    grand_total = sum(r.total_sec for r in rows) or 1.0
+    return pd.DataFrame([
         {
-            "detection_id": d["detection_id"],
-            "検知日時": d["detected_at"],
-            "あなたの出品ID": d["your_item_id"],
-            "あなたの出品URL": d["your_item_url"],
-            "侵害セラー": d["infringing_seller_display"],
-            "侵害出品ID": d["infringing_item_id"],
-            "侵害出品URL": d["infringing_item_url"],
-            "一致証拠": d["match_evidence"],
-            "ステータス": d["status"],
+            "ステージ": r.stage,
+            "回数": r.count,
+            "合計(秒)": round(r.total_sec, 1),
+            "割合(%)": round(100.0 * r.total_sec / grand_total, 1),
+            "p50(秒)": round(r.p50_sec, 2),
+            "p95(秒)": round(r.p95_sec, 2),
+            "最大(秒)": round(r.max_sec, 2),
         }
-        for d in rows
-    ]
-    if include_messages:
-        for i, d in enumerate(rows):
-            data[i]["メッセージ件名"] = d["message_subject"] or ""
-            data[i]["メッセージ本文"] = d["message_body"] or ""
-    return pd.DataFrame(data)
+        for r in rows
+    ])
+
+
+def get_slowest_listings_dataframe(run_id: str, limit: int = 20) -> pd.DataFrame:
+    """run で時間のかかった出品（timing.per_listing 有効時のみ記録）。"""
+    rows = repo.get_slowest_listings(db.get_read_connection(), run_id, limit)
+    return pd.DataFrame(
+        [{"出品ID": lid, "合計(秒)": round(total, 1), "最も長いステージ": stage or ""} for lid, total, stage in rows]
+    )
+
+
+# 検知一覧の列名（DB 列 → 表示名）
+_DETECTION_LABELS = {
+    "detection_id": "detection_id",
+    "detected_at": "検知日時",
+    "your_item_id": "あなたの出品ID",
+    "your_item_url": "あなたの出品URL",
+    "infringing_seller_display": "侵害セラー",
+    "infringing_item_id": "侵害出品ID",
+    "infringing_item_url": "侵害出品URL",
+    "match_evidence": "一致証拠",
+    "status": "ステータス",
+    "message_subject": "メッセージ件名",
+    "message_body": "メッセージ本文",
+}
+
+
+def _page_to_dataframe(page: DetectionPage) -> pd.DataFrame:
+    if not page.rows:
+        return pd.DataFrame()
+    # カーソルの列からそのまま DataFrame を組み立てる（行ごとの dict 変換をしない）
+    return pd.DataFrame.from_records(
+        page.rows, columns=[_DETECTION_LABELS[c] for c in page.columns]
+    )
+
+
+def get_detections_page(
+    flt: Optional[DetectionFilter] = None,
+    after: Optional[tuple[str, int]] = None,
+    page_size: int = 200,
+    include_messages: bool = False,
+) -> tuple[pd.DataFrame, Optional[tuple[str, int]]]:
+    """
+    検知結果を新しい順に1ページ分取得。絞り込みは DB 側で行う。
+    Returns: (DataFrame, 次ページのカーソル。最終ページなら None)
+    """
+    page = repo.query_detections_page(
+        db.get_read_connection(), flt, after=after, limit=page_size, include_messages=include_messages
+    )
+    return _page_to_dataframe(page), page.next_cursor
+
+
+def get_detections_dataframe(
+    limit: int = 100,
+    include_messages: bool = False,
+    flt: Optional[DetectionFilter] = None,
+) -> pd.DataFrame:
+    """
+    検知結果を新しい順に最大 limit 件、DataFrame で取得。常にDBから最新を読み込む。
+    include_messages=True の場合、メッセージ文面（件名・本文）も含める（CSV出力用）。
+    """
+    df, _ = get_detections_page(flt, page_size=limit, include_messages=include_messages)
+    return df
+
+
+def get_all_detections_dataframe(
+    flt: Optional[DetectionFilter] = None,
+    include_messages: bool = False,
+    page_size: int = 1000,
+) -> pd.DataFrame:
+    """絞り込み条件に一致する検知をすべて取得（CSV出力用）。キーセットページングで順に読む。"""
+    conn = db.get_read_connection()
+    columns: list[str] = []
+    rows: list[tuple] = []
+    after = None
+    while True:
+        page = repo.query_detections_page(
+            conn, flt, after=after, limit=page_size, include_messages=include_messages
+        )
+        columns = page.columns
+        rows.extend(page.rows)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    return _page_to_dataframe(DetectionPage(columns=columns, rows=rows, next_cursor=None))
+
+
+def get_detection_messages(detection_ids: list[int]) -> dict[int, tuple[str, str]]:
+    """選択した検知のメッセージ（件名, 本文）だけを読み込む。"""
+    return repo.get_detection_messages(db.get_read_connection(), detection_ids)
+
+
+def get_infringing_seller_counts(flt: Optional[DetectionFilter] = None) -> list[tuple[str, int]]:
+    """絞り込み条件に一致する検知の侵害セラー別件数。"""
+    return repo.count_detections_by_seller(db.get_read_connection(), flt)
 
 
 def get_detection_by_id(detection_id: int) -> Optional[dict]:
     """検知IDで検知情報を取得。"""
-    from app.store import repo
-    
-    conn = db.get_connection()
-    db.init_schema(conn)
-    try:
-        detection = repo.get_detection(conn, detection_id)
-        if not detection:
-            return None
-        return {
-            "detection_id": detection.detection_id,
-            "侵害セラー": detection.infringing_seller_display,
-            "侵害出品ID": detection.infringing_item_id,
-            "侵害出品URL": detection.infringing_item_url,
-            "メッセージ件名": detection.message_subject or "",
-            "メッセージ本文": detection.message_body or "",
-            "ステータス": detection.status,
-        }
-    finally:
-        conn.close()
+    conn = db.get_read_connection()
+    detection = repo.get_detection(conn, detection_id)
+    if not detection:
+        return None
+    return {
+        "detection_id": detection.detection_id,
+        "侵害セラー": detection.infringing_seller_display,
+        "侵害出品ID": detection.infringing_item_id,
+        "侵害出品URL": detection.infringing_item_url,
+        "メッセージ件名": detection.message_subject or "",
+        "メッセージ本文": detection.message_body or "",
+        "ステータス": detection.status,
+    }
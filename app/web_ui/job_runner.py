@@ -50,6 +50,7 @@ def _run_job_worker(
     dry_run: bool,
     only_item: Optional[str],
     run_overrides: Optional[dict],
+    resume_run_id: Optional[str] = None,
 ) -> None:
     """スレッド内でジョブを実行。_job_state に結果を書き込む。"""
     from app.job import run_once
@@ -83,6 +84,7 @@ def _run_job_worker(
                 run_overrides=run_overrides,
                 progress_callback=_on_progress,
                 cancellation_check=lambda: _job_state.get("cancelled", False),
+                resume_run_id=resume_run_id,
             )
             if _job_state.get("cancelled", False):
                 _job_state["status"] = "cancelled"
@@ -105,15 +107,19 @@ def run_job_in_thread(
     dry_run: bool,
     only_item: Optional[str],
     run_overrides: Optional[dict] = None,
+    resume_run_id: Optional[str] = None,
 ) -> None:
-    """ジョブをスレッドで開始。完了後は sync_job_state_to_session で状態を取得。"""
+    """
+    ジョブをスレッドで開始。完了後は sync_job_state_to_session で状態を取得。
+    resume_run_id 指定時は中断した run を続きから再開する。
+    """
     _job_state["status"] = "running"
     _job_state["logs"] = []
     _job_state["progress"] = None
     _job_state["cancelled"] = False  # 中止フラグをリセット
     thread = threading.Thread(
         target=_run_job_worker,
-        args=(dry_run, only_item, run_overrides),
+        args=(dry_run, only_item, run_overrides, resume_run_id),
         daemon=True,
     )
     thread.start()
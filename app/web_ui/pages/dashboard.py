@@ -3,8 +3,13 @@ from __future__ import annotations
 
 import streamlit as st
 
-from app.store import db
-from app.web_ui.services import get_runs_dataframe
+from app.store import db, repo
+from app.web_ui.services import (
+    get_runs_dataframe,
+    get_slowest_listings_dataframe,
+    get_stage_timings_dataframe,
+    get_timed_run_ids,
+)
 
 
 def render_dashboard() -> None:
@@ -17,24 +22,16 @@ def render_dashboard() -> None:
     st.info("📊 統計情報と実行履歴を確認できます。")
     st.markdown("### 概要")
 
-    conn = db.get_connection()
-    db.init_schema(conn)
-    total_runs = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
-    total_detections = conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
-    new_detections = conn.execute(
-        "SELECT COUNT(*) FROM detections WHERE status = 'NEW'"
-    ).fetchone()[0]
-    last_run = conn.execute(
-        "SELECT * FROM runs ORDER BY started_at DESC LIMIT 1"
-    ).fetchone()
+    # トリガーで維持している集計を主キー1件で参照（履歴の件数に依存しない）
+    stats = repo.get_dashboard_stats(db.get_read_connection())
 
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("総実行回数", total_runs)
-    col2.metric("総検知数", total_detections)
-    col3.metric("未対応検知", new_detections)
+    col1.metric("総実行回数", stats.total_runs)
+    col2.metric("総検知数", stats.total_detections)
+    col3.metric("未対応検知", stats.new_detections)
     col4.metric(
         "最終実行",
-        last_run["started_at"][:10] if last_run and last_run["started_at"] else "-",
+        stats.last_run_started_at[:10] if stats.last_run_started_at else "-",
     )
 
     st.markdown("---")
@@ -45,6 +42,28 @@ def render_dashboard() -> None:
     else:
         st.info("まだ実行履歴がありません。")
 
+    _render_stage_timings()
+
+
+def _render_stage_timings() -> None:
+    """run のステージ別の所要時間（どこに時間がかかっているか）。"""
+    run_ids = get_timed_run_ids()
+    if not run_ids:
+        return
+    st.markdown("---")
+    st.markdown("### ステージ別の所要時間")
+    run_id = st.selectbox("実行ID", run_ids, key="dashboard_timing_run")
+    timings_df = get_stage_timings_dataframe(run_id)
+    st.caption(
+        "各ステージは並行に実行されるため、合計は実行時間（経過時間）より長くなります。"
+        "候補画像のダウンロード・ハッシュは候補画像ごと、検索・照合は画像ごとの回数です。"
+    )
+    st.dataframe(timings_df, use_container_width=True, hide_index=True)
+    slowest_df = get_slowest_listings_dataframe(run_id)
+    if not slowest_df.empty:
+        st.markdown("#### 時間のかかった出品")
+        st.dataframe(slowest_df, use_container_width=True, hide_index=True)
+
 
 _INTRO_MARKDOWN = """
 ### 🚀 使い方の流れ
@@ -1,12 +1,29 @@
 """結果確認ページ。"""
 from __future__ import annotations
 
+from datetime import timedelta
+
 import streamlit as st
 
 from app.config import load_config, load_env
 from app.store import db, repo
-from app.web_ui.services import get_detections_dataframe, get_runs_dataframe
-from app.web_ui.data_queries import get_detection_by_id
+from app.store.models import DetectionFilter
+from app.web_ui.services import (
+    get_all_detections_dataframe,
+    get_detection_messages,
+    get_detections_page,
+    get_infringing_seller_counts,
+    get_runs_dataframe,
+)
+
+_DETECTIONS_PAGE_SIZE = 200
+# 絞り込みのステータス（表示名 → DB の値。None は絞り込まない）
+_STATUS_OPTIONS = {
+    "すべて": None,
+    "未対応（NEW）": "NEW",
+    "送信済み（SENT）": "SENT",
+    "掲載終了（REMOVED）": "REMOVED",
+}
 
 
 def render_results() -> None:
@@ -47,33 +64,35 @@ def _render_detections_tab(output_type: str) -> None:
         if st.button("🔄 更新", help="最新の検知結果を再取得します"):
             st.rerun()
 
-    detections_df = get_detections_dataframe(limit=200)
+    flt = _render_detection_filters()
+    cursor_stack: list = st.session_state.setdefault("detections_cursor_stack", [None])
+    detections_df, next_cursor = get_detections_page(
+        flt, after=cursor_stack[-1], page_size=_DETECTIONS_PAGE_SIZE
+    )
     if detections_df.empty:
+        if len(cursor_stack) > 1:
+            # 削除などでページが空になった場合は先頭に戻す
+            st.session_state["detections_cursor_stack"] = [None]
+            st.rerun()
         st.info(
             "まだ検知結果がありません。"
             "実行して検知があった場合、ここに表示されます。"
+            if flt == DetectionFilter()
+            else "条件に一致する検知結果がありません。"
         )
         return
 
-    # 侵害セラー一覧セクションを追加
-    _render_sellers_section(detections_df)
+    # 侵害セラー一覧セクションを追加（絞り込み条件に一致する全件を DB 側で集計）
+    _render_sellers_section(get_infringing_seller_counts(flt))
 
     # 削除用と送信用のチェック列を追加
     if "削除" not in detections_df.columns:
         detections_df.insert(0, "削除", False)
     if "送信" not in detections_df.columns:
         detections_df.insert(1, "送信", False)
-    
-    # メッセージを含むデータを取得
-    detections_with_messages = get_detections_dataframe(limit=200, include_messages=True)
-    messages_dict = {}
-    if not detections_with_messages.empty and "メッセージ件名" in detections_with_messages.columns:
-        for _, row in detections_with_messages.iterrows():
-            messages_dict[row["detection_id"]] = {
-                "件名": row.get("メッセージ件名", ""),
-                "本文": row.get("メッセージ本文", ""),
-            }
-    
+
+    _render_pagination(cursor_stack, next_cursor, len(detections_df))
+
     edited_df = st.data_editor(
         detections_df,
         column_config={
@@ -113,7 +132,7 @@ def _render_detections_tab(output_type: str) -> None:
     # メッセージ送信支援セクション
     selected_for_message = edited_df.loc[edited_df["送信"] == True, "detection_id"].astype(int).tolist()
     if selected_for_message:
-        _render_message_sending_section(selected_for_message, messages_dict, edited_df)
+        _render_message_sending_section(selected_for_message, edited_df)
 
     # 検知の削除: 選択削除 / 一括削除
     st.markdown("---")
@@ -141,30 +160,78 @@ def _render_detections_tab(output_type: str) -> None:
                 st.rerun()
     with col_all:
         if st.button(
-            "🗑️ すべて削除",
+            "🗑️ 表示中のページを削除",
             type="secondary",
-            help="検知結果をすべて削除します",
+            help="表示中のページの検知結果をすべて削除します（他のページの検知は残ります）",
             key="delete_detections_all",
         ):
             if not all_ids:
-                st.warning("削除する検知がありません。")
+                st.warning("表示中のページに削除する検知がありません。")
             else:
                 conn = db.get_connection()
                 try:
                     for did in all_ids:
                         repo.delete_detection(conn, did)
-                    st.success(f"{len(all_ids)} 件すべて削除しました。")
+                    st.success(f"表示中のページの {len(all_ids)} 件を削除しました。")
                 finally:
                     conn.close()
                 st.rerun()
 
     if output_type == "csv":
-        _render_csv_output_section()
+        _render_csv_output_section(flt)
     else:
         _render_sheets_output_section()
 
 
-def _render_sellers_section(detections_df) -> None:
+def _render_detection_filters() -> DetectionFilter:
+    """検知結果の絞り込み条件を描画し、DetectionFilter を返す。条件が変わったら先頭ページに戻す。"""
+    with st.expander("🔎 絞り込み", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            status_label = st.selectbox(
+                "ステータス", list(_STATUS_OPTIONS), key="detections_filter_status"
+            )
+        with col2:
+            seller = st.text_input("侵害セラー", key="detections_filter_seller").strip()
+        with col3:
+            your_item_id = st.text_input("あなたの出品ID", key="detections_filter_item").strip()
+        with col4:
+            date_range = st.date_input("検知日", value=(), key="detections_filter_dates")
+    detected_from = detected_to = None
+    if isinstance(date_range, (list, tuple)) and date_range:
+        detected_from = date_range[0].isoformat()
+        # 終了日はその日の終わりまで含める
+        detected_to = (date_range[-1] + timedelta(days=1)).isoformat()
+    flt = DetectionFilter(
+        status=_STATUS_OPTIONS[status_label],
+        seller=seller or None,
+        your_item_id=your_item_id or None,
+        detected_from=detected_from,
+        detected_to=detected_to,
+    )
+    if st.session_state.get("detections_filter") != flt:
+        st.session_state["detections_filter"] = flt
+        st.session_state["detections_cursor_stack"] = [None]
+    return flt
+
+
+def _render_pagination(cursor_stack: list, next_cursor, shown: int) -> None:
+    """前へ・次へ（キーセットページング。表示中ページの開始カーソルを積む）。"""
+    page_no = len(cursor_stack)
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ 前へ", disabled=page_no <= 1, key="detections_prev"):
+            cursor_stack.pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"{page_no} ページ目（{shown} 件表示、1ページ {_DETECTIONS_PAGE_SIZE} 件）")
+    with col_next:
+        if st.button("次へ ▶", disabled=next_cursor is None, key="detections_next"):
+            cursor_stack.append(next_cursor)
+            st.rerun()
+
+
+def _render_sellers_section(seller_counts: list[tuple[str, int]]) -> None:
     """侵害セラー一覧セクションを描画。"""
     st.markdown("---")
     col_title, col_btn = st.columns([3, 1])
@@ -172,8 +239,8 @@ def _render_sellers_section(detections_df) -> None:
         st.markdown("### 👥 侵害セラー一覧")
         st.markdown("**検知された侵害セラーの一覧です。** セラー名をクリックするとeBayのセラーページに移動します。")
     
-    # 重複を除いたセラー一覧を取得
-    sellers = detections_df["侵害セラー"].dropna().unique().tolist()
+    counts = {seller: n for seller, n in seller_counts if seller}
+    sellers = list(counts)
     if not sellers:
         st.info("侵害セラーがありません。")
         return
@@ -190,8 +257,7 @@ def _render_sellers_section(detections_df) -> None:
     st.markdown("\n".join(seller_links))
     
     # 統計情報
-    seller_counts = detections_df["侵害セラー"].value_counts()
-    st.caption(f"合計 {len(sellers)} 名のセラー、検知件数: {len(detections_df)} 件")
+    st.caption(f"合計 {len(sellers)} 名のセラー、検知件数: {sum(counts.values())} 件")
     
     # CSVダウンロード機能
     with col_btn:
@@ -202,7 +268,7 @@ def _render_sellers_section(detections_df) -> None:
         sellers_df = pd.DataFrame({
             "セラー名": sellers_sorted,
             "セラーページURL": [f"https://www.ebay.com/usr/{seller}" for seller in sellers_sorted],
-            "検知件数": [seller_counts.get(seller, 0) for seller in sellers_sorted],
+            "検知件数": [counts.get(seller, 0) for seller in sellers_sorted],
         })
         
         # CSVとして出力
@@ -220,20 +286,20 @@ def _render_sellers_section(detections_df) -> None:
         )
 
 
-def _render_csv_output_section() -> None:
-    """CSV 出力のセクション。現在の検知結果一覧（削除されていないもの）のみをダウンロード。"""
+def _render_csv_output_section(flt: DetectionFilter) -> None:
+    """CSV 出力のセクション。絞り込み条件に一致する検知結果（削除されていないもの）をすべてダウンロード。"""
     import io
     
     st.markdown("---")
     st.markdown("### 📄 CSV ダウンロード")
     st.markdown(
-        "**現在の検知結果一覧に表示されているものだけ**をCSVとしてダウンロードできます。"
+        "**現在の絞り込み条件に一致する検知結果**をすべてCSVとしてダウンロードできます。"
         "過去に削除した検知結果は含まれません。"
     )
     st.caption("CSVには、メッセージ文面（件名・本文）と侵害セラー一覧も含まれています。Excel等で開いて確認できます。")
     
-    # 現在表示されている検知結果（削除されていないもの）を取得（メッセージも含む）
-    detections_df = get_detections_dataframe(limit=200, include_messages=True)
+    # 絞り込み条件に一致する検知結果（削除されていないもの）を全ページ取得（メッセージも含む）
+    detections_df = get_all_detections_dataframe(flt, include_messages=True)
     
     if detections_df.empty:
         st.info("ダウンロードできる検知結果がありません。")
@@ -367,9 +433,7 @@ def _render_runs_tab() -> None:
         )
 
 
-def _render_message_sending_section(
-    selected_ids: list[int], messages_dict: dict, edited_df
-) -> None:
+def _render_message_sending_section(selected_ids: list[int], edited_df) -> None:
     """メッセージ送信支援セクションを描画。"""
     st.markdown("---")
     st.markdown("### 📧 メッセージ送信支援")
@@ -385,12 +449,25 @@ def _render_message_sending_section(
                 seller_groups[seller] = []
             seller_groups[seller].append(det_id)
     
+    # メッセージ本文は選択した行の分だけ読み込む
+    messages = get_detection_messages(selected_ids)
+    rows_by_id = {
+        int(r["detection_id"]): r for r in edited_df.to_dict("records") if int(r["detection_id"]) in messages
+    }
     for seller, det_ids in seller_groups.items():
         with st.expander(f"📨 {seller} ({len(det_ids)}件)", expanded=True):
             for det_id in det_ids:
-                detection_info = get_detection_by_id(det_id)
-                if not detection_info:
+                row = rows_by_id.get(det_id)
+                if row is None:
                     continue
+                subject, body = messages[det_id]
+                detection_info = {
+                    "侵害出品ID": row["侵害出品ID"],
+                    "侵害出品URL": row["侵害出品URL"],
+                    "メッセージ件名": subject,
+                    "メッセージ本文": body,
+                    "ステータス": row["ステータス"],
+                }
                 
                 st.markdown(f"**検知ID: {det_id}** | 侵害出品: [{detection_info['侵害出品ID']}]({detection_info['侵害出品URL']})")
                 
@@ -456,3 +533,5 @@ def _render_message_sending_section(
                                 conn.close()
                     elif current_status == "SENT":
                         st.success("✓ 送信済み")
+                    elif current_status == "REMOVED":
+                        st.info("侵害出品は掲載終了しています")
@@ -9,7 +9,12 @@ import streamlit as st
 from app.config import load_config
 from app.store import db, repo
 from app.web_ui.account_verify import verify_account
-from app.web_ui.services import run_job_in_thread, sync_job_state_to_session, cancel_job
+from app.web_ui.services import (
+    cancel_job,
+    get_resumable_runs,
+    run_job_in_thread,
+    sync_job_state_to_session,
+)
 
 def render_run_page() -> None:
     """実行ページを描画。"""
@@ -58,6 +63,8 @@ def render_run_page() -> None:
             }
             _handle_run_start(False, False, None, overrides)
     
+    _render_resume_section()
+
     # オプション設定（折りたたみ可能）
     with st.expander("⚙️ 詳細設定", expanded=False):
         st.markdown(
@@ -133,6 +140,33 @@ def render_run_page() -> None:
         st.rerun()
 
 
+def _render_resume_section() -> None:
+    """中断・中止した実行の再開（未完了の出品が残っている run がある場合のみ表示）。"""
+    resumable = get_resumable_runs()
+    if not resumable:
+        return
+    with st.expander("⏯️ 中断した実行を再開", expanded=False):
+        st.caption("中断・中止した実行の続き（未処理の出品）だけを処理します。処理済みの出品はやり直しません。")
+        labels = dict(resumable)
+        run_id = st.selectbox(
+            "再開する実行",
+            options=list(labels),
+            format_func=lambda rid: labels[rid],
+        )
+        if st.button(
+            "続きから再開",
+            disabled=st.session_state.run_status == "running",
+            use_container_width=True,
+        ):
+            st.session_state.run_status = "running"
+            st.session_state.run_logs = []
+            st.session_state.run_progress = None
+            run_job_in_thread(False, None, resume_run_id=run_id)
+            st.info("再開しました。数秒後に自動更新されます。")
+            time.sleep(2)
+            st.rerun()
+
+
 def _render_run_status_banner() -> None:
     """実行状態のバナー表示（ページ上部）。"""
     status = st.session_state.run_status
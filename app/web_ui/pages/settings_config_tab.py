@@ -100,6 +100,33 @@ def _render_run_config(config: dict[str, Any]) -> None:
         value=run["max_concurrent_downloads"],
         help="同時ダウンロード数。大きいと高速。",
     )
+    if "listing_workers" not in run:
+        run["listing_workers"] = 1
+    run["listing_workers"] = st.number_input(
+        "出品の並列処理数",
+        min_value=1,
+        max_value=16,
+        value=run["listing_workers"],
+        help="出品の解決・画像への展開を同時に行う数。後続のステージは下のワーカー数で並行に処理される。",
+    )
+    if "search_workers" not in run:
+        run["search_workers"] = 2
+    run["search_workers"] = st.number_input(
+        "画像・キーワード検索の並列数",
+        min_value=1,
+        max_value=16,
+        value=run["search_workers"],
+        help="検索ステージのワーカー数。大きいと速いが、API のレート制限に当たりやすくなる。",
+    )
+    if "time_budget_minutes" not in run:
+        run["time_budget_minutes"] = 0
+    run["time_budget_minutes"] = st.number_input(
+        "実行時間の上限（分、0=無制限）",
+        min_value=0,
+        max_value=1440,
+        value=run["time_budget_minutes"],
+        help="過去の実行から1出品あたりの時間を見積もり、時間内に終わる件数だけを処理する。定期実行が業務時間にはみ出さないように。",
+    )
 
 
 def _render_message_config(config: dict[str, Any]) -> None:
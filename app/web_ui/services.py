@@ -4,7 +4,18 @@ Web UI 用サービス集約エントリポイント。
 """
 from __future__ import annotations
 
-from app.web_ui.data_queries import get_detections_dataframe, get_runs_dataframe
+from app.web_ui.data_queries import (
+    get_all_detections_dataframe,
+    get_detection_messages,
+    get_detections_dataframe,
+    get_detections_page,
+    get_infringing_seller_counts,
+    get_resumable_runs,
+    get_runs_dataframe,
+    get_slowest_listings_dataframe,
+    get_stage_timings_dataframe,
+    get_timed_run_ids,
+)
 from app.web_ui.job_runner import run_job_in_thread, sync_job_state_to_session, cancel_job
 
 __all__ = [
@@ -12,5 +23,13 @@ __all__ = [
     "sync_job_state_to_session",
     "get_runs_dataframe",
     "get_detections_dataframe",
+    "get_detections_page",
+    "get_all_detections_dataframe",
+    "get_detection_messages",
+    "get_infringing_seller_counts",
+    "get_resumable_runs",
+    "get_stage_timings_dataframe",
+    "get_slowest_listings_dataframe",
+    "get_timed_run_ids",
     "cancel_job",
 ]
@@ -0,0 +1,20 @@
+"""テスト共通のフィクスチャ。"""
+import pytest
+
+from app.store import db, repo
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """スキーマを作成済みの一時 DB への接続。"""
+    c = db.get_connection(str(tmp_path / "state.db"))
+    db.init_schema(c)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def run_conn(conn):
+    """run "r1" を登録済みの conn（run に紐づく行を入れるテスト用）。"""
+    repo.create_run(conn, "r1")
+    return conn
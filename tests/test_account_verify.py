@@ -0,0 +1,58 @@
+"""account_verify（アカウント検証）のユニットテスト。"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.ebay import auth, browse, models, trading, user_token
+from app.job import catalog_sync
+from app.store import db
+from app.web_ui import account_verify
+
+
+def _item(item_id):
+    return models.ItemSummary(
+        item_id=f"v1|{item_id}|0",
+        item_web_url=f"https://www.ebay.com/itm/{item_id}",
+        image=models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}.jpg"),
+        additional_images=[],
+        seller=models.Seller(username="me", user_id="me"),
+        title=f"Title {item_id}",
+    )
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_DB_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setenv("EBAY_SELLER_USERNAME", "me")
+    monkeypatch.setattr(user_token, "has_user_refresh_token", lambda: True)
+    monkeypatch.setattr(user_token, "get_user_access_token", lambda: "token")
+    c = db.get_connection()
+    db.init_schema(c)
+    catalog_sync.apply_full_listing(
+        c, "me", [_item(i) for i in range(1, 4)], True, datetime(2026, 10, 1, tzinfo=timezone.utc)
+    )
+    c.close()
+
+
+def test_catalog_is_used_only_after_an_authenticated_trading_call(catalog, monkeypatch):
+    probes = []
+    monkeypatch.setattr(
+        trading, "check_my_ebay_selling_access", lambda token, seller: probes.append((token, seller)) or 3
+    )
+    result = account_verify.verify_account()
+    assert probes == [("token", "me")]
+    assert result.success and result.listings_count == 3
+
+
+def test_failed_trading_call_does_not_report_success_from_catalog(catalog, monkeypatch):
+    def _reject(token, seller):
+        raise RuntimeError("GetMyeBaySelling error: Invalid token")
+
+    monkeypatch.setattr(trading, "check_my_ebay_selling_access", _reject)
+    monkeypatch.setattr(auth, "get_access_token", lambda: "app-token")
+    monkeypatch.setattr(browse, "search_all_my_fixed_price_listings", lambda *a, **k: [])
+    monkeypatch.setattr(
+        browse, "search_my_fixed_price_listings", lambda *a, **k: models.SearchResponse(item_summaries=[], total=0, offset=0, limit=50)
+    )
+    result = account_verify.verify_account()
+    assert not result.success and result.listings_count == 0
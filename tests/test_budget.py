@@ -0,0 +1,73 @@
+"""run の実行予算（履歴からの見積もり・打ち切り判定）のテスト。"""
+import pytest
+
+from app.job import budget
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _add_run(conn, run_id, started, finished, scanned, api_calls):
+    conn.execute(
+        "INSERT INTO runs (run_id, started_at, finished_at, scanned_listings_count, api_calls_count) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (run_id, started, finished, scanned, api_calls),
+    )
+    conn.commit()
+
+
+def test_estimate_uses_median_of_recent_runs(conn):
+    _add_run(conn, "a", "2026-01-01T00:00:00.000000Z", "2026-01-01T00:10:00.000000Z", 100, 400)
+    _add_run(conn, "b", "2026-01-02T00:00:00.000000Z", "2026-01-02T00:20:00.000000Z", 100, 600)
+    # 再開で何日もかかった外れ値は中央値で無視される
+    _add_run(conn, "c", "2026-01-03T00:00:00.000000Z", "2026-01-06T00:00:00.000000Z", 100, 500)
+    _add_run(conn, "d", "2026-01-04T00:00:00.000000Z", None, 50, 0)
+    est = budget.estimate_listing_cost(conn)
+    assert est.sec_per_listing == pytest.approx(12.0)
+    assert est.api_calls_per_listing == pytest.approx(5.0)
+    assert budget.estimate_listing_cost(conn, history_runs=0) == budget.ListingCostEstimate()
+
+
+def test_listings_that_fit_time_and_api_budget():
+    clock = _Clock()
+    b = budget.RunBudget(
+        600, 1000, 60, budget.ListingCostEstimate(10.0, 20.0), clock=clock, api_call_count=lambda: 0
+    )
+    assert b.listings_that_fit(100) == (50, budget.BUDGET_API_CALLS)  # 1000 / 20
+    clock.now += 240
+    assert b.listings_that_fit(100) == (30, budget.BUDGET_TIME)  # (600 - 60 - 240) / 10
+    unlimited = budget.RunBudget(0, 0, 60, budget.ListingCostEstimate(10.0, 20.0), clock=clock)
+    assert not unlimited.enabled and unlimited.listings_that_fit(100) == (100, None)
+
+
+def test_exhausted_uses_observed_pace_and_in_flight():
+    clock = _Clock()
+    calls = {"n": 0}
+    b = budget.RunBudget(
+        100, 0, 10, budget.ListingCostEstimate(1.0, None), clock=clock, api_call_count=lambda: calls["n"]
+    )
+    for _ in range(3):
+        assert b.exhausted() is None
+        b.listing_started()
+        clock.now += 20
+        b.listing_finished()
+    # 実測 20 秒/件: 60 秒経過 + 処理中1件 + 次の1件 = 100 秒 > 期限 90 秒
+    b.listing_started()
+    assert b.exhausted() == budget.BUDGET_TIME
+
+
+def test_exhausted_by_api_calls_counts_resumed_calls():
+    calls = {"n": 100}
+    b = budget.RunBudget(
+        0, 50, 0, budget.ListingCostEstimate(None, 10.0), api_calls_before=35,
+        clock=_Clock(), api_call_count=lambda: calls["n"],
+    )
+    assert b.api_calls_used() == 35
+    assert b.exhausted() is None
+    calls["n"] += 6
+    assert b.exhausted() == budget.BUDGET_API_CALLS
@@ -0,0 +1,102 @@
+"""catalog_sync（ローカルカタログの完全同期・差分同期）のユニットテスト。"""
+from datetime import datetime, timedelta, timezone
+
+from app.ebay import models
+from app.ebay.trading import SellerEvent
+from app.job import catalog_sync
+from app.store import repo
+
+
+def _item(item_id, n_images=2):
+    urls = [f"https://i.ebayimg.com/{item_id}/{n}.jpg" for n in range(n_images)]
+    return models.ItemSummary(
+        item_id=item_id,
+        item_web_url=f"https://www.ebay.com/itm/{item_id}",
+        image=models.ImageInfo(image_url=urls[0]),
+        additional_images=[models.ImageInfo(image_url=u) for u in urls[1:]],
+        seller=models.Seller(username="me", user_id="me"),
+        title=f"Title {item_id}",
+    )
+
+
+NOW = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_first_sync_is_full_and_round_trips(conn, monkeypatch):
+    monkeypatch.setattr(
+        catalog_sync, "get_my_ebay_selling_active",
+        lambda token, seller, max_total, failed_site_ids: [_item("1", 3), _item("2")],
+    )
+    result = catalog_sync.sync_catalog(conn, "me", "token", now=NOW)
+    assert (result.mode, result.upserted) == ("full", 2)
+    loaded = catalog_sync.load_catalog_summaries(conn, "me")
+    assert sorted(s.item_id for s in loaded) == ["1", "2"]
+    one = next(s for s in loaded if s.item_id == "1")
+    assert one.image_urls(12) == _item("1", 3).image_urls(12)
+    assert one.is_from_any_seller(["me"])
+
+
+def test_delta_sync_applies_seller_events(conn, monkeypatch):
+    monkeypatch.setattr(
+        catalog_sync, "get_my_ebay_selling_active",
+        lambda token, seller, max_total, failed_site_ids: [_item("1"), _item("2")],
+    )
+    catalog_sync.sync_catalog(conn, "me", "token", now=NOW)
+
+    calls = []
+
+    def _events(token, seller, mod_from, mod_to):
+        calls.append((mod_from, mod_to))
+        return [
+            SellerEvent(item_id="3", listing_status="Active", item=_item("3")),
+            SellerEvent(item_id="1", listing_status="Completed", item=None),
+        ]
+
+    monkeypatch.setattr(catalog_sync, "get_seller_events", _events)
+    later = NOW + timedelta(days=1)
+    result = catalog_sync.sync_catalog(conn, "me", "token", now=later)
+    assert result.mode == "delta"
+    assert calls == [(NOW - catalog_sync.DELTA_SYNC_OVERLAP, later)]
+    assert sorted(s.item_id for s in catalog_sync.load_catalog_summaries(conn, "me")) == ["2", "3"]
+    assert repo.get_catalog_sync_state(conn, "me").last_delta_sync_at.startswith("2026-10-02")
+
+
+def test_full_sync_reconciles_missing_listings(conn, monkeypatch):
+    inventory = [[_item("1"), _item("2")], [_item("2")]]
+    monkeypatch.setattr(
+        catalog_sync, "get_my_ebay_selling_active",
+        lambda token, seller, max_total, failed_site_ids: inventory.pop(0),
+    )
+    catalog_sync.sync_catalog(conn, "me", "token", now=NOW)
+    result = catalog_sync.sync_catalog(
+        conn, "me", "token", full_sync_interval_days=7, now=NOW + timedelta(days=8)
+    )
+    assert (result.mode, result.ended) == ("full", 1)
+    assert [s.item_id for s in catalog_sync.load_catalog_summaries(conn, "me")] == ["2"]
+
+
+def test_partial_full_sync_does_not_end_listings(conn, monkeypatch):
+    def _active(token, seller, max_total, failed_site_ids):
+        failed_site_ids.append(3)
+        return [_item("2")]
+
+    catalog_sync.apply_full_listing(conn, "me", [_item("1"), _item("2")], True, NOW)
+    monkeypatch.setattr(catalog_sync, "get_my_ebay_selling_active", _active)
+    result = catalog_sync.sync_catalog(conn, "me", "token", force_full=True, now=NOW + timedelta(days=1))
+    assert result.ended == 0
+    assert len(catalog_sync.load_catalog_summaries(conn, "me")) == 2
+
+
+def test_full_sync_of_large_store_is_complete_and_enables_delta(conn, monkeypatch):
+    # run の処理件数（既定 1000 件）を超えるストアでも完全同期になり、次回から差分同期する
+    requested = []
+
+    def _active(token, seller, max_total, failed_site_ids):
+        requested.append(max_total)
+        return [_item(str(i)) for i in range(2500)]
+
+    monkeypatch.setattr(catalog_sync, "get_my_ebay_selling_active", _active)
+    result = catalog_sync.sync_catalog(conn, "me", "token", now=NOW)
+    assert requested[0] > 2500 and result.upserted == 2500
+    assert not catalog_sync.needs_full_sync(conn, "me", 7, NOW + timedelta(days=1))
+    assert len(catalog_sync.load_catalog_summaries(conn, "me")) == 2500
@@ -0,0 +1,102 @@
+"""ホストごとの並列数の自動調整（AIMD）のテスト。"""
+import threading
+
+import pytest
+import requests
+
+from app.util import concurrency
+from app.util.concurrency import AimdLimiter, HostLimitConfig
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def _limiter(initial=4, min_limit=1, max_limit=8, latency=1.0):
+    clock = FakeClock()
+    return AimdLimiter(HostLimitConfig("api.ebay.com", initial, min_limit, max_limit, latency), clock), clock
+
+
+def test_healthy_responses_increase_and_congestion_halves_once():
+    limiter, clock = _limiter()
+    for _ in range(5):
+        with limiter.slot():
+            clock.now += 0.5
+    assert limiter.level == 5
+    # 遅い成功・404 では増やさない
+    with limiter.slot():
+        clock.now += 2.0
+    with limiter.slot() as outcome:
+        outcome.status = 404
+    assert limiter.level == 5
+
+    # 同時に始まったリクエストが続けて 429 になっても1回だけ減らす
+    slots = [limiter.slot(), limiter.slot()]
+    for s in slots:
+        s.__enter__()
+    clock.now += 0.1
+    for s in slots:
+        err = _http_error(429)
+        assert not s.__exit__(type(err), err, None)
+    assert limiter.level == 2 and limiter.decreases == 1
+    clock.now += 0.1
+    with pytest.raises(requests.Timeout):
+        with limiter.slot():
+            raise requests.Timeout()
+    assert limiter.level == 1 and (limiter.low, limiter.high) == (1, 5)
+
+
+def test_slot_blocks_at_the_current_level():
+    limiter, _clock = _limiter(initial=1)
+    entered = threading.Event()
+    holder = limiter.slot()
+    holder.__enter__()
+
+    def _second():
+        with limiter.slot():
+            entered.set()
+
+    t = threading.Thread(target=_second)
+    t.start()
+    assert not entered.wait(0.05)
+    holder.__exit__(None, None, None)
+    assert entered.wait(1.0)
+    t.join()
+
+
+def test_configure_keeps_learned_level_and_limits_only_configured_hosts():
+    hosts = concurrency.host_limits_from_config({"api.ebay.com": {"initial": 2, "max": 4}}, default_initial=6)
+    by_host = {h.host: h for h in hosts}
+    assert by_host["api.ebay.com"].initial == 2 and by_host["i.ebayimg.com"].initial == 6
+    try:
+        concurrency.configure(hosts, enabled=True)
+        limiter = concurrency.limiter_for("https://api.ebay.com/buy/browse/v1/item/")
+        with limiter.slot() as outcome:
+            outcome.status = 503
+        concurrency.configure(hosts, enabled=True)
+        assert concurrency.limiter_for("https://api.ebay.com/x") is limiter and limiter.level == 1
+        assert concurrency.limiter_for("https://example.com/x") is None
+        assert concurrency.max_level("i.ebayimg.com", 10) == 32
+    finally:
+        concurrency.configure((), enabled=False)
+    assert concurrency.limiter_for("https://api.ebay.com/x") is None
+
+
+def test_shared_executor_grows_without_breaking_callers_of_the_old_pool():
+    small = concurrency.shared_executor("test-grow", 1)
+    assert concurrency.shared_executor("test-grow", 1) is small
+    large = concurrency.shared_executor("test-grow", 4)
+    assert large is not small
+    # 差し替え前に取得したプールへの投入も失敗しない
+    assert small.submit(lambda: 1).result() == 1
+    assert large.submit(lambda: 2).result() == 2
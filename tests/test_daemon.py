@@ -0,0 +1,106 @@
+"""常駐モードのスケジューラと検知の再確認のテスト。"""
+import json
+import threading
+from datetime import datetime, timezone
+
+from app.job import daemon, reverify
+from app.store import repo
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_daemon_runs_due_tasks_records_failures_and_respects_last_run(conn, tmp_path):
+    clock = FakeClock(1_000_000.0)
+    calls: list[str] = []
+    stop = threading.Event()
+
+    def _quick():
+        calls.append("quick")
+        clock.now += 10
+
+    def _verify():
+        calls.append("verify")
+        raise SystemExit(1)
+
+    # 前回の実行から間隔が経っていない full は実行しない
+    repo.set_maintenance_last_run(conn, "daemon:full", daemon._iso(clock.now - 600))
+    tasks = [
+        daemon.DaemonTask("full", 3600, lambda: calls.append("full")),
+        daemon.DaemonTask("quick", 60, _quick),
+        daemon.DaemonTask("verify", 3600, _verify),
+    ]
+    status_file = tmp_path / "status.json"
+    d = daemon.Daemon(tasks, conn, str(status_file), jitter_ratio=0.0, clock=clock)
+    assert tasks[0].next_run_at == clock.now + 3000
+
+    for task in sorted(tasks, key=lambda t: t.next_run_at)[:2]:
+        d.run_task(task)
+    stop.set()
+    d.run(stop)
+
+    assert calls == ["quick", "verify"]
+    assert tasks[1].next_run_at == 1_000_000.0 + 60
+    status = json.loads(status_file.read_text(encoding="utf-8"))
+    assert status["state"] == "stopped"
+    assert status["tasks"]["verify"]["last_status"] == "error"
+    assert status["tasks"]["quick"]["runs"] == 1
+    assert repo.get_maintenance_last_run(conn, "daemon:quick") == daemon._iso(1_000_000.0)
+
+
+def test_reverify_marks_ended_infringing_listings_removed(conn):
+    repo.create_run(conn, "r1")
+    for i in range(4):
+        repo.insert_detection(
+            conn, "r1", "mine", "u", 0, "u", "h", f"v1|{i}|0", "u", "seller", "u", "h", "sha256", "s", "b"
+        )
+    repo.update_detection_status(conn, 2, "SENT")
+    repo.update_detection_status(conn, 3, "SENT")  # v1|1|0 と v1|2|0
+    checked: list[str] = []
+
+    def _check(item_ids, token):
+        checked.extend(item_ids)
+        # v1|3|0 は判定できなかった（結果なし）→ 掲載中のまま、次回また確認する
+        return {"v1|0|0": False, "v1|1|0": True, "v1|2|0": False}
+
+    now = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    result = reverify.reverify_detections(conn, "t", 10, 24, now=now, check_availability=_check)
+    assert (result.checked, result.removed) == (3, 2)
+    rows = conn.execute("SELECT infringing_item_id, status, previous_status FROM detections").fetchall()
+    assert {r[0]: (r[1], r[2]) for r in rows} == {
+        "v1|0|0": ("REMOVED", "NEW"),
+        "v1|1|0": ("SENT", None),
+        "v1|2|0": ("REMOVED", "SENT"),
+        "v1|3|0": ("NEW", None),
+    }
+    # 確認したばかりの検知は min_interval_hours が経つまで再確認しない（判定できなかったものは再確認する）
+    again = reverify.reverify_detections(conn, "t", 10, 24, now=now, check_availability=_check)
+    assert again.checked == 0 and checked[4:] == ["v1|3|0"]
+
+
+def test_status_file_is_refreshed_while_a_task_runs(conn, tmp_path):
+    status_file = tmp_path / "status.json"
+    seen: list[dict] = []
+    progress: dict = {}
+
+    def _long_task():
+        progress.update(listings_scanned=3, listings_total=10)
+        first = json.loads(status_file.read_text(encoding="utf-8"))["updated_at"]
+        for _ in range(200):
+            status = json.loads(status_file.read_text(encoding="utf-8"))
+            if status["updated_at"] != first and status.get("progress"):
+                seen.append(status)
+                return
+            threading.Event().wait(0.01)
+
+    task = daemon.DaemonTask("full", 3600, _long_task)
+    d = daemon.Daemon([task], conn, str(status_file), heartbeat_sec=0.02, progress=progress)
+    d.run_task(task)
+    assert seen and seen[0]["state"] == "running" and seen[0]["current_task"] == "full"
+    assert seen[0]["progress"]["listings_scanned"] == 3
+    assert json.loads(status_file.read_text(encoding="utf-8"))["state"] == "idle"
@@ -0,0 +1,60 @@
+"""dashboard_stats（トリガーで維持するダッシュボード集計）のテスト。"""
+from datetime import datetime, timezone
+
+from app.job import retention
+from app.store import db, repo
+
+
+def _insert_detection(conn, run_id, infringing_item_id):
+    return repo.insert_detection(
+        conn, run_id, "1", "u", 0, "i", "a", infringing_item_id, "v", "s", "j", "b", "sha256", "subj", "body",
+    )
+
+
+def test_triggers_track_inserts_updates_and_deletes(conn):
+    repo.create_run(conn, "r1")
+    repo.create_run(conn, "r2")
+    d1 = _insert_detection(conn, "r1", "900")
+    _insert_detection(conn, "r2", "901")
+    repo.update_detection_status(conn, d1.detection_id, "SENT")
+
+    stats = repo.get_dashboard_stats(conn)
+    assert (stats.total_runs, stats.total_detections, stats.new_detections, stats.sent_detections) == (2, 2, 1, 1)
+    assert stats.last_run_id == "r2"
+
+    repo.delete_run(conn, "r2")
+    stats = repo.get_dashboard_stats(conn)
+    assert (stats.total_runs, stats.total_detections, stats.new_detections) == (1, 1, 0)
+    assert stats.last_run_id == "r1"
+    assert stats == repo.rebuild_dashboard_stats(conn)
+
+
+def test_retention_keeps_totals(conn):
+    conn.execute(
+        "INSERT INTO runs (run_id, started_at, finished_at) VALUES ('old', '2025-01-01T00:00:00Z', '2025-01-01T01:00:00Z')"
+    )
+    conn.commit()
+    d = _insert_detection(conn, "old", "900")
+    conn.execute("UPDATE detections SET detected_at = '2025-01-01T00:00:00Z' WHERE detection_id = ?", (d.detection_id,))
+    repo.update_detection_status(conn, d.detection_id, "SENT")
+    before = repo.get_dashboard_stats(conn)
+
+    retention.run_retention(conn, 180, 90, 0, now=datetime(2026, 10, 1, tzinfo=timezone.utc))
+    after = repo.get_dashboard_stats(conn)
+    assert (after.total_runs, after.total_detections, after.sent_detections) == (
+        before.total_runs, before.total_detections, before.sent_detections,
+    )
+    assert after == repo.rebuild_dashboard_stats(conn)
+
+
+def test_seeded_from_existing_data(tmp_path):
+    # user_version 導入前（統計テーブルなし）の DB をマイグレーションすると既存データから初期化される
+    path = str(tmp_path / "state.db")
+    c = db.get_connection(path)
+    c.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, started_at TEXT NOT NULL, finished_at TEXT)")
+    c.execute("INSERT INTO runs VALUES ('r1', '2026-01-01T00:00:00Z', NULL)")
+    c.commit()
+    db.init_schema(c)
+    stats = repo.get_dashboard_stats(c)
+    assert (stats.total_runs, stats.last_run_id) == (1, "r1")
+    c.close()
@@ -0,0 +1,87 @@
+"""app.store.db の接続管理のテスト。"""
+import sqlite3
+import threading
+
+import pytest
+
+from app.store import db
+
+
+def test_get_connection_applies_wal_and_pragmas(tmp_path):
+    conn = db.get_connection(str(tmp_path / "state.db"))
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+def test_read_connection_is_read_only_and_sees_writes(tmp_path):
+    path = str(tmp_path / "state.db")
+    reader = db.get_read_connection(path)
+    assert reader.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+
+    writer = db.get_thread_connection(path)
+    writer.execute("INSERT INTO runs (run_id, started_at) VALUES ('r1', '2026-01-01T00:00:00Z')")
+    writer.commit()
+    assert reader.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("DELETE FROM runs")
+    db.close_thread_connections()
+
+
+def test_thread_connection_reused_per_thread(tmp_path):
+    path = str(tmp_path / "state.db")
+    main_conn = db.get_thread_connection(path)
+    assert db.get_thread_connection(path) is main_conn
+
+    other: list = []
+    t = threading.Thread(target=lambda: other.append(db.get_thread_connection(path)))
+    t.start()
+    t.join()
+    assert other[0] is not main_conn
+    db.close_thread_connections()
+
+
+def test_migrate_sets_user_version_and_is_idempotent(tmp_path):
+    conn = db.get_connection(str(tmp_path / "state.db"))
+    try:
+        assert db.get_schema_version(conn) == 0
+        assert db.migrate(conn) == db.SCHEMA_VERSION
+        assert db.get_schema_version(conn) == db.SCHEMA_VERSION
+        assert db.migrate(conn) == db.SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM dashboard_stats").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_init_schema_runs_once_per_db_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.db")
+    calls = []
+    real_migrate = db.migrate
+    monkeypatch.setattr(db, "migrate", lambda conn: calls.append(1) or real_migrate(conn))
+    for _ in range(3):
+        conn = db.get_connection(path)
+        db.init_schema(conn)
+        conn.close()
+    db.get_read_connection(path)
+    db.close_thread_connections()
+    assert len(calls) == 1
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    conn = db.get_connection(str(tmp_path / "state.db"))
+
+    def _broken(c):
+        c.execute("CREATE TABLE partial (x INTEGER)")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(db, "_MIGRATIONS", [_broken])
+    monkeypatch.setattr(db, "SCHEMA_VERSION", 1)
+    with pytest.raises(RuntimeError):
+        db.migrate(conn)
+    assert db.get_schema_version(conn) == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'partial'").fetchone() is None
+    conn.close()
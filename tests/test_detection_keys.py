@@ -0,0 +1,44 @@
+"""DetectionKeySet（検知キーのメモリ上の集合）のユニットテスト。"""
+from app.store import db, repo
+from app.store.detection_keys import DetectionKeySet
+from app.store.writer import BatchWriter
+
+
+def test_add_and_contains():
+    keys = DetectionKeySet()
+    assert keys.add("1", "900")
+    assert not keys.add("1", "900")
+    assert ("1", "900") in keys
+    assert ("900", "1") not in keys
+
+
+def test_switches_to_compact_fingerprints_when_large():
+    keys = DetectionKeySet.from_pairs(((str(i), "x") for i in range(10)), compact_threshold=5)
+    assert keys.compact
+    assert len(keys) == 10
+    assert ("3", "x") in keys
+    assert ("3", "y") not in keys
+    assert not keys.add("3", "x")
+
+
+def test_writer_dedupes_against_keys_loaded_from_db(tmp_path):
+    path = str(tmp_path / "state.db")
+    conn = db.get_connection(path)
+    db.init_schema(conn)
+    repo.create_run(conn, "r1")
+    common = dict(
+        run_id="r1", your_item_url="u", your_image_index=0, your_image_url="i",
+        your_image_sha256="a", infringing_item_url="v", infringing_seller_display="s",
+        infringing_image_url="j", infringing_image_sha256="b", match_evidence="e",
+        message_subject="s", message_body="b",
+    )
+    repo.insert_detection(conn, your_item_id="1", infringing_item_id="900", **common)
+
+    keys = DetectionKeySet.from_pairs(repo.iter_detection_keys(conn))
+    with BatchWriter(path, detection_keys=keys) as w:
+        assert w.has_detection("1", "900")
+        assert not w.insert_detection("1", "900", **common)
+        assert w.insert_detection("1", "901", **common)
+        assert w.has_detection("1", "901")
+    assert conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0] == 2
+    conn.close()
@@ -18,3 +18,34 @@ def test_empty_bytes():
     h = sha256_hex(b"")
     assert len(h) == 64
     assert all(c in "0123456789abcdef" for c in h)
+
+
+def _png_bytes(size=(64, 48), color=(200, 30, 30)):
+    import io
+    import PIL.Image
+
+    buf = io.BytesIO()
+    PIL.Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_fingerprint_matches_individual_hashes():
+    from app.match.hashing import ahash_image, dhash_image, fingerprint_image, phash_image
+
+    data = _png_bytes()
+    fp = fingerprint_image(data)
+    assert fp.sha256 == sha256_hex(data)
+    assert fp.phash == phash_image(data)
+    assert fp.ahash == ahash_image(data)
+    assert fp.dhash == dhash_image(data)
+    # 候補画像用（既定）はデコード済みの画像を保持しない
+    assert fp.image is None
+    assert fingerprint_image(data, keep_image=True).image is not None
+
+
+def test_fingerprint_invalid_image():
+    from app.match.hashing import fingerprint_image
+
+    fp = fingerprint_image(b"not an image")
+    assert fp.sha256 == sha256_hex(b"not an image")
+    assert fp.phash is None and fp.image is None
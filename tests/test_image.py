@@ -0,0 +1,44 @@
+"""image ユーティリティ（検索用ペイロード）のユニットテスト。"""
+import base64
+import io
+import os
+
+import PIL.Image
+
+from app.util import image
+
+
+def _jpeg_bytes(size):
+    buf = io.BytesIO()
+    PIL.Image.new("RGB", size, (10, 120, 200)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_build_search_payload_downscales_longest_edge(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_PAYLOAD_CACHE_DIR", str(tmp_path))
+    payload = image.build_search_payload(_jpeg_bytes((2000, 1000)), max_edge=500)
+    decoded = PIL.Image.open(io.BytesIO(base64.b64decode(payload)))
+    assert decoded.size == (500, 250)
+
+
+def test_build_search_payload_uses_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_PAYLOAD_CACHE_DIR", str(tmp_path))
+    raw = _jpeg_bytes((300, 200))
+    first = image.build_search_payload(raw, sha256="abc", max_edge=128)
+    assert (tmp_path / "abc_128.b64").read_text() == first
+    image._payload_cache.clear()
+    (tmp_path / "abc_128.b64").write_text("cached")
+    assert image.build_search_payload(raw, sha256="abc", max_edge=128) == "cached"
+
+
+def test_prune_payload_cache_by_age_then_size(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_PAYLOAD_CACHE_DIR", str(tmp_path))
+    now = 1_000_000_000.0
+    for name, age_days in (("old", 40), ("mid", 5), ("new", 1)):
+        path = tmp_path / f"{name}_1024.b64"
+        path.write_text("x" * 600_000)
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+    # 30 日より古いものを消し、残り 1.2MB を 1MB 以下にするため最終利用の古い mid を消す
+    assert image.prune_payload_cache(30, 1, now=now) == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["new_1024.b64"]
+    assert image.prune_payload_cache(0, 0, now=now) == 0
@@ -0,0 +1,79 @@
+"""item_fetcher（一括取得・キャッシュ）のユニットテスト。"""
+import pytest
+from app.ebay import item_fetcher
+
+
+class _FakeResponse:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.content = b"x"
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def _item(item_id):
+    return {
+        "itemId": item_id,
+        "itemWebUrl": f"https://www.ebay.com/itm/{item_id}",
+        "image": {"imageUrl": f"https://i.ebayimg.com/{item_id}.jpg"},
+        "seller": {"username": "other"},
+    }
+
+
+@pytest.fixture
+def fake_get(monkeypatch):
+    calls = []
+
+    def _get(url, params=None, headers=None, timeout=None):
+        ids = params["item_ids"].split(",")
+        calls.append(ids)
+        return _FakeResponse({"items": [_item(i) for i in ids if i != "v1|999|0"]})
+
+    monkeypatch.setattr(item_fetcher.requests, "get", _get)
+    monkeypatch.setattr(item_fetcher, "build_headers", lambda token: {})
+    return calls
+
+
+def test_to_rest_item_id_converts_legacy_id():
+    assert item_fetcher.to_rest_item_id("123") == "v1|123|0"
+    assert item_fetcher.to_rest_item_id("v1|123|0") == "v1|123|0"
+
+
+def test_fetch_items_by_ids_batches_by_20(fake_get):
+    ids = [str(i) for i in range(1, 46)]
+    result = item_fetcher.fetch_items_by_ids(ids, "token")
+    assert len(result) == 45
+    assert sorted(len(c) for c in fake_get) == [5, 20, 20]
+    assert result["1"].item_id == "v1|1|0"
+
+
+def test_fetch_items_by_ids_uses_cache(fake_get):
+    cache = item_fetcher.ItemCache()
+    item_fetcher.fetch_items_by_ids(["1", "999"], "token", cache=cache)
+    result = item_fetcher.fetch_items_by_ids(["1", "v1|999|0"], "token", cache=cache)
+    assert len(fake_get) == 1
+    assert list(result) == ["1"]
+
+
+def test_fetch_item_availability_ends_only_items_confirmed_missing(monkeypatch):
+    single_calls = []
+
+    def _get(url, params=None, headers=None, timeout=None):
+        if url.endswith("/item/"):
+            # 一括取得の応答から 2 と 3 が抜けている
+            return _FakeResponse({"items": [_item("v1|1|0")]})
+        single_calls.append(params["legacy_item_id"])
+        status = {"2": 404, "3": 500}[params["legacy_item_id"]]
+        return _FakeResponse({}, status_code=status)
+
+    monkeypatch.setattr(item_fetcher.requests, "get", _get)
+    monkeypatch.setattr(item_fetcher, "build_headers", lambda token: {})
+    result = item_fetcher.fetch_item_availability(["1", "2", "3"], "token")
+    assert result == {"1": True, "2": False}
+    assert single_calls == ["2", "3"]
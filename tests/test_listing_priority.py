@@ -0,0 +1,94 @@
+"""出品のリスクによる優先度付き選定のテスト。"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.config import default_config
+from app.job import listing_priority
+from app.job.params import RunParams
+from app.store import repo
+
+NOW = datetime(2026, 3, 31, tzinfo=timezone.utc)
+
+
+def _scanned(conn, listing_item_id, at):
+    conn.execute("INSERT INTO listings_scan_state VALUES (?, ?, 'r1', 'success')", (listing_item_id, at))
+    conn.commit()
+
+
+def _detected(conn, your_item_id, infringing_item_id):
+    conn.execute(
+        """
+        INSERT INTO detections (
+            run_id, detected_at, your_item_id, your_item_url, your_image_index, your_image_url,
+            your_image_sha256, infringing_item_id, infringing_item_url, infringing_seller_display,
+            infringing_image_url, infringing_image_sha256, match_evidence
+        ) VALUES ('r1', '2026-03-01T00:00:00Z', ?, '', 0, '', '', ?, '', 'x', '', '', '')
+        """,
+        (your_item_id, infringing_item_id),
+    )
+    conn.commit()
+
+
+def test_term_risks_exclude_own_detection():
+    titles = {
+        "a": "Sanrio Hello Kitty pouch",
+        "b": "Sanrio Kuromi keychain",
+        "c": "Sanrio My Melody plush",
+        "d": "Plain cotton towel",
+    }
+    risks = listing_priority.term_risks(titles, detected_ids={"a", "b"})
+    # c は sanrio を含む他の出品2件がどちらも検知あり: 2 / (3 - 1 + 5)
+    assert risks["c"] == pytest.approx(2 / 7)
+    # a 自身の検知は数えない: 1 / (3 - 1 + 5)
+    assert risks["a"] == pytest.approx(1 / 7)
+    assert risks["d"] == 0.0
+
+
+def test_risk_and_rescan_interval():
+    assert listing_priority.listing_risk(0, 0.0, False) == 0.0
+    assert listing_priority.listing_risk(1, 0.0, False) == pytest.approx(0.5)
+    assert listing_priority.listing_risk(1, 0.0, True) == pytest.approx(0.75)
+    assert listing_priority.rescan_interval_days(0.0, 1, 30) == pytest.approx(30)
+    assert listing_priority.rescan_interval_days(1.0, 1, 30) == pytest.approx(1)
+    assert 1 < listing_priority.rescan_interval_days(0.5, 1, 30) < 30
+
+
+def test_select_by_priority_rescans_high_risk_daily_and_cold_monthly(run_conn):
+    params = RunParams.from_config(default_config())
+    # hot: 検知3件・2日前にスキャン → 間隔は約1.5日で再スキャン時期
+    for i in range(3):
+        _detected(run_conn, "hot", f"x{i}")
+    _scanned(run_conn, "hot", "2026-03-29T00:00:00Z")
+    # cold: 検知なし・10日前 → まだ30日の間隔内
+    _scanned(run_conn, "cold", "2026-03-21T00:00:00Z")
+    # stale: 検知なし・35日前 → 時期を過ぎているが、hot より経過の割合が小さい
+    _scanned(run_conn, "stale", "2026-02-24T00:00:00Z")
+    titles = {"hot": "Brand bag", "cold": "Plain towel", "stale": "Plain cup", "new": "Plain mug"}
+    selected = listing_priority.select_by_priority(
+        run_conn, params, ["cold", "stale", "hot", "new"], titles, now=NOW
+    )
+    assert [lid for lid, _ in selected] == ["new", "hot", "stale"]
+    assert selected[1] == ("hot", "2026-03-29T00:00:00Z")
+
+
+def test_risk_rows_count_archived_detections_and_catalog_first_seen(run_conn):
+    _detected(run_conn, "a", "x1")
+    run_conn.execute(
+        "INSERT INTO detections_archive VALUES (99, 'a', 'x2', '2026-01-01T00:00:00Z', 'SENT', "
+        "'2026-02-01T00:00:00Z', x'00')"
+    )
+    run_conn.execute(
+        "INSERT INTO my_listings (item_id, seller_username, item_web_url, first_seen_at, last_seen_at) "
+        "VALUES ('b', 'me', '', '2026-03-30T00:00:00Z', '2026-03-30T00:00:00Z')"
+    )
+    run_conn.commit()
+    rows = repo.get_listing_risk_rows(run_conn, ["b", "a"])
+    assert [(r.listing_item_id, r.detections_count, r.first_seen_at) for r in rows] == [
+        ("b", 0, "2026-03-30T00:00:00Z"),
+        ("a", 2, None),
+    ]
+    params = RunParams.from_config(default_config())
+    b, a = listing_priority.prioritize(rows, {}, params, now=NOW)
+    # b は新着、a は過去の検知2件
+    assert b.risk == pytest.approx(0.5) and a.risk == pytest.approx(0.75)
@@ -0,0 +1,42 @@
+"""複数アカウントの設定と出品選定のテスト。"""
+import threading
+
+from app.config import default_config
+from app.job import listing_selector
+from app.job.accounts import Account, load_accounts
+from app.job.params import RunParams
+
+
+def test_load_accounts_defaults_to_env_seller(monkeypatch):
+    monkeypatch.setenv("EBAY_SELLER_USERNAME", "me")
+    assert load_accounts(default_config()) == [Account("me", "EBAY_USER_REFRESH_TOKEN")]
+    config = {"accounts": [
+        {"seller_username": "a"},
+        {"seller_username": "B", "refresh_token_env": "TOKEN_B"},
+        {"seller_username": "b"},
+        {},
+    ]}
+    assert load_accounts(config) == [Account("a"), Account("B", "TOKEN_B")]
+
+
+def test_multiple_accounts_are_selected_concurrently_and_interleaved(monkeypatch):
+    per_account = {
+        "a": ([("a1", None), ("a2", None), ("a3", None)], {"a1": "A1", "a2": "A2", "a3": "A3"}),
+        "b": ([("b1", None), ("a2", None)], {"b1": "B1", "a2": "A2"}),
+    }
+    threads = set()
+
+    def _select(params, account, from_beginning, new_only, timings):
+        threads.add(threading.current_thread().name)
+        return per_account[account.seller_username]
+
+    monkeypatch.setattr(listing_selector, "_select_account_listings_in_thread", _select)
+    params = RunParams.from_config(default_config())
+    selected, summary_map, seller_names = listing_selector.select_listings(
+        None, params, [Account("a"), Account("b")], None
+    )
+    # 交互に並べ、両方のアカウントに出た出品は1回だけ
+    assert [lid for lid, _ in selected] == ["a1", "b1", "a2", "a3"]
+    assert set(summary_map) == {"a1", "a2", "a3", "b1"}
+    assert seller_names == ["a", "b"]
+    assert all(name.startswith("account") for name in threads)
@@ -0,0 +1,97 @@
+"""ListingPipeline（ステージ間の有界キュー・集計・例外）のテスト。"""
+import threading
+import time
+
+import pytest
+
+from app.config import default_config
+from app.ebay import models
+from app.job import pipeline, processor
+from app.job.params import RunParams
+
+
+def _summary(item_id, images):
+    return models.ItemSummary(
+        item_id=item_id,
+        item_web_url=f"https://www.ebay.com/itm/{item_id}",
+        image=models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}_0.jpg") if images else None,
+        additional_images=[
+            models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}_{i}.jpg") for i in range(1, images)
+        ],
+        seller=models.Seller(username="me", user_id="me"),
+    )
+
+
+def _ctx(**run):
+    config = default_config()
+    config["run"].update(run)
+    return processor.ProcessContext(
+        # ステージを差し替えるため DB には書き込まない
+        run_id="r1", params=RunParams.from_config(config), seller_names=["me"], token="t", writer=None
+    )
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    def _search(task, ctx):
+        time.sleep(0.005)  # 検索が遅いステージ
+        task.listing.add(images=1)
+        return True
+
+    monkeypatch.setattr(processor, "resolve_image", lambda task, ctx: True)
+    monkeypatch.setattr(processor, "search_image", _search)
+    monkeypatch.setattr(processor, "download_candidates", lambda task, ctx: True)
+    monkeypatch.setattr(processor, "match_candidates", lambda task, ctx: task.listing.add(candidates=2))
+
+
+def test_aggregates_per_listing_with_bounded_queues(fake_stages):
+    summaries = {str(i): _summary(str(i), images=i % 3) for i in range(20)}
+    done = {}
+    lock = threading.Lock()
+
+    def _done(listing):
+        with lock:
+            assert listing.listing_item_id not in done
+            done[listing.listing_item_id] = listing.result()
+
+    with pipeline.ListingPipeline(
+        _ctx(stage_queue_size=2, search_workers=1), summaries.get, _done
+    ) as p:
+        for lid in summaries:
+            p.submit(lid)
+
+    assert len(done) == 20
+    for lid, summary in summaries.items():
+        n = len(summary.image_urls(3))
+        assert done[lid] == ((n, 2 * n, 0, 0) if n else (0, 0, 0, 1))
+    metrics = {m.name: m for m in p.metrics()}
+    assert metrics["listing"].processed == 20
+    assert metrics["search"].processed == sum(len(s.image_urls(3)) for s in summaries.values())
+    assert all(m.max_depth <= m.queue_size for m in metrics.values())
+    # 検索ステージが詰まり、上流は有界キューで待たされる
+    assert metrics["search"].max_depth == 2
+
+
+def test_stage_error_aborts_and_is_raised(fake_stages, monkeypatch):
+    def _boom(task, ctx):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(processor, "download_candidates", _boom)
+    done = []
+    p = pipeline.ListingPipeline(_ctx(), lambda lid: _summary(lid, 2), done.append)
+    p.submit("1")
+    with pytest.raises(RuntimeError, match="boom"):
+        p.close()
+    assert p.failed and done == []
+
+
+def test_resumed_listing_skips_done_images(fake_stages):
+    done = []
+    done_images = {"1": {0: processor.ImageResult(1, 4, 0, 0)}}
+    with pipeline.ListingPipeline(
+        _ctx(), lambda lid: _summary(lid, 3), done.append, done_images=done_images
+    ) as p:
+        p.submit("1")
+    # 完了済みの画像0は処理せず、その結果を集計に含める
+    assert done[0].result() == (3, 8, 0, 0)
+    assert {m.name: m.processed for m in p.metrics()}["search"] == 2
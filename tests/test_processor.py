@@ -0,0 +1,168 @@
+"""processor（画像検索の候補収集）のユニットテスト。"""
+import pytest
+
+from app.config import default_config
+from app.ebay import models
+from app.job import processor
+from app.job.params import RunParams
+from app.match.hashing import ImageFingerprint
+
+
+def _summary(item_id, seller="other"):
+    return models.ItemSummary(
+        item_id=item_id,
+        item_web_url=f"https://www.ebay.com/itm/{item_id}",
+        image=models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}.jpg"),
+        additional_images=[],
+        seller=models.Seller(username=seller, user_id=None),
+    )
+
+
+class _FakeDownloader:
+    """ダウンロードせず、URL ごとに与えた pHash 距離のハッシュを返す。"""
+
+    def __init__(self, distances=None):
+        self.submitted = []
+        self.distances = distances or {}
+
+    def submit(self, candidates):
+        self.submitted.extend(u for _, u in candidates)
+
+    def fingerprint(self, url):
+        return ImageFingerprint(
+            sha256=url, phash=100 - self.distances.get(url, 64), ahash=None, dhash=None, image=None
+        )
+
+
+_OUR_FP = ImageFingerprint(sha256="ours", phash=100, ahash=None, dhash=None, image=None)
+
+
+def _params(**run):
+    config = default_config()
+    config["run"].update(run)
+    return RunParams.from_config(config)
+
+
+def _fake_search(pages_by_marketplace, calls=None):
+    def _search(image_b64, limit=50, offset=0, marketplace_id=None):
+        if calls is not None:
+            calls.append((marketplace_id, offset))
+        pages = pages_by_marketplace[marketplace_id]
+        if pages is None:
+            raise RuntimeError("boom")
+        items = pages[offset // limit] if offset // limit < len(pages) else []
+        return models.SearchResponse(item_summaries=items, total=0, offset=offset, limit=limit)
+    return _search
+
+
+def test_multi_marketplace_search_merges_and_dedupes(monkeypatch):
+    monkeypatch.setattr(processor.browse, "search_by_image", _fake_search({
+        "EBAY_US": [[_summary("a"), _summary("b"), _summary("mine", seller="me")]],
+        "EBAY_GB": [[_summary("b"), _summary("c")]],
+        "EBAY_DE": None,
+    }))
+    downloader = _FakeDownloader()
+    cands, depths = processor._search_image_candidates(
+        "b64",
+        _OUR_FP,
+        _params(image_search_marketplaces=["EBAY_US", "EBAY_GB", "EBAY_DE"]),
+        "listing",
+        0,
+        ["me"],
+        "token",
+        None,
+        downloader,
+    )
+    assert [c.item_id for c, _ in cands] == ["a", "b", "c"]
+    assert "https://i.ebayimg.com/c.jpg" in downloader.submitted
+    assert [(d.marketplace_id, d.stop_reason) for d in depths] == [
+        ("EBAY_US", "exhausted"), ("EBAY_GB", "exhausted"), ("EBAY_DE", "error"),
+    ]
+
+
+def test_multi_marketplace_search_all_failed_returns_none(monkeypatch):
+    monkeypatch.setattr(processor.browse, "search_by_image", _fake_search({"EBAY_US": None}))
+    cands, depths = processor._search_image_candidates(
+        "b64", _OUR_FP, _params(), "listing", 0, ["me"], "token", None, _FakeDownloader()
+    )
+    assert cands is None
+    assert depths[0].stop_reason == "error"
+
+
+def _pages(n_pages, size):
+    return [[_summary(f"p{p}i{i}") for i in range(size)] for p in range(n_pages)]
+
+
+@pytest.mark.parametrize(
+    "near_pages, expected_pages, expected_reason",
+    [
+        (set(), 1, "relevance_drop"),
+        ({0}, 2, "relevance_drop"),
+        ({0, 1, 2}, 3, "max_depth"),
+    ],
+)
+def test_adaptive_paging_follows_near_band(monkeypatch, near_pages, expected_pages, expected_reason):
+    pages = _pages(5, 100)
+    calls = []
+    monkeypatch.setattr(processor.browse, "search_by_image", _fake_search({"EBAY_US": pages}, calls))
+    distances = {
+        f"https://i.ebayimg.com/p{p}i0.jpg": 25 for p in near_pages
+    }
+    cands, depth = processor._search_image_one_marketplace(
+        "b64",
+        _OUR_FP,
+        _params(candidates_per_image=100, image_search_max_depth=300),
+        "EBAY_US",
+        "listing",
+        ["me"],
+        "token",
+        None,
+        _FakeDownloader(distances),
+    )
+    assert depth.pages == expected_pages == len(calls)
+    assert depth.depth == expected_pages * 100
+    assert depth.stop_reason == expected_reason
+    assert len(cands) == expected_pages * 100
+
+
+def test_adaptive_paging_clamps_page_size_to_api_limit(monkeypatch):
+    # candidates_per_image が API の上限（200）を超えても、200 件の満杯ページを最終ページと誤判定しない
+    pages = _pages(3, 200)
+    calls = []
+    monkeypatch.setattr(processor.browse, "search_by_image", _fake_search({"EBAY_US": pages}, calls))
+    distances = {f"https://i.ebayimg.com/p{p}i0.jpg": 25 for p in range(3)}
+    _, depth = processor._search_image_one_marketplace(
+        "b64",
+        _OUR_FP,
+        _params(candidates_per_image=300, image_search_max_depth=400),
+        "EBAY_US",
+        "listing",
+        ["me"],
+        "token",
+        None,
+        _FakeDownloader(distances),
+    )
+    assert [offset for _, offset in calls] == [0, 200]
+    assert (depth.depth, depth.stop_reason) == (400, "max_depth")
+
+
+def test_fingerprint_cache_shares_candidate_hashes_across_downloaders(monkeypatch):
+    downloads = []
+
+    def _download(url):
+        downloads.append(url)
+        return None if "broken" in url else url.encode()
+
+    monkeypatch.setattr(processor, "_download_candidate_image", _download)
+    cache = processor.FingerprintCache(max_entries=2)
+    cands = [(_summary("1"), "https://i.ebayimg.com/a.jpg"), (_summary("1"), "https://i.ebayimg.com/broken.jpg")]
+    for _ in range(2):
+        # 出品（アカウント）ごとのダウンローダでも、2回目はキャッシュのハッシュを使う
+        with processor._CandidateDownloader(1, cache=cache) as downloader:
+            downloader.submit(cands)
+            assert downloader.fingerprint("https://i.ebayimg.com/a.jpg").sha256
+            assert downloader.fingerprint("https://i.ebayimg.com/broken.jpg") is None
+    assert downloads.count("https://i.ebayimg.com/a.jpg") == 1
+    # 失敗した URL はキャッシュせず再取得する
+    assert downloads.count("https://i.ebayimg.com/broken.jpg") == 2
+    assert cache.hits == 1 and len(cache) == 1
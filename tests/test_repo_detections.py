@@ -0,0 +1,61 @@
+"""検知一覧のキーセットページング・絞り込みのテスト。"""
+import pytest
+
+from app.store import repo
+from app.store.models import DetectionFilter
+
+
+@pytest.fixture
+def detections_conn(run_conn):
+    """検知 25 件を登録済みの接続。"""
+    for i in range(25):
+        row = repo.insert_detection(
+            run_conn, "r1", f"mine{i % 2}", "u", 0, "i", "a", str(1000 + i), "v", f"seller{i % 3}",
+            "j", "b", "sha256", f"subj{i}", f"body{i}",
+        )
+        # 同じ時刻の検知を含めて detection_id で順序が決まることを確認する
+        run_conn.execute(
+            "UPDATE detections SET detected_at = ? WHERE detection_id = ?",
+            (f"2026-10-{1 + i // 2:02d}T00:00:00Z", row.detection_id),
+        )
+    run_conn.commit()
+    return run_conn
+
+
+def test_keyset_pages_cover_all_rows_in_order(detections_conn):
+    seen = []
+    after = None
+    while True:
+        page = repo.query_detections_page(detections_conn, after=after, limit=10)
+        assert "message_body" not in page.columns
+        seen.extend(r[0] for r in page.rows)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    expected = [
+        r[0] for r in detections_conn.execute(
+            "SELECT detection_id FROM detections ORDER BY detected_at DESC, detection_id DESC"
+        )
+    ]
+    assert seen == expected and len(seen) == 25
+
+
+def test_filters_and_seller_counts(detections_conn):
+    flt = DetectionFilter(seller="seller1", your_item_id="mine1")
+    page = repo.query_detections_page(detections_conn, flt, limit=100)
+    seller_idx = page.columns.index("infringing_seller_display")
+    item_idx = page.columns.index("your_item_id")
+    assert page.rows and all(r[seller_idx] == "seller1" and r[item_idx] == "mine1" for r in page.rows)
+
+    dated = DetectionFilter(detected_from="2026-10-02", detected_to="2026-10-03")
+    assert len(repo.query_detections_page(detections_conn, dated).rows) == 2
+
+    counts = dict(repo.count_detections_by_seller(detections_conn))
+    assert counts == {"seller0": 9, "seller1": 8, "seller2": 8}
+
+
+def test_messages_loaded_only_for_selected(detections_conn):
+    ids = [r[0] for r in repo.query_detections_page(detections_conn, limit=2).rows]
+    messages = repo.get_detection_messages(detections_conn, ids)
+    assert set(messages) == set(ids)
+    assert all(subj.startswith("subj") and body.startswith("body") for subj, body in messages.values())
@@ -0,0 +1,38 @@
+"""listings_scan_state の選定クエリのテスト。"""
+from app.store import repo
+
+
+def _scanned(conn, listing_item_id, at):
+    conn.execute(
+        "INSERT INTO listings_scan_state VALUES (?, ?, 'r1', 'success')", (listing_item_id, at)
+    )
+    conn.commit()
+
+
+def test_never_scanned_first_then_oldest(run_conn):
+    _scanned(run_conn, "a", "2026-03-01T00:00:00Z")
+    _scanned(run_conn, "b", "2026-01-01T00:00:00Z")
+    _scanned(run_conn, "c", None)
+    selected = repo.get_listings_scan_state_for_selection(run_conn, 10, ["a", "x", "b", "c", "y"])
+    assert selected == [
+        ("x", None),
+        ("y", None),
+        ("c", None),
+        ("b", "2026-01-01T00:00:00Z"),
+        ("a", "2026-03-01T00:00:00Z"),
+    ]
+    assert repo.get_listings_scan_state_for_selection(run_conn, 2, ["a", "x", "b"]) == [
+        ("x", None),
+        ("b", "2026-01-01T00:00:00Z"),
+    ]
+
+
+def test_handles_more_ids_than_sqlite_variable_limit(run_conn):
+    ids = [str(i) for i in range(40000)]
+    _scanned(run_conn, "0", "2026-01-01T00:00:00Z")
+    selected = repo.get_listings_scan_state_for_selection(run_conn, 40000, ids)
+    assert len(selected) == 40000
+    assert selected[0] == ("1", None)
+    assert selected[-1] == ("0", "2026-01-01T00:00:00Z")
+    # 一時テーブルは呼び出しごとに空に戻る
+    assert run_conn.execute("SELECT COUNT(*) FROM temp.selection_candidates").fetchone()[0] == 0
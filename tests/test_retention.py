@@ -0,0 +1,84 @@
+"""retention（run の日次集計・検知アーカイブ・incremental_vacuum）のユニットテスト。"""
+import sqlite3
+from datetime import datetime, timezone
+
+from app.config import default_config
+from app.job import retention
+from app.job.params import RunParams
+from app.store import db, repo
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def _run(conn, run_id, started_at, scanned=10):
+    conn.execute(
+        "INSERT INTO runs (run_id, started_at, finished_at, scanned_listings_count, errors_count) "
+        "VALUES (?, ?, ?, ?, 1)",
+        (run_id, started_at, started_at, scanned),
+    )
+    conn.commit()
+
+
+def _detection(conn, run_id, infringing_item_id, detected_at, status):
+    row = repo.insert_detection(
+        conn, run_id, "1", "u", 0, "i", "a", infringing_item_id, "v", "s", "j", "b", "sha256", "subj", "body",
+    )
+    conn.execute(
+        "UPDATE detections SET detected_at = ?, status = ? WHERE detection_id = ?",
+        (detected_at, status, row.detection_id),
+    )
+    conn.commit()
+    return row.detection_id
+
+
+def test_rollup_and_archive(conn):
+    _run(conn, "old1", "2025-01-05T01:00:00Z")
+    _run(conn, "old2", "2025-01-05T09:00:00Z", scanned=5)
+    _run(conn, "old3", "2025-01-06T00:00:00Z")
+    _run(conn, "new", "2026-09-30T00:00:00Z")
+    sent_id = _detection(conn, "old1", "900", "2025-01-05T01:00:00Z", "SENT")
+    _detection(conn, "old3", "901", "2025-01-06T00:00:00Z", "NEW")
+
+    result = retention.run_retention(
+        conn, keep_runs_days=180, archive_resolved_after_days=90, prune_ended_listings_days=0, now=NOW
+    )
+    assert (result.runs_rolled_up, result.detections_archived) == (2, 1)
+    # 未対応の検知が紐づく run は残る
+    assert [r[0] for r in conn.execute("SELECT run_id FROM runs ORDER BY run_id")] == ["new", "old3"]
+    day = conn.execute("SELECT * FROM run_daily_rollups WHERE day = '2025-01-05'").fetchone()
+    assert (day["runs_count"], day["scanned_listings_count"], day["errors_count"]) == (2, 15, 2)
+
+    archived = repo.get_archived_detection(conn, sent_id)
+    assert archived.infringing_item_id == "900" and archived.status == "SENT"
+    # アーカイブ済みの検知も重複扱い
+    assert repo.detection_exists(conn, "1", "900")
+    assert ("1", "900") in set(repo.iter_detection_keys(conn))
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_vacuum_conversion_runs_only_from_the_maintenance_command(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE t (x)")
+    legacy.commit()
+    legacy.close()
+    c = db.get_connection(path)
+    try:
+        db.init_schema(c)
+        result = retention.run_retention(c, 180, 90, 0, now=NOW)
+        assert result.pages_freed == 0
+        assert not retention.is_incremental_auto_vacuum(c)
+    finally:
+        c.close()
+    assert retention.vacuum_database(path)
+    c = db.get_connection(path)
+    try:
+        assert retention.is_incremental_auto_vacuum(c)
+    finally:
+        c.close()
+
+
+def test_maybe_run_retention_respects_interval(conn):
+    params = RunParams.from_config(default_config())
+    assert retention.maybe_run_retention(conn, params, now=NOW) is not None
+    assert retention.maybe_run_retention(conn, params, now=NOW) is None
@@ -0,0 +1,239 @@
+"""run_once のパイプライン処理（カウンタ集計・中止）のテスト。"""
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from app.config import default_config
+from app.ebay import models
+from app.job import processor, runner
+from app.store import db, repo
+
+
+def _summary(item_id):
+    return models.ItemSummary(
+        item_id=item_id,
+        item_web_url=f"https://www.ebay.com/itm/{item_id}",
+        image=models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}.jpg"),
+        additional_images=[models.ImageInfo(image_url=f"https://i.ebayimg.com/{item_id}_2.jpg")],
+        seller=models.Seller(username="me", user_id="me"),
+        title=f"Title {item_id}",
+    )
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_DB_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setenv("EBAY_SELLER_USERNAME", "me")
+    config = default_config()
+    config["run"].update(listing_workers=2, resolve_workers=4, stage_queue_size=2)
+    monkeypatch.setattr(runner, "load_config", lambda: config)
+    monkeypatch.setattr(runner.auth, "get_access_token", lambda: "token")
+    ids = [str(i) for i in range(12)]
+    summaries = {i: _summary(i) for i in ids}
+    monkeypatch.setattr(
+        runner, "select_listings",
+        lambda conn, params, seller, only_item, from_beginning, **_kw: ([(i, None) for i in ids], summaries, ["me"]),
+    )
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def _fake_resolve(task, ctx):
+        assert ctx.writer is not None
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return True
+
+    def _fake_search(task, ctx):
+        task.listing.add(images=1)
+        return True
+
+    monkeypatch.setattr(processor, "resolve_image", _fake_resolve)
+    monkeypatch.setattr(processor, "search_image", _fake_search)
+    monkeypatch.setattr(processor, "download_candidates", lambda task, ctx: True)
+    monkeypatch.setattr(
+        processor, "match_candidates", lambda task, ctx: task.listing.add(candidates=5)
+    )
+    return ids, active
+
+
+def _last_run():
+    conn = db.get_connection()
+    try:
+        run_id = conn.execute("SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()[0]
+        return repo.get_run(conn, run_id), conn.execute(
+            "SELECT COUNT(*) FROM listings_scan_state"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_parallel_listings_aggregate_counters(env):
+    ids, active = env
+    progress = []
+    runner.run_once(progress_callback=lambda *a: progress.append(a))
+    run, scan_states = _last_run()
+    assert active["max"] > 1
+    assert (run.scanned_listings_count, run.scanned_images_count, run.candidates_checked_count) == (12, 24, 120)
+    assert run.finished_at and scan_states == 12
+    scanned = [p[0] for p in progress]
+    assert scanned == sorted(scanned) and scanned[-1] == 12
+    conn = db.get_connection()
+    try:
+        stages = {r.stage: r for r in repo.get_run_stage_timings(conn, run.run_id)}
+    finally:
+        conn.close()
+    assert stages["select"].count == 1
+
+
+def test_cancellation_stops_pending_listings(env):
+    ids, _ = env
+    calls = {"n": 0}
+
+    def _cancel():
+        calls["n"] += 1
+        return calls["n"] > 3
+
+    runner.run_once(cancellation_check=_cancel)
+    run, _ = _last_run()
+    assert run.scanned_listings_count < len(ids)
+    assert run.notes.startswith("User cancelled")
+
+
+def test_cancelled_run_resumes_with_consistent_counters(env):
+    ids, _ = env
+    calls = {"n": 0}
+
+    def _cancel():
+        calls["n"] += 1
+        return calls["n"] > 3
+
+    runner.run_once(cancellation_check=_cancel)
+    run, _ = _last_run()
+    assert "--resume" in run.notes
+    conn = db.get_connection()
+    try:
+        pending = repo.get_pending_checkpoint_listings(conn, run.run_id)
+        assert pending and len(pending) == len(ids) - run.scanned_listings_count
+        assert [r.run_id for r in repo.list_resumable_runs(conn)] == [run.run_id]
+    finally:
+        conn.close()
+
+    progress = []
+    runner.run_once(resume_run_id=run.run_id, progress_callback=lambda *a: progress.append(a))
+    resumed, _ = _last_run()
+    assert resumed.run_id == run.run_id and resumed.finished_at
+    assert (resumed.scanned_listings_count, resumed.scanned_images_count,
+            resumed.candidates_checked_count) == (12, 24, 120)
+    assert progress[0][:2] == (run.scanned_listings_count, 12) and progress[-1][0] == 12
+    conn = db.get_connection()
+    try:
+        assert repo.list_resumable_runs(conn) == []
+        assert conn.execute("SELECT COUNT(*) FROM run_checkpoints").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_resume_unknown_run_raises(env):
+    with pytest.raises(ValueError):
+        runner.run_once(resume_run_id="missing")
+
+
+def test_sigterm_requests_graceful_stop():
+    stop_event = threading.Event()
+    names = []
+    restore = runner._install_signal_handlers(stop_event, names, runner.get_logger("test"))
+    try:
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert stop_event.is_set() and names == ["SIGTERM"]
+    finally:
+        restore()
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+def test_api_call_budget_stops_new_listings(env, monkeypatch):
+    from app.ebay import api_client
+
+    config = runner.load_config()
+    config["run"]["api_call_budget"] = 10
+    real_search = processor.search_image
+
+    def _search_with_call(task, ctx):
+        api_client.record_api_call()
+        return real_search(task, ctx)
+
+    monkeypatch.setattr(processor, "search_image", _search_with_call)
+    # 前回の run の実績: 1出品あたり API 2回 → 予算 10回で 5件に絞る
+    conn = db.get_connection()
+    try:
+        db.init_schema(conn)
+        conn.execute(
+            "INSERT INTO runs (run_id, started_at, finished_at, scanned_listings_count, api_calls_count) "
+            "VALUES ('prev', '2026-01-01T00:00:00.000000Z', '2026-01-01T00:01:00.000000Z', 10, 20)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    runner.run_once()
+    run, scan_states = _last_run()
+    assert run.notes == "API call budget reached. Processed 5/5 items"
+    assert run.scanned_listings_count == 5
+    assert run.api_calls_count == 2 * run.scanned_listings_count
+    # スキャン状態は完了した出品だけ。残りは次回の選定に回し、再開対象にはしない
+    assert scan_states == run.scanned_listings_count
+    conn = db.get_connection()
+    try:
+        assert repo.list_resumable_runs(conn) == []
+    finally:
+        conn.close()
+
+
+def test_concurrent_workers_share_one_run_via_work_queue(env, monkeypatch):
+    from app.job import work_queue
+
+    config = runner.load_config()
+    config["work_queue"] = {"enabled": True, "lease_batch": 2}
+    config["run"]["write_batch_interval_sec"] = 0.1
+    monkeypatch.setattr(work_queue, "_MAX_POLL_SEC", 0.05)
+    processed = []
+    lock = threading.Lock()
+    real_resolve = processor.resolve_image
+
+    def _resolve(task, ctx):
+        with lock:
+            processed.append((task.listing.listing_item_id, task.img_index))
+        return real_resolve(task, ctx)
+
+    monkeypatch.setattr(processor, "resolve_image", _resolve)
+    errors = []
+
+    def _worker():
+        try:
+            runner.run_once()
+        except BaseException as e:  # pragma: no cover - テスト失敗時の報告用
+            errors.append(e)
+
+    workers = [threading.Thread(target=_worker) for _ in range(2)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join(timeout=30)
+    assert not errors
+    # 2つのワーカーで1つの run を分担し、各画像を1回ずつ処理する
+    assert sorted(processed) == sorted({(str(i), j) for i in range(12) for j in range(2)})
+    run, scan_states = _last_run()
+    conn = db.get_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM work_queue").fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert run.finished_at
+    assert (run.scanned_listings_count, run.scanned_images_count, run.candidates_checked_count) == (12, 24, 120)
+    assert scan_states == 12
@@ -0,0 +1,67 @@
+"""ステージごとの所要時間の集計と記録のテスト。"""
+import pytest
+
+from app.store import repo
+from app.util import timing
+from app.util.timing import StageTimings
+
+
+def test_summary_has_count_total_percentiles_and_max():
+    t = StageTimings()
+    for sec in range(1, 21):  # 1..20 秒
+        t.record("image_search", float(sec))
+    t.record("match", 0.5)
+    with pytest.raises(ValueError):
+        with timing.measure("own_image_hash", t, None):
+            raise ValueError("decode failed")
+
+    rows = {r["stage"]: r for r in t.summary()}
+    search = rows["image_search"]
+    assert (search["count"], search["total_sec"], search["max_sec"]) == (20, 210.0, 20.0)
+    # 百分位はヒストグラムからの推定（誤差 ±3% 以内）。最大値を超えない
+    assert search["p50_sec"] == pytest.approx(10.0, rel=0.03)
+    assert search["p95_sec"] == pytest.approx(19.0, rel=0.03)
+    assert rows["match"]["p95_sec"] == pytest.approx(0.5, rel=0.03) and rows["match"]["p95_sec"] <= 0.5
+    # 例外で抜けたブロックも記録する
+    assert rows["own_image_hash"]["count"] == 1
+    assert t.summary()[0]["stage"] == "image_search"
+
+    per_listing = StageTimings(percentiles=False)
+    per_listing.record("match", 2.0)
+    assert per_listing.summary()[0]["p50_sec"] == 0.0 and per_listing.summary()[0]["max_sec"] == 2.0
+
+
+def test_percentile_memory_stays_bounded():
+    t = StageTimings()
+    for i in range(200_000):
+        t.record("candidate_download", 0.01 + (i % 1000) * 0.001)
+    assert len(t._histograms["candidate_download"]) <= timing._HIST_MAX_BUCKET + 1
+    row = t.summary()[0]
+    assert row["count"] == 200_000
+    assert row["p50_sec"] == pytest.approx(0.51, rel=0.03)
+    assert row["p95_sec"] == pytest.approx(0.96, rel=0.03)
+
+
+def test_run_timings_merge_across_workers_and_listing_rows(run_conn):
+    first, second = StageTimings(), StageTimings()
+    first.record("candidate_download", 1.0)
+    first.record("candidate_download", 3.0)
+    second.record("candidate_download", 5.0)
+    repo.save_run_stage_timings(run_conn, "r1", first.summary())
+    repo.save_run_stage_timings(run_conn, "r1", second.summary())
+    [row] = repo.get_run_stage_timings(run_conn, "r1")
+    assert (row.stage, row.count, row.total_sec, row.max_sec) == ("candidate_download", 3, 9.0, 5.0)
+    assert row.p50_sec == pytest.approx((1.0 * 2 + 5.0) / 3, rel=0.03)
+    assert repo.list_timed_run_ids(run_conn) == ["r1"]
+
+    slow, fast = StageTimings(percentiles=False), StageTimings(percentiles=False)
+    slow.record("image_search", 4.0)
+    slow.record("match", 1.0)
+    fast.record("match", 0.5)
+    repo.record_listing_timings(run_conn, "r1", "slow", slow.summary())
+    repo.record_listing_timings(run_conn, "r1", "fast", fast.summary())
+    assert repo.get_slowest_listings(run_conn, "r1") == [("slow", 5.0, "image_search"), ("fast", 0.5, "match")]
+
+    assert repo.delete_run(run_conn, "r1")
+    assert repo.get_run_stage_timings(run_conn, "r1") == []
+    assert repo.get_slowest_listings(run_conn, "r1") == []
@@ -0,0 +1,148 @@
+"""trading（GetMyeBaySelling の並列取得・パース）のユニットテスト。"""
+import io
+import re
+import threading
+
+import pytest
+
+from app.ebay import trading
+
+
+def _page_xml(item_ids, total):
+    items = "".join(
+        f"<Item><ItemID>{i}</ItemID>"
+        f"<ListingDetails><ViewItemURL>https://www.ebay.com/itm/{i}</ViewItemURL></ListingDetails>"
+        f"<Title>Title {i}</Title><PictureDetails><PictureURL>https://i.ebayimg.com/{i}.jpg</PictureURL>"
+        f"</PictureDetails></Item>"
+        for i in item_ids
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<GetMyeBaySellingResponse xmlns="urn:ebay:apis:eBLBaseComponents"><Ack>Success</Ack>'
+        f"<ActiveList><ItemArray>{items}</ItemArray>"
+        f"<PaginationResult><TotalNumberOfPages>0</TotalNumberOfPages>"
+        f"<TotalNumberOfEntries>{total}</TotalNumberOfEntries></PaginationResult></ActiveList>"
+        "</GetMyeBaySellingResponse>"
+    ).encode()
+
+
+class _FakeRaw(io.BytesIO):
+    decode_content = False
+
+
+class _FakeResponse:
+    def __init__(self, content):
+        self.raw = _FakeRaw(content)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.raw.close()
+
+
+@pytest.fixture
+def fake_trading(monkeypatch):
+    """SiteID ごとの出品 ID リストを返す偽 Trading API。"""
+    inventory = {
+        0: [f"1{n:04d}" for n in range(450)],
+        3: ["10001", "30000"],
+    }
+    calls = []
+    lock = threading.Lock()
+
+    def _post(url, headers=None, data=None, timeout=None, stream=False):
+        site_id = int(headers["X-EBAY-API-SITEID"])
+        body = data.decode()
+        page = int(re.search(r"<PageNumber>(\d+)</PageNumber>", body).group(1))
+        per_page = int(re.search(r"<EntriesPerPage>(\d+)</EntriesPerPage>", body).group(1))
+        with lock:
+            calls.append((site_id, page))
+        ids = inventory.get(site_id, [])
+        if not ids:
+            return _FakeResponse(
+                b'<GetMyeBaySellingResponse xmlns="urn:ebay:apis:eBLBaseComponents">'
+                b"<Ack>Success</Ack></GetMyeBaySellingResponse>"
+            )
+        return _FakeResponse(_page_xml(ids[(page - 1) * per_page : page * per_page], len(ids)))
+
+    monkeypatch.setattr(trading.requests, "post", _post)
+    return calls
+
+
+def test_get_my_ebay_selling_active_fetches_pages_in_parallel(fake_trading):
+    items = trading.get_my_ebay_selling_active("token", "me", max_total=1000, max_workers=3)
+    ids = [s.item_id for s in items]
+    assert len(ids) == 451
+    assert ids[:450] == [f"1{n:04d}" for n in range(450)]
+    assert ids[-1] == "30000"
+    assert sorted(p for sid, p in fake_trading if sid == 0) == [1, 2, 3]
+
+
+def test_get_my_ebay_selling_active_respects_max_total(fake_trading):
+    items = trading.get_my_ebay_selling_active("token", "me", max_total=150)
+    assert len(items) == 150
+    assert sorted(p for sid, p in fake_trading if sid == 0) == [1]
+
+
+def test_failed_page_is_retried(fake_trading, monkeypatch):
+    monkeypatch.setenv("HTTP_RETRY_BACKOFF_SEC", "0")
+    post = trading.requests.post
+    failures = {"left": 1}
+
+    def _flaky(url, headers=None, data=None, **kw):
+        if headers["X-EBAY-API-SITEID"] == "0" and "<PageNumber>2<" in data.decode() and failures["left"]:
+            failures["left"] -= 1
+            raise trading.requests.ConnectionError("reset")
+        return post(url, headers=headers, data=data, **kw)
+
+    monkeypatch.setattr(trading.requests, "post", _flaky)
+    failed = []
+    items = trading.get_my_ebay_selling_active("token", "me", max_total=1000, failed_site_ids=failed)
+    assert len(items) == 451 and failed == []
+
+
+def test_page_that_keeps_failing_marks_site_incomplete(fake_trading, monkeypatch):
+    monkeypatch.setenv("HTTP_RETRY_BACKOFF_SEC", "0")
+    post = trading.requests.post
+
+    def _broken(url, headers=None, data=None, **kw):
+        if headers["X-EBAY-API-SITEID"] == "0" and "<PageNumber>2<" in data.decode():
+            raise trading.requests.ConnectionError("reset")
+        return post(url, headers=headers, data=data, **kw)
+
+    monkeypatch.setattr(trading.requests, "post", _broken)
+    failed = []
+    items = trading.get_my_ebay_selling_active("token", "me", max_total=1000, failed_site_ids=failed)
+    # 取れたページの出品は返すが、サイトは不完全として報告する（カタログの終了判定をしない）
+    assert failed == [0]
+    assert len(items) == 251
+    assert "10200" not in {s.item_id for s in items}
+
+
+def test_request_xml_uses_output_selector():
+    body = trading._build_get_my_ebay_selling_xml(2, 200)
+    assert "<OutputSelector>ActiveList.ItemArray.Item.ItemID</OutputSelector>" in body
+    assert "<PageNumber>2</PageNumber>" in body
+
+
+def test_iter_my_ebay_selling_items_streams_items_and_meta():
+    meta = trading._ResponseMeta()
+    items = list(trading.iter_my_ebay_selling_items(io.BytesIO(_page_xml(["1", "2"], 7)), "me", meta))
+    assert [s.item_id for s in items] == ["1", "2"]
+    assert items[0].item_web_url == "https://www.ebay.com/itm/1"
+    assert items[0].image.image_url == "https://i.ebayimg.com/1.jpg"
+    assert items[0].seller.username == "me"
+    assert (meta.ack, meta.item_count, meta.total_entries, meta.has_active_list) == ("Success", 2, 7, True)
+
+
+def test_iter_my_ebay_selling_items_raises_on_failure():
+    xml = (
+        b'<GetMyeBaySellingResponse xmlns="urn:ebay:apis:eBLBaseComponents"><Ack>Failure</Ack>'
+        b"<Errors><ShortMessage>Invalid token</ShortMessage></Errors></GetMyeBaySellingResponse>"
+    )
+    with pytest.raises(RuntimeError, match="Invalid token"):
+        list(trading.iter_my_ebay_selling_items(io.BytesIO(xml), "me"))
@@ -0,0 +1,39 @@
+"""作業キュー（work_queue）のリース・期限切れの取り直し・完了のテスト。"""
+from app.store import repo
+
+SINCE = "2000-01-01T00:00:00.000000Z"
+
+
+def test_lease_renew_and_reclaim_expired(run_conn):
+    assert repo.enqueue_shared_run(run_conn, "r1", ["a", "b", "c"], SINCE) == "r1"
+    assert repo.lease_work(run_conn, "r1", "w1", 2, lease_sec=10, now=100) == [("a", 0), ("b", 0)]
+    assert repo.lease_work(run_conn, "r1", "w2", 5, lease_sec=10, now=105) == [("c", 0)]
+    assert repo.lease_work(run_conn, "r1", "w2", 5, lease_sec=10, now=106) == []
+    # w1 はハートビートで期限を延長、w2 は止まった
+    assert repo.renew_leases(run_conn, "r1", "w1", 10, now=108) == 2
+    assert repo.lease_work(run_conn, "r1", "w3", 5, lease_sec=10, now=116) == [("c", 1)]
+    assert repo.count_remaining_work(run_conn, "r1") == 3
+
+
+def test_completed_listings_leave_the_queue_and_release_returns_the_rest(run_conn):
+    repo.enqueue_shared_run(run_conn, "r1", ["a", "b"], SINCE)
+    repo.lease_work(run_conn, "r1", "w1", 5, lease_sec=10)
+    repo.mark_listing_checkpoint(run_conn, "r1", "a", "success", 1, 2, 10, 1, 0)
+    assert repo.count_remaining_work(run_conn, "r1") == 1
+    assert repo.release_leases(run_conn, "r1", "w1") == 1
+    assert repo.lease_work(run_conn, "r1", "w2", 5, lease_sec=10) == [("b", 1)]
+    repo.sync_run_counters(run_conn, "r1")
+    run = repo.get_run(run_conn, "r1")
+    assert (run.scanned_listings_count, run.scanned_images_count, run.detections_new_count) == (1, 2, 1)
+
+
+def test_concurrent_start_joins_the_first_run_and_finish_is_claimed_once(run_conn):
+    repo.enqueue_shared_run(run_conn, "r1", ["a"], SINCE)
+    repo.create_run(run_conn, "r2")
+    assert repo.find_active_shared_run(run_conn, SINCE, exclude_run_id="r2") == "r1"
+    # 同時に選定した r2 は登録せず、先に登録された r1 に合流する
+    assert repo.enqueue_shared_run(run_conn, "r2", ["a", "b"], SINCE) == "r1"
+    assert repo.count_remaining_work(run_conn, "r2") == 0
+    assert repo.claim_run_finish(run_conn, "r1", "2026-01-01T00:00:00Z")
+    assert not repo.claim_run_finish(run_conn, "r1", "2026-01-01T00:00:01Z")
+    assert repo.find_active_shared_run(run_conn, SINCE) is None
@@ -0,0 +1,118 @@
+"""BatchWriter（書き込みの Unit of Work）のユニットテスト。"""
+import sqlite3
+
+import pytest
+
+from app.store import db, repo
+from app.store.writer import BatchWriter, WriterFailedError
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "state.db")
+    c = db.get_connection(path)
+    db.init_schema(c)
+    repo.create_run(c, "r1")
+    c.close()
+    return path
+
+
+def _detection_kwargs(n):
+    return dict(
+        run_id="r1",
+        your_item_url="https://www.ebay.com/itm/1",
+        your_image_index=0,
+        your_image_url="https://i.ebayimg.com/1.jpg",
+        your_image_sha256="a" * 64,
+        infringing_item_url=f"https://www.ebay.com/itm/{n}",
+        infringing_seller_display="other",
+        infringing_image_url=f"https://i.ebayimg.com/{n}.jpg",
+        infringing_image_sha256="b" * 64,
+        match_evidence="sha256",
+        message_subject="s",
+        message_body="b",
+    )
+
+
+def _count(path, table):
+    c = db.get_connection(path)
+    try:
+        return c.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        c.close()
+
+
+def test_writes_are_buffered_until_flush(db_path):
+    with BatchWriter(db_path, flush_every_listings=100, flush_interval_sec=60) as w:
+        assert w.insert_detection("1", "900", **_detection_kwargs(900))
+        w.upsert_listing_scan_state("1", "r1", "ok")
+        w.update_run("r1", scanned_listings_count=1)
+        w.listing_done()
+        assert _count(db_path, "detections") == 0
+        w.flush()
+        assert _count(db_path, "detections") == 1
+        assert _count(db_path, "listings_scan_state") == 1
+        assert w.flush_count == 1
+
+
+def test_flushes_every_n_listings_and_on_close(db_path):
+    w = BatchWriter(db_path, flush_every_listings=2, flush_interval_sec=60)
+    for lid in ("1", "2", "3"):
+        w.upsert_listing_scan_state(lid, "r1", "ok")
+        w.listing_done()
+    w.close()
+    assert w.flush_count == 2
+    assert _count(db_path, "listings_scan_state") == 3
+
+
+def test_duplicate_detection_key_rejected(db_path):
+    with BatchWriter(db_path) as w:
+        assert w.insert_detection("1", "900", **_detection_kwargs(900))
+        assert not w.insert_detection("1", "900", **_detection_kwargs(900))
+    assert _count(db_path, "detections") == 1
+
+
+def test_insert_detection_returning_and_conflict(db_path):
+    c = db.get_connection(db_path)
+    try:
+        row = repo.insert_detection(c, your_item_id="1", infringing_item_id="900", **_detection_kwargs(900))
+        assert row is not None and row.detection_id and row.status == "NEW"
+        assert repo.insert_detection(c, your_item_id="1", infringing_item_id="900", **_detection_kwargs(900)) is None
+    finally:
+        c.close()
+
+
+def test_failed_op_commits_earlier_writes_and_stops_accepting(db_path):
+    def _broken(conn, commit=True):
+        raise sqlite3.IntegrityError("broken")
+
+    w = BatchWriter(db_path, flush_every_listings=100, flush_interval_sec=60)
+    w.upsert_listing_scan_state("1", "r1", "ok")
+    w._submit(_broken)
+    w.upsert_listing_scan_state("2", "r1", "ok")
+    with pytest.raises(WriterFailedError):
+        w.flush()
+    # 失敗した書き込みの手前までをコミットし、後ろ（チェックポイントなど）は飛ばさずに止める
+    assert _count(db_path, "listings_scan_state") == 1
+    assert w.failed
+    with pytest.raises(WriterFailedError):
+        w.upsert_listing_scan_state("3", "r1", "ok")
+    with pytest.raises(WriterFailedError):
+        w.close()
+
+
+def test_transient_batch_failure_is_reapplied_op_by_op(db_path):
+    calls = {"n": 0}
+
+    def _flaky(conn, commit=True):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    with BatchWriter(db_path, flush_every_listings=100, flush_interval_sec=60) as w:
+        w.upsert_listing_scan_state("1", "r1", "ok")
+        w._submit(_flaky)
+        w.upsert_listing_scan_state("2", "r1", "ok")
+        w.flush()
+        assert not w.failed
+    assert _count(db_path, "listings_scan_state") == 2